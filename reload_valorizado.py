@@ -19,6 +19,9 @@ Uso — Render Shell (DATABASE_URL ya está en el entorno):
 Uso — batch size distinto:
   BATCH_SIZE=3000 python reload_valorizado.py
 
+Uso — solo summaries (incremental por mes; --full reconstruye todas):
+  python reload_valorizado.py --summaries-only [--full]
+
 Post-carga verifica automáticamente que SUM(monto_yhat) = $121.742B.
 """
 
@@ -159,23 +162,23 @@ def _enrich_batch(
     return df
 
 
-def _rebuild_forecast_summaries(engine) -> None:
-    """Reconstruye las 2 summaries agregadas. Idempotente (2+ corridas) y atómico. Solo PostgreSQL.
+def _rebuild_forecast_summaries(engine, *, completo: bool = False) -> None:
+    """Refresca las summaries agregadas. Idempotente (2+ corridas) y atómico. Solo PostgreSQL.
+
+    Las summaries con fecha (granos cliente×subneg×mes, subneg×perfil×mes,
+    producto×mes) viven en web_comparativas/forecast_summaries.py y se refrescan
+    solo para los meses cuya firma cambió (`completo=True` / `--full` fuerza build
+    + swap de todas). forecast_product_summary no tiene fecha: se reconstruye siempre.
 
     Literal entero 0 en COALESCE = espeja las queries de los endpoints.
     Tipos resultantes: monto_yhat -> double precision; yhat_cliente -> numeric (SUM(bigint)).
     """
     from sqlalchemy import text
+    from web_comparativas import forecast_summaries
     if "postgresql" not in str(engine.url):
         logger.info("Summaries: motor no-PostgreSQL -> omitido (gate de motor).")
         return
     SUMMARIES = [
-        ("forecast_valorizado_summary", "idx_fvs_filtros", "(perfil, neg, subneg, fecha)",
-         """SELECT perfil, neg, subneg, nombre_grupo, fantasia, cliente_id, fecha,
-                   SUM(COALESCE(monto_yhat,   0)) AS monto_yhat,
-                   SUM(COALESCE(yhat_cliente, 0)) AS yhat_cliente
-            FROM forecast_valorizado
-            GROUP BY perfil, neg, subneg, nombre_grupo, fantasia, cliente_id, fecha"""),
         ("forecast_product_summary", "idx_fps_filtros", "(perfil, neg)",
          # Rama A (valorizado) = volumen real; Rama B (main) = catálogo completo con
          # vol 0, para preservar las series de forecast_main sin filas en valorizado.
@@ -192,9 +195,10 @@ def _rebuild_forecast_summaries(engine) -> None:
             ) u
             GROUP BY perfil, neg, codigo_serie"""),
     ]
-    logger.info("Reconstruyendo summaries (build + swap atomico)...")
+    logger.info("Refrescando summaries (%s)...", "completo" if completo else "incremental por mes")
     with engine.begin() as conn:                      # 1 transaccion -> readers ven la vieja hasta el commit
         conn.execute(text("SET LOCAL statement_timeout = 0"))
+        resumen = forecast_summaries.refrescar(conn, completo=completo)
         for base, idx, idx_cols, select_sql in SUMMARIES:
             # BUILD (self-healing: limpia restos de una corrida fallida previa)
             conn.execute(text(f"DROP TABLE IF EXISTS {base}_new"))
@@ -206,7 +210,9 @@ def _rebuild_forecast_summaries(engine) -> None:
             conn.execute(text(f"ALTER TABLE {base}_new RENAME TO {base}"))
             conn.execute(text(f"DROP TABLE IF EXISTS {base}_old"))   # MOVIDO ARRIBA: libera el nombre del indice {idx}
             conn.execute(text(f"ALTER INDEX IF EXISTS {idx}_new RENAME TO {idx}"))
-    logger.info("Summaries reconstruidas OK.")
+    for tabla, info in resumen.items():
+        logger.info("  %-32s %-12s meses=%d", tabla, info["modo"], info["meses"])
+    logger.info("Summaries OK.")
 
 
 # ---------------------------------------------------------------------------
@@ -340,7 +346,7 @@ if __name__ == "__main__":
             logger.error("DATABASE_URL no configurado.")
             sys.exit(1)
         engine = _get_engine(DATABASE_URL)   # mismo método que run() (línea ~179)
-        logger.info("Modo --summaries-only: reconstruyo summaries sin recargar valorizado.")
-        _rebuild_forecast_summaries(engine)
+        logger.info("Modo --summaries-only: refresco summaries sin recargar valorizado.")
+        _rebuild_forecast_summaries(engine, completo="--full" in sys.argv)
     else:
         run()
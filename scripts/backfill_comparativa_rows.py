@@ -0,0 +1,65 @@
+"""Backfill / re-sync de comparativa_rows desde los normalized_content de uploads.
+
+Procesa muchos uploads en paralelo (el parseo del Excel va a procesos hijos) y escribe
+cada upload en su propia transacción, así que cortarlo a mitad de camino no deja
+uploads a medias.
+
+Uso:
+    python -m scripts.backfill_comparativa_rows                     # solo pendientes
+    python -m scripts.backfill_comparativa_rows --workers 4         # pendientes, en paralelo
+    python -m scripts.backfill_comparativa_rows --resync --workers 4
+    python -m scripts.backfill_comparativa_rows --resync --desde-id 1834   # reanudar
+    python -m scripts.backfill_comparativa_rows --dry-run           # solo cuenta
+
+Reanudar: sin --resync alcanza con volver a correrlo (saltea los uploads que ya tienen
+filas). Con --resync, pasar --desde-id con la "marca de agua" del último progreso
+impreso: todos los uploads con id <= marca de agua ya quedaron escritos.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+from web_comparativas.models import SessionLocal
+from web_comparativas.comparativa_rows_sync import sincronizar_uploads, uploads_pendientes
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Backfill de comparativa_rows")
+    ap.add_argument("--workers", type=int, default=1, help="procesos de parseo en paralelo")
+    ap.add_argument("--resync", action="store_true", help="reescribe también los uploads ya sincronizados")
+    ap.add_argument("--desde-id", type=int, default=None, help="solo uploads con id mayor a este")
+    ap.add_argument("--limit", type=int, default=None, help="máximo de uploads a procesar")
+    ap.add_argument("--cada", type=int, default=25, help="imprime progreso cada N uploads")
+    ap.add_argument("--dry-run", action="store_true", help="solo informa cuántos uploads procesaría")
+    args = ap.parse_args()
+
+    if args.dry_run:
+        session = SessionLocal()
+        try:
+            ids = uploads_pendientes(session, resync=args.resync, desde_id=args.desde_id, limite=args.limit)
+        finally:
+            session.close()
+        rango = f" (ids {ids[0]}..{ids[-1]})" if ids else ""
+        print(f"[BACKFILL_COMP][DRY] {len(ids)} uploads a sincronizar{rango}.")
+        return 0
+
+    def progreso(estado: dict) -> None:
+        hechos = estado["ok"] + estado["errores"]
+        if hechos % max(args.cada, 1) == 0 or hechos == estado["total"]:
+            print(
+                f"[BACKFILL_COMP] {hechos}/{estado['total']} uploads | {estado['filas']} filas | "
+                f"{estado['errores']} errores | {estado['segundos']}s | marca de agua: {estado['marca_agua']}",
+                flush=True,
+            )
+
+    estado = sincronizar_uploads(
+        workers=args.workers, resync=args.resync, desde_id=args.desde_id,
+        limite=args.limit, progreso=progreso,
+    )
+    print(f"[BACKFILL_COMP] Fin: {estado}")
+    return 1 if estado["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,12 @@ Uso:
     python -m scripts.backfill_dim_entidades --run 7    # una corrida puntual
     python -m scripts.backfill_dim_entidades --all      # todas las corridas success
     python -m scripts.backfill_dim_entidades --dry-run  # solo reporta stats, no escribe
+    python -m scripts.backfill_dim_entidades --completo # re-matchea todo (auditoría)
+
+Por defecto resuelve INCREMENTAL: los CUITs/nombres ya presentes en
+dimensionamiento_identidad_claves conservan su entidad sin volver a matchearse. Con
+--completo se re-matchea desde cero (las claves numéricas siguen estables) y las stats
+informan cuántos nombres quedaron `reasignadas`.
 
 Requiere que la migración de esquema (ensure_dimensionamiento_entidad_columns) ya haya
 corrido — sucede en el startup de main.py.
@@ -46,6 +52,7 @@ def main() -> int:
     ap.add_argument("--run", type=int, default=None, help="import_run_id puntual")
     ap.add_argument("--all", action="store_true", help="todas las corridas success")
     ap.add_argument("--dry-run", action="store_true", help="solo reporta stats, no escribe")
+    ap.add_argument("--completo", action="store_true", help="re-matchea todos los nombres (auditoría)")
     args = ap.parse_args()
 
     session = SessionLocal()
@@ -56,10 +63,10 @@ def main() -> int:
             return 1
         for run_id in runs:
             if args.dry_run:
-                res = resolve_entities(session, run_id)
+                res = resolve_entities(session, run_id, incremental=not args.completo)
                 print(f"[BACKFILL][DRY] run={run_id} stats={res.stats} ambiguas={len(res.ambiguous)}")
             else:
-                stats = rebuild_client_entities(session, run_id, commit=True)
+                stats = rebuild_client_entities(session, run_id, commit=True, incremental=not args.completo)
                 print(f"[BACKFILL] run={run_id} OK stats={stats}")
         return 0
     finally:
@@ -0,0 +1,162 @@
+"""
+Benchmark del SQL de Forecast: literales interpolados vs binds vs PREPARE/EXECUTE.
+
+Compara, para las formas recurrentes de chart / client-table / treemap, el mismo
+WHERE armado de tres maneras:
+  - literal:   como antes de `forecast_sql` (IN ('a','b') / fecha >= '2026-01-01');
+  - binds:     `= ANY(:perfil_0)` vía text() (el driver interpola del lado cliente);
+  - preparado: `forecast_sql.ejecutar` → PREPARE una vez por conexión + EXECUTE.
+
+Mide:
+  1. Planning Time de `EXPLAIN (ANALYZE, SUMMARY)` (para "preparado" se explica el
+     EXECUTE, así que a partir de la 6ª ejecución refleja el plan genérico cacheado).
+  2. Latencia ida y vuelta (ms, p50/p95) sobre N iteraciones rotando los valores de
+     los filtros, que es lo que genera textos distintos en el modo literal.
+
+Uso (desde la raíz del proyecto, venv activado, DATABASE_URL apuntando a Postgres):
+    python scripts/bench_forecast_sql.py
+    python scripts/bench_forecast_sql.py --iter 50 --cuentas 2000
+
+Solo lectura. Aborta si la base configurada no es PostgreSQL.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import text  # noqa: E402
+
+from web_comparativas import forecast_service as svc  # noqa: E402
+from web_comparativas import forecast_sql  # noqa: E402
+
+FORMAS = {
+    "chart": (
+        "SELECT fecha, SUM(COALESCE(monto_yhat, 0)) AS total_forecast "
+        "FROM forecast_valorizado WHERE {where} GROUP BY fecha ORDER BY fecha"
+    ),
+    "client_table": (
+        "SELECT fantasia, nombre_grupo, fecha, SUM(COALESCE(monto_yhat, 0)) AS val "
+        "FROM forecast_valorizado WHERE {where} "
+        "GROUP BY fantasia, nombre_grupo, fecha ORDER BY fecha"
+    ),
+    "treemap": (
+        "SELECT neg, subneg, SUM(COALESCE(monto_yhat, 0)) AS val "
+        "FROM forecast_valorizado WHERE {where} GROUP BY neg, subneg"
+    ),
+}
+
+
+def _valores(conn, col: str, limite: int) -> list[str]:
+    return [
+        r[0] for r in conn.execute(text(
+            f"SELECT DISTINCT {col} FROM forecast_valorizado WHERE {col} IS NOT NULL LIMIT {int(limite)}"
+        ))
+    ]
+
+
+def _variantes(conn, n: int, n_cuentas: int) -> list[dict]:
+    """Filtros rotativos: misma forma, valores distintos en cada iteración."""
+    perfiles = _valores(conn, "perfil", 20) or ["-"]
+    negs = _valores(conn, "neg", 20) or ["-"]
+    cuentas = _valores(conn, "cliente_id", n_cuentas) or ["-"]
+    fechas = ["2025-01-01", "2025-04-01", "2025-07-01", "2025-10-01"]
+    out = []
+    for i in range(n):
+        out.append({
+            "start_date": fechas[i % len(fechas)],
+            "profiles": [perfiles[i % len(perfiles)]],
+            "neg": [negs[j % len(negs)] for j in range(i % 3 + 1)],
+            "cuentas": cuentas[i % 7:],
+        })
+    return out
+
+
+def _planning_ms(conn, sql: str, args: tuple | None = None) -> float:
+    if args is None:
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}")).scalar()
+    else:
+        marcas = ", ".join(["%s"] * len(args))
+        plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql} ({marcas})", args).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0].get("Planning Time", 0.0))
+
+
+def _sql(plantilla: str, filtros: dict) -> str:
+    """Mismo armado que los `_pg_*_inner`: dentro de un scope sale con binds."""
+    extra = svc._safe_in("cliente_id", filtros["cuentas"])
+    campos = {k: v for k, v in filtros.items() if k != "cuentas"}
+    return plantilla.format(where=svc._build_filter_sql(**campos, extra=extra))
+
+
+def _correr(conn, plantilla: str, variantes: list[dict], modo: str) -> tuple[list[float], list[float]]:
+    latencias, planning = [], []
+    for filtros in variantes:
+        if modo == "literal":
+            sql = _sql(plantilla, filtros)
+            t0 = time.perf_counter()
+            conn.execute(text(sql)).fetchall()
+            latencias.append((time.perf_counter() - t0) * 1000)
+            planning.append(_planning_ms(conn, sql))
+            continue
+        with forecast_sql.bind_scope():
+            sql = _sql(plantilla, filtros)
+            preparar = modo == "preparado"
+            t0 = time.perf_counter()
+            forecast_sql.ejecutar(conn, sql, text=text, preparar=preparar).fetchall()
+            latencias.append((time.perf_counter() - t0) * 1000)
+            if not preparar:
+                # Con psycopg2 el driver interpola del lado cliente: el plan es el de 'literal'.
+                planning.append(float("nan"))
+                continue
+            orden = forecast_sql.nombres(sql)
+            nombre = forecast_sql._preparar(conn, sql, orden)
+            params = forecast_sql.params_para(sql)
+            planning.append(_planning_ms(conn, f"EXECUTE {nombre}", tuple(params[n] for n in orden)))
+    return latencias, planning
+
+
+def _resumen(valores: list[float]) -> str:
+    vals = sorted(v for v in valores if v == v)
+    if not vals:
+        return "      -          -"
+    p95 = vals[min(len(vals) - 1, int(round(0.95 * (len(vals) - 1))))]
+    return f"{statistics.median(vals):9.2f}  {p95:9.2f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iter", type=int, default=30, help="iteraciones por forma y modo")
+    parser.add_argument("--cuentas", type=int, default=500, help="tamaño de la lista de cuentas (cartera)")
+    args = parser.parse_args()
+
+    if svc.engine is None or "postgresql" not in str(svc.engine.url):
+        print("Este benchmark necesita PostgreSQL (DATABASE_URL); la base configurada no lo es.")
+        return 2
+
+    with svc.engine.connect() as conn:
+        variantes = _variantes(conn, args.iter, args.cuentas)
+        print(f"{'forma':<14}{'modo':<11}{'lat p50':>10}{'lat p95':>11}{'plan p50':>11}{'plan p95':>11}")
+        for forma, plantilla in FORMAS.items():
+            for modo in ("literal", "binds", "preparado"):
+                lat, plan = _correr(conn, plantilla, variantes, modo)
+                print(f"{forma:<14}{modo:<11} {_resumen(lat)}  {_resumen(plan)}")
+            conn.rollback()
+        # Los statements preparados viven en la conexión: se liberan antes de devolverla.
+        conn.exec_driver_sql("DEALLOCATE ALL")
+        conn.info.pop(forecast_sql._INFO_KEY, None)
+    print("\nplan = Planning Time de EXPLAIN (ANALYZE, SUMMARY); en 'binds' no se mide (el "
+          "driver interpola del lado cliente, el plan es el mismo que 'literal').")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -18,6 +18,7 @@ Uso (desde la raíz del proyecto, venv activado):
     python scripts/rebuild_oportunidades.py
     python scripts/rebuild_oportunidades.py --run-id 5
     python scripts/rebuild_oportunidades.py --examples 5
+    python scripts/rebuild_oportunidades.py --incremental   # solo los pares que cambiaron
 
 Opera sobre la base configurada por la app (local: web_comparativas/app.db).
 """
@@ -27,6 +28,7 @@ import argparse
 import datetime as dt
 import statistics
 import sys
+import time
 from collections import defaultdict
 from pathlib import Path
 
@@ -230,6 +232,7 @@ def main() -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--run-id", dest="run_id", type=int, default=None, help="Run a procesar (default: run activo).")
     parser.add_argument("--examples", dest="examples", type=int, default=3, help="Cantidad de ejemplos de detalle (default 3).")
+    parser.add_argument("--incremental", action="store_true", help="Reescribe solo los pares que cambiaron respecto del run previo.")
     args = parser.parse_args()
 
     session = SessionLocal()
@@ -244,8 +247,15 @@ def main() -> int:
 
         print(f"OPORTUNIDADES_ENABLED = {opp.OPORTUNIDADES_ENABLED()}", flush=True)
         print(f"Reconstruyendo oportunidades para run_id={run_id} ...", flush=True)
-        result = opp.rebuild_oportunidades_for_run(session, run_id, commit=True)
-        print(f"Rebuild status={result.get('status')} filas={result.get('rows')}", flush=True)
+        t0 = time.perf_counter()
+        result = opp.rebuild_oportunidades_for_run(session, run_id, commit=True, incremental=args.incremental)
+        print(
+            f"Rebuild status={result.get('status')} filas={result.get('rows')} "
+            f"modo={(result.get('stats') or {}).get('modo')} {time.perf_counter() - t0:.1f}s",
+            flush=True,
+        )
+        if (result.get("stats") or {}).get("incremental"):
+            print(f"   incremental: {result['stats']['incremental']}", flush=True)
 
         stats = result.get("stats") or {}
         ref_month = dt.date.fromisoformat(stats["ref_month"]) if stats.get("ref_month") else None
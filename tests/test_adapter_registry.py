@@ -0,0 +1,125 @@
+"""Registry de adapters compilado: paridad con el despacho viejo, recarga por mtime y dry-run."""
+from __future__ import annotations
+
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import adapter_registry as areg
+
+REGISTRY = Path(__file__).resolve().parents[1] / "web_comparativas" / "registry.yml"
+
+METAS = [
+    {"filename": "Informe.PDF"},
+    {"filename": "comparativa.xlsx", "platform": "bac"},
+    {"filename": "comparativa.xls", "platform": "PBAC"},
+    {"filename": "cuadro.csv", "platform": "COMPRAR"},
+    {"filename": "lote.zip", "platform": "LA_PAMPA"},
+    {"filename": "lote.zip", "platform": "SIPROSA"},
+    {"filename": "lote.zip", "platform": "BAC"},
+    {"filename": "", "platform": ""},
+]
+
+
+def _pick_viejo(meta, sources):
+    """Copia del loop de `services._pick_handler` previo (referencia de paridad)."""
+    fname = meta.get("filename", "") or ""
+    platform = (meta.get("platform", "") or "").upper()
+    for s in sources:
+        w = s.get("when", {}) or {}
+        ok = True
+        if "platform" in w and w["platform"]:
+            ok &= platform in [str(p).upper() for p in w["platform"]]
+        if w.get("filename_regex"):
+            if not re.match(w["filename_regex"], fname, flags=re.I):
+                ok = False
+        if ok:
+            return s["handler"], s.get("id")
+    d = [x for x in sources if x.get("id") == "DEFAULT"]
+    return d[0]["handler"], "DEFAULT"
+
+
+def test_paridad_con_el_registry_real():
+    sources = yaml.safe_load(REGISTRY.read_text(encoding="utf-8"))["sources"]
+    reg = areg.compile_file(REGISTRY)
+    assert reg.combined is not None
+    for meta in METAS:
+        rule = reg.resolve(meta)
+        assert (rule.spec, rule.id) == _pick_viejo(meta, sources), meta
+
+
+def test_patron_no_combinable_se_evalua_suelto():
+    reg = areg.compile_sources([
+        {"id": "DOBLE", "when": {"filename_regex": r"(a)\1\.xlsx$"}, "handler": "os.path:join"},
+        {"id": "DEFAULT", "when": {}, "handler": "os.path:basename"},
+    ])
+    assert reg.combined is None                   # el backref no sobrevive al combinar
+    assert reg.resolve({"filename": "AA.xlsx"}).id == "DOBLE"
+    assert reg.resolve({"filename": "ab.xlsx"}).id == "DEFAULT"
+
+
+def test_backref_numerado_no_entra_en_la_combinada():
+    # combinado, el \1 de la segunda regla apuntaría al grupo de la primera y
+    # la expresión igual compila: 'xx.pdf' caía en DEFAULT
+    reg = areg.compile_sources([
+        {"id": "AB", "when": {"filename_regex": r"(a)b"}, "handler": "os.path:join"},
+        {"id": "DOBLE", "when": {"filename_regex": r"(x)\1\.pdf"}, "handler": "os.path:join"},
+        {"id": "DEFAULT", "when": {}, "handler": "os.path:basename"},
+    ])
+    assert reg.combined is not None and reg.rules[1].filename_slot is None
+    assert re.match(r"(x)\1\.pdf", "xx.pdf")
+    assert reg.resolve({"filename": "xx.pdf"}).id == "DOBLE"
+    assert reg.resolve({"filename": "ab.xlsx"}).id == "AB"
+    assert reg.resolve({"filename": "xy.pdf"}).id == "DEFAULT"
+
+
+def test_nombre_de_grupo_repetido_evalua_todo_suelto():
+    reg = areg.compile_sources([
+        {"id": "A", "when": {"filename_regex": r"(?P<n>a)\.pdf"}, "handler": "os.path:join"},
+        {"id": "B", "when": {"filename_regex": r"(?P<n>b)\.pdf"}, "handler": "os.path:join"},
+    ])
+    assert reg.combined is None and all(r.filename_slot is None for r in reg.rules)
+    assert reg.resolve({"filename": "b.pdf"}).id == "B"
+
+
+def test_recarga_por_mtime_y_handler_memoizado(tmp_path):
+    path = tmp_path / "registry.yml"
+    path.write_text("sources:\n  - id: A\n    when: {}\n    handler: 'os.path:join'\n", encoding="utf-8")
+    reg = areg.get_registry(path)
+    assert areg.get_registry(path) is reg
+    assert reg.resolve({}).handler() is os.path.join is areg.load_handler("os.path:join")
+
+    path.write_text("sources:\n  - id: BB\n    when: {}\n    handler: 'os.path:basename'\n", encoding="utf-8")
+    nuevo = areg.get_registry(path)
+    assert nuevo is not reg and nuevo.resolve({}).id == "BB"
+
+
+def test_explain_reporta_condiciones_y_tiempos():
+    reg = areg.compile_file(REGISTRY)
+    out = reg.explain({"filename": "lote.zip", "platform": "SIPROSA"})
+    assert out["selected"] == "SIPROSA" and not out["fallback_default"]
+    por_id = {r["id"]: r for r in out["rules"]}
+    assert por_id["TENDER_PDF"]["checks"] == [{"when": "filename_regex", "ok": False}]
+    assert por_id["BAC"]["checks"] == [{"when": "platform", "ok": False}]
+    assert all(r["us"] >= 0 for r in out["rules"])
+    assert areg.benchmark(reg, METAS, repeat=3)["calls"] == 3 * len(METAS)
+
+
+def test_pick_handler_de_utils_registry_mantiene_su_semantica():
+    from web_comparativas.utils_registry import pick_handler
+
+    sources = [
+        {"id": "PDF", "when": {"platform": ["BAC"], "filename_regex": r"\.pdf$"}, "handler": "os.path:join"},
+        {"id": "ZIP", "when": {"buyer_regex": "Hospital"}, "handler": "os.path:basename"},
+    ]
+    assert pick_handler({"platform": "BAC", "filename": "x/informe.pdf"}, sources) == (os.path.join, "PDF")
+    assert pick_handler({"buyer": "Hospital Central"}, sources)[1] == "ZIP"
+    for meta in ({"platform": "bac", "filename": "informe.pdf"}, {"buyer": "hospital central"}):
+        with pytest.raises(ValueError):                # sensible a mayúsculas y sin DEFAULT
+            pick_handler(meta, sources)
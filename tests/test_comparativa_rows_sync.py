@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import datetime as dt
+import io
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import comparativa_rows_sync as sync
+from web_comparativas.models import Base, ComparativaRow, Upload, User
+
+
+def _loop_viejo(df: pd.DataFrame, meta: dict) -> list[dict]:
+    """Copia del loop `iterrows()` que reemplaza `filas_comparativa` (referencia de paridad)."""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    salida = []
+    for _, row in df.iterrows():
+        rec = dict(meta)
+        for excel_col, model_col in sync.EXCEL_COL_MAP.items():
+            val = row.get(excel_col)
+            if val is not None and not (isinstance(val, float) and pd.isna(val)):
+                if model_col == "posicion":
+                    try:
+                        val = int(val)
+                    except Exception:
+                        val = None
+                elif model_col in sync.COLUMNAS_FLOAT:
+                    try:
+                        val = float(val)
+                    except Exception:
+                        val = None
+                else:
+                    val = str(val).strip() if val else None
+                rec[model_col] = val
+        salida.append(rec)
+    return salida
+
+
+def _excel(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _df_prueba(n: int = 6) -> pd.DataFrame:
+    return pd.DataFrame({
+        " Proveedor ": ["Acme SA", "  Beta  ", None, 0, "Gamma", "   "][:n],
+        "Renglón": [1, 2, 3, 4, 5, 6][:n],
+        "Descripción": ["Gasa", "Guante", "Sutura", None, "Jeringa", "Aguja"][:n],
+        "Cantidad solicitada": [10, "20", "n/a", None, 5.5, " 7 "][:n],
+        "Precio unitario": [1.25, 2, "x", 3, None, 0][:n],
+        "Posicion": [1, 2.9, "3", "abc", None, 6.0][:n],
+        "Marca": ["M1", None, "M3", "M4", "", "M6"][:n],
+    })
+
+
+def _normalizar(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    return valor
+
+
+def test_conversion_vectorizada_coincide_con_el_loop_viejo():
+    df = _df_prueba()
+    meta = {"upload_id": 7, "fecha_apertura": dt.date(2026, 3, 1), "nro_proceso": "P-1",
+            "comprador": "Hospital", "plataforma": "BAC", "cuenta": "123", "provincia": "CABA"}
+
+    nuevo = sync.a_registros(sync.filas_comparativa(df, meta))
+    viejo = _loop_viejo(df, meta)
+
+    assert len(nuevo) == len(viejo)
+    for fila_nueva, fila_vieja in zip(nuevo, viejo):
+        for columna in sync.COLUMNAS:
+            assert _normalizar(fila_nueva[columna]) == _normalizar(fila_vieja.get(columna)), columna
+
+
+def test_posicion_fuera_de_rango_queda_nula():
+    filas = sync.filas_comparativa(pd.DataFrame({"Posicion": [1e12, float("inf"), 4]}), {})
+    assert sync.a_registros(filas)[0]["posicion"] is None
+    assert [r["posicion"] for r in sync.a_registros(filas)] == [None, None, 4]
+
+
+@pytest.fixture()
+def session_factory(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[User.__table__, Upload.__table__, ComparativaRow.__table__])
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(sync, "SessionLocal", factory)
+    return factory
+
+
+def _cargar_uploads(factory, cantidad: int, *, roto: int | None = None) -> None:
+    with factory() as s:
+        for upload_id in range(1, cantidad + 1):
+            contenido = b"no es un xlsx" if upload_id == roto else _excel(_df_prueba(upload_id % 6 + 1))
+            s.add(Upload(
+                id=upload_id, proceso_nro=f"P-{upload_id}", apertura_fecha="2026-02-03",
+                status="done", normalized_content=contenido,
+            ))
+        s.add(Upload(id=cantidad + 1, proceso_nro="pendiente", status="pending", normalized_content=b"x"))
+        s.commit()
+
+
+def _filas_por_upload(factory) -> dict[int, int]:
+    with factory() as s:
+        return dict(s.execute(
+            select(ComparativaRow.upload_id, func.count()).group_by(ComparativaRow.upload_id)
+        ).all())
+
+
+def test_escribir_filas_reemplaza_las_del_upload(session_factory):
+    _cargar_uploads(session_factory, 1)
+    with session_factory() as s:
+        up = s.execute(select(Upload.__table__).where(Upload.id == 1)).first()
+        assert sync.sincronizar_upload(s, up, up.normalized_content) == 2
+        assert sync.sincronizar_upload(s, up, up.normalized_content) == 2
+        s.commit()
+        fila = s.execute(select(ComparativaRow).order_by(ComparativaRow.id)).scalars().first()
+    assert _filas_por_upload(session_factory) == {1: 2}
+    assert fila.fecha_apertura == dt.date(2026, 2, 3)
+    assert fila.proveedor == "Acme SA"
+    assert fila.posicion == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_backfill_en_paralelo_con_progreso(session_factory, workers):
+    _cargar_uploads(session_factory, 8, roto=3)
+    progreso = []
+
+    estado = sync.sincronizar_uploads(workers=workers, progreso=progreso.append)
+
+    filas = _filas_por_upload(session_factory)
+    assert set(filas) == {1, 2, 4, 5, 6, 7, 8}
+    assert filas[5] == 6
+    assert estado["ok"] == 7 and estado["errores"] == 1
+    assert estado["filas"] == sum(filas.values())
+    assert estado["marca_agua"] == 8
+    assert [p["ok"] + p["errores"] for p in progreso] == list(range(1, 9))
+
+
+def test_backfill_reanuda_y_resync_desde_marca_de_agua(session_factory):
+    _cargar_uploads(session_factory, 5)
+    primera = sync.sincronizar_uploads(limite=2)
+    assert primera["marca_agua"] == 2
+
+    # Sin resync solo quedan los que no tienen filas.
+    with session_factory() as s:
+        assert sync.uploads_pendientes(s) == [3, 4, 5]
+    sync.sincronizar_uploads()
+    with session_factory() as s:
+        assert sync.uploads_pendientes(s) == []
+        assert sync.uploads_pendientes(s, resync=True, desde_id=3) == [4, 5]
+
+    antes = _filas_por_upload(session_factory)
+    estado = sync.sincronizar_uploads(resync=True, desde_id=3)
+    assert estado["total"] == 2
+    assert _filas_por_upload(session_factory) == antes
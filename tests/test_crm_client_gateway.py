@@ -0,0 +1,245 @@
+"""Gateway del CRM contra un CRM de mentira levantado en localhost (http.server)."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.dimensionamiento import crm_client
+
+
+class StubCrm:
+    """Estado compartido con el handler: qué responde y qué le pidieron."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hits: dict[str, int] = {}
+        self.tokens_emitidos = 0
+        self.tokens_validos: set[str] = set()
+        self.usuarios = [
+            {"id": "u1", "usuario": "jacqueline.gallo"},
+            {"id": "u2", "usuario": "Ayelen.Perez"},
+        ]
+        self.cuentas = {"100": "acc-100", "200": "acc-200", "300": "acc-300"}
+        self.demora_cuenta = 0.0
+        self.usuarios_caido = False
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def contar(self, ruta: str) -> None:
+        with self.lock:
+            self.hits[ruta] = self.hits.get(ruta, 0) + 1
+
+
+def _handler(stub: StubCrm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *_args) -> None:
+            pass
+
+        def _responder(self, status: int, payload: dict) -> None:
+            cuerpo = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _autorizado(self) -> bool:
+            token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+            return token in stub.tokens_validos
+
+        def do_POST(self) -> None:
+            largo = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(largo)
+            ruta = urlparse(self.path).path
+            stub.contar(ruta)
+            if ruta != "/Api/access_token":
+                return self._responder(404, {"error": "no"})
+            with stub.lock:
+                stub.tokens_emitidos += 1
+                token = f"tok-{stub.tokens_emitidos}"
+                stub.tokens_validos.add(token)
+            self._responder(200, {"access_token": token, "expires_in": 3600})
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            stub.contar(url.path)
+            if not self._autorizado():
+                return self._responder(401, {"error": "token inválido"})
+            if url.path.endswith("/usuarios_rendidores"):
+                if stub.usuarios_caido:
+                    return self._responder(503, {"error": "mantenimiento"})
+                return self._responder(200, {"status": True, "data": stub.usuarios})
+            if url.path.endswith("/Cuentas_por_numero_fusion"):
+                numero = parse_qs(url.query).get("n_cuenta_c", [""])[0]
+                with stub.lock:
+                    stub.en_vuelo += 1
+                    stub.max_en_vuelo = max(stub.max_en_vuelo, stub.en_vuelo)
+                try:
+                    time.sleep(stub.demora_cuenta)
+                finally:
+                    with stub.lock:
+                        stub.en_vuelo -= 1
+                if numero not in stub.cuentas:
+                    return self._responder(200, {"status": False, "message": "sin datos"})
+                return self._responder(200, {"status": True, "data": {
+                    "id": stub.cuentas[numero], "name": f"Cliente {numero}", "n_cuenta_c": numero,
+                }})
+            self._responder(404, {"error": "no"})
+
+    return Handler
+
+
+@pytest.fixture()
+def stub(monkeypatch):
+    estado = StubCrm()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(estado))
+    hilo = threading.Thread(target=server.serve_forever, daemon=True)
+    hilo.start()
+    monkeypatch.setenv("CRM_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("CRM_CLIENT_ID", "cliente")
+    monkeypatch.setenv("CRM_CLIENT_SECRET", "secreto")
+    monkeypatch.setenv("CRM_MODO", "test")
+    for nombre in ("CRM_CA_BUNDLE", "CRM_CA_PEM", "CRM_USUARIO_FALLBACK_ID"):
+        monkeypatch.delenv(nombre, raising=False)
+    crm_client.limpiar_caches()
+    yield estado
+    crm_client.limpiar_caches()
+    server.shutdown()
+    server.server_close()
+
+
+USUARIOS = "/Api/V8/custom/reports/usuarios_rendidores"
+CUENTAS = "/Api/V8/custom/reports/Cuentas_por_numero_fusion"
+
+
+def test_token_y_directorio_se_reutilizan_entre_requests(stub):
+    for _ in range(3):
+        ctx = crm_client.contexto_asignacion("Jacqueline.Gallo@suizo.com")
+        assert ctx["match"] == {"id": "u1", "usuario": "jacqueline.gallo", "origen": "match"}
+    crm_client.consultar_cuentas(["100"])
+
+    assert stub.hits["/Api/access_token"] == 1
+    assert stub.hits[USUARIOS] == 1
+
+
+def test_indice_del_directorio_coincide_con_el_match_lineal(stub):
+    directorio = crm_client.directorio_usuarios()
+    for email in ("ayelen.perez@suizo.com", " AYELEN.PEREZ ", "nadie@suizo.com", "", None):
+        assert directorio.match(email) == crm_client.buscar_match_usuario(directorio.usuarios, email)
+    assert directorio.buscar("ayelen.perez")["id"] == "u2"
+
+
+def test_contexto_devuelve_copias_del_snapshot(stub):
+    ctx = crm_client.contexto_asignacion(None)
+    ctx["usuarios"][0]["usuario"] = "pisado"
+    assert crm_client.contexto_asignacion(None)["usuarios"][0]["usuario"] == "Ayelen.Perez"
+
+
+def test_directorio_por_vencer_se_refresca_en_segundo_plano(stub, monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(crm_client, "_ahora", lambda: reloj[0])
+    monkeypatch.setenv("CRM_USUARIOS_TTL_SEG", "100")
+    crm_client.directorio_usuarios()
+    stub.usuarios = stub.usuarios + [{"id": "u3", "usuario": "nuevo.usuario"}]
+
+    reloj[0] += 90  # pasó el 80% del TTL: se sirve el snapshot y se refresca aparte
+    viejo = crm_client.directorio_usuarios()
+    assert viejo.buscar("nuevo.usuario") is None
+    for _ in range(100):
+        if crm_client.directorio_usuarios().buscar("nuevo.usuario"):
+            break
+        time.sleep(0.02)
+    assert crm_client.directorio_usuarios().buscar("nuevo.usuario")["id"] == "u3"
+    assert stub.hits[USUARIOS] == 2
+
+
+def test_directorio_vencido_con_crm_caido_sirve_el_ultimo_snapshot(stub, monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(crm_client, "_ahora", lambda: reloj[0])
+    crm_client.directorio_usuarios()
+    stub.usuarios_caido = True
+    reloj[0] += crm_client.CRM_USUARIOS_TTL_SEG() + 1
+
+    assert crm_client.directorio_usuarios().buscar("jacqueline.gallo")["id"] == "u1"
+    crm_client.limpiar_caches()
+    with pytest.raises(crm_client.CrmError) as exc:
+        crm_client.directorio_usuarios()
+    assert exc.value.kind == "crm"
+
+
+def test_token_rechazado_se_renueva_una_vez(stub):
+    crm_client.contexto_asignacion(None)
+    stub.tokens_validos.clear()  # el CRM "olvidó" el token cacheado
+
+    result = crm_client.consultar_cuentas(["100", "999"])
+
+    assert result["results"]["100"]["crm_account_id"] == "acc-100"
+    assert result["results"]["999"] == {"exists": False}
+    assert stub.hits["/Api/access_token"] == 2
+
+
+def test_consultas_en_paralelo_acotadas_y_en_orden(stub, monkeypatch):
+    monkeypatch.setenv("CRM_CONCURRENCIA", "2")
+    stub.demora_cuenta = 0.05
+    stub.cuentas.update({str(n): f"acc-{n}" for n in range(400, 406)})
+    numeros = ["999"] + [str(n) for n in range(400, 406)]
+
+    result = crm_client.consultar_cuentas(numeros)
+
+    assert list(result["results"]) == numeros
+    assert result["results"]["405"]["crm_account_id"] == "acc-405"
+    assert stub.max_en_vuelo == 2
+
+
+def test_detener_si_primera_existe_no_consulta_el_resto(stub):
+    result = crm_client.consultar_cuentas(["100", "200", "300"], detener_si_primera_existe=True)
+    assert list(result["results"]) == ["100"]
+    assert stub.hits[CUENTAS] == 1
+
+    result = crm_client.consultar_cuentas(["999", "200", "300"], detener_si_primera_existe=True)
+    assert list(result["results"]) == ["999", "200", "300"]
+
+
+def test_cache_por_corrida(stub, monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(crm_client, "_ahora", lambda: reloj[0])
+    crm_client.consultar_cuentas(["100", "999"], alcance="run:1")
+    crm_client.consultar_cuentas(["100", "999"], alcance="run:1")
+    assert stub.hits[CUENTAS] == 2
+
+    # El "no existe" vence rápido: después de darla de alta en el CRM ya se ve.
+    stub.cuentas["999"] = "acc-999"
+    reloj[0] += crm_client.CRM_CUENTAS_NO_ENCONTRADAS_TTL_SEG() + 1
+    result = crm_client.consultar_cuentas(["100", "999"], alcance="run:1")
+    assert result["results"]["999"]["crm_account_id"] == "acc-999"
+    assert stub.hits[CUENTAS] == 3
+
+    # Corrida nueva: arranca de cero. Sin alcance: nunca usa la caché.
+    crm_client.consultar_cuentas(["100"], alcance="run:2")
+    crm_client.consultar_cuentas(["100"])
+    assert stub.hits[CUENTAS] == 5
+
+
+def test_errores_de_consulta_no_se_cachean(stub, monkeypatch):
+    llamadas = []
+
+    def caida(_sesion, _cfg, _token, numero):
+        llamadas.append(numero)
+        raise crm_client.CrmError("caído", kind="crm", reintentable=True)
+
+    monkeypatch.setattr(crm_client, "buscar_cuenta", caida)
+    for _ in range(2):
+        result = crm_client.consultar_cuentas(["100"], alcance="run:1")
+        assert result["results"]["100"]["exists"] is None
+    assert llamadas == ["100", "100"]
@@ -0,0 +1,139 @@
+"""Resolución de identidad con claves persistentes entre corridas (modo incremental)."""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.models import Base
+from web_comparativas.dimensionamiento import identity
+from web_comparativas.dimensionamiento.models import (
+    DimensionamientoClienteEntidad, DimensionamientoIdentidadClave,
+    DimensionamientoImportRun, DimensionamientoRecord,
+)
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.delenv("DIM_EXCLUDE_TEST_ENTITIES", raising=False)
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[
+        DimensionamientoImportRun.__table__, DimensionamientoRecord.__table__,
+        DimensionamientoClienteEntidad.__table__, DimensionamientoIdentidadClave.__table__,
+    ])
+    Session = sessionmaker(bind=engine, future=True)
+    with Session() as session:
+        for run_id in (1, 2):
+            session.add(DimensionamientoImportRun(id=run_id, source_path=f"run{run_id}.csv", status="success"))
+        session.commit()
+        yield session
+
+
+def _cargar(db, run_id: int, filas: list[tuple]) -> None:
+    """filas: (cuit, homologado, original, visible)."""
+    for i, (cuit, hom, ori, visible) in enumerate(filas):
+        db.add(DimensionamientoRecord(
+            import_run_id=run_id, id_registro_unico=f"{run_id}-{i}", fecha=dt.date(2026, 1, 1),
+            plataforma="Portal", cuit=cuit, cliente_nombre_homologado=hom,
+            cliente_nombre_original=ori, cliente_visible=visible,
+        ))
+    db.commit()
+
+
+BASE = [
+    ("30-2", "SANATORIO SUR", "Sanatorio Sur S.A.", "SANATORIO SUR"),
+    ("30-1", "HOSPITAL NORTE", "Hospital Norte", "HOSPITAL NORTE"),
+    ("SIN DATO", "SIN DATO", "Hospital Norte", "HOSPITAL NORTE"),   # adjunta nivel 1
+    ("SIN DATO", "SIN DATO", "sanatorio sur, s.a", "SANATORIO SUR"),  # adjunta nivel 2
+    ("SIN DATO", "SIN DATO", "Clinica Oeste", "Clinica Oeste"),      # propia
+]
+
+
+def _entidades_por_record(db, run_id: int) -> dict[str, int]:
+    return {
+        r.id_registro_unico: r.cliente_entidad_id
+        for r in db.execute(
+            select(DimensionamientoRecord).where(DimensionamientoRecord.import_run_id == run_id)
+        ).scalars()
+    }
+
+
+def test_sin_claves_previas_numera_igual_que_siempre(db):
+    _cargar(db, 1, BASE)
+    stats = identity.persist_records_and_registry(db, 1)
+
+    assert (stats["anclas"], stats["adjuntadas"], stats["propias"]) == (2, 2, 1)
+    assert stats["claves_nuevas"] == 3
+    # Anclas ordenadas por CUIT (30-1 → 0, 30-2 → 1), después las propias.
+    assert _entidades_por_record(db, 1) == {"1-0": 1, "1-1": 0, "1-2": 0, "1-3": 1, "1-4": 2}
+    claves = {(c.tipo, c.valor): c.entidad_key for c in db.execute(select(DimensionamientoIdentidadClave)).scalars()}
+    assert claves[("cuit", "30-1")] == 0
+    assert claves[("ori", "Clinica Oeste")] == 2
+
+
+def test_corrida_nueva_conserva_claves_y_solo_resuelve_lo_nuevo(db):
+    _cargar(db, 1, BASE)
+    identity.persist_records_and_registry(db, 1)
+
+    # Run 2: aparece un CUIT que ordena ANTES que los existentes y un huérfano nuevo.
+    _cargar(db, 2, BASE + [
+        ("30-0", "ALFA SALUD", "Alfa Salud", "ALFA SALUD"),
+        ("SIN DATO", "SIN DATO", "Centro Nuevo", "Centro Nuevo"),
+    ])
+    stats = identity.persist_records_and_registry(db, 2)
+
+    assert stats["modo"] == "incremental"
+    assert stats["claves_nuevas"] == 2
+    por_record = _entidades_por_record(db, 2)
+    assert [por_record[f"2-{i}"] for i in range(5)] == [1, 0, 0, 1, 2]
+    assert por_record["2-5"] == 3 and por_record["2-6"] == 4
+    registry = db.execute(
+        select(DimensionamientoClienteEntidad.entidad_key, DimensionamientoClienteEntidad.es_cliente)
+        .where(DimensionamientoClienteEntidad.import_run_id == 2)
+    ).all()
+    assert sorted(registry) == [(0, True), (1, True), (2, False), (3, True), (4, False)]
+
+
+def test_incremental_no_rematchea_y_completo_reasigna(db):
+    _cargar(db, 1, BASE)
+    identity.persist_records_and_registry(db, 1)
+    # Run 2: "Clinica Oeste" ahora tiene un ancla con CUIT (nombre visible distinto).
+    _cargar(db, 2, BASE + [("30-9", "CLINICA OESTE", "Clinica Oeste", "CLINICA OESTE SA")])
+
+    inc = identity.resolve_entities(db, 2, incremental=True)
+    assert inc.orphan_name_to_key["Clinica Oeste"] == 2
+    assert inc.stats["reasignadas"] == 0
+
+    completo = identity.resolve_entities(db, 2)
+    assert completo.orphan_name_to_key["Clinica Oeste"] == completo.cuit_to_key["30-9"] == 3
+    assert completo.stats["reasignadas"] == 1
+    # La numeración del resto no se mueve.
+    assert completo.cuit_to_key["30-1"] == 0 and completo.cuit_to_key["30-2"] == 1
+
+    identity.persist_records_and_registry(db, 2, incremental=False)
+    assert _entidades_por_record(db, 2)["2-4"] == 3
+    assert db.execute(text(
+        "SELECT entidad_key FROM dimensionamiento_identidad_claves WHERE tipo='ori' AND valor='Clinica Oeste'"
+    )).scalar_one() == 3
+
+
+def test_incremental_que_rompe_el_invariante_cae_al_completo(db):
+    _cargar(db, 1, BASE)
+    identity.persist_records_and_registry(db, 1)
+    # Mismo cliente_visible para el huérfano viejo y el ancla nueva: conservar la clave
+    # vieja mapearía un visible a 2 entidades.
+    _cargar(db, 2, BASE + [("30-9", "CLINICA OESTE", "Clinica Oeste", "Clinica Oeste")])
+
+    result = identity.resolve_entities(db, 2, incremental=True)
+    assert result.stats["modo"] == "completo"
+    assert result.orphan_name_to_key["Clinica Oeste"] == result.cuit_to_key["30-9"]
@@ -0,0 +1,95 @@
+"""Servicio de impacto de aprobaciones: cache por versión y recálculo por cliente."""
+from __future__ import annotations
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+
+CLIENTES = ["Cliente A", "Cliente B", "Cliente C"]
+
+
+def _override(oid, selector, scope, pct, subneg="", codigo="", mes=""):
+    return SimpleNamespace(
+        id=oid, client_selector=selector, override_scope=scope, subneg=subneg,
+        codigo_serie=codigo, forecast_month=mes, override_growth_pct=pct,
+        effective_monthly_pct=None, effective_from_month=None, is_active=True,
+    )
+
+
+@pytest.fixture()
+def entorno(monkeypatch):
+    filas = []
+    for i, cli in enumerate(CLIENTES):
+        for mes in ("2026-01-01", "2026-02-01", "2026-03-01"):
+            for sub, cod in (("Sueros", "ART-1"), ("Guantes", "ART-2")):
+                filas.append({
+                    "fecha": pd.Timestamp(mes), "fantasia": cli, "cliente_id": f"C{i}",
+                    "subneg": sub, "codigo_serie": cod, "monto_yhat": 100.0 * (i + 1),
+                })
+    df = pd.DataFrame(filas)
+    overrides = [
+        _override(1, "Cliente A", "subneg", 40.0, subneg="Sueros"),
+        _override(2, "Cliente B", "product", 10.0, codigo="ART-2"),
+        _override(3, "Cliente C", "cell", 0.0, subneg="Guantes", codigo="ART-2", mes="2026-02"),
+    ]
+    aplicadas: list[set] = []
+    original = svc._apply_override_effects_to_dataframe
+
+    def _apply(ov, *a, **k):
+        aplicadas.append(set(ov["fantasia"]))
+        return original(ov, *a, **k)
+
+    monkeypatch.setattr(svc, "engine", None)
+    monkeypatch.setattr(svc, "get_data", lambda: {"df_valorizado": df})
+    monkeypatch.setattr(svc, "_query_override_records", lambda *a, **k: list(overrides))
+    monkeypatch.setattr(svc, "_apply_override_effects_to_dataframe", _apply)
+    svc.clear_response_cache()
+    yield SimpleNamespace(overrides=overrides, aplicadas=aplicadas)
+    svc.clear_response_cache()
+
+
+def test_mismo_resultado_que_el_calculo_completo_y_cacheado(entorno):
+    impactos = svc.get_approval_curve_impacts(25.0)
+    assert impactos == svc.compute_approval_curve_impacts(25.0)
+    assert impactos[("subnegocio", "cliente a", "sueros", "", "")]["impact"] == pytest.approx(300 * 0.15)
+    entorno.aplicadas.clear()
+    assert svc.get_approval_curve_impacts(25.0) is impactos
+    assert entorno.aplicadas == []
+
+
+def test_aprobar_recalcula_solo_el_cliente_afectado(entorno):
+    svc.get_approval_curve_impacts(25.0)
+    entorno.overrides.append(_override(4, "Cliente B", "subneg", 60.0, subneg="Sueros"))
+    entorno.aplicadas.clear()
+    svc.clear_response_cache(override_selectors=["Cliente B"])
+
+    impactos = svc.get_approval_curve_impacts(25.0)
+    assert entorno.aplicadas == [{"Cliente B"}]
+    entorno.aplicadas.clear()
+    assert impactos == svc.compute_approval_curve_impacts(25.0)
+    assert impactos[("subnegocio", "cliente b", "sueros", "", "")]["override_id"] == 4
+
+
+def test_escritura_sin_selectores_recalcula_todo(entorno):
+    svc.get_approval_curve_impacts(25.0)
+    entorno.overrides.pop(0)
+    entorno.aplicadas.clear()
+    svc.clear_response_cache()
+
+    impactos = svc.get_approval_curve_impacts(25.0)
+    assert entorno.aplicadas == [{"Cliente B", "Cliente C"}]
+    assert not any(k[1] == "cliente a" for k in impactos)
+
+
+def test_growth_distinto_es_otra_entrada(entorno):
+    a = svc.get_approval_curve_impacts(25.0)
+    b = svc.get_approval_curve_impacts(10.0)
+    assert a != b
+    assert svc.get_approval_curve_impacts(25.0) is a
@@ -0,0 +1,89 @@
+"""Índice del maestro de artículos: ranking, plegado de acentos, huella y validación."""
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_article_index as idx
+from web_comparativas import forecast_service as svc
+
+ARTICULOS = [
+    {"codigo_serie": "8100200", "descripcion": "Solución fisiológica 500 ml", "neg": "N1", "subneg": "Sueros", "unidad_medida": "Unid."},
+    {"codigo_serie": "SUE-10", "descripcion": "Equipo de suero macrogotero", "neg": "N1", "subneg": "Sueros", "unidad_medida": "Unid."},
+    {"codigo_serie": "GUA-7", "descripcion": "Guante de látex talle M", "neg": "N2", "subneg": "Guantes", "unidad_medida": "Caja"},
+    {"codigo_serie": "81002", "descripcion": "Jeringa 5 ml", "neg": "N2", "subneg": "Descartables", "unidad_medida": "Unid."},
+    {"codigo_serie": "LAT-1", "descripcion": "Sonda de LATEX", "neg": "N2", "subneg": "Descartables", "unidad_medida": "Unid."},
+]
+
+
+def _codigos(resultados):
+    return [a["codigo_serie"] for a in resultados]
+
+
+def test_ranking_codigo_exacto_prefijo_y_descripcion():
+    index = idx.ArticleIndex(ARTICULOS)
+    assert _codigos(index.search("81002")) == ["81002", "8100200"]
+    assert _codigos(index.search("s")) == ["SUE-10", "8100200", "LAT-1"]
+    assert _codigos(index.search("latex")) == ["GUA-7", "LAT-1"]     # empate: orden del maestro
+
+
+def test_plegado_de_acentos_y_varias_palabras():
+    index = idx.ArticleIndex(ARTICULOS)
+    assert _codigos(index.search("SOLUCION")) == ["8100200"]
+    assert _codigos(index.search("ml  jer")) == ["81002"]
+    assert _codigos(index.search("ml")) == ["8100200", "81002"]
+    assert index.search("inexistente") == []
+    assert _codigos(index.search("", limit=2)) == ["8100200", "SUE-10"]
+    assert index.get(" sue-10 ")["codigo_serie"] == "SUE-10"
+
+
+def test_topk_rapido_sobre_catalogo_grande():
+    grande = [
+        {"codigo_serie": f"ART-{i:06d}", "descripcion": f"Producto genérico número {i} presentación {i % 97}"}
+        for i in range(50_000)
+    ]
+    index = idx.ArticleIndex(grande)
+    t0 = time.perf_counter()
+    res = index.search("ART-0421", limit=30)
+    assert (time.perf_counter() - t0) < 0.05
+    assert _codigos(res)[:3] == ["ART-042100", "ART-042101", "ART-042102"]
+
+
+@pytest.fixture()
+def maestro(monkeypatch):
+    lecturas = []
+
+    def _load():
+        lecturas.append(1)
+        return {"negocios": ["N1", "N2"], "subnegocios": [], "articulos": list(ARTICULOS), "grupos_csv": {"G1"}}
+
+    huella = {"v": 1}
+    monkeypatch.setattr(svc, "_load_article_master", _load)
+    monkeypatch.setattr(svc, "_article_master_fingerprint", lambda: (huella["v"],))
+    monkeypatch.setattr(svc, "_ARTICLE_INDEX", None)
+    monkeypatch.setattr(svc, "_data_cache", {})
+    return lecturas, huella
+
+
+def test_el_maestro_se_relee_solo_si_cambia_la_huella(maestro):
+    lecturas, huella = maestro
+    assert _codigos(svc.search_articles("guante")) == ["GUA-7"]
+    catalogo = svc.get_new_client_catalog()
+    assert len(catalogo["articulos"]) == len(ARTICULOS) and catalogo["grupos"] == ["G1"]
+    assert len(lecturas) == 1
+    huella["v"] = 2
+    svc.search_articles("x")
+    assert len(lecturas) == 2
+
+
+def test_validacion_de_entradas_contra_el_indice(maestro):
+    ok = svc._validate_manual_entries([{"codigo_serie": "gua-7", "forecast_month": "2026-01"}])
+    assert ok[0]["codigo_serie"] == "GUA-7"
+    assert ok[0]["subneg"] == "Guantes" and ok[0]["unidad_medida"] == "Caja"
+    with pytest.raises(ValueError, match="NOPE"):
+        svc._validate_manual_entries([{"codigo_serie": "GUA-7"}, {"codigo_serie": "NOPE"}])
@@ -0,0 +1,87 @@
+"""Snapshot de dimensiones de Forecast: mapas vectorizados y refresco en background."""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+
+FILAS = pd.DataFrame([
+    {"fantasia": " Cliente A ", "nombre_grupo": "Grupo 1", "perfil": "FAR", "subneg": "Sueros", "neg": "N1", "codigo_serie": "S1", "monto_yhat": 100.0},
+    {"fantasia": "cliente a", "nombre_grupo": "Grupo 1", "perfil": "FAR", "subneg": "Guantes", "neg": "N2", "codigo_serie": "G1", "monto_yhat": 50.0},
+    {"fantasia": "Cliente B", "nombre_grupo": "SIN GRUPO", "perfil": "", "subneg": "sueros ", "neg": "N1", "codigo_serie": "S1", "monto_yhat": 30.0},
+    {"fantasia": "Cliente C", "nombre_grupo": None, "perfil": "HOS", "subneg": "Mixto", "neg": "N1", "codigo_serie": "M1", "monto_yhat": None},
+    {"fantasia": "Cliente C", "nombre_grupo": None, "perfil": "HOS", "subneg": "Mixto", "neg": "N3", "codigo_serie": "M1", "monto_yhat": 5.0},
+    {"fantasia": None, "nombre_grupo": "Grupo 2", "perfil": "FAR", "subneg": "General", "neg": " ", "codigo_serie": "X9", "monto_yhat": 7.0},
+])
+
+
+@pytest.fixture()
+def dims(monkeypatch):
+    monkeypatch.setattr(svc, "engine", None)
+    monkeypatch.setattr(svc, "get_data", lambda: {"df_valorizado": FILAS})
+    monkeypatch.setattr(svc, "_FORECAST_DIMS", {"data": None, "ts": 0.0, "intento": 0.0, "refrescando": False})
+    return svc._FORECAST_DIMS
+
+
+def test_mapas_vectorizados(dims):
+    snap = svc.build_forecast_dimensions()
+    assert snap.client_dim == {
+        "cliente a": {"grupo": "Grupo 1", "perfil": "FAR"},
+        "cliente b": {"grupo": None, "perfil": None},
+        "cliente c": {"grupo": None, "perfil": "HOS"},
+    }
+    assert snap.subneg_neg == {"sueros": "N1", "guantes": "N2"}   # mixto ambiguo, general sin neg
+    res = snap.resolver
+    assert res["ok"] and res["source"] == "parquet:df_valorizado"
+    assert res["client"] == {"cliente a": 150.0, "cliente b": 30.0, "cliente c": 5.0}
+    assert res["group"] == {"grupo 1": 150.0, "sin grupo": 30.0, "grupo 2": 7.0}
+    assert res["subneg"]["sueros"] == 130.0
+    assert res["client_subneg"][("cliente a", "sueros")] == 100.0
+    assert res["client_codigo"] == {("cliente a", "s1"): 100.0, ("cliente a", "g1"): 50.0,
+                                    ("cliente b", "s1"): 30.0, ("cliente c", "m1"): 5.0}
+    assert svc.resolve_scope_base(res, client_selector="CLIENTE A", subneg="Sueros") == 100.0
+
+
+def test_getters_comparten_un_solo_snapshot(dims, monkeypatch):
+    lecturas = []
+    original = svc._load_forecast_dims_frame
+    monkeypatch.setattr(svc, "_load_forecast_dims_frame", lambda: lecturas.append(1) or original())
+    assert svc.get_client_group_map() == {"cliente a": "Grupo 1"}
+    assert svc.get_subneg_neg_map()["guantes"] == "N2"
+    assert svc.get_scope_value_resolver()["ok"]
+    assert len(lecturas) == 1
+
+
+def test_snapshot_vencido_se_sirve_mientras_se_refresca(dims, monkeypatch):
+    viejo = svc.get_forecast_dimensions()
+    dims["ts"] -= svc._FORECAST_DIMS_TTL * 2
+    dims["intento"] = 0.0
+    liberar, terminado = threading.Event(), threading.Event()
+    original = svc.build_forecast_dimensions
+
+    def _lento(df=None):
+        liberar.wait(5)
+        try:
+            return original(FILAS.iloc[:2])
+        finally:
+            terminado.set()
+
+    monkeypatch.setattr(svc, "build_forecast_dimensions", _lento)
+    assert svc.get_forecast_dimensions() is viejo          # no bloquea: sirve el stale
+    assert svc.get_forecast_dimensions() is viejo          # y no lanza un segundo refresco
+    assert dims["refrescando"]
+    liberar.set()
+    assert terminado.wait(5)
+    for _ in range(100):
+        if not dims["refrescando"]:
+            break
+        threading.Event().wait(0.01)
+    nuevo = svc.get_forecast_dimensions()
+    assert nuevo is not viejo and set(nuevo.client_dim) == {"cliente a"}
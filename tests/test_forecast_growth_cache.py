@@ -0,0 +1,115 @@
+"""Agregados base de chart / client-table reutilizados entre valores de growth_pct."""
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+def _filas(sql: str) -> list[dict]:
+    if "n_products" in sql:
+        return [{"n_products": 3}]
+    if "total_forecast" in sql:
+        return [
+            {"fecha": "2025-12-01", "total_forecast": 100.0, "total_li": 90.0, "total_ls": 110.0},
+            {"fecha": "2026-01-01", "total_forecast": 200.0, "total_li": 180.0, "total_ls": 220.0},
+        ]
+    if "total_venta" in sql:
+        return [{"fecha": "2025-12-01", "total_venta": 150.0}]
+    return []
+
+
+@pytest.fixture()
+def pg(monkeypatch):
+    """Engine PostgreSQL simulado: cuenta cada consulta que llega al driver."""
+    calls: list[str] = []
+
+    @contextmanager
+    def _connect():
+        yield SimpleNamespace(execute=lambda *a, **k: None)
+
+    def _ejecutar(conn, sql, *, text=None, preparar=True):
+        calls.append(sql)
+        if "FALLA" in sql:
+            raise RuntimeError("boom")
+        return _Result(_filas(sql))
+
+    monkeypatch.setattr(svc, "engine", SimpleNamespace(
+        url="postgresql://forecast", connect=_connect, begin=_connect,
+    ))
+    monkeypatch.setattr(svc._fsql, "ejecutar", _ejecutar)
+    # Caches de módulo que consultarían (y quedarían sucios para otros tests).
+    monkeypatch.setattr(svc, "_pg_valorizado_has_codigo_serie", lambda: False)
+    monkeypatch.setattr(svc, "_get_canonical_series_cached", lambda: ["S1", "S2"])
+    monkeypatch.setattr(svc, "_get_manual_entries_df", lambda *a, **k: svc.pd.DataFrame())
+    monkeypatch.setattr(svc, "_get_max_hist_date_cached", lambda: svc.pd.Timestamp("2025-12-01"))
+    monkeypatch.setattr(svc, "_get_override_snapshot", lambda *a, **k: SimpleNamespace(
+        records=[], consolidated=[], maps={}, consolidated_maps={},
+    ))
+    svc._clear_base_agg_cache()
+    yield calls
+    svc._clear_base_agg_cache()
+
+
+def test_memo_solo_dentro_del_scope_y_devuelve_copias(pg):
+    sql = "SELECT fecha, SUM(monto_yhat) AS total_forecast FROM forecast_valorizado GROUP BY fecha"
+    svc._query_agg(sql)
+    svc._query_agg(sql)
+    assert len(pg) == 2
+
+    with svc._growth_base_scope():
+        primero = svc._query_agg(sql)
+        primero["total_forecast"] = 0.0
+        segundo = svc._query_agg(sql)
+    assert len(pg) == 3
+    assert segundo["total_forecast"].tolist() == [100.0, 200.0]
+
+
+def test_errores_no_se_memoizan_y_el_reload_invalida(pg):
+    with svc._growth_base_scope():
+        assert svc._query_agg("SELECT FALLA FROM forecast_main").empty
+        assert svc._query_agg("SELECT FALLA FROM forecast_main").empty
+        assert len(pg) == 2
+        svc._query_agg("SELECT fecha, 1 AS total_venta FROM forecast_imp_hist")
+        svc.clear_response_cache()
+        svc._query_agg("SELECT fecha, 1 AS total_venta FROM forecast_imp_hist")
+    assert len(pg) == 4
+
+
+def test_mover_el_slider_no_vuelve_a_consultar(pg):
+    args = dict(
+        user_id=None, start_date=None, end_date=None, profiles=["FAR"], neg=None,
+        subneg=None, products=None, view_money=True,
+    )
+    base = svc._pg_get_chart_data(**args, growth_pct=0.0)
+    consultas = len(pg)
+    assert consultas > 0
+
+    crecido = svc._pg_get_chart_data(**args, growth_pct=25.0)
+    assert len(pg) == consultas
+
+    def _por_fecha(resp):
+        return {r["fecha"]: r for r in resp["forecast"]}
+
+    b, c = _por_fecha(base), _por_fecha(crecido)
+    assert c["2026-01-01"]["Total_Forecast"] == b["2026-01-01"]["Total_Forecast"] == 200
+    assert c["2026-01-01"]["Total_Adj"] == 250
+    assert c["2026-01-01"]["Total_User_Adj"] == 250
@@ -0,0 +1,288 @@
+"""Paridad: resolución vectorizada de overrides vs el recorrido fila a fila histórico."""
+from __future__ import annotations
+
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+
+CLIENTES = ["Cliente A", "Cliente B", " Cliente C ", "Grupo X", "0"]
+SUBNEGS = ["Sueros", "Descartables", "", "Guantes"]
+CODIGOS = ["ART-1", "ART-2", "ART-3", " ART-4"]
+MESES = ["2025-11", "2025-12", "2026-01", "2026-02", "2026-03"]
+SELECTOR_COLS = ("fantasia", "cliente_id", "_cliente", "Cliente")
+
+
+def _referencia(df: pd.DataFrame, records, base_growth_pct: float, max_hist_date) -> pd.DataFrame:
+    """Copia del loop por fila que reemplaza la resolución vectorizada."""
+    maps = svc._build_override_maps(records)
+    out = df.copy()
+    selectores = {svc._clean_override_text(getattr(r, "client_selector", "") or "") for r in records} - {""}
+    base_monthly = svc._monthly_pct_from_annual_growth(base_growth_pct)
+    scopes, monthlies, annual, flags = [], [], [], []
+    for _, row in out.iterrows():
+        afectada = any(
+            col in out.columns and str(row[col]).strip() in selectores for col in SELECTOR_COLS
+        )
+        fecha = row.get("fecha")
+        historica = max_hist_date is not None and pd.notna(fecha) and fecha <= max_hist_date
+        if not afectada or historica:
+            scopes.append("base")
+            monthlies.append(base_monthly)
+            annual.append(1.0)
+            flags.append(False)
+            continue
+        candidatos = []
+        for col in SELECTOR_COLS:
+            val = svc._clean_override_text(row[col]) if col in out.columns else ""
+            if val and val not in candidatos:
+                candidatos.append(val)
+        codigo = next((row[c] for c in ("codigo_serie", "articulo", "descripcion") if c in out.columns), "")
+        resolved = svc._resolve_override_for_row(
+            selector_candidates=candidatos,
+            subneg=svc._clean_override_text(row["subneg"]) if "subneg" in out.columns else "",
+            codigo_serie=svc._clean_override_text(codigo),
+            forecast_month="" if pd.isna(fecha) else fecha.strftime("%Y-%m"),
+            maps=maps,
+            base_growth_pct=base_growth_pct,
+        )
+        scopes.append(str(resolved["scope"]))
+        monthlies.append(float(resolved["monthly_pct"]))
+        annual.append(1.0 + float(resolved["annual_pct"]) / 100.0)
+        flags.append(str(resolved["scope"]) != "base")
+    out["_override_scope"] = scopes
+    out["_monthly_pct"] = monthlies
+    out["_annual_eff"] = annual
+    out["_has_override"] = flags
+    return out
+
+
+def _records_sinteticos(rnd: random.Random, n: int) -> list[SimpleNamespace]:
+    records = []
+    for _ in range(n):
+        scope = rnd.choice(["cell", "product", "subneg", "subneg", "celda", "producto"])
+        annual = rnd.choice([None, -20.0, 0.0, 8.0, 25.0, 40.0])
+        monthly = None if annual is not None else rnd.choice([None, 1.5])
+        records.append(SimpleNamespace(
+            client_selector=rnd.choice(CLIENTES + ["", "Otro"]),
+            override_scope=scope,
+            subneg=rnd.choice(SUBNEGS),
+            codigo_serie=rnd.choice(CODIGOS),
+            forecast_month=rnd.choice(MESES + ["", "2026-02-15"]),
+            override_growth_pct=annual,
+            effective_monthly_pct=monthly,
+            effective_from_month=rnd.choice([None, None, "", "2026-01", "2026-03"]),
+        ))
+    return records
+
+
+def _df_sintetico(rnd: random.Random, n: int, *, columnas=SELECTOR_COLS, codigo_col="codigo_serie") -> pd.DataFrame:
+    data = {col: [rnd.choice(CLIENTES + ["Nadie", None]) for _ in range(n)] for col in columnas}
+    data["subneg"] = [rnd.choice(SUBNEGS + [None]) for _ in range(n)]
+    data[codigo_col] = [rnd.choice(CODIGOS) for _ in range(n)]
+    fechas = pd.to_datetime([rnd.choice(MESES) + "-01" for _ in range(n)])
+    data["fecha"] = fechas.where([rnd.random() > 0.05 for _ in range(n)])
+    return pd.DataFrame(data, index=rnd.sample(range(10 * n), n))
+
+
+def _comparar(nuevo: pd.DataFrame, viejo: pd.DataFrame) -> None:
+    assert list(nuevo["_override_scope"]) == list(viejo["_override_scope"])
+    assert list(nuevo["_has_override"]) == list(viejo["_has_override"])
+    np.testing.assert_allclose(nuevo["_monthly_pct"].to_numpy(), viejo["_monthly_pct"].to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(nuevo["_annual_eff"].to_numpy(), viejo["_annual_eff"].to_numpy(), equal_nan=True)
+    assert list(nuevo.index) == list(viejo.index)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_paridad_con_overrides_sinteticos(seed):
+    rnd = random.Random(seed)
+    records = _records_sinteticos(rnd, rnd.choice([5, 40, 300]))
+    df = _df_sintetico(rnd, 400)
+    base = rnd.choice([0.0, 12.0, -5.0])
+    max_hist = rnd.choice([None, pd.Timestamp("2025-12-31")])
+
+    nuevo, maps = svc._apply_override_effects_to_dataframe(df, None, base, max_hist, _records=records)
+
+    _comparar(nuevo, _referencia(df, records, base, max_hist))
+    assert maps["selectors"] == svc._build_override_maps(records)["selectors"]
+
+
+@pytest.mark.parametrize("columnas,codigo_col", [
+    (("fantasia",), "articulo"),
+    (("Cliente", "_cliente"), "descripcion"),
+])
+def test_paridad_con_columnas_parciales(columnas, codigo_col):
+    rnd = random.Random(99)
+    records = _records_sinteticos(rnd, 120)
+    df = _df_sintetico(rnd, 300, columnas=columnas, codigo_col=codigo_col)
+
+    nuevo, _ = svc._apply_override_effects_to_dataframe(df, None, 10.0, None, _records=records)
+
+    _comparar(nuevo, _referencia(df, records, 10.0, None))
+
+
+def test_precedencia_nivel_antes_que_candidato_y_ultimo_gana():
+    records = [
+        SimpleNamespace(client_selector="Cliente B", override_scope="product", subneg="", codigo_serie="ART-1",
+                        forecast_month="", override_growth_pct=30.0, effective_from_month=None),
+        SimpleNamespace(client_selector="Cliente A", override_scope="subneg", subneg="", codigo_serie="",
+                        forecast_month="", override_growth_pct=5.0, effective_from_month=None),
+        # Mismo alcance que el anterior, más reciente: gana.
+        SimpleNamespace(client_selector="Cliente A", override_scope="subneg", subneg="", codigo_serie="",
+                        forecast_month="", override_growth_pct=7.0, effective_from_month=None),
+        # Celda vigente recién desde 2026-03: en 2026-02 no aplica.
+        SimpleNamespace(client_selector="Cliente A", override_scope="cell", subneg="", codigo_serie="ART-1",
+                        forecast_month="2026-02", override_growth_pct=50.0, effective_from_month="2026-03"),
+    ]
+    df = pd.DataFrame({
+        "fantasia": ["Cliente A", "Cliente A"],
+        "cliente_id": ["Cliente B", "Cliente B"],
+        "subneg": ["Sueros", "Sueros"],
+        "codigo_serie": ["ART-1", "ART-2"],
+        "fecha": pd.to_datetime(["2026-02-01", "2026-02-01"]),
+    })
+
+    out, _ = svc._apply_override_effects_to_dataframe(df, None, 0.0, None, _records=records)
+
+    # Fila 0: el producto del 2º candidato le gana al wildcard del 1º (nivel > candidato).
+    assert list(out["_override_scope"]) == [svc.FORECAST_SCOPE_PRODUCT, svc.FORECAST_SCOPE_SUBNEG]
+    assert out["_annual_eff"].tolist() == pytest.approx([1.30, 1.07])
+
+
+# ── Overlay copy-on-write de df_valorizado ─────────────────────────────────────
+
+VALOR_COLS = ("yhat_cliente", "monto_yhat", "li_cliente", "ls_cliente", "monto_li", "monto_ls")
+
+
+def _parche_viejo(df: pd.DataFrame, records, max_hist_date) -> pd.DataFrame:
+    """Copia del _get_patched_df_val con copia completa que reemplaza el overlay."""
+    patched, _ = svc._apply_override_effects_to_dataframe(df, None, 0.0, max_hist_date, _records=records)
+    future_mask = patched["_has_override"]
+    for col in VALOR_COLS:
+        patched[col] = pd.to_numeric(patched[col], errors="coerce").fillna(0).astype(float)
+        patched.loc[future_mask, col] = patched.loc[future_mask, col] * patched.loc[future_mask, "_annual_eff"]
+    return patched
+
+
+def _con_valores(rnd: random.Random, df: pd.DataFrame) -> pd.DataFrame:
+    for col in VALOR_COLS:
+        df[col] = [rnd.choice([None, 0.0, 10.0, 125.5, 3000.0]) for _ in range(len(df))]
+    return df
+
+
+@pytest.fixture()
+def dataset(monkeypatch):
+    rnd = random.Random(3)
+    records = _records_sinteticos(rnd, 80)
+    df = _con_valores(rnd, _df_sintetico(rnd, 500))
+    max_hist = pd.Timestamp("2025-12-31")
+    df_main = pd.DataFrame({"tipo": ["hist", "forecast"], "fecha": [max_hist, pd.Timestamp("2026-06-01")]})
+    monkeypatch.setattr(svc, "get_data", lambda: {"df_valorizado": df, "df_main": df_main})
+    monkeypatch.setattr(svc, "_query_override_records", lambda *a, **k: records)
+    svc._bump_override_version()
+    return df, records, max_hist
+
+
+def test_overlay_completo_coincide_con_la_copia_parcheada(dataset):
+    df, records, max_hist = dataset
+    antes = df.copy()
+
+    overlay = svc._get_valorizado_overlay(user_id=1)
+    nuevo = svc._get_patched_df_val(user_id=1)
+    viejo = _parche_viejo(df, records, max_hist)
+
+    assert 0 < len(overlay.pos) < len(df)
+    assert overlay.base is df
+    pd.testing.assert_frame_equal(nuevo, viejo)
+    pd.testing.assert_frame_equal(df, antes)
+
+
+def test_overlay_materializa_solo_el_subconjunto_filtrado(dataset):
+    df, records, max_hist = dataset
+    mask = pd.Series(True, index=df.index) & (df["fecha"] >= pd.Timestamp("2026-01-01"))
+    mask &= df["subneg"].isin(["Sueros", "Guantes"])
+
+    sub = svc._materialize_valorizado_overlay(svc._get_valorizado_overlay(user_id=1), mask)
+
+    pd.testing.assert_frame_equal(sub, _parche_viejo(df, records, max_hist)[mask.to_numpy()])
+
+
+def test_overlay_sin_overrides_no_copia_el_cache(dataset, monkeypatch):
+    df, _, _ = dataset
+    monkeypatch.setattr(svc, "_query_override_records", lambda *a, **k: [])
+    svc._bump_override_version()
+
+    overlay = svc._get_valorizado_overlay(user_id=1)
+    sub = svc._materialize_valorizado_overlay(overlay, df["fantasia"] == "Cliente A")
+
+    assert overlay.base is df and len(overlay.pos) == 0 and not overlay.coerce
+    assert not sub["_has_override"].any()
+    assert set(sub["_override_scope"]) == {"base"}
+    pd.testing.assert_series_equal(sub["monto_yhat"], df.loc[df["fantasia"] == "Cliente A", "monto_yhat"])
+
+
+# ── Snapshot versionado de overrides ───────────────────────────────────────────
+
+@pytest.fixture()
+def consultas(monkeypatch):
+    llamadas = []
+    records = _records_sinteticos(random.Random(5), 30)
+
+    def fake_query(user_id, client_selector=None, client_selectors=None, *, all_users=False):
+        llamadas.append((user_id, client_selector, all_users))
+        return list(records)
+
+    monkeypatch.setattr(svc, "_query_override_records", fake_query)
+    svc._bump_override_version()
+    return llamadas
+
+
+def test_snapshot_reutiliza_registros_y_mapas_hasta_que_cambia_la_version(consultas):
+    primero = svc._get_override_snapshot(7)
+    segundo = svc._get_override_snapshot(7)
+    assert segundo is primero and len(consultas) == 1
+    assert primero.consolidated_maps == svc._build_override_maps(primero.consolidated)
+    assert primero.maps == svc._build_override_maps(primero.records)
+
+    # Otro alcance (admin / selector) es otra entrada.
+    svc._get_override_snapshot(7, all_users=True)
+    svc._fetch_override_records(7, client_selector=" Cliente A ")
+    svc._fetch_override_records(7, client_selector="Cliente A")
+    assert len(consultas) == 3
+
+    svc._bump_override_version()
+    assert svc._get_override_snapshot(7) is not primero
+    assert len(consultas) == 4
+
+
+def test_snapshot_leido_durante_una_escritura_no_se_guarda(consultas, monkeypatch):
+    original = svc._query_override_records
+
+    def query_con_escritura(*args, **kwargs):
+        out = original(*args, **kwargs)
+        svc._bump_override_version()  # otro request guardó mientras se consultaba
+        return out
+
+    monkeypatch.setattr(svc, "_query_override_records", query_con_escritura)
+    svc._get_override_snapshot(7)
+    monkeypatch.setattr(svc, "_query_override_records", original)
+    svc._get_override_snapshot(7)
+    assert len(consultas) == 2
+
+
+def test_invalidar_cache_tras_guardar_incrementa_la_version(consultas):
+    svc._get_override_snapshot(7)
+    version = svc._OVERRIDE_VERSION
+    svc._clear_cache_for_override_save(7)
+    svc.clear_response_cache()
+    assert svc._OVERRIDE_VERSION == version + 2
+    svc._get_override_snapshot(7)
+    assert len(consultas) == 2
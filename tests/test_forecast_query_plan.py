@@ -0,0 +1,98 @@
+"""Plan de consultas concurrente de Forecast: paralelismo, orden, timeouts y tiempos."""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+from web_comparativas import forecast_sql
+
+
+def _lenta(valor, espera=0.2, barrera=None):
+    def _fn():
+        if barrera is not None:
+            barrera.wait(timeout=5)
+        time.sleep(espera)
+        return valor
+    return _fn
+
+
+def test_plan_corre_en_paralelo_y_respeta_el_orden(monkeypatch):
+    monkeypatch.setenv("FORECAST_QUERY_CONCURRENCY", "4")
+    barrera = threading.Barrier(3)
+    plan = {"c": _lenta("C", 0.05, barrera), "a": _lenta("A", 0.2, barrera), "b": _lenta("B", 0.0, barrera)}
+
+    t0 = time.perf_counter()
+    with svc.forecast_query_timings() as timings:
+        results, ms = svc._run_query_plan(plan, label="chart")
+    elapsed = time.perf_counter() - t0
+
+    # Con la barrera, un ejecutor secuencial se quedaría esperando: las 3 tareas
+    # tuvieron que estar vivas a la vez.
+    assert elapsed < 1.0
+    assert list(results) == ["c", "a", "b"]
+    assert results == {"c": "C", "a": "A", "b": "B"}
+    assert set(ms) == {"a", "b", "c"} and ms["a"] >= 200
+    assert list(timings) == ["chart.c", "chart.a", "chart.b", "chart.plan_wall"]
+
+
+def test_plan_hereda_el_bind_scope_del_caller(monkeypatch):
+    monkeypatch.setenv("FORECAST_QUERY_CONCURRENCY", "4")
+    with forecast_sql.bind_scope():
+        ref = forecast_sql.bind("perfil", ["FAR"])
+        results, _ = svc._run_query_plan({
+            "x": lambda: forecast_sql.params_para(f"SELECT {ref}"),
+            "y": lambda: forecast_sql.params_para(f"SELECT {ref}"),
+        })
+    assert results == {"x": {"perfil_0": ["FAR"]}, "y": {"perfil_0": ["FAR"]}}
+
+
+def test_un_error_degrada_a_vacio_sin_tirar_el_plan(monkeypatch):
+    monkeypatch.setenv("FORECAST_QUERY_CONCURRENCY", "4")
+
+    def _falla():
+        raise RuntimeError("boom")
+
+    results, _ = svc._run_query_plan({"ok": lambda: 1, "mal": _falla})
+    assert results["ok"] == 1
+    assert isinstance(results["mal"], pd.DataFrame) and results["mal"].empty
+
+
+def test_secuencial_con_concurrencia_1(monkeypatch):
+    monkeypatch.setenv("FORECAST_QUERY_CONCURRENCY", "1")
+    hilos = []
+    results, _ = svc._run_query_plan({
+        "a": lambda: hilos.append(threading.current_thread().name) or 1,
+        "b": lambda: hilos.append(threading.current_thread().name) or 2,
+    })
+    assert results == {"a": 1, "b": 2}
+    assert hilos == [threading.current_thread().name] * 2
+
+
+def test_cada_consulta_lleva_statement_timeout(monkeypatch):
+    monkeypatch.setenv("FORECAST_QUERY_TIMEOUT_S", "7.5")
+    ejecutados: list[str] = []
+
+    class _Conn:
+        def execute(self, stmt, *a, **k):
+            ejecutados.append(str(stmt))
+
+    @contextmanager
+    def _begin():
+        yield _Conn()
+
+    monkeypatch.setattr(svc, "engine", SimpleNamespace(url="postgresql://forecast", begin=_begin))
+    monkeypatch.setattr(svc._fsql, "ejecutar", lambda conn, sql, **k: SimpleNamespace(
+        mappings=lambda: SimpleNamespace(all=lambda: [{"n": 1}]),
+    ))
+    results, _ = svc._run_query_plan({"q": "SELECT 1 AS n FROM forecast_main"})
+    assert results["q"]["n"].tolist() == [1]
+    assert ejecutados == ["SET LOCAL statement_timeout = 7500"]
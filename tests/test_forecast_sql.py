@@ -0,0 +1,82 @@
+"""Builder de SQL parametrizado de Forecast (binds por scope + PREPARE por conexión)."""
+from __future__ import annotations
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+from web_comparativas import forecast_sql
+
+
+@pytest.fixture()
+def pg(monkeypatch):
+    """Los helpers solo parametrizan con engine PostgreSQL."""
+    monkeypatch.setattr(svc, "engine", SimpleNamespace(url="postgresql://forecast"))
+
+
+def test_sin_scope_no_hay_binds():
+    assert forecast_sql.bind("perfil", ["FAR"]) is None
+    assert forecast_sql.params_para("SELECT :perfil_0") == {}
+
+
+def test_bind_nombra_por_prefijo_y_reutiliza_el_mismo_valor():
+    with forecast_sql.bind_scope() as binds:
+        assert forecast_sql.bind("perfil", ["A"]) == ":perfil_0"
+        assert forecast_sql.bind("perfil", ["B"]) == ":perfil_1"
+        assert forecast_sql.bind("perfil", ["A"]) == ":perfil_0"
+        assert forecast_sql.bind("TRIM(fantasia)", ["X"]) == ":trim_fantasia_0"
+        with forecast_sql.bind_scope() as anidado:
+            assert anidado is binds
+        assert binds == {"perfil_0": ["A"], "perfil_1": ["B"], "trim_fantasia_0": ["X"]}
+
+
+def test_placeholders_ignoran_casts_y_literales_con_dos_puntos():
+    sql = "SELECT fecha::date, '10:30' FROM t WHERE a = ANY(:neg_0) AND b >= :fecha_desde_0 OR c = ANY(:neg_0)"
+    assert forecast_sql.nombres(sql) == ["neg_0", "fecha_desde_0"]
+    assert forecast_sql.a_posicional(sql, ["neg_0", "fecha_desde_0"]).endswith(
+        "a = ANY($1) AND b >= $2 OR c = ANY($1)"
+    )
+
+
+def test_filtros_de_igual_forma_producen_el_mismo_texto(pg):
+    textos = []
+    for perfiles, negs, desde in ((["FAR"], ["N1", "N2"], "2026-01-01"), (["HOS", "FAR"], ["N9"], "2026-03-01")):
+        with forecast_sql.bind_scope():
+            where = svc._build_filter_sql(start_date=desde, profiles=perfiles, neg=negs)
+            textos.append(where)
+            params = forecast_sql.params_para(where)
+    assert textos[0] == textos[1] == "1=1 AND fecha >= :fecha_desde_0 AND perfil = ANY(:perfil_0) AND neg = ANY(:neg_0)"
+    assert params == {"fecha_desde_0": "2026-03-01", "perfil_0": ["FAR", "HOS"], "neg_0": ["N9"]}
+
+
+def test_fuera_de_scope_los_helpers_siguen_interpolando(pg):
+    assert svc._safe_in("perfil", ["O'Hara"]) == "perfil IN ('O''Hara')"
+    assert svc._build_filter_sql(start_date="2026-01-01") == "1=1 AND fecha >= '2026-01-01'"
+
+
+def test_cartera_reutiliza_el_bind_de_cuentas(pg):
+    ramas = ((("C1", "C2"), ("N1",)), (("C1", "C2"), None))
+    with forecast_sql.bind_scope():
+        sql = svc._cartera_sql(ramas)
+        params = forecast_sql.params_para(sql)
+    assert sql == "((cliente_id = ANY(:cliente_id_0) AND neg = ANY(:neg_0)) OR (cliente_id = ANY(:cliente_id_0)))"
+    assert params == {"cliente_id_0": ["C1", "C2"], "neg_0": ["N1"]}
+
+
+def test_ejecutar_sin_postgres_usa_binds_sin_preparar():
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    with engine.connect() as conn, forecast_sql.bind_scope():
+        ref = forecast_sql.bind("monto", 42)
+        fila = forecast_sql.ejecutar(conn, f"SELECT {ref} AS v", text=text).mappings().one()
+        assert fila["v"] == 42
+        assert forecast_sql._INFO_KEY not in conn.info
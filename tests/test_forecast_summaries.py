@@ -0,0 +1,73 @@
+"""Summaries de Forecast por grano: router de tabla y plan de refresco incremental."""
+from __future__ import annotations
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import forecast_service as svc
+from web_comparativas import forecast_sql
+from web_comparativas import forecast_summaries as fsum
+
+_TODAS = frozenset(fsum.MEDIDAS)
+_COLS = {g.tabla: frozenset(g.dims) | _TODAS for g in fsum.GRANOS}
+
+
+def _columnas(disponibles=_COLS):
+    return lambda tabla: disponibles.get(tabla, frozenset())
+
+
+def test_columnas_ignoran_literales_y_binds():
+    where = "1=1 AND perfil = ANY(:perfil_0) AND fecha >= :fecha_desde_0 AND neg IN ('fantasia')"
+    assert fsum.columnas_referenciadas("fecha, monto_yhat", where) == {"perfil", "fecha", "neg", "monto_yhat"}
+
+
+@pytest.mark.parametrize("select, where, esperada", [
+    ("fecha, monto_yhat, monto_li, monto_ls", "1=1 AND perfil IN ('FAR')", "forecast_subneg_summary"),
+    ("fecha, monto_yhat", "1=1 AND codigo_serie IN ('S1')", "forecast_product_month_summary"),
+    ("fantasia, nombre_grupo, fecha, yhat_cliente", "1=1 AND subneg IN ('X')", "forecast_valorizado_summary"),
+    ("fantasia, nombre_grupo, fecha, monto_yhat", "((cliente_id IN ('C1') AND neg IN ('N1')))",
+     "forecast_valorizado_summary"),
+    ("perfil, fantasia, cliente_id, monto_yhat", "1=1 AND codigo_serie IN ('S1')", "forecast_valorizado"),
+])
+def test_router_elige_el_grano_mas_chico_que_cubre(select, where, esperada):
+    assert fsum.elegir_tabla([select, where], _columnas()) == esperada
+
+
+def test_router_mira_las_columnas_reales_de_la_tabla():
+    # Summary construida por la versión anterior: sin bandas ni granos nuevos.
+    vieja = {"forecast_valorizado_summary": frozenset(fsum.GRANOS[2].dims) | {"monto_yhat", "yhat_cliente"}}
+    assert fsum.elegir_tabla(["fecha, monto_yhat", "1=1"], _columnas(vieja)) == "forecast_valorizado_summary"
+    assert fsum.elegir_tabla(["fecha, monto_yhat, monto_li", "1=1"], _columnas(vieja)) == "forecast_valorizado"
+
+
+def test_planificar_solo_meses_con_firma_distinta():
+    guardadas = {"2026-01-01": "10:1", "2026-02-01": "10:2", "2025-12-01": "4:9"}
+    actuales = {"2026-01-01": "10:1", "2026-02-01": "11:7", "2026-03-01": "3:3"}
+    assert fsum.planificar(actuales, guardadas) == (["2026-02-01", "2026-03-01"], ["2025-12-01"])
+    assert fsum.planificar(actuales, dict(actuales)) == ([], [])
+
+
+def test_service_usa_el_router_con_kill_switch(monkeypatch):
+    monkeypatch.setattr(svc, "engine", SimpleNamespace(url="postgresql://forecast"))
+    monkeypatch.setattr(svc, "_SUMMARY_COLS_CACHE", {})
+    consultas: list[str] = []
+
+    def _query_agg(sql, *a, **k):
+        consultas.append(sql)
+        tabla = sql.split("table_name = '")[1].rstrip("'")
+        return svc.pd.DataFrame({"column_name": sorted(_COLS.get(tabla, ()))})
+
+    monkeypatch.setattr(svc, "_query_agg", _query_agg)
+    with forecast_sql.bind_scope():
+        where = svc._build_filter_sql(start_date="2026-01-01", profiles=["FAR"])
+    assert svc._pick_summary_table("fecha, monto_yhat", where) == "forecast_subneg_summary"
+    svc._pick_summary_table("fecha, monto_yhat", where)
+    assert len(consultas) == 1                       # cacheado por TTL
+
+    monkeypatch.setenv("FORECAST_USE_SUMMARY", "0")
+    assert svc._pick_summary_table("fecha, monto_yhat", where) == "forecast_valorizado"
@@ -0,0 +1,95 @@
+"""Panel de inicio: agregado por estado + LIMIT angostos, cacheado por alcance de visibilidad."""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import visibility_service as vis
+from web_comparativas.models import Base, Comment, Upload, User
+
+AHORA = dt.datetime.utcnow()
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[User.__table__, Upload.__table__, Comment.__table__])
+    s = sessionmaker(bind=engine, future=True)()
+    s.add_all([
+        User(id=1, email="admin@x", role="admin"),
+        User(id=2, email="ana@x", role="analista"),
+        User(id=3, email="otro@x", role="analista"),
+    ])
+    estados = [
+        (2, "done", 1), (2, "pending", 2), (2, "reviewing", 3), (2, "dashboard", 4),
+        (3, "done", 5), (3, "processing", 6), (3, "error", 7), (2, "done", 60),
+    ]
+    for i, (uid, st, horas) in enumerate(estados, start=1):
+        t = AHORA - dt.timedelta(hours=horas)
+        s.add(Upload(id=i, user_id=uid, proceso_nro=f"P-{i}", status=st, created_at=t, updated_at=t))
+    s.commit()
+    vis.invalidate_home_panel()
+    yield s
+    s.close()
+
+
+def _como_antes(session, user):
+    """Referencia: el `_home_collect` viejo (todo el ORM en Python) + los tres COUNT."""
+    ups = vis.uploads_visible_query(session, user).order_by(Upload.created_at.desc()).all()
+    done = [u for u in ups if (u.status or "").lower() in vis.HOME_DONE_STATUSES]
+    return {
+        "last": [u.id for u in ups[:5]],
+        "recent": [u.id for u in done if (AHORA - u.updated_at).total_seconds() < 86400],
+    }
+
+
+@pytest.mark.parametrize("user_id", [1, 2])
+def test_panel_igual_al_camino_viejo(session, user_id):
+    user = session.get(User, user_id)
+    panel = vis.home_panel(session, user)
+    ref = _como_antes(session, user)
+    assert [u.id for u in panel["last_done"]] == ref["last"]
+    assert [u.id for u in panel["recent_done"]] == ref["recent"]
+    assert panel["last_done"][0].proceso_nro == f"P-{ref['last'][0]}"
+    if user_id == 1:
+        assert panel["kpis"] == {"pending": 3, "done": 3, "total": 8}
+    else:
+        assert panel["kpis"] == {"pending": 2, "done": 2, "total": 5}
+
+
+def test_cache_por_alcance_e_invalidacion_por_estado(session):
+    admin, ana = session.get(User, 1), session.get(User, 2)
+    primero = vis.home_panel(session, admin)
+    assert vis.home_panel(session, admin) is primero          # mismo alcance: cacheado
+    assert vis.home_panel(session, ana) is not primero
+
+    session.get(Upload, 1).province_hint = "x"                 # columna que el panel no muestra
+    session.commit()
+    assert vis.home_panel(session, admin) is primero
+
+    session.get(Upload, 1).buyer_hint = "x"                    # columna mostrada: invalida
+    session.commit()
+    tras_buyer = vis.home_panel(session, admin)
+    assert tras_buyer is not primero
+    assert {u.buyer_hint for u in tras_buyer["last_done"] if u.id == 1} == {"x"}
+    primero = tras_buyer
+
+    session.get(Upload, 2).status = "done"                     # cambio de estado
+    session.commit()
+    tras_cambio = vis.home_panel(session, admin)
+    assert tras_cambio is not primero and tras_cambio["kpis"]["done"] == 4
+
+    session.execute(update(Upload).where(Upload.id == 3).values(status="done"))
+    session.commit()                                           # bulk UPDATE también invalida
+    assert vis.home_panel(session, admin)["kpis"]["done"] == 5
@@ -0,0 +1,92 @@
+"""Tokens de reseteo y avisos enviados en tablas: hash, vencimiento, barrido, idempotencia e importación."""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import mail_store as ms
+from web_comparativas.models import Base, PasswordResetToken, UploadEmailSent
+
+
+@pytest.fixture()
+def factory(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[PasswordResetToken.__table__, UploadEmailSent.__table__])
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(ms, "_Session", factory)
+    return factory
+
+
+def _contar(factory, modelo):
+    with factory() as s:
+        return s.scalar(select(func.count()).select_from(modelo))
+
+
+def test_token_se_guarda_hasheado_y_se_consume(factory):
+    tok = ms.crear_token_reset("  Ana@Example.com ")
+    assert ms.email_de_token(tok) == "ana@example.com"
+    with factory() as s:
+        assert s.scalar(select(PasswordResetToken.token_hash)) == ms._hash(tok) != tok
+
+    assert ms.email_de_token("otro") is None and ms.email_de_token("") is None
+    assert ms.consumir_token(tok) is True
+    assert ms.email_de_token(tok) is None
+    assert ms.consumir_token(tok) is False
+
+
+def test_vencidos_no_valen_y_el_barrido_los_borra(factory):
+    viejo = ms.crear_token_reset("a@example.com", ttl=dt.timedelta(seconds=-1))
+    vigente = ms.crear_token_reset("b@example.com")
+    assert ms.email_de_token(viejo) is None
+    assert ms.barrer_vencidos() == 1
+    assert ms.email_de_token(vigente) == "b@example.com"
+    assert ms.barrer_vencidos(dt.datetime.utcnow() + dt.timedelta(days=2)) == 1
+    assert _contar(factory, PasswordResetToken) == 0
+
+
+def test_marcar_email_es_idempotente(factory):
+    assert ms.email_enviado(10, 1) is False
+    assert ms.marcar_email_enviado(10, 1) is True
+    assert ms.marcar_email_enviado(10, 1) is False
+    ms.marcar_email_enviado(10, 2)
+    assert ms.email_enviado(10, 1) and ms.email_enviado(10, 2) and not ms.email_enviado(11, 1)
+    assert _contar(factory, UploadEmailSent) == 2
+
+
+def test_importa_los_json_viejos_una_vez(factory, tmp_path):
+    ahora = dt.datetime.utcnow()
+    (tmp_path / "password_resets.json").write_text(json.dumps({
+        "tok-vigente": {"email": "A@example.com", "created_at": (ahora - dt.timedelta(hours=1)).isoformat()},
+        "tok-vencido": {"email": "b@example.com", "created_at": (ahora - dt.timedelta(days=3)).isoformat()},
+        "tok-sin-fecha": {"email": "c@example.com"},
+        "basura": "x",
+    }), encoding="utf-8")
+    (tmp_path / "email_sent.json").write_text(json.dumps({"5": [1, 2, 2], "6": [1], "x": [3]}),
+                                              encoding="utf-8")
+    ms.marcar_email_enviado(6, 1)                     # ya marcado por la tabla: no se duplica
+
+    assert ms.importar_json(tmp_path) == {"password_resets": 2, "email_sent": 2}
+    assert ms.email_de_token("tok-vigente") == "a@example.com"
+    assert ms.email_de_token("tok-sin-fecha") == "c@example.com"
+    assert ms.email_de_token("tok-vencido") is None
+    assert ms.email_enviado(5, 2) and _contar(factory, UploadEmailSent) == 3
+    assert not (tmp_path / "email_sent.json").exists()
+    assert (tmp_path / "password_resets.json.migrated").exists()
+
+    # otro worker que todavía veía los archivos: no duplica
+    for nombre in ("password_resets.json", "email_sent.json"):
+        (tmp_path / f"{nombre}.migrated").rename(tmp_path / nombre)
+    assert ms.importar_json(tmp_path) == {"password_resets": 0, "email_sent": 0}
+    assert ms.importar_json(tmp_path) == {"password_resets": 0, "email_sent": 0}   # ya no hay archivos
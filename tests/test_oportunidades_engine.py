@@ -0,0 +1,233 @@
+"""Motor de oportunidades: paridad set-based vs el recorrido fila a fila + modo incremental."""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.models import Base
+from web_comparativas.dimensionamiento import oportunidades as opp
+from web_comparativas.dimensionamiento.models import (
+    DimensionamientoImportRun, DimensionamientoRecord, OportunidadSummary,
+)
+
+ESTADOS = [opp.ESTADO_NO_PARTICIPO] * 4 + [
+    opp.ESTADO_GANADO, opp.ESTADO_GANADO, opp.ESTADO_COMPRADO_OTRA, opp.ESTADO_EN_ESPERA, None,
+]
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setenv("OPORTUNIDADES_ENABLED", "1")
+    # Dataset chico: el piso de renglones/mes y el monto mínimo se bajan para que haya
+    # meses completos y oportunidades que califiquen.
+    monkeypatch.setattr(opp, "PARAM_MES_COMPLETO_PISO_MIN", 1)
+    monkeypatch.setattr(opp, "PARAM_MONTO_MIN_ARS", 500)
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[
+        DimensionamientoImportRun.__table__, DimensionamientoRecord.__table__,
+        OportunidadSummary.__table__,
+    ])
+    Session = sessionmaker(bind=engine, future=True)
+    with Session() as session:
+        for run_id in (1, 2):
+            session.add(DimensionamientoImportRun(id=run_id, source_path=f"run{run_id}.csv", status="success"))
+        session.commit()
+        yield session
+
+
+def _cargar(db, run_id: int, seed: int = 7, n: int = 900) -> None:
+    rnd = random.Random(seed)
+    clientes = [f"Cliente {i}" for i in range(12)] + [""]
+    codigos = [f"ART{i}" for i in range(9)] + [None]
+    for i in range(n):
+        mes = rnd.randrange(0, 16)
+        fecha = dt.date(2025 + (mes // 12), mes % 12 + 1, rnd.randint(1, 28))
+        db.add(DimensionamientoRecord(
+            import_run_id=run_id, id_registro_unico=f"{run_id}-{i}", fecha=fecha, plataforma="Portal",
+            cliente_visible=rnd.choice(clientes), codigo_articulo=rnd.choice(codigos),
+            resultado_participacion=rnd.choice(ESTADOS),
+            cantidad_demandada=rnd.choice([0.0, 1.0, 2.5, 10.0, 40.0]),
+            valorizacion_estimada=rnd.choice([None, 0.0, 150.0, 900.0, 4000.0]),
+            cuit=f"30-{i}", cuenta_interna=rnd.choice(["SIN DATO", f"{1000 + i}", None]),
+            provincia=rnd.choice(["CABA", "Córdoba"]),
+            producto_nombre_original=rnd.choice([None, "", f"Producto {i}"]),
+            descripcion_articulo=rnd.choice([None, f"Desc {i}"]),
+            familia="F", unidad_negocio="U", is_identified=rnd.random() > 0.15,
+        ))
+    db.commit()
+
+
+def _motor_viejo(db, run_id: int, ref_month: dt.date) -> tuple[list[dict], dict]:
+    """Copia condensada del recorrido fila a fila que reemplaza el motor set-based."""
+    window_start = opp._subtract_months(ref_month, opp.VENTANA_MESES - 1)
+    window_end = opp._subtract_months(ref_month, -1)
+    registros = db.execute(
+        select(DimensionamientoRecord).where(DimensionamientoRecord.import_run_id == run_id)
+        .order_by(DimensionamientoRecord.id)
+    ).scalars().all()
+    en_ventana = [
+        r for r in registros
+        if window_start <= r.fecha < window_end and r.codigo_articulo and r.cliente_visible
+    ]
+    pares: dict = {}
+    for r in en_ventana:
+        if r.resultado_participacion != opp.ESTADO_NO_PARTICIPO:
+            continue
+        par = pares.setdefault((r.cliente_visible, r.codigo_articulo), {
+            "np": defaultdict(float), "cli": defaultdict(float), "cant": 0.0, "val": 0.0,
+            "ultima": None, "attr": None,
+        })
+        par["np"][r.fecha.strftime("%Y-%m")] += float(r.cantidad_demandada or 0)
+        par["cant"] += float(r.cantidad_demandada or 0)
+        par["val"] += float(r.valorizacion_estimada or 0)
+    for r in en_ventana:
+        par = pares.get((r.cliente_visible, r.codigo_articulo))
+        if par is None:
+            continue
+        par["cli"][r.fecha.strftime("%Y-%m")] += float(r.cantidad_demandada or 0)
+        if par["ultima"] is None or r.fecha > par["ultima"]:
+            par["ultima"] = r.fecha
+        if par["attr"] is None or r.fecha >= par["attr"].fecha:
+            par["attr"] = r
+    efectividad = opp._efectividad_por_codigo(db, run_id)
+    discard = defaultdict(int)
+    candidatos = 0
+    rows = []
+    for (cliente, codigo), par in pares.items():
+        np_sums = [v for v in par["np"].values() if v > 0]
+        if not np_sums:
+            discard["sin_demanda"] += 1
+            continue
+        if par["cant"] <= 0 or par["val"] / par["cant"] <= 0:
+            discard["precio_cero"] += 1
+            continue
+        candidatos += 1
+        precio = par["val"] / par["cant"]
+        monto = float(statistics.median(np_sums)) * precio
+        eff = efectividad.get(codigo, {"ganados": 0, "efectividad": 0.0})
+        tipo = opp._clasificar_tipo(len([v for v in par["cli"].values() if v > 0]))
+        meses_desde = opp._month_diff(ref_month, opp._month_floor(par["ultima"]))
+        act = opp.ESTADO_ACTIVA if meses_desde <= opp.PARAM_RECENCIA_MESES else opp.ESTADO_DORMIDA
+        fallas = {
+            "no_identificado": not par["attr"].is_identified,
+            "efectividad_baja": eff["efectividad"] < opp.PARAM_EFECTIVIDAD_MIN,
+            "monto_bajo": monto < opp.PARAM_MONTO_MIN_ARS,
+            "sin_ganados": eff["ganados"] <= 0,
+        }
+        for motivo, falla in fallas.items():
+            discard[motivo] += int(falla)
+        if any(fallas.values()):
+            continue
+        attr = par["attr"]
+        rows.append({
+            "cliente_visible": cliente, "codigo_articulo": codigo,
+            "cuenta_interna": opp.normalizar_cuenta_fusion(attr.cuenta_interna),
+            "cuit": attr.cuit,
+            "producto_nombre": attr.producto_nombre_original or attr.descripcion_articulo,
+            "tipo_oportunidad": tipo, "estado_actividad": act,
+            "consumo_min_mensual": min(np_sums), "consumo_max_mensual": max(np_sums),
+            "ultima_demanda": par["ultima"], "meses_desde_ultima_demanda": meses_desde,
+            "precio_unitario_estimado": precio, "monto_oportunidad": monto,
+            "score": monto * eff["efectividad"] * opp.TIPO_MULTIPLICADOR[tipo] * opp.ACTIVIDAD_MULTIPLICADOR[act],
+        })
+    return rows, {"candidatos": candidatos, "pares_no_participo": len(pares), "discard": {k: v for k, v in discard.items() if v}}
+
+
+def test_motor_set_based_coincide_con_el_recorrido_fila_a_fila(db):
+    _cargar(db, 1)
+    result = opp.computar_oportunidades(db, 1)
+    stats = result["stats"]
+    viejas, stats_viejas = _motor_viejo(db, 1, dt.date.fromisoformat(stats["ref_month"]))
+
+    assert result["rows"], "el dataset de prueba tiene que producir oportunidades"
+    assert stats["candidatos"] == stats_viejas["candidatos"]
+    assert stats["pares_no_participo"] == stats_viejas["pares_no_participo"]
+    assert {k: v for k, v in stats["discard"].items() if v} == stats_viejas["discard"]
+
+    nuevas = {(r["cliente_visible"], r["codigo_articulo"]): r for r in result["rows"]}
+    assert set(nuevas) == {(r["cliente_visible"], r["codigo_articulo"]) for r in viejas}
+    for vieja in viejas:
+        nueva = nuevas[(vieja["cliente_visible"], vieja["codigo_articulo"])]
+        for campo, valor in vieja.items():
+            if isinstance(valor, float):
+                assert nueva[campo] == pytest.approx(valor), campo
+            else:
+                assert nueva[campo] == valor, campo
+        assert nueva["oportunidad_id"] == opp.opportunity_stable_id(vieja["cliente_visible"], vieja["codigo_articulo"])
+        assert len(nueva["huella"]) == 16
+
+
+def _filas(db, run_id: int) -> dict[str, tuple[int, float]]:
+    return {
+        o.oportunidad_id: (o.id, o.monto_oportunidad)
+        for o in db.execute(
+            select(OportunidadSummary).where(OportunidadSummary.import_run_id == run_id)
+        ).scalars()
+    }
+
+
+def test_incremental_conserva_las_filas_sin_cambios(db):
+    _cargar(db, 1)
+    _cargar(db, 2)
+    completo = opp.rebuild_oportunidades_for_run(db, 1)
+    assert completo["stats"]["modo"] == "completo"
+    antes = _filas(db, 1)
+
+    # Mismo dataset en el run 2: todas las filas se copian al run nuevo y las del run 1
+    # quedan intactas (historia por run, igual que en el modo completo).
+    incremental = opp.rebuild_oportunidades_for_run(db, 2, incremental=True)
+    assert incremental["stats"]["modo"] == "incremental"
+    assert incremental["stats"]["incremental"] == {
+        "conservadas": len(antes), "insertadas": 0, "borradas": 0,
+    }
+    run1 = _filas(db, 1)
+    assert run1 == antes
+    copiadas = _filas(db, 2)
+    assert {k: v[1] for k, v in copiadas.items()} == {k: v[1] for k, v in antes.items()}
+    assert not {v[0] for v in copiadas.values()} & {v[0] for v in antes.values()}
+    antes = copiadas
+
+    # Re-cálculo del mismo run con un par cambiado: solo esa fila se reescribe (las demás
+    # conservan su id) y el resultado es el de un rebuild completo.
+    db.expire_all()
+    cambiada = db.execute(
+        select(OportunidadSummary).where(OportunidadSummary.import_run_id == 2)
+    ).scalars().first()
+    clave = cambiada.oportunidad_id
+    for rec in db.execute(
+        select(DimensionamientoRecord).where(
+            DimensionamientoRecord.import_run_id == 2,
+            DimensionamientoRecord.cliente_visible == cambiada.cliente_visible,
+            DimensionamientoRecord.codigo_articulo == cambiada.codigo_articulo,
+        )
+    ).scalars():
+        rec.valorizacion_estimada = (rec.valorizacion_estimada or 0) * 3
+    db.commit()
+
+    segunda = opp.rebuild_oportunidades_for_run(db, 2, incremental=True)
+    assert segunda["stats"]["incremental"] == {
+        "conservadas": len(antes) - 1, "insertadas": 1, "borradas": 1,
+    }
+    despues = _filas(db, 2)
+    assert set(despues) == set(antes)
+    assert despues[clave][0] != antes[clave][0]
+    assert all(despues[k][0] == antes[k][0] for k in antes if k != clave)
+    assert _filas(db, 1) == run1
+    assert despues[clave][1] == pytest.approx(antes[clave][1] * 3)
+
+    opp.rebuild_oportunidades_for_run(db, 2)
+    assert {k: v[1] for k, v in _filas(db, 2).items()} == pytest.approx({k: v[1] for k, v in despues.items()})
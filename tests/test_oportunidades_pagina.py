@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.models import Base, User, VendedorFusion
+from web_comparativas.dimensionamiento.models import (
+    CrmEnvio, DimensionamientoImportRun, DimensionamientoRecord,
+    OportunidadAsignacionManual, OportunidadSummary,
+)
+from web_comparativas.dimensionamiento.oportunidades import opportunity_stable_id
+from web_comparativas.routers import oportunidades_router as router
+
+URL = "/api/mercado-privado/oportunidades/pagina"
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, VendedorFusion.__table__,
+        DimensionamientoImportRun.__table__, DimensionamientoRecord.__table__,
+        OportunidadSummary.__table__, OportunidadAsignacionManual.__table__,
+        CrmEnvio.__table__,
+    ])
+    Session = sessionmaker(bind=engine, future=True)
+    with Session() as session:
+        session.add(DimensionamientoImportRun(id=1, source_path="test.csv", status="success"))
+        session.commit()
+        yield session
+
+
+def make_user(db, *, email, role, reporta_a_id=None) -> User:
+    u = User(email=email, name=email.split("@")[0], role=role, password_hash="x", reporta_a_id=reporta_a_id)
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+def add_opportunity(db, row_id: int, client: str, code: str, **overrides) -> OportunidadSummary:
+    values = dict(
+        id=row_id, import_run_id=1, codigo_articulo=code, cliente_visible=client,
+        cuenta_interna=f"C{row_id}", producto_nombre=f"Producto {row_id}",
+        familia="Familia A", unidad_negocio="Unidad 1", plataforma="Portal",
+        tipo_oportunidad="ESTABLE", estado_actividad="ACTIVA",
+        meses_demanda_cliente_12m=3, meses_no_participo_12m=3, ventana_meses=12,
+        consumo_tipico_mensual=10, consumo_min_mensual=5, consumo_max_mensual=15,
+        meses_desde_ultima_demanda=1, precio_unitario_estimado=100,
+        monto_oportunidad=1000 * row_id, efectividad=0.5, ganados=2, comprado_otra=1,
+        en_espera=0, clientes_distintos=2, tipo_multiplicador=1,
+        multiplicador_actividad=1, score=float(row_id),
+    )
+    values.update(overrides)
+    row = OportunidadSummary(**values)
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+
+def configure(monkeypatch, *, cartera_enabled: bool = False):
+    monkeypatch.setattr(router, "OPORTUNIDADES_ENABLED", lambda: True)
+    monkeypatch.setattr(router, "OPORTUNIDADES_CARTERA_ENABLED", lambda: cartera_enabled)
+    monkeypatch.setattr(router, "_modo_envio_actual", lambda: "simulado")
+    monkeypatch.setattr(router, "_window_meta", lambda _db, _run_id: {"label": "periodo"})
+    monkeypatch.setattr(router, "_contexto_asignacion_seguro", lambda *_args: {
+        "match": None, "usuarios": [], "sugerido_id": None, "error": None,
+        "puede_elegir": True,
+    })
+
+
+def client_for(db, user) -> TestClient:
+    app = FastAPI()
+    app.include_router(router.router)
+    app.dependency_overrides[router._perm_oportunidades] = lambda: user
+    app.dependency_overrides[router.get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture()
+def admin(db):
+    return make_user(db, email="admin@suizo.com", role="admin")
+
+
+def test_recorre_todas_las_paginas_sin_repetir_ni_saltear(db, monkeypatch, admin):
+    configure(monkeypatch)
+    for i in range(1, 8):
+        add_opportunity(db, i, f"Cliente {i}", f"ART{i}")
+    # Empate de score: el desempate por id mantiene el orden total.
+    add_opportunity(db, 8, "Cliente 8", "ART8", score=4.0)
+
+    vistos: list[int] = []
+    cursor = None
+    with client_for(db, admin) as client:
+        for _ in range(10):
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get(URL, params=params).json()["data"]
+            vistos.extend(row["id"] for row in data["rows"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+    assert vistos == [7, 6, 5, 8, 4, 3, 2, 1]
+
+
+def test_primera_pagina_trae_totales_y_las_siguientes_no(db, monkeypatch, admin):
+    configure(monkeypatch)
+    for i in range(1, 4):
+        add_opportunity(db, i, f"Cliente {i}", f"ART{i}")
+    add_opportunity(db, 4, "Cliente 4", "ART4", cuenta_interna="SIN DATO", tipo_oportunidad="PUNTUAL")
+
+    with client_for(db, admin) as client:
+        primera = client.get(URL, params={"limit": 2}).json()["data"]
+        segunda = client.get(URL, params={"limit": 2, "cursor": primera["next_cursor"]}).json()["data"]
+
+    assert primera["total"] == 4
+    assert primera["completeness"]["faltan_n_cuenta"] == 1
+    assert primera["kpis"]["monto_total"] == 10000
+    assert primera["kpis"]["repetida"] == 3
+    assert primera["opciones"]["familias"] == ["Familia A"]
+    assert "total" not in segunda and "completeness" not in segunda
+    assert [row["id"] for row in segunda["rows"]] == [2, 1]
+
+
+def test_faltan_cuenta_respeta_el_fallback_a_records(db, monkeypatch, admin):
+    configure(monkeypatch)
+    add_opportunity(db, 1, "Cliente 1", "ART1", cuenta_interna=None)
+    add_opportunity(db, 2, "Cliente 2", "ART2", cuenta_interna=None)
+    db.add(DimensionamientoRecord(
+        import_run_id=1, id_registro_unico="r1", fecha=dt.date(2026, 1, 1), plataforma="Portal",
+        cliente_visible="Cliente 1", cuenta_interna="999",
+    ))
+    db.commit()
+
+    with client_for(db, admin) as client:
+        data = client.get(URL).json()["data"]
+
+    assert data["completeness"]["faltan_n_cuenta"] == 1
+    por_id = {row["id"]: row for row in data["rows"]}
+    assert por_id[1]["cuenta_fusion"] == "999"
+
+
+def test_filtros_se_aplican_en_sql(db, monkeypatch, admin):
+    configure(monkeypatch)
+    add_opportunity(db, 1, "Hospital Norte", "ART1", familia="Suturas")
+    add_opportunity(db, 2, "Hospital Sur", "ART2", familia="Guantes", tipo_oportunidad="PUNTUAL")
+    add_opportunity(db, 3, "Clinica 100%", "ART3", familia="Suturas", unidad_negocio="Unidad 2")
+
+    with client_for(db, admin) as client:
+        def ids(**params):
+            return {row["id"] for row in client.get(URL, params=params).json()["data"]["rows"]}
+
+        assert ids(cliente="hospital") == {1, 2}
+        assert ids(q="art3") == {3}
+        assert ids(cliente="100%") == {3}
+        assert ids(familia=["Suturas"]) == {1, 3}
+        assert ids(unidad_negocio=["Unidad 2"]) == {3}
+        assert ids(tipo=["PUNTUAL"]) == {2}
+        assert ids(monto_min=1500, monto_max=2500) == {2}
+
+
+def test_excluye_enviadas_del_entorno_activo_y_completa_oportunidad_id(db, monkeypatch, admin):
+    configure(monkeypatch)
+    enviada = add_opportunity(db, 1, "Cliente 1", "ART1")
+    add_opportunity(db, 2, "Cliente 2", "ART2")
+    db.add(CrmEnvio(
+        oportunidad_id=opportunity_stable_id(enviada.cliente_visible, enviada.codigo_articulo),
+        cliente_visible="Cliente 1", codigo_articulo="ART1", enviado_por="x@suizo.com",
+        crm_status="SIMULADO", crm_modo="simulado",
+    ))
+    db.commit()
+
+    with client_for(db, admin) as client:
+        data = client.get(URL).json()["data"]
+
+    assert [row["id"] for row in data["rows"]] == [2]
+    assert data["total"] == 1
+    db.expire_all()
+    assert db.get(OportunidadSummary, 1).oportunidad_id == opportunity_stable_id("Cliente 1", "ART1")
+
+
+def test_cursor_de_otro_orden_se_rechaza(db, monkeypatch, admin):
+    configure(monkeypatch)
+    for i in range(1, 4):
+        add_opportunity(db, i, f"Cliente {i}", f"ART{i}")
+    with client_for(db, admin) as client:
+        cursor = client.get(URL, params={"limit": 1}).json()["data"]["next_cursor"]
+        response = client.get(URL, params={"limit": 1, "cursor": cursor, "orden": "efectividad"})
+        assert response.status_code == 400
+        assert client.get(URL, params={"cursor": "no-es-un-cursor"}).status_code == 400
+
+
+class _FakeMaster:
+    def __init__(self, operators_by_code):
+        self.operators_by_code = operators_by_code
+
+
+def test_visibilidad_por_cartera_coincide_con_el_filtro_en_memoria(db, monkeypatch):
+    """El predicado SQL y `oportunidades_visibles_para` tienen que elegir las mismas
+    filas para cada rol (mismo escenario que test_oportunidades_cartera_wiring)."""
+    supervisor = make_user(db, email="supervisor@suizo.com", role="supervisor")
+    analista = make_user(db, email="analista@suizo.com", role="analista", reporta_a_id=supervisor.id)
+    analista2 = make_user(db, email="analista2@suizo.com", role="analista")
+    gerente = make_user(db, email="gerente@suizo.com", role="gerente")
+    supervisor.reporta_a_id = gerente.id
+    for codigo, user_id in (("4071", analista.id), ("2731", supervisor.id), ("3162", analista2.id)):
+        db.add(VendedorFusion(codigo_vendedor=codigo, nombre_fusion=codigo, activo=True, user_id=user_id))
+    db.commit()
+
+    add_opportunity(db, 1, "Cliente A", "ART1", cuenta_interna="AAA")
+    add_opportunity(db, 2, "Cliente B", "ART2", cuenta_interna="BBB")
+    ajena = add_opportunity(db, 3, "Cliente C", "ART3", cuenta_interna="CCC")
+    add_opportunity(db, 4, "Cliente D", "ART4", cuenta_interna="DDD")
+    add_opportunity(db, 5, "Cliente E", "ART5", cuenta_interna=None)
+    db.add(OportunidadAsignacionManual(
+        oportunidad_id=opportunity_stable_id(ajena.cliente_visible, ajena.codigo_articulo),
+        analista_user_id=analista.id, asignado_por_user_id=supervisor.id,
+    ))
+    db.commit()
+    monkeypatch.setattr(
+        "web_comparativas.dimensionamiento.oportunidades_visibilidad.get_master_index",
+        lambda: _FakeMaster({
+            "AAA": {"vendedor_codigo": "4071"},
+            "BBB": {"vendedor_codigo": "2731"},
+            "CCC": {"vendedor_codigo": "3162"},
+        }),
+    )
+    configure(monkeypatch, cartera_enabled=True)
+
+    esperado = {
+        analista.id: {1, 3},
+        supervisor.id: {1, 2, 4, 5},
+        gerente.id: {1, 2},
+        analista2.id: {3},
+    }
+    todas = db.query(OportunidadSummary).all()
+    for user in (analista, supervisor, gerente, analista2):
+        en_memoria = {o.id for o in router.oportunidades_visibles_para(db, user, todas)}
+        with client_for(db, user) as client:
+            data = client.get(URL).json()["data"]
+        assert {row["id"] for row in data["rows"]} == en_memoria == esperado[user.id]
+        assert data["total"] == len(esperado[user.id])
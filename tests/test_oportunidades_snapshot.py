@@ -0,0 +1,84 @@
+"""Snapshot del maestro de Oportunidades: derivadas tipadas, índice por código y Parquet."""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import oportunidades_snapshot as snapmod
+
+CRUDO = pd.DataFrame({
+    "Comprador": ["Hospital Norte", "hospital norte", "Ministerio Salud", "Hospital Sur", ""],
+    "Provincia": ["Salta", "Salta", "Jujuy", "Salta", "Jujuy"],
+    "Apertura": ["2026-05-01", "01/05/2026", "x", "2026-06-10", ""],
+    "Presupuesto": ["1.500,50", "100", "", "abc", "2.000"],
+    "Estado": ["Emergencia", "Regular", "EMERG. sanitaria", "", "Regular"],
+})
+FUENTES = {"_dt": "Apertura", "_budget": "Presupuesto", "_state": "Estado"}
+
+
+def _fecha(v):
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return dt.datetime.strptime(str(v).strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _monto(v):
+    s = str(v or "").strip().replace(".", "").replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        return 0.0
+
+
+def _compilado():
+    return snapmod.compilar(CRUDO, fuentes=FUENTES, dimensiones=["Comprador", "Provincia"],
+                            parse_fecha=_fecha, parse_monto=_monto)
+
+
+def test_compilar_deriva_columnas_tipadas():
+    df = _compilado()
+    assert df["_dt"].tolist() == [dt.date(2026, 5, 1), dt.date(2026, 5, 1), None, dt.date(2026, 6, 10), None]
+    assert df["_budget"].tolist() == [1500.5, 100.0, 0.0, 0.0, 2000.0]
+    assert df["_state"].tolist() == ["EMERGENCIA", "REGULAR", "EMERGENCIA", "REGULAR", "REGULAR"]
+    assert isinstance(df["Comprador"].dtype, pd.CategoricalDtype)
+    assert not isinstance(CRUDO["Comprador"].dtype, pd.CategoricalDtype)   # el crudo no se modifica
+
+
+def test_coincidencias_por_codigo_igual_al_contains():
+    snap = snapmod.OppSnapshot(_compilado(), huella="h1", fuentes=FUENTES)
+    assert snap.df["Comprador"].dtype == object and set(snap.indices) == {"Comprador", "Provincia"}
+    frame = snap.frame()
+    sub = frame[frame["Provincia"] == "Salta"]           # subconjunto: conserva índice y huella
+    prueba = lambda s: s.str.contains("hospital", case=False, na=False)
+    esperado = sub["Comprador"].astype(str).str.contains("hospital", case=False, na=False).to_numpy()
+    assert snap.coincidencias(sub, "Comprador", prueba).tolist() == esperado.tolist() == [True, True, True]
+    ajeno = sub.copy()
+    ajeno.attrs["opp_huella"] = "otra"                   # frame de otro snapshot: cae al contains
+    assert snap.coincidencias(ajeno, "Comprador", prueba).tolist() == [True, True, True]
+    assert snap.coincidencias(frame, "Provincia", lambda s: s.str.contains("juj", case=False)).tolist() == [
+        False, False, True, False, True,
+    ]
+
+
+def test_parquet_se_reusa_por_huella_o_sha(tmp_path):
+    pytest.importorskip("pyarrow")
+    destino = tmp_path / "opp.parquet"
+    assert snapmod.guardar(_compilado(), destino, huella="h1", sha="abc", fuentes=FUENTES)
+
+    snap = snapmod.cargar(destino, huella="h1", sha=lambda: pytest.fail("no debe hashear"))
+    assert snap is not None and len(snap) == 5 and snap.fuentes == FUENTES
+    assert snap.df["_dt"].iloc[0] == dt.date(2026, 5, 1)
+    assert set(snap.indices) == {"Comprador", "Provincia"}
+
+    tocado = snapmod.cargar(destino, huella="h2", sha=lambda: "abc")     # mismo contenido
+    assert tocado is not None and tocado.huella == "h2"
+    assert snapmod.cargar(destino, huella="h2", sha=lambda: "otro") is None
@@ -0,0 +1,144 @@
+"""Ejecutor de parseo de PDFs: merge en orden de página, caché por huella y techo de memoria."""
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.adapters import pdf_executor as pe
+
+
+# Documento falso (texto con páginas separadas por \f): funciones de módulo para
+# que viajen por pickle a los procesos hijos igual que los parsers reales.
+class _Pagina:
+    def __init__(self, numero, texto):
+        self.page_number = numero
+        self.texto = texto
+
+
+class _Doc:
+    def __init__(self, paginas):
+        self.pages = paginas
+
+
+@contextmanager
+def abrir_texto(path):
+    with open(path, encoding="utf-8") as f:
+        partes = f.read().split("\f")
+    yield _Doc([_Pagina(i + 1, t) for i, t in enumerate(partes)])
+
+
+def palabras(page):
+    return [(page.page_number, w) for w in page.texto.split()]
+
+
+LLAMADAS: list[int] = []
+
+
+def palabras_contadas(page):
+    LLAMADAS.append(page.page_number)
+    return palabras(page)
+
+
+def falla_en_la_tercera(page):
+    if page.page_number == 3:
+        raise ValueError("página rota")
+    return []
+
+
+def _doc(tmp_path, nombre, paginas):
+    path = tmp_path / nombre
+    path.write_text("\f".join(paginas), encoding="utf-8")
+    return str(path)
+
+
+def _docs(tmp_path):
+    return [
+        _doc(tmp_path, f"pliego_{d}.pdf", [f"doc{d} pag{p} item {p * 10 + d}" for p in range(1, 8 + d)])
+        for d in range(4)
+    ]
+
+
+def test_paralelo_igual_a_secuencial_y_en_orden(tmp_path):
+    pe.limpiar_cache()
+    paths = _docs(tmp_path)
+    tareas = [(p, palabras) for p in paths] + [(paths[0], palabras)]      # repetida: se parsea una vez
+
+    secuencial = pe.parsear_documentos(tareas, workers=1, cache_mb=0, abrir=abrir_texto)
+    paralelo = pe.parsear_documentos(tareas, workers=3, memoria_mb=10_000, paginas_por_tarea=3,
+                                     cache_mb=0, abrir=abrir_texto)
+
+    assert paralelo == secuencial
+    assert [len(pags) for pags in paralelo] == [7, 8, 9, 10, 7]
+    assert paralelo[1][0] == [(1, "doc1"), (1, "pag1"), (1, "item"), (1, "11")]
+    assert paralelo[4] == paralelo[0]
+
+
+def test_cache_por_pagina_con_clave_por_contenido(tmp_path):
+    pe.limpiar_cache()
+    LLAMADAS.clear()
+    path = _doc(tmp_path, "a.pdf", ["uno", "dos", "tres"])
+
+    primero = pe.parsear_paginas(path, palabras_contadas, workers=1, abrir=abrir_texto)
+    assert LLAMADAS == [1, 2, 3]
+    assert pe.parsear_paginas(path, palabras_contadas, workers=1, abrir=abrir_texto) == primero
+    assert LLAMADAS == [1, 2, 3]                                          # todo desde caché
+
+    copia = _doc(tmp_path, "copia.pdf", ["uno", "dos", "tres"])            # mismo contenido, otra ruta
+    pe.parsear_paginas(copia, palabras_contadas, workers=1, abrir=abrir_texto)
+    assert LLAMADAS == [1, 2, 3]
+
+    _doc(tmp_path, "a.pdf", ["uno", "dos", "tres", "cuatro"])              # cambió el archivo
+    os.utime(path, ns=(1, 1))
+    assert len(pe.parsear_paginas(path, palabras_contadas, workers=1, abrir=abrir_texto)) == 4
+    assert LLAMADAS[3:] == [1, 2, 3, 4]
+
+
+def test_cache_acotado_por_tamano_y_huellas_se_olvidan(tmp_path):
+    pe.limpiar_cache()
+    grande = "x" * 4000                                                   # ~4 KB por página
+    a = _doc(tmp_path, "a.pdf", [f"a{i} {grande}" for i in range(3)])
+    b = _doc(tmp_path, "b.pdf", [f"b{i} {grande}" for i in range(3)])
+    techo_mb = 20_000 / (1024 * 1024)                                    # entran ~4 páginas
+
+    pe.parsear_paginas(a, palabras, workers=1, cache_mb=techo_mb, abrir=abrir_texto)
+    huella_a = pe.huella_archivo(a)
+    pe.parsear_paginas(b, palabras, workers=1, cache_mb=techo_mb, abrir=abrir_texto)
+    assert 0 < pe._bytes_cache <= 20_000 and len(pe._cache) < 6
+    assert {clave[0] for clave in pe._cache} == set(pe._cacheadas_por_huella)
+
+    # al salir la última página de 'a', su huella y su cantidad de páginas se olvidan con ella
+    pe.parsear_paginas(_doc(tmp_path, "c.pdf", [grande] * 4), palabras,
+                       workers=1, cache_mb=techo_mb, abrir=abrir_texto)
+    assert huella_a not in pe._cacheadas_por_huella
+    assert huella_a not in pe._paginas_por_huella and huella_a not in pe._huellas.values()
+
+    # caché apagado: no queda nada memoizado de los archivos
+    pe.limpiar_cache()
+    pe.parsear_paginas(a, palabras, workers=1, cache_mb=0, abrir=abrir_texto)
+    assert not pe._cache and not pe._huellas and not pe._paginas_por_huella
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_error_de_un_parser_se_propaga(tmp_path, workers):
+    pe.limpiar_cache()
+    path = _doc(tmp_path, "roto.pdf", ["a", "b", "c", "d"])
+    with pytest.raises(ValueError, match="página rota"):
+        pe.parsear_documentos([(path, falla_en_la_tercera)], workers=workers, memoria_mb=10_000,
+                              paginas_por_tarea=1, abrir=abrir_texto)
+
+
+def test_workers_acotados_por_memoria_y_tareas():
+    assert pe.workers_para(40, workers=16, memoria_mb=pe.MB_POR_WORKER * 3) == 3
+    assert pe.workers_para(40, workers=16, memoria_mb=1) == 1
+    assert pe.workers_para(2, workers=16, memoria_mb=10_000) == 2
+    assert pe.workers_para(0, workers=4, memoria_mb=10_000) == 1
+
+
+def test_rangos_contiguos_acotados():
+    assert pe._rangos([0, 1, 2, 3, 4, 7, 8, 10], 2) == [(0, 2), (2, 4), (4, 5), (7, 9), (10, 11)]
+    assert pe._rangos([], 5) == []
@@ -0,0 +1,58 @@
+"""Almacén de PDFs de reportes: una generación por versión, ETag y poda de versiones viejas."""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import report_artifacts as rep
+
+
+def test_version_estable_y_sensible_a_los_datos():
+    a = rep.version_de({"proceso_nro": "P-1", "kpis": {"b": 1, "a": 2}}, 1)
+    assert a == rep.version_de({"kpis": {"a": 2, "b": 1}, "proceso_nro": "P-1"}, 1)
+    assert a != rep.version_de({"proceso_nro": "P-2", "kpis": {"b": 1, "a": 2}}, 1)
+    assert a != rep.version_de({"proceso_nro": "P-1", "kpis": {"b": 1, "a": 2}}, 2)
+
+
+def test_get_or_build_genera_una_vez_aun_con_concurrencia(tmp_path):
+    store = rep.ReportStore(tmp_path)
+    llamadas = []
+    listo = threading.Event()
+
+    def build():
+        llamadas.append(1)
+        listo.wait(0.2)
+        return b"%PDF-1"
+
+    hilos = [threading.Thread(target=store.get_or_build, args=(7, "reporte_proceso", "v1", build)) for _ in range(5)]
+    for h in hilos:
+        h.start()
+    listo.set()
+    for h in hilos:
+        h.join()
+    assert len(llamadas) == 1
+    art = store.get_or_build(7, "reporte_proceso", "v1", lambda: b"otro")
+    assert art.path.read_bytes() == b"%PDF-1" and art.size == 6
+
+
+def test_nueva_version_poda_la_vieja_del_mismo_tipo(tmp_path):
+    store = rep.ReportStore(tmp_path)
+    viejo = store.put(7, "reporte_proceso", "v1", b"uno")
+    otro_tipo = store.put(7, "informe_u3", "v1", b"otro")
+    nuevo = store.put(7, "reporte_proceso", "v2", b"dos")
+    assert not viejo.path.exists() and otro_tipo.path.exists()
+    assert nuevo.etag != viejo.etag and nuevo.etag.startswith('"v2-')
+    store.purge(7)
+    assert store.get(7, "reporte_proceso", "v2") is None
+
+
+def test_etag_coincide():
+    etag = '"v1-abc"'
+    assert rep.etag_coincide('"v1-abc"', etag)
+    assert rep.etag_coincide('"x", W/"v1-abc"', etag)
+    assert rep.etag_coincide("*", etag)
+    assert not rep.etag_coincide('"v1-abd"', etag)
+    assert not rep.etag_coincide(None, etag)
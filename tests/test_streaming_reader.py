@@ -0,0 +1,245 @@
+"""Lectura en streaming de comparativas: paridad con la lectura completa previa, CSV y benchmark (WC_BENCH=1)."""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas.adapters import portales
+from web_comparativas.adapters import streaming as st
+
+PROVEEDORES = ["ALFA SA", "BETA SRL", "GAMMA SA"]
+
+
+def _libro_bloques(path, renglones=30):
+    """Cuadro comparativo en formato de bloques (una columna-bloque por proveedor)."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Cuadro comparativo"
+    ws.append(["Cuadro comparativo de ofertas"])
+    fila_prov = [None, None, None]
+    cabecera = ["Renglón", "Descripción", "Cantidad solicitada"]
+    for p in PROVEEDORES:
+        fila_prov += [p, None, None, None]
+        cabecera += ["Precio unitario", "Cantidad ofertada", "Total por renglón", "Especificación técnica"]
+    ws.append(fila_prov)
+    ws.append(cabecera)
+    for r in range(1, renglones + 1):
+        fila = [r, f"Insumo {r}", 10 * r]
+        for k, _ in enumerate(PROVEEDORES):
+            pu = None if (r + k) % 7 == 0 else f"{100 + r + k},50"
+            fila += [pu, 10 * r, None, f"Marca {k} lote {r % 3}"]
+        ws.append(fila)
+    ws.append([None, "Total general"])            # fila sin renglón: se ignora
+    wb.save(path)
+    return path
+
+
+def _filas_planas(renglones=40):
+    yield ["Listado de ofertas"]
+    yield ["Renglón", "Descripción", "Proveedor", "Precio unitario", "Cantidad ofertada", "Observaciones"]
+    for r in range(1, renglones + 1):
+        for k, p in enumerate(PROVEEDORES):
+            yield [r, f"Insumo {r}", p, f"{50 + r + k},25", 5 * r, f"obs {k}"]
+        yield [None, None, None, None, None, None]  # separador vacío: se ignora
+
+
+def _libro_plano(path, renglones=40):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Ofertas"
+    for fila in _filas_planas(renglones):
+        ws.append(fila)
+    wb.save(path)
+    return path
+
+
+def _frame_completo(path, hoja):
+    """Lectura previa: libro entero (modo normal) → DataFrame con todas las celdas."""
+    ws = load_workbook(path, data_only=True)[hoja]
+    return pd.DataFrame([list(row) for row in ws.iter_rows(values_only=True)])
+
+
+def _bloques_referencia(df):
+    """Loop del parser de bloques previo (recalcula mapeos por fila y usa df.iloc)."""
+    h, p = portales._find_header_and_provider_rows(df)
+    fixed = portales._first_fixed_cols(df.iloc[h])
+    blocks = portales._provider_blocks(df, p, h, fixed)
+    out = []
+    for r in range(h + 1, df.shape[0]):
+        row = df.iloc[r]
+        rc = fixed.get("Renglón")
+        if rc is None or pd.isna(row[rc]):
+            continue
+        base = {k: row[i] for k, i in fixed.items()}
+        for name, start, end in blocks:
+            m = portales._map_cols_in_block(df, h, start, end)
+            rec = base.copy()
+            rec["Proveedor"] = str(name).strip()
+            rec["Precio unitario"] = portales._parse_latam(row[m["Precio unitario"]])
+            rec["Cantidad ofertada"] = portales._parse_latam(row[m["Cantidad ofertada"]])
+            rec["Total por renglón"] = portales._parse_latam(row[m["Total por renglón"]])
+            rec["Especificación técnica"] = row[m["Especificación técnica"]]
+            rec["Marca"] = portales._detectar_marca(rec["Especificación técnica"])
+            out.append(rec)
+    return portales._build_summary_and_finalize(pd.DataFrame(out), {})
+
+
+def _iguales(a: pd.DataFrame, b: pd.DataFrame):
+    assert list(a.columns) == list(b.columns)
+    pd.testing.assert_frame_equal(
+        a.reset_index(drop=True).astype(object).where(a.notna(), None),
+        b.reset_index(drop=True).astype(object).where(b.notna(), None),
+    )
+
+
+def test_bloques_misma_salida_que_la_lectura_completa(tmp_path):
+    path = _libro_bloques(tmp_path / "bloques.xlsx", renglones=100)   # más filas que la cabecera cargada
+    out, summary = portales._normalize_core(path, hoja="Cuadro comparativo")
+    ref, ref_summary = _bloques_referencia(_frame_completo(path, "Cuadro comparativo"))
+
+    _iguales(out, ref)
+    assert summary["total_offers"] == ref_summary["total_offers"]
+    assert summary["__diag__"]["blocks_detected"] == len(PROVEEDORES)
+    assert summary["__diag__"]["rows_extracted"] == 100 * len(PROVEEDORES)
+
+
+def test_tabla_plana_streaming_igual_a_dataframe(tmp_path):
+    path = _libro_plano(tmp_path / "plana.xlsx")
+    out, summary = portales._normalize_core(path)
+
+    df = _frame_completo(path, "Ofertas")
+    h, _ = portales._find_header_and_provider_rows(df)
+    cols = [str(v).strip() for v in df.iloc[h].tolist() if v and str(v).strip()]
+    ref, ref_diag = portales._parse_flat_provider_table(df, h, "Ofertas", ["Ofertas"], cols)
+    ref, _ = portales._build_summary_and_finalize(ref, ref_diag)
+
+    _iguales(out, ref)
+    diag = summary["__diag__"]
+    assert diag["rows_read"] == ref_diag["rows_read"] >= 40 * len(PROVEEDORES)
+    assert diag["rows_normalized"] == 40 * len(PROVEEDORES)
+
+
+def _dimension_vieja(path, ref="A1:B3"):
+    """Reescribe el <dimension> de la primera hoja (como dejan algunos generadores)."""
+    import re
+    import zipfile
+
+    with zipfile.ZipFile(path) as z:
+        partes = {n: z.read(n) for n in z.namelist()}
+    hoja = "xl/worksheets/sheet1.xml"
+    partes[hoja], n = re.subn(rb'<dimension ref="[^"]*"', f'<dimension ref="{ref}"'.encode(), partes[hoja])
+    assert n == 1
+    with zipfile.ZipFile(path, "w") as z:
+        for nombre, datos in partes.items():
+            z.writestr(nombre, datos)
+    return path
+
+
+def test_dimension_declarada_incorrecta_no_recorta_la_hoja(tmp_path):
+    wb = Workbook()
+    for r in range(10):
+        wb.active.append([r, f"x{r}", r * 1.5])
+    path = tmp_path / "dim.xlsx"
+    wb.save(path)
+    _dimension_vieja(path)
+    assert load_workbook(path, read_only=True).active.max_row == 3      # la etiqueta miente
+
+    with st.abrir(path) as libro:
+        filas = list(libro.filas())
+        assert libro.mas_filas_que("Sheet", 5) and not libro.mas_filas_que("Sheet", 10)
+    assert filas == [(r, f"x{r}", r * 1.5) for r in range(10)]
+    assert st.frame_crudo(filas).shape == pd.read_excel(path, header=None).shape == (10, 3)
+
+    plana = _dimension_vieja(_libro_plano(tmp_path / "plana.xlsx"))
+    out, summary = portales._normalize_core(plana)
+    assert summary["__diag__"]["rows_normalized"] == 40 * len(PROVEEDORES)
+    assert out["Proveedor"].nunique() == len(PROVEEDORES)
+
+
+def test_csv_por_el_camino_rapido(tmp_path):
+    path = tmp_path / "plana.csv"
+    lineas = [";".join("" if v is None else str(v) for v in fila) for fila in _filas_planas(5)]
+    path.write_text("\n".join(lineas) + "\n", encoding="latin-1")
+
+    with st.abrir(path) as libro:
+        assert libro.tipo == "csv"
+        head, resto = libro.primeras_filas(None, 2)
+        assert head[1][2] == "Proveedor" and next(resto)[2] == "ALFA SA"
+
+    out, summary = portales._normalize_core(path)
+    assert len(out) == 5 * len(PROVEEDORES)
+    assert out["Precio unitario"].iloc[0] == pytest.approx(51.25)
+    assert summary["__diag__"]["parser_mode"] == "flat_provider_table"
+
+
+def test_csv_separador_y_encoding_con_muestra_cortada(tmp_path, monkeypatch):
+    # ';' con decimales latinos: la coma también aparece en todas las filas de datos
+    assert st._csv_separador(["Listado", "a;b;c", "1;2,5;3", "2;4,25;5"]) == ";"
+    assert st._csv_separador(["a,b,c", "1,2;x,3", "2,4,5"]) == ","
+
+    # una 'ó' (2 bytes en utf-8) partida justo en el borde de la muestra
+    path = tmp_path / "utf8.csv"
+    linea = "Renglón;Descripción\n"
+    contenido = (linea * 4).encode("utf-8")
+    corte = contenido.index("ó".encode("utf-8"), 20) + 1
+    monkeypatch.setattr(st, "_CSV_MUESTRA", corte)
+    path.write_bytes(contenido)
+    assert st._csv_formato(path) == ("utf-8-sig", ";")
+
+
+def test_frame_con_cabecera_nombra_como_pandas():
+    filas = [("titulo",), ("a", None, "a", 3), (1, 2, 3, 4, 5)]
+    df = st.frame_con_cabecera(filas, 1)
+    assert list(df.columns) == ["a", "Unnamed: 1", "a.1", "3", "Unnamed: 4"]
+    assert df.iloc[0].tolist() == [1, 2, 3, 4, 5]
+    assert st.frame_con_cabecera([], 0).empty
+
+
+def test_lotes_y_columnas_tipadas():
+    filas = [(str(i), f"{i},5") for i in range(7)]
+    lotes = list(st.en_lotes(filas, 3))
+    assert [len(l) for l in lotes] == [3, 3, 1]
+    cols = st.columnas(lotes[0], {"id": 0, "precio": 1, "falta": 9}, {"precio": portales._parse_latam})
+    assert cols == {"id": ["0", "1", "2"], "precio": [0.5, 1.5, 2.5], "falta": [None, None, None]}
+
+
+_BENCH = textwrap.dedent("""
+    import resource, sys, time
+    sys.path.insert(0, {raiz!r})
+    import pandas as pd
+    from openpyxl import load_workbook
+    from web_comparativas.adapters import portales
+    t0 = time.perf_counter()
+    if sys.argv[1] == "completo":
+        ws = load_workbook(sys.argv[2], data_only=True)["Cuadro comparativo"]
+        df = pd.DataFrame([list(r) for r in ws.iter_rows(values_only=True)])
+        n = df.shape[0]
+    else:
+        out, _ = portales._normalize_core(sys.argv[2], hoja="Cuadro comparativo")
+        n = len(out)
+    print(time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, n)
+""")
+
+
+@pytest.mark.skipif(os.environ.get("WC_BENCH") != "1", reason="benchmark: correr con WC_BENCH=1")
+def test_benchmark_memoria_pico(tmp_path):
+    path = _libro_bloques(tmp_path / "grande.xlsx", renglones=int(os.environ.get("WC_BENCH_ROWS", "50000")))
+    script = tmp_path / "bench.py"
+    script.write_text(_BENCH.format(raiz=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    res = {}
+    for modo in ("completo", "streaming"):
+        salida = subprocess.run([sys.executable, str(script), modo, str(path)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        res[modo] = (float(salida[0]), int(salida[1]))
+        print(f"{modo}: {res[modo][0]:.2f}s, pico {res[modo][1] / 1024:.0f} MB")
+    # la lectura completa solo arma el DataFrame crudo; streaming además normaliza todo
+    assert res["streaming"][1] < res["completo"][1]
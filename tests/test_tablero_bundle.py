@@ -0,0 +1,107 @@
+"""Bundle del tablero: se regenera por versión o huella, ida y vuelta por JSON y recorte del ranking."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import legacy_routes as lr
+
+NORMALIZADO = b"normalizado v1"
+
+
+@pytest.fixture()
+def tablero(monkeypatch):
+    """Upload falso + contadores de cálculo; la persistencia va a una sesión de mentira."""
+    estado = {"content": NORMALIZADO, "analytics": 0, "commits": 0}
+    df = pd.DataFrame({
+        "Renglón": [1, 1, 1, 2, 2],
+        "Descripción": ["Gasas", "Gasas", "Gasas", "Vendas", "Vendas"],
+        "Proveedor": ["ALFA SA", "BETA SRL", "GAMMA SA", "ALFA SA", "BETA SRL"],
+        "Precio unitario": [10.0, 12.5, 9.0, 30.0, 28.0],
+        "Cantidad solicitada": [100, 100, 100, 50, 50],
+    })
+
+    def analytics(up, df_, dash):
+        estado["analytics"] += 1
+        return {"kpis": {"ofertas": np.int64(len(df_)), "fecha": pd.Timestamp("2026-10-01")}}
+
+    monkeypatch.setattr(lr.services, "get_normalized_bytes", lambda up: estado["content"])
+    monkeypatch.setattr(lr.services, "get_dashboard_data", lambda up: {})
+    monkeypatch.setattr(lr, "_read_processed_bytes", lambda content: df)
+    monkeypatch.setattr(lr, "_compute_tablero_analytics", analytics)
+    monkeypatch.setattr(lr, "db_session", SimpleNamespace(
+        add=lambda obj: None,
+        commit=lambda: estado.__setitem__("commits", estado["commits"] + 1),
+        rollback=lambda: None,
+    ))
+    up = SimpleNamespace(id=7, tablero_bundle_json=None)
+    return up, estado
+
+
+def test_bundle_se_persiste_y_se_reusa(tablero):
+    up, estado = tablero
+    primero = lr.get_tablero_bundle(up)
+    assert estado["analytics"] == 1 and estado["commits"] == 1
+    assert json.loads(up.tablero_bundle_json) == primero
+
+    # ida y vuelta por JSON: tipos de numpy/pandas ya serializados en la primera vista
+    assert primero["analytics"]["kpis"] == {"ofertas": 5, "fecha": "2026-10-01T00:00:00"}
+    assert primero["version"] == lr.TABLERO_BUNDLE_VERSION
+    assert primero["fingerprint"] == lr._tablero_fingerprint(NORMALIZADO)
+
+    assert lr.get_tablero_bundle(up) == primero
+    assert estado["analytics"] == 1                        # desde el bundle guardado
+
+
+def test_otra_version_regenera(tablero, monkeypatch):
+    up, estado = tablero
+    lr.get_tablero_bundle(up)
+    monkeypatch.setattr(lr, "TABLERO_BUNDLE_VERSION", lr.TABLERO_BUNDLE_VERSION + 1)
+
+    nuevo = lr.get_tablero_bundle(up)
+    assert estado["analytics"] == 2
+    assert nuevo["version"] == lr.TABLERO_BUNDLE_VERSION
+    assert json.loads(up.tablero_bundle_json)["version"] == lr.TABLERO_BUNDLE_VERSION
+
+
+def test_otro_normalizado_regenera(tablero):
+    up, estado = tablero
+    lr.get_tablero_bundle(up)
+    estado["content"] = b"normalizado v2 (re-procesado)"
+
+    nuevo = lr.get_tablero_bundle(up)
+    assert estado["analytics"] == 2
+    assert nuevo["fingerprint"] == lr._tablero_fingerprint(estado["content"])
+
+    up.tablero_bundle_json = "{no es json"                  # guardado corrupto: también regenera
+    lr.get_tablero_bundle(up)
+    assert estado["analytics"] == 3
+
+
+def test_sin_normalizado_no_hay_bundle(tablero):
+    up, estado = tablero
+    estado["content"] = None
+    assert lr.get_tablero_bundle(up) is None
+    assert estado["analytics"] == 0 and up.tablero_bundle_json is None
+
+
+def test_recorte_de_puestos_del_ranking(tablero):
+    up, _ = tablero
+    rows = lr.get_tablero_bundle(up)["ranking"]["rows"]
+    assert [len(r["positions"]) for r in rows] == [3, 2]
+
+    recortadas, max_pos = lr._trim_ranking_rows(rows, 1)
+    assert max_pos == 1 and [len(r["positions"]) for r in recortadas] == [1, 1]
+    assert recortadas[0]["positions"] == rows[0]["positions"][:1]
+    assert [len(r["positions"]) for r in rows] == [3, 2]    # el bundle no se muta
+
+    assert lr._trim_ranking_rows(rows, None) == (rows, 3)
+    assert lr._trim_ranking_rows([], 2) == ([], 0)
@@ -0,0 +1,122 @@
+"""Cola durable de cargas: dedupe al encolar, lease, un job por upload y reintentos."""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+import types
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import upload_jobs as jobs
+from web_comparativas.models import Base, Upload, UploadJob, User
+
+
+@pytest.fixture()
+def factory(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[User.__table__, Upload.__table__, UploadJob.__table__])
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(jobs, "_Session", factory)
+    with factory() as s:
+        s.add_all([
+            Upload(id=1, proceso_nro="P-1", status="pending"),
+            Upload(id=2, proceso_nro="P-2", status="processing"),
+            Upload(id=3, proceso_nro="P-3", status="done", normalized_content=b"x"),
+        ])
+        s.commit()
+    return factory
+
+
+def _job(factory, job_id):
+    with factory() as s:
+        return s.get(UploadJob, job_id)
+
+
+def _fake_services(monkeypatch, comportamiento):
+    fake = types.SimpleNamespace(
+        classify_and_process=comportamiento,
+        db_session=types.SimpleNamespace(remove=lambda: None),
+    )
+    monkeypatch.setitem(sys.modules, "web_comparativas.services", fake)
+    monkeypatch.setattr(sys.modules["web_comparativas"], "services", fake, raising=False)
+
+
+def test_enqueue_reusa_el_job_en_cola(factory):
+    a = jobs.enqueue(1, {"platform": "x"})
+    assert jobs.enqueue(1, {}) == a
+    assert jobs.enqueue(2) != a
+    assert _job(factory, a).metadata_json == '{"platform": "x"}'
+
+
+def test_claim_toma_una_vez_y_respeta_un_job_por_upload(factory):
+    a = jobs.enqueue(1)
+    tomado = jobs.claim("w1")
+    assert tomado.id == a and tomado.attempts == 1
+    assert _job(factory, a).status == "running" and _job(factory, a).locked_by == "w1"
+
+    jobs.enqueue(1)                         # otro pedido del mismo upload mientras corre
+    assert jobs.claim("w2") is None
+
+    with factory() as s:                    # el worker murió: lease vencido
+        s.get(UploadJob, a).lease_until = dt.datetime.utcnow() - dt.timedelta(seconds=1)
+        s.commit()
+    retomado = jobs.claim("w2")
+    assert retomado.id == a and retomado.attempts == 2
+    assert not jobs._update_owned(a, "w1", progress="zombie")   # el viejo ya no puede escribir
+
+
+def test_excepcion_reintenta_con_backoff_y_luego_falla(factory, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_ATTEMPTS", 2)
+
+    def revienta(*a, **k):
+        raise OSError("disco")
+
+    _fake_services(monkeypatch, revienta)
+    job_id = jobs.enqueue(1)
+    assert jobs.run_job(jobs.claim("w"), "w") == "queued"
+    job = _job(factory, job_id)
+    assert job.progress == "retry" and job.available_at > dt.datetime.utcnow()
+    assert jobs.claim("w") is None          # backoff pendiente
+
+    with factory() as s:
+        s.get(UploadJob, job_id).available_at = dt.datetime.utcnow() - dt.timedelta(seconds=1)
+        s.commit()
+    assert jobs.run_job(jobs.claim("w"), "w") == "failed"
+    job = _job(factory, job_id)
+    assert job.attempts == 2 and "OSError" in job.last_error and job.finished_at is not None
+
+
+def test_error_del_pipeline_no_reintenta_y_ok_reporta_progreso(factory, monkeypatch):
+    _fake_services(monkeypatch, lambda *a, **k: {"error": "archivo inválido"})
+    fallido = jobs.enqueue(1)
+    assert jobs.run_job(jobs.claim("w"), "w") == "failed"
+    assert _job(factory, fallido).last_error == "archivo inválido"
+
+    etapas = []
+
+    def ok(upload_id, metadata, *, touch_status, progress):
+        progress("handler")
+        etapas.append(_job(factory, hecho).progress)
+        return {"summary": {}}
+
+    _fake_services(monkeypatch, ok)
+    hecho = jobs.enqueue(2)
+    assert jobs.run_job(jobs.claim("w"), "w") == "done"
+    assert etapas == ["handler"] and _job(factory, hecho).progress == "done"
+
+
+def test_recover_reencola_solo_las_trabadas(factory):
+    jobs.enqueue(1)
+    assert jobs.recover_stuck_uploads() == 1      # solo el 2: el 1 ya tiene job y el 3 terminó
+    with factory() as s:
+        assert sorted(j.upload_id for j in s.query(UploadJob)) == [1, 2]
+    assert jobs.recover_stuck_uploads() == 0
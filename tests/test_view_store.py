@@ -0,0 +1,133 @@
+"""Vistas y presets en saved_views: upsert, default en un UPDATE, caché por usuario y migración del JSON."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from web_comparativas import view_store as vs
+from web_comparativas.models import Base, SavedView, User
+
+
+@pytest.fixture()
+def factory(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[User.__table__, SavedView.__table__])
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(vs, "_Session", factory)
+    monkeypatch.setattr(vs, "_migrados", set())
+    vs.invalidar()
+    with factory() as s:
+        s.add_all([User(id=1, email="a@example.com", password_hash="x", role="analista"),
+                   User(id=2, email="b@example.com", password_hash="x", role="analista")])
+        s.commit()
+    yield factory
+    vs.invalidar()
+
+
+def _contar_sentencias(factory):
+    sentencias: list[str] = []
+    engine = factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cur, stmt, *a: sentencias.append(stmt.split()[0].upper()))
+    return sentencias
+
+
+def test_guardar_es_upsert_y_respeta_replace_existing(factory):
+    a = vs.guardar(1, "dashboard", "Compacta", {"density": "compacto"})
+    b = vs.guardar(1, "dashboard", "Compacta", {"density": "normal"})
+    assert a["id"] == b["id"] and b["payload"] == {"density": "normal"}
+    assert len(vs.listar(1, "dashboard")) == 1
+
+    with pytest.raises(ValueError, match="Ya existe"):
+        vs.guardar(1, "dashboard", "Compacta", {}, replace_existing=False)
+    assert vs.obtener(1, "dashboard", name="Compacta")["payload"] == {"density": "normal"}
+
+    vs.guardar(1, "dashboard", "Compacta", {"density": "x"}, is_default=True)
+    assert vs.guardar(1, "dashboard", "Compacta", {})["is_default"] is True   # no se desmarca por upsert
+
+
+def test_default_unico_en_un_solo_update(factory):
+    v1 = vs.guardar(1, "dashboard", "Uno", {}, is_default=True)
+    v2 = vs.guardar(1, "dashboard", "Dos", {}, is_default=True)
+    vs.guardar(2, "dashboard", "Otro usuario", {}, is_default=True)
+    assert vs.por_defecto(1, "dashboard")["id"] == v2["id"]
+    assert [v["is_default"] for v in vs.listar(1, "dashboard")] == [True, False]
+
+    sentencias = _contar_sentencias(factory)
+    assert vs.marcar_default(1, "dashboard", pk=v1["id"])["is_default"] is True
+    assert sentencias.count("UPDATE") == 1
+    assert vs.por_defecto(1, "dashboard")["id"] == v1["id"]
+    assert vs.por_defecto(2, "dashboard")["name"] == "Otro usuario"
+    assert vs.marcar_default(1, "dashboard", name="No existe") is None
+
+
+def test_cache_por_usuario_se_invalida_al_escribir(factory):
+    vs.guardar(1, "dashboard", "Uno", {})
+    sentencias = _contar_sentencias(factory)
+    vs.listar(1, "dashboard")
+    vs.por_defecto(1, "dashboard")
+    vs.obtener(1, "otra_vista", name="Uno")
+    assert sentencias.count("SELECT") == 1                 # una consulta por usuario
+
+    vs.listar(1, "dashboard")[0]["payload"]["x"] = 1        # devuelve copias
+    assert vs.listar(1, "dashboard")[0]["payload"] == {}
+
+    assert vs.eliminar(1, "dashboard", name="Uno") is True
+    assert vs.listar(1, "dashboard") == []
+    assert vs.eliminar(1, "dashboard", name="Uno") is False
+
+
+def test_presets_crear_actualizar_y_conflictos(factory):
+    p = vs.guardar_preset(1, "historial", "Pendientes", {"status": "pending"})
+    assert p["view"] == "historial" and len(p["id"]) == 36
+    igual = vs.guardar_preset(1, "historial", "Pendientes", {"status": "done"})
+    assert igual["id"] == p["id"] and igual["filters"] == {"status": "done"}
+
+    otro = vs.guardar_preset(1, "historial", "Otro", {})
+    with pytest.raises(ValueError):
+        vs.guardar_preset(1, "historial", "Pendientes", {}, preset_id=otro["id"])
+    with pytest.raises(LookupError):
+        vs.guardar_preset(1, "historial", "X", {}, preset_id="no-existe")
+
+    assert {x["name"] for x in vs.presets(1, "historial")} == {"Pendientes", "Otro"}
+    assert vs.presets(1, "dashboard") == [] and vs.listar(1, "historial") == []
+    assert vs.eliminar_preset(1, "historial", p["id"]) is True
+    assert vs.obtener_preset(1, "historial", p["id"]) is None
+
+
+def test_migra_json_una_vez_con_ids_originales(factory, tmp_path):
+    vs.guardar_preset(1, "historial", "Ya en la base", {})
+    viejo = [
+        {"id": "11111111-1111-1111-1111-111111111111", "view": "historial", "name": "Ya en la base",
+         "filters": {"q": "a"}, "created_at": "2025-01-02T03:04:05", "updated_at": "2025-01-02T03:04:05"},
+        {"id": "22222222-2222-2222-2222-222222222222", "view": "historial", "name": "Mes",
+         "filters": {"q": "b"}, "created_at": "2025-02-01T00:00:00", "updated_at": "2025-02-01T00:00:00"},
+        {"id": "33333333-3333-3333-3333-333333333333", "view": "historial", "name": "Mes",
+         "filters": {}, "created_at": "bogus", "updated_at": None},
+    ]
+    path = tmp_path / "1.json"
+    path.write_text(json.dumps(viejo), encoding="utf-8")
+
+    items = vs.presets(1, "historial", json_path=path)
+    assert {x["name"] for x in items} == {"Ya en la base", "Ya en la base (2)", "Mes", "Mes (2)"}
+    assert vs.obtener_preset(1, "historial", viejo[1]["id"])["filters"] == {"q": "b"}
+    assert vs.obtener_preset(1, "historial", viejo[1]["id"])["created_at"] == "2025-02-01T00:00:00"
+    assert not path.exists() and (tmp_path / "1.json.migrated").exists()
+
+    # otro proceso que todavía ve el archivo: no duplica
+    path.write_text(json.dumps(viejo), encoding="utf-8")
+    vs._migrados.clear()
+    assert vs.migrar_json(1, path) == 0
+    with factory() as s:
+        assert len(s.scalars(select(SavedView).where(SavedView.user_id == 1)).all()) == 4
@@ -0,0 +1,267 @@
+"""Registry de adapters compilado (registry.yml → reglas listas para despachar).
+
+`services._pick_handler` releía y parseaba registry.yml en cada clasificación,
+evaluaba los regex de cada fuente con `re` suelto y `classify_and_process`
+hacía `import_module` del handler cada vez. Ahora (oct-2026):
+  - el YAML se compila una vez a `CompiledRegistry` y se recarga solo si cambia
+    su mtime/tamaño (`get_registry`, un `stat` por llamada);
+  - los `filename_regex` distintos van en una sola expresión con un lookahead
+    opcional por patrón: un único `match` dice qué patrones cumple el archivo
+    (los patrones con referencias numeradas, `\\1` o `(?(1)...)`, quedan afuera: al
+    combinar cambia el número de sus grupos; se evalúan sueltos con su propio regex);
+  - el handler de cada regla se importa la primera vez que se usa y queda memoizado;
+  - `explain` (dry-run con tiempos por regla) y `benchmark` para medir el despacho.
+
+Semántica de `when` (la de services): `platform` comparado en mayúsculas,
+`filename_regex` con `re.match` sin distinguir mayúsculas; además se admiten
+`province`, `buyer_regex` (`re.search`) y `header_contains`, como en
+utils_registry. Sin regla que cumpla → la fuente `DEFAULT`.
+"""
+from __future__ import annotations
+
+import importlib
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import yaml
+
+DEFAULT_ID = "DEFAULT"
+
+# \1..\99 o condicional (?(1)...): apuntan a grupos por número y en la expresión
+# combinada ese número se corre (puede seguir compilando y matchear otra cosa)
+_REF_NUMERADA = re.compile(r"\\[1-9]|\(\?\(\d")
+
+
+@lru_cache(maxsize=None)
+def load_handler(spec: str) -> Callable:
+    """'paquete.modulo:funcion' → callable (import perezoso, una vez por spec)."""
+    mod, func = spec.split(":")
+    return getattr(importlib.import_module(mod), func)
+
+
+@dataclass
+class Rule:
+    id: Optional[str]
+    spec: str
+    platforms: Optional[frozenset] = None
+    provinces: Optional[frozenset] = None
+    filename_re: Optional[re.Pattern] = None
+    buyer_re: Optional[re.Pattern] = None
+    header_contains: tuple = ()
+    filename_slot: Optional[str] = None     # grupo del patrón en la expresión combinada
+
+    @property
+    def module(self) -> str:
+        return self.spec.split(":")[0]
+
+    @property
+    def func(self) -> str:
+        return self.spec.split(":")[1]
+
+    def handler(self) -> Callable:
+        return load_handler(self.spec)
+
+    def checks(self, meta: dict, filename_hits: Optional[set]) -> list[tuple[str, bool]]:
+        """(condición, cumple) en orden; corta en la primera que falla."""
+        out: list[tuple[str, bool]] = []
+
+        def _add(nombre: str, ok: bool) -> bool:
+            out.append((nombre, ok))
+            return ok
+
+        if self.platforms is not None:
+            if not _add("platform", (meta.get("platform") or "").upper() in self.platforms):
+                return out
+        if self.provinces is not None:
+            if not _add("province", meta.get("province") in self.provinces):
+                return out
+        if self.filename_re is not None:
+            if filename_hits is not None and self.filename_slot is not None:
+                ok = self.filename_slot in filename_hits
+            else:
+                ok = self.filename_re.match(meta.get("filename") or "") is not None
+            if not _add("filename_regex", ok):
+                return out
+        if self.buyer_re is not None:
+            if not _add("buyer_regex", self.buyer_re.search(meta.get("buyer") or "") is not None):
+                return out
+        if self.header_contains:
+            sample = " ".join(meta.get("header_sample") or []).lower()
+            _add("header_contains", all(h in sample for h in self.header_contains))
+        return out
+
+    def matches(self, meta: dict, filename_hits: Optional[set] = None) -> bool:
+        return all(ok for _, ok in self.checks(meta, filename_hits))
+
+
+@dataclass
+class CompiledRegistry:
+    rules: list[Rule]
+    default: Optional[Rule]
+    combined: Optional[re.Pattern] = None
+    source: Optional[str] = None
+    huella: Optional[str] = None
+    compiled_at: float = field(default_factory=time.time)
+
+    def filename_hits(self, filename: str) -> Optional[set]:
+        """Slots de `filename_regex` que cumple `filename`, en un solo match (None si no hay combinada)."""
+        if self.combined is None:
+            return None
+        m = self.combined.match(filename or "")
+        return {k for k, v in m.groupdict().items() if v is not None} if m else set()
+
+    def resolve(self, meta: dict) -> Rule:
+        hits = self.filename_hits(meta.get("filename") or "")
+        for rule in self.rules:
+            if rule.matches(meta, hits):
+                return rule
+        if self.default is not None:
+            return self.default
+        raise RuntimeError("No hay handler en registry.yml")
+
+    def explain(self, meta: dict) -> dict[str, Any]:
+        """Dry-run: qué condición cumplió o cortó cada regla y cuánto tardó (µs)."""
+        t0 = time.perf_counter()
+        hits = self.filename_hits(meta.get("filename") or "")
+        scan_us = (time.perf_counter() - t0) * 1e6
+        rules, elegida = [], None
+        for rule in self.rules:
+            t = time.perf_counter()
+            checks = rule.checks(meta, hits)
+            ok = all(c for _, c in checks)
+            rules.append({
+                "id": rule.id,
+                "handler": rule.spec,
+                "checks": [{"when": n, "ok": c} for n, c in checks],
+                "match": ok,
+                "us": round((time.perf_counter() - t) * 1e6, 2),
+            })
+            if ok and elegida is None:
+                elegida = rule
+        if elegida is None:
+            elegida = self.default
+        return {
+            "meta": meta,
+            "selected": elegida.id if elegida else None,
+            "handler": elegida.spec if elegida else None,
+            "fallback_default": bool(elegida is not None and elegida is self.default
+                                     and not any(r["match"] for r in rules)),
+            "combined_scan": self.combined is not None,
+            "filename_slots": sorted(hits) if hits is not None else None,
+            "scan_us": round(scan_us, 2),
+            "total_us": round((time.perf_counter() - t0) * 1e6, 2),
+            "rules": rules,
+            "registry": {"source": self.source, "huella": self.huella, "compiled_at": self.compiled_at},
+        }
+
+
+def _upper_set(vals: Any) -> Optional[frozenset]:
+    if not vals:
+        return None
+    if isinstance(vals, str):
+        vals = [vals]
+    return frozenset(str(v).upper() for v in vals)
+
+
+def compile_sources(sources: Iterable[dict], *, source: Optional[str] = None,
+                    huella: Optional[str] = None) -> CompiledRegistry:
+    """Lista `sources` del YAML → CompiledRegistry (orden de evaluación = orden del YAML)."""
+    rules: list[Rule] = []
+    default: Optional[Rule] = None
+    slots: dict[str, str] = {}                       # patrón → nombre de grupo
+    for src in sources or []:
+        w = src.get("when") or {}
+        provinces = w.get("province")
+        header = w.get("header_contains") or ()
+        rule = Rule(
+            id=src.get("id"),
+            spec=str(src["handler"]),
+            platforms=_upper_set(w.get("platform")),
+            provinces=frozenset([provinces] if isinstance(provinces, str) else provinces) if provinces else None,
+            filename_re=re.compile(w["filename_regex"], re.I) if w.get("filename_regex") else None,
+            buyer_re=re.compile(w["buyer_regex"], re.I) if w.get("buyer_regex") else None,
+            header_contains=tuple(str(h).lower() for h in ([header] if isinstance(header, str) else header)),
+        )
+        if rule.filename_re is not None and not _REF_NUMERADA.search(rule.filename_re.pattern):
+            rule.filename_slot = slots.setdefault(rule.filename_re.pattern, f"f{len(slots)}")
+        if rule.id == DEFAULT_ID:
+            default = default or rule
+        rules.append(rule)
+
+    combined = None
+    if slots:
+        try:
+            combined = re.compile(
+                "".join(f"(?:(?=(?P<{slot}>{pat})))?" for pat, slot in slots.items()), re.I
+            )
+        except re.error:                            # p.ej. el mismo (?P<nombre>) en dos patrones
+            combined = None
+            for rule in rules:
+                rule.filename_slot = None           # todos se evalúan sueltos
+    return CompiledRegistry(rules=rules, default=default, combined=combined, source=source, huella=huella)
+
+
+def _huella(path: Path) -> Optional[str]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def compile_file(path: Path) -> CompiledRegistry:
+    path = Path(path)
+    huella = _huella(path)
+    if huella is None:
+        return compile_sources([], source=str(path))
+    data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    return compile_sources(data.get("sources", []), source=str(path), huella=huella)
+
+
+_cache: dict[str, CompiledRegistry] = {}
+_lock = threading.Lock()
+
+
+def get_registry(path: Path) -> CompiledRegistry:
+    """Registry compilado de `path`; se recompila si el archivo cambió (mtime/tamaño)."""
+    key = str(path)
+    reg = _cache.get(key)
+    huella = _huella(Path(path))
+    if reg is not None and reg.huella == huella:
+        return reg
+    with _lock:
+        reg = _cache.get(key)
+        if reg is None or reg.huella != huella:
+            reg = compile_file(Path(path))
+            _cache[key] = reg
+        return reg
+
+
+def benchmark(reg: CompiledRegistry, metas: list[dict], repeat: int = 1000) -> dict[str, Any]:
+    """Micro-benchmark de `resolve` sobre `metas` (µs por clasificación)."""
+    metas = list(metas) or [{}]
+    repeat = max(1, int(repeat))
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for meta in metas:
+            reg.resolve(meta)
+    total = time.perf_counter() - t0
+    n = repeat * len(metas)
+    return {"calls": n, "total_ms": round(total * 1e3, 3), "per_call_us": round(total / n * 1e6, 3)}
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    _reg = compile_file(Path(__file__).resolve().parent / "registry.yml")
+    _metas = [{"filename": f, "platform": p} for f, p in (
+        ("informe.pdf", ""), ("comparativa.xlsx", "BAC"), ("planilla.xls", "COMPRAR"),
+        ("lote.zip", "LA_PAMPA"), ("otro.csv", ""),
+    )]
+    print(json.dumps(benchmark(_reg, _metas, int(sys.argv[1]) if len(sys.argv) > 1 else 10000), indent=2))
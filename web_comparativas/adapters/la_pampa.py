@@ -32,6 +32,8 @@ from decimal import Decimal, ROUND_HALF_UP
 import pandas as pd
 import numpy as np
 
+from web_comparativas.adapters import pdf_executor
+
 # ======================= Columnas estándar =======================
 STANDARD_COLUMNS = [
     "Proveedor",
@@ -320,6 +322,129 @@ def _tag_expediente(expediente: str) -> str:
     return f"{num}-{year:02d}"
 
 # ======================= Lectores (PDF) =======================
+def _pliego_regs_pagina(page) -> List[Dict[str, Any]]:
+    """Registros (ITEM/CGO/CANTIDAD/DESCRIPCION/UNIDAD) de UNA página del pliego.
+
+    Cada página se parsea sola (anclas de columnas propias, la última fila se
+    cierra al final de la página): por eso se puede repartir entre procesos.
+    """
+    regs: List[Dict[str, Any]] = []
+
+    words = page.extract_words(use_text_flow=True, keep_blank_chars=False) or []
+    if not words:
+        return regs
+
+    x_item, x_cgo, x_qty, x_unit, x_desc = _detect_column_anchors(words)
+    cuts = _build_cuts_from_anchors(x_item, x_cgo, x_qty, x_unit, x_desc)
+
+    y_tol = 1.8
+    def ybin(y): return round(y / y_tol) * y_tol
+    line_map: Dict[float, List[dict]] = {}
+    for w in words:
+        line_map.setdefault(ybin(w["top"]), []).append(w)
+
+    last_row: Optional[Dict[str, Any]] = None
+    expect_unit_lines = 0
+
+    for y in sorted(line_map.keys()):
+        ws = sorted(line_map[y], key=lambda w: w["x0"])
+        band_words = {0: [], 1: [], 2: [], 3: [], 4: []}
+        for w in ws:
+            band_words[_assign_band(w["x0"], cuts)].append(w)
+
+        def join_text(idx):
+            return _normalize_spaces(" ".join(t["text"] for t in band_words[idx]).strip()) if band_words[idx] else None
+
+        cgo_txt  = join_text(1)
+        qty_txt0 = join_text(2)
+        unit_from_b3, desc_prefix_b3 = _extract_unit_and_b3desc(band_words[3])
+        desc_txt_b4 = join_text(4)
+
+        if cgo_txt and FOOTER_NOISE_RE.search(cgo_txt): cgo_txt = None
+        if qty_txt0 and FOOTER_NOISE_RE.search(qty_txt0): qty_txt0 = None
+        if desc_txt_b4 and FOOTER_NOISE_RE.search(desc_txt_b4): desc_txt_b4 = None
+
+        nums_on_line = [w for w in ws if NUM_EU_RE.fullmatch(w["text"]) or re.fullmatch(r"\d{1,6}", w["text"])]
+        nums_on_line.sort(key=lambda t: t["x0"])
+
+        is_item_line = any(re.fullmatch(r"\d{1,6}", w["text"]) and abs(w["x0"] - x_item) <= 20 for w in nums_on_line)
+        if is_item_line:
+            if last_row:
+                regs.append(last_row); last_row = None; expect_unit_lines = 0
+
+            item_candidates = [w for w in nums_on_line if re.fullmatch(r"\d{1,6}", w["text"]) and abs(w["x0"] - x_item) <= 20]
+            if not item_candidates:
+                continue
+            item_val = int(item_candidates[0]["text"])
+
+            cgo_val = None
+            if len(nums_on_line) >= 2:
+                cgo_val = nums_on_line[1]["text"]
+            if cgo_val is not None and not (NUM_EU_RE.fullmatch(cgo_val) or re.fullmatch(r"\d{1,6}", cgo_val)):
+                cgo_val = None
+            if cgo_val is None:
+                near_cgo = [w for w in nums_on_line if abs(w["x0"] - x_cgo) <= 20]
+                if near_cgo:
+                    cgo_val = near_cgo[0]["text"]
+            cgo_val = _normalize_spaces(cgo_val)
+
+            qty_val = None
+            if len(nums_on_line) >= 3:
+                qty_val = _parse_number_cell(nums_on_line[2]["text"], decimals=2, for_quantity=True)
+            if qty_val is None:
+                qty_txt = qty_txt0 if (qty_txt0 and NUM_EU_RE.fullmatch(qty_txt0)) else _pick_qty_from_words(ws, x_qty, x_unit)
+                qty_val = _parse_number_cell(qty_txt, decimals=2, for_quantity=True)
+
+            desc_line = " ".join([t for t in [desc_prefix_b3, desc_txt_b4] if t])
+            desc_clean, unit_from_desc = _split_desc_and_unit_from_text(desc_line or "")
+
+            unidad_val = unit_from_b3 or (_canonical_unidad(unit_from_desc) if unit_from_desc else None)
+            if (desc_line and "$" in desc_line) and not unidad_val:
+                expect_unit_lines = 3
+
+            last_row = {
+                "ITEM": item_val,
+                "CGO": cgo_val,
+                "CANTIDAD": qty_val,
+                "DESCRIPCION": desc_clean,
+                "UNIDAD": unidad_val
+            }
+            continue
+
+        if last_row:
+            if (not last_row.get("UNIDAD")) and unit_from_b3:
+                last_row["UNIDAD"] = unit_from_b3
+
+            if desc_prefix_b3 or desc_txt_b4:
+                prev = last_row.get("DESCRIPCION") or ""
+                joined_desc = _normalize_spaces((" ".join([prev, desc_prefix_b3 or "", desc_txt_b4 or ""])).strip())
+                d2, u2 = _split_desc_and_unit_from_text(joined_desc)
+                last_row["DESCRIPCION"] = d2
+                if (not last_row.get("UNIDAD")) and u2:
+                    last_row["UNIDAD"] = _canonical_unidad(u2)
+                if (desc_prefix_b3 and "$" in desc_prefix_b3) or (desc_txt_b4 and "$" in desc_txt_b4):
+                    if not last_row.get("UNIDAD"):
+                        expect_unit_lines = max(expect_unit_lines, 3)
+
+            if last_row.get("CANTIDAD") is None:
+                qty_txt = qty_txt0 if (qty_txt0 and NUM_EU_RE.fullmatch(qty_txt0)) else _pick_qty_from_words(ws, x_qty, x_unit)
+                q2 = _parse_number_cell(qty_txt, decimals=2, for_quantity=True)
+                if q2 is not None:
+                    last_row["CANTIDAD"] = q2
+
+            if expect_unit_lines > 0 and not last_row.get("UNIDAD"):
+                line_text_all = _normalize_spaces(" ".join(t["text"] for t in ws))
+                cand2 = _canonical_unidad(line_text_all or "")
+                if cand2:
+                    last_row["UNIDAD"] = cand2
+                expect_unit_lines -= 1
+
+    if last_row:
+        regs.append(last_row)
+
+    return regs
+
+
 def leer_pliego_pdf(path_pdf: str) -> pd.DataFrame:
     """
     Tu parser original (sin cambios de lógica):
@@ -327,127 +452,12 @@ def leer_pliego_pdf(path_pdf: str) -> pd.DataFrame:
       - UNIDAD banda 3 + prefijo de descripción
       - soporte $$ con lookahead
     """
-    try:
-        import pdfplumber
-    except Exception:
-        raise RuntimeError("Instalá 'pdfplumber' para leer pliegos PDF.")
-
-    regs: List[Dict[str, Any]] = []
-
-    with pdfplumber.open(path_pdf) as pdf:
-        for page in pdf.pages:
-            words = page.extract_words(use_text_flow=True, keep_blank_chars=False) or []
-            if not words:
-                continue
+    paginas = pdf_executor.parsear_paginas(path_pdf, _pliego_regs_pagina)
+    return _pliego_desde_regs([r for regs in paginas for r in regs])
 
-            x_item, x_cgo, x_qty, x_unit, x_desc = _detect_column_anchors(words)
-            cuts = _build_cuts_from_anchors(x_item, x_cgo, x_qty, x_unit, x_desc)
-
-            y_tol = 1.8
-            def ybin(y): return round(y / y_tol) * y_tol
-            line_map: Dict[float, List[dict]] = {}
-            for w in words:
-                line_map.setdefault(ybin(w["top"]), []).append(w)
-
-            last_row: Optional[Dict[str, Any]] = None
-            expect_unit_lines = 0
-
-            for y in sorted(line_map.keys()):
-                ws = sorted(line_map[y], key=lambda w: w["x0"])
-                band_words = {0: [], 1: [], 2: [], 3: [], 4: []}
-                for w in ws:
-                    band_words[_assign_band(w["x0"], cuts)].append(w)
-
-                def join_text(idx):
-                    return _normalize_spaces(" ".join(t["text"] for t in band_words[idx]).strip()) if band_words[idx] else None
-
-                cgo_txt  = join_text(1)
-                qty_txt0 = join_text(2)
-                unit_from_b3, desc_prefix_b3 = _extract_unit_and_b3desc(band_words[3])
-                desc_txt_b4 = join_text(4)
-
-                if cgo_txt and FOOTER_NOISE_RE.search(cgo_txt): cgo_txt = None
-                if qty_txt0 and FOOTER_NOISE_RE.search(qty_txt0): qty_txt0 = None
-                if desc_txt_b4 and FOOTER_NOISE_RE.search(desc_txt_b4): desc_txt_b4 = None
-
-                nums_on_line = [w for w in ws if NUM_EU_RE.fullmatch(w["text"]) or re.fullmatch(r"\d{1,6}", w["text"])]
-                nums_on_line.sort(key=lambda t: t["x0"])
-
-                is_item_line = any(re.fullmatch(r"\d{1,6}", w["text"]) and abs(w["x0"] - x_item) <= 20 for w in nums_on_line)
-                if is_item_line:
-                    if last_row:
-                        regs.append(last_row); last_row = None; expect_unit_lines = 0
-
-                    item_candidates = [w for w in nums_on_line if re.fullmatch(r"\d{1,6}", w["text"]) and abs(w["x0"] - x_item) <= 20]
-                    if not item_candidates:
-                        continue
-                    item_val = int(item_candidates[0]["text"])
-
-                    cgo_val = None
-                    if len(nums_on_line) >= 2:
-                        cgo_val = nums_on_line[1]["text"]
-                    if cgo_val is not None and not (NUM_EU_RE.fullmatch(cgo_val) or re.fullmatch(r"\d{1,6}", cgo_val)):
-                        cgo_val = None
-                    if cgo_val is None:
-                        near_cgo = [w for w in nums_on_line if abs(w["x0"] - x_cgo) <= 20]
-                        if near_cgo:
-                            cgo_val = near_cgo[0]["text"]
-                    cgo_val = _normalize_spaces(cgo_val)
-
-                    qty_val = None
-                    if len(nums_on_line) >= 3:
-                        qty_val = _parse_number_cell(nums_on_line[2]["text"], decimals=2, for_quantity=True)
-                    if qty_val is None:
-                        qty_txt = qty_txt0 if (qty_txt0 and NUM_EU_RE.fullmatch(qty_txt0)) else _pick_qty_from_words(ws, x_qty, x_unit)
-                        qty_val = _parse_number_cell(qty_txt, decimals=2, for_quantity=True)
-
-                    desc_line = " ".join([t for t in [desc_prefix_b3, desc_txt_b4] if t])
-                    desc_clean, unit_from_desc = _split_desc_and_unit_from_text(desc_line or "")
-
-                    unidad_val = unit_from_b3 or (_canonical_unidad(unit_from_desc) if unit_from_desc else None)
-                    if (desc_line and "$" in desc_line) and not unidad_val:
-                        expect_unit_lines = 3
-
-                    last_row = {
-                        "ITEM": item_val,
-                        "CGO": cgo_val,
-                        "CANTIDAD": qty_val,
-                        "DESCRIPCION": desc_clean,
-                        "UNIDAD": unidad_val
-                    }
-                    continue
-
-                if last_row:
-                    if (not last_row.get("UNIDAD")) and unit_from_b3:
-                        last_row["UNIDAD"] = unit_from_b3
-
-                    if desc_prefix_b3 or desc_txt_b4:
-                        prev = last_row.get("DESCRIPCION") or ""
-                        joined_desc = _normalize_spaces((" ".join([prev, desc_prefix_b3 or "", desc_txt_b4 or ""])).strip())
-                        d2, u2 = _split_desc_and_unit_from_text(joined_desc)
-                        last_row["DESCRIPCION"] = d2
-                        if (not last_row.get("UNIDAD")) and u2:
-                            last_row["UNIDAD"] = _canonical_unidad(u2)
-                        if (desc_prefix_b3 and "$" in desc_prefix_b3) or (desc_txt_b4 and "$" in desc_txt_b4):
-                            if not last_row.get("UNIDAD"):
-                                expect_unit_lines = max(expect_unit_lines, 3)
-
-                    if last_row.get("CANTIDAD") is None:
-                        qty_txt = qty_txt0 if (qty_txt0 and NUM_EU_RE.fullmatch(qty_txt0)) else _pick_qty_from_words(ws, x_qty, x_unit)
-                        q2 = _parse_number_cell(qty_txt, decimals=2, for_quantity=True)
-                        if q2 is not None:
-                            last_row["CANTIDAD"] = q2
-
-                    if expect_unit_lines > 0 and not last_row.get("UNIDAD"):
-                        line_text_all = _normalize_spaces(" ".join(t["text"] for t in ws))
-                        cand2 = _canonical_unidad(line_text_all or "")
-                        if cand2:
-                            last_row["UNIDAD"] = cand2
-                        expect_unit_lines -= 1
-
-            if last_row:
-                regs.append(last_row); last_row = None
 
+def _pliego_desde_regs(regs: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Consolida los registros de todas las páginas (en orden) por ITEM."""
     df = pd.DataFrame(regs)
     if df.empty:
         return pd.DataFrame(columns=["ITEM", "CGO", "CANTIDAD", "DESCRIPCION", "UNIDAD"])
@@ -486,170 +496,175 @@ def leer_pliego_pdf(path_pdf: str) -> pd.DataFrame:
 
     return out[["ITEM", "CGO", "CANTIDAD", "DESCRIPCION", "UNIDAD"]]
 
-def leer_comparativa_pdf(path_pdf: str) -> pd.DataFrame:
-    """
-    Tu parser original robusto (sin cambios de lógica):
-      - Columnas SOLO si token incluye 'Alt'
-      - Proveedor a la izquierda
-      - PU alineado por columna
-      - ignora TOTAL/PROMEDIO/PROVEEDOR
-    """
-    try:
-        import pdfplumber
-    except Exception:
-        raise RuntimeError("Instalá 'pdfplumber' para leer comparativas PDF.")
+_COMP_NUM_RE = re.compile(r"^\d{1,3}(?:\.\d{3})*(?:,\d+)?$")
+
+def _parse_item_alt_token_strict(txt: str) -> Tuple[Optional[int], Optional[int]]:
+    if not txt:
+        return (None, None)
+    s = str(txt).strip()
+    m = re.search(r"(\d+)\s*(?:-\s*\d+)?\s*-\s*Alt\.?\s*(\d+)", s, flags=re.IGNORECASE)
+    if m:
+        return (int(m.group(1)), int(m.group(2)))
+    m2 = re.search(r"(\d+)\s+Alt\.?\s*(\d+)", s, flags=re.IGNORECASE)
+    if m2:
+        return (int(m2.group(1)), int(m2.group(2)))
+    return (None, None)
 
+def _comparativa_regs_pagina(page) -> List[Dict[str, Any]]:
+    """Precios (PROVEEDOR/ITEM/Alt/PU/ItemCode) de UNA página de la comparativa."""
     registros: List[Dict[str, Any]] = []
-    num_pat = re.compile(r"^\d{1,3}(?:\.\d{3})*(?:,\d+)?$")
 
-    def _parse_item_alt_token_strict(txt: str) -> Tuple[Optional[int], Optional[int]]:
-        if not txt:
-            return (None, None)
-        s = str(txt).strip()
-        m = re.search(r"(\d+)\s*(?:-\s*\d+)?\s*-\s*Alt\.?\s*(\d+)", s, flags=re.IGNORECASE)
-        if m:
-            return (int(m.group(1)), int(m.group(2)))
-        m2 = re.search(r"(\d+)\s+Alt\.?\s*(\d+)", s, flags=re.IGNORECASE)
-        if m2:
-            return (int(m2.group(1)), int(m2.group(2)))
-        return (None, None)
+    words = page.extract_words(use_text_flow=True, keep_blank_chars=False)
+    if not words:
+        return registros
+
+    code_words = []
+    for w in words:
+        it, al = _parse_item_alt_token_strict(w["text"])
+        if it is not None:
+            code_words.append(w)
+
+    if not code_words:
+        return registros
+
+    xs = sorted([w["x0"] for w in code_words])
+    cols_x = []
+    cluster = [xs[0]]
+    for x in xs[1:]:
+        if abs(x - float(np.mean(cluster))) <= 12:
+            cluster.append(x)
+        else:
+            cols_x.append(float(np.mean(cluster)))
+            cluster = [x]
+    cols_x.append(float(np.mean(cluster)))
+    code_cols = sorted(set(cols_x))
 
-    with pdfplumber.open(path_pdf) as pdf:
-        for page in pdf.pages:
-            words = page.extract_words(use_text_flow=True, keep_blank_chars=False)
-            if not words:
-                continue
+    colcodes: Dict[int, Tuple[int, int, str]] = {}
+    for w in code_words:
+        idx = int(np.argmin([abs(w["x0"] - cx) for cx in code_cols]))
+        it, al = _parse_item_alt_token_strict(w["text"])
+        if it is not None and idx not in colcodes:
+            colcodes[idx] = (int(it), int(al), w["text"])
+
+    if not colcodes:
+        return registros
 
-            code_words = []
-            for w in words:
-                it, al = _parse_item_alt_token_strict(w["text"])
-                if it is not None:
-                    code_words.append(w)
+    min_code_x = min(code_cols)
+    x_thresh = min_code_x - 12.0
+    x_left_limit = x_thresh + 25.0
 
-            if not code_words:
+    y_tol = 1.8
+    def ybin(y): return round(y / y_tol) * y_tol
+
+    line_map: Dict[float, Dict[str, List[dict]]] = {}
+    for w in words:
+        y = ybin(w["top"])
+        obj = line_map.setdefault(y, {"left": [], "nums": [], "all": []})
+        obj["all"].append(w)
+
+        if w["x0"] < x_left_limit:
+            obj["left"].append(w)
+
+        if _COMP_NUM_RE.fullmatch(w["text"]) and (w["x0"] >= (min_code_x - 5)):
+            obj["nums"].append(w)
+
+    ys = sorted(line_map.keys())
+
+    def _join_provider(ws: List[dict]) -> Optional[str]:
+        if not ws:
+            return None
+        ws_sorted = sorted(ws, key=lambda t: t["x0"])
+        has_letters = any(re.search(r"[A-Za-zÁÉÍÓÚÑ]", t["text"]) for t in ws_sorted)
+
+        keep = []
+        for t in ws_sorted:
+            tx = str(t["text"]).strip()
+            if not tx:
+                continue
+            if re.search(r"[A-Za-zÁÉÍÓÚÑ]", tx):
+                keep.append(tx)
+                continue
+            if has_letters and re.fullmatch(r"\d{1,3}", tx):
+                keep.append(tx)
                 continue
 
-            xs = sorted([w["x0"] for w in code_words])
-            cols_x = []
-            cluster = [xs[0]]
-            for x in xs[1:]:
-                if abs(x - float(np.mean(cluster))) <= 12:
-                    cluster.append(x)
-                else:
-                    cols_x.append(float(np.mean(cluster)))
-                    cluster = [x]
-            cols_x.append(float(np.mean(cluster)))
-            code_cols = sorted(set(cols_x))
+        return _normalize_spaces(" ".join(keep))
+
+    def _get_provider(i: int) -> Optional[str]:
+        if line_map[ys[i]]["left"]:
+            p = _join_provider(line_map[ys[i]]["left"])
+            if p:
+                return p
+
+        for k in range(1, 6):
+            j = i - k
+            if j < 0:
+                break
+            if ys[i] - ys[j] > 60:
+                break
+            if line_map[ys[j]]["left"]:
+                p = _join_provider(line_map[ys[j]]["left"])
+                if p:
+                    return p
+
+        if i + 1 < len(ys) and (ys[i + 1] - ys[i] <= 24.0) and line_map[ys[i + 1]]["left"]:
+            p = _join_provider(line_map[ys[i + 1]]["left"])
+            if p:
+                return p
+
+        return None
+
+    for ii, y in enumerate(ys):
+        row = line_map[y]
+        if not row["nums"]:
+            continue
+
+        prov = _get_provider(ii)
+        if not prov:
+            continue
+
+        up = prov.upper()
+        if up.startswith("TOTAL") or up.startswith("PROMEDIO") or up.startswith("PROVEEDOR"):
+            continue
+
+        for numw in sorted(row["nums"], key=lambda t: t["x0"]):
+            idx = int(np.argmin([abs(numw["x0"] - cx) for cx in code_cols]))
+            if idx not in colcodes:
+                continue
 
-            colcodes: Dict[int, Tuple[int, int, str]] = {}
-            for w in code_words:
-                idx = int(np.argmin([abs(w["x0"] - cx) for cx in code_cols]))
-                it, al = _parse_item_alt_token_strict(w["text"])
-                if it is not None and idx not in colcodes:
-                    colcodes[idx] = (int(it), int(al), w["text"])
+            if abs(numw["x0"] - code_cols[idx]) > 35:
+                continue
 
-            if not colcodes:
+            item, alt, rawtxt = colcodes[idx]
+            pu = _parse_number_cell(numw["text"])
+            if pu is None:
                 continue
 
-            min_code_x = min(code_cols)
-            x_thresh = min_code_x - 12.0
-            x_left_limit = x_thresh + 25.0
-
-            y_tol = 1.8
-            def ybin(y): return round(y / y_tol) * y_tol
-
-            line_map: Dict[float, Dict[str, List[dict]]] = {}
-            for w in words:
-                y = ybin(w["top"])
-                obj = line_map.setdefault(y, {"left": [], "nums": [], "all": []})
-                obj["all"].append(w)
-
-                if w["x0"] < x_left_limit:
-                    obj["left"].append(w)
-
-                if num_pat.fullmatch(w["text"]) and (w["x0"] >= (min_code_x - 5)):
-                    obj["nums"].append(w)
-
-            ys = sorted(line_map.keys())
-
-            def _join_provider(ws: List[dict]) -> Optional[str]:
-                if not ws:
-                    return None
-                ws_sorted = sorted(ws, key=lambda t: t["x0"])
-                has_letters = any(re.search(r"[A-Za-zÁÉÍÓÚÑ]", t["text"]) for t in ws_sorted)
-
-                keep = []
-                for t in ws_sorted:
-                    tx = str(t["text"]).strip()
-                    if not tx:
-                        continue
-                    if re.search(r"[A-Za-zÁÉÍÓÚÑ]", tx):
-                        keep.append(tx)
-                        continue
-                    if has_letters and re.fullmatch(r"\d{1,3}", tx):
-                        keep.append(tx)
-                        continue
-
-                return _normalize_spaces(" ".join(keep))
-
-            def _get_provider(i: int) -> Optional[str]:
-                if line_map[ys[i]]["left"]:
-                    p = _join_provider(line_map[ys[i]]["left"])
-                    if p:
-                        return p
-
-                for k in range(1, 6):
-                    j = i - k
-                    if j < 0:
-                        break
-                    if ys[i] - ys[j] > 60:
-                        break
-                    if line_map[ys[j]]["left"]:
-                        p = _join_provider(line_map[ys[j]]["left"])
-                        if p:
-                            return p
-
-                if i + 1 < len(ys) and (ys[i + 1] - ys[i] <= 24.0) and line_map[ys[i + 1]]["left"]:
-                    p = _join_provider(line_map[ys[i + 1]]["left"])
-                    if p:
-                        return p
-
-                return None
-
-            for ii, y in enumerate(ys):
-                row = line_map[y]
-                if not row["nums"]:
-                    continue
-
-                prov = _get_provider(ii)
-                if not prov:
-                    continue
-
-                up = prov.upper()
-                if up.startswith("TOTAL") or up.startswith("PROMEDIO") or up.startswith("PROVEEDOR"):
-                    continue
-
-                for numw in sorted(row["nums"], key=lambda t: t["x0"]):
-                    idx = int(np.argmin([abs(numw["x0"] - cx) for cx in code_cols]))
-                    if idx not in colcodes:
-                        continue
-
-                    if abs(numw["x0"] - code_cols[idx]) > 35:
-                        continue
-
-                    item, alt, rawtxt = colcodes[idx]
-                    pu = _parse_number_cell(numw["text"])
-                    if pu is None:
-                        continue
-
-                    registros.append({
-                        "PROVEEDOR": prov.strip(),
-                        "ITEM": int(item),
-                        "Alt": int(alt),
-                        "PU": float(pu),
-                        "ItemCode": rawtxt or f"{item}-0-Alt.{alt}",
-                    })
+            registros.append({
+                "PROVEEDOR": prov.strip(),
+                "ITEM": int(item),
+                "Alt": int(alt),
+                "PU": float(pu),
+                "ItemCode": rawtxt or f"{item}-0-Alt.{alt}",
+            })
+
+    return registros
+
 
+def leer_comparativa_pdf(path_pdf: str) -> pd.DataFrame:
+    """
+    Tu parser original robusto (sin cambios de lógica):
+      - Columnas SOLO si token incluye 'Alt'
+      - Proveedor a la izquierda
+      - PU alineado por columna
+      - ignora TOTAL/PROMEDIO/PROVEEDOR
+    """
+    paginas = pdf_executor.parsear_paginas(path_pdf, _comparativa_regs_pagina)
+    return _comparativa_desde_regs([r for regs in paginas for r in regs])
+
+
+def _comparativa_desde_regs(registros: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Registros de todas las páginas (en orden) → DataFrame de precios."""
     cols = ["PROVEEDOR", "ITEM", "Alt", "PU", "ItemCode"]
     return pd.DataFrame(registros, columns=cols) if registros else pd.DataFrame(columns=cols)
 
@@ -814,9 +829,22 @@ def normalize_la_pampa(input_path: Path, metadata: Dict[str, Any], out_dir: Path
     master_rows: List[pd.DataFrame] = []
     por_tag: Dict[str, pd.DataFrame] = {}
 
+    # Todos los PDFs de las parejas se parsean juntos, repartidos en procesos
+    # (pdf_executor); un pliego compartido por varias comparativas se parsea una vez.
+    pliegos_usados = list(dict.fromkeys(plg for _, plg, _, _ in pairs))
+    comps_usadas = list(dict.fromkeys(comp for comp, _, _, _ in pairs))
+    paginas = pdf_executor.parsear_documentos(
+        [(plg, _pliego_regs_pagina) for plg in pliegos_usados]
+        + [(comp, _comparativa_regs_pagina) for comp in comps_usadas]
+    )
+    regs_por_pdf = {
+        path: [r for regs in pags for r in regs]
+        for path, pags in zip(pliegos_usados + comps_usadas, paginas)
+    }
+
     for comp, pliego_file, tag_name, expediente in pairs:
-        df_pl   = leer_pliego_pdf(pliego_file)
-        df_comp = leer_comparativa_pdf(comp)
+        df_pl   = _pliego_desde_regs(regs_por_pdf[pliego_file])
+        df_comp = _comparativa_desde_regs(regs_por_pdf[comp])
 
         # robustez merge: ITEM como int
         for d in (df_pl, df_comp):
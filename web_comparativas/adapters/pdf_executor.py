@@ -0,0 +1,333 @@
+"""Parseo de PDFs repartido en procesos (La Pampa y pliegos del TenderProcessor).
+
+`la_pampa.leer_pliego_pdf` / `leer_comparativa_pdf` recorrían las páginas con
+pdfplumber (extract_words + y-bin) en un solo hilo y `normalize_la_pampa`
+procesaba un PDF por vez: un ZIP con 40 pliegos tardaba la suma de todos.
+pdfplumber es Python puro, así que hilos no ayudan. Ahora (oct-2026):
+  - `parsear_documentos` recibe (pdf, parser_de_pagina) y reparte el trabajo en un
+    ProcessPoolExecutor: una tarea por PDF, o por rango de páginas si el PDF es
+    grande (`PAGINAS_POR_TAREA`);
+  - el resultado de cada documento es la lista de resultados por página, en orden
+    de página: el merge es determinístico sin importar qué proceso terminó antes;
+  - caché por página en memoria, con clave (sha256 del archivo, parser, página): los
+    reintentos del mismo ZIP y los pliegos compartidos por varias comparativas no se
+    vuelven a parsear. Vive en el proceso web (fuera del techo de los workers), así
+    que se acota por tamaño aproximado (`WC_PDF_CACHE_MB`, pickle de cada resultado)
+    y la huella memoizada de un archivo se olvida junto con su última página;
+  - techo de memoria configurable (`WC_PDF_MEM_MB`): limita la cantidad de procesos
+    (`MB_POR_WORKER` c/u), los procesos se reciclan cada `TAREAS_POR_WORKER` tareas y,
+    si un proceso reporta un pico mayor a su parte, baja la cantidad de tareas en
+    vuelo;
+  - `workers <= 1` (o una sola tarea) parsea en el mismo proceso, como antes.
+
+Los parsers de página tienen que ser funciones de módulo (se mandan por pickle al
+proceso hijo) y devolver datos simples. Los hijos se crean con `spawn`: el proceso
+web tiene hilos (job queue, mantenimiento) y hacer fork con hilos vivos no es seguro.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+logger = logging.getLogger("wc.pdf_executor")
+
+MEMORIA_MB = int(os.getenv("WC_PDF_MEM_MB", "512"))
+MB_POR_WORKER = int(os.getenv("WC_PDF_MB_POR_WORKER", "160"))
+PAGINAS_POR_TAREA = int(os.getenv("WC_PDF_PAGINAS_POR_TAREA", "20"))
+TAREAS_POR_WORKER = int(os.getenv("WC_PDF_TAREAS_POR_WORKER", "8"))
+CACHE_MB = int(os.getenv("WC_PDF_CACHE_MB", "64"))
+
+ParserPagina = Callable[[Any], Any]
+_FALTA = object()                                # página todavía sin parsear
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Apertura de documentos (reemplazable en tests)
+# ──────────────────────────────────────────────────────────────────────────────
+
+@contextmanager
+def abrir_pdfplumber(path: str) -> Iterator[Any]:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        yield pdf
+
+
+def _cerrar_pagina(page: Any) -> None:
+    # pdfplumber >= 0.10: suelta el caché de objetos de la página ya procesada
+    cerrar = getattr(page, "close", None)
+    if callable(cerrar):
+        try:
+            cerrar()
+        except Exception:
+            pass
+
+
+def _pico_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:                              # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0   # Linux: KB
+
+
+def _procesar_rango(parser: ParserPagina, path: str, desde: int, hasta: int,
+                    abrir: Callable = abrir_pdfplumber) -> tuple[list, Optional[float]]:
+    """Corre en el proceso hijo: resultados de `parser` para las páginas [desde, hasta) + pico RSS."""
+    out = []
+    with abrir(path) as pdf:
+        for i in range(desde, hasta):
+            page = pdf.pages[i]
+            out.append(parser(page))
+            _cerrar_pagina(page)
+    return out, _pico_rss_mb()
+
+
+def _contar_paginas(path: str, abrir: Callable = abrir_pdfplumber) -> int:
+    with abrir(path) as pdf:
+        return len(pdf.pages)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Huella de archivo + caché por página
+# ──────────────────────────────────────────────────────────────────────────────
+
+_huellas: dict[tuple[str, int, int], str] = {}
+_rutas_por_huella: dict[str, set[tuple[str, int, int]]] = {}
+_paginas_por_huella: dict[str, int] = {}
+_cache: "OrderedDict[tuple[str, str, int], tuple[Any, int]]" = OrderedDict()   # clave → (valor, bytes)
+_cacheadas_por_huella: dict[str, int] = {}
+_bytes_cache = 0
+_lock = threading.Lock()
+
+
+def huella_archivo(path: str | Path) -> str:
+    """sha256 del contenido (memoizado por ruta + mtime + tamaño)."""
+    st = os.stat(path)
+    clave = (str(path), st.st_mtime_ns, st.st_size)
+    h = _huellas.get(clave)
+    if h is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                sha.update(bloque)
+        h = sha.hexdigest()
+        with _lock:
+            _huellas[clave] = h
+            _rutas_por_huella.setdefault(h, set()).add(clave)
+    return h
+
+
+def _olvidar_huella(huella: str) -> None:
+    """Suelta lo memoizado del archivo (rutas → huella, cantidad de páginas). Con `_lock` tomado."""
+    for clave in _rutas_por_huella.pop(huella, ()):
+        _huellas.pop(clave, None)
+    _paginas_por_huella.pop(huella, None)
+
+
+def _tamano(valor: Any) -> int:
+    """Bytes aproximados de un resultado de página (lo que ocupa serializado)."""
+    try:
+        return len(pickle.dumps(valor, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1 << 20
+
+
+def _nombre_parser(parser: ParserPagina) -> str:
+    return f"{parser.__module__}:{parser.__qualname__}"
+
+
+def _cache_get(clave: tuple) -> tuple[bool, Any]:
+    with _lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return True, _cache[clave][0]
+    return False, None
+
+
+def _cache_quitar(clave: tuple) -> None:
+    """Saca una página del caché; si era la última de su archivo, olvida la huella. Con `_lock` tomado."""
+    global _bytes_cache
+    _, tam = _cache.pop(clave)
+    _bytes_cache -= tam
+    huella = clave[0]
+    quedan = _cacheadas_por_huella.get(huella, 1) - 1
+    if quedan > 0:
+        _cacheadas_por_huella[huella] = quedan
+    else:
+        _cacheadas_por_huella.pop(huella, None)
+        _olvidar_huella(huella)
+
+
+def _cache_put(clave: tuple, valor: Any, maximo_bytes: int) -> None:
+    """Guarda la página (LRU) y desaloja las más viejas hasta quedar en `maximo_bytes`."""
+    global _bytes_cache
+    tam = _tamano(valor) if maximo_bytes > 0 else 0
+    if maximo_bytes <= 0 or tam > maximo_bytes:
+        return
+    with _lock:
+        if clave in _cache:
+            _cache_quitar(clave)
+        _cache[clave] = (valor, tam)
+        _bytes_cache += tam
+        _cacheadas_por_huella[clave[0]] = _cacheadas_por_huella.get(clave[0], 0) + 1
+        while _bytes_cache > maximo_bytes:
+            _cache_quitar(next(iter(_cache)))
+
+
+def _soltar_sin_cache(huellas: set[str]) -> None:
+    """Huellas sin ninguna página en caché (caché apagado o resultados muy grandes): no se retienen."""
+    with _lock:
+        for huella in huellas:
+            if huella not in _cacheadas_por_huella:
+                _olvidar_huella(huella)
+
+
+def limpiar_cache() -> None:
+    global _bytes_cache
+    with _lock:
+        _cache.clear()
+        _cacheadas_por_huella.clear()
+        _bytes_cache = 0
+        _huellas.clear()
+        _rutas_por_huella.clear()
+        _paginas_por_huella.clear()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Ejecutor
+# ──────────────────────────────────────────────────────────────────────────────
+
+def workers_para(n_tareas: int, *, workers: Optional[int] = None,
+                 memoria_mb: Optional[int] = None) -> int:
+    """Procesos a usar: lo pedido (`WC_PDF_WORKERS`, default núcleos) acotado por el techo de memoria."""
+    memoria_mb = MEMORIA_MB if memoria_mb is None else memoria_mb
+    if workers is None:
+        env = os.getenv("WC_PDF_WORKERS")
+        workers = int(env) if env else (os.cpu_count() or 1)
+    por_memoria = max(1, memoria_mb // max(1, MB_POR_WORKER))
+    return max(1, min(workers, por_memoria, n_tareas))
+
+
+def _rangos(paginas: Sequence[int], tam: int) -> list[tuple[int, int]]:
+    """Páginas faltantes → rangos contiguos [desde, hasta) de a lo sumo `tam` páginas."""
+    rangos: list[tuple[int, int]] = []
+    for p in paginas:
+        if rangos and rangos[-1][1] == p and p - rangos[-1][0] < tam:
+            rangos[-1] = (rangos[-1][0], p + 1)
+        else:
+            rangos.append((p, p + 1))
+    return rangos
+
+
+def parsear_documentos(
+    tareas: Sequence[tuple[str | Path, ParserPagina]],
+    *,
+    workers: Optional[int] = None,
+    memoria_mb: Optional[int] = None,
+    paginas_por_tarea: Optional[int] = None,
+    cache_mb: Optional[float] = None,
+    abrir: Callable = abrir_pdfplumber,
+) -> list[list[Any]]:
+    """Para cada (pdf, parser) devuelve `[parser(página) for página in pdf]`, en el orden de `tareas`.
+
+    Tareas repetidas se parsean una sola vez. Una excepción de un parser se propaga
+    (como en el camino secuencial); si se cae el pool (p.ej. un hijo muerto por OOM),
+    lo que falta se parsea en este proceso.
+    """
+    memoria_mb = MEMORIA_MB if memoria_mb is None else memoria_mb
+    tam = max(1, PAGINAS_POR_TAREA if paginas_por_tarea is None else paginas_por_tarea)
+    maximo_cache = int((CACHE_MB if cache_mb is None else cache_mb) * 1024 * 1024)
+
+    docs: list[dict[str, Any]] = []
+    for path, parser in tareas:
+        path = str(path)
+        huella = huella_archivo(path)
+        n = _paginas_por_huella.get(huella)
+        if n is None:
+            n = _contar_paginas(path, abrir)
+            with _lock:
+                _paginas_por_huella[huella] = n
+        docs.append({"path": path, "parser": parser, "huella": huella,
+                     "clave": (huella, _nombre_parser(parser)), "paginas": [_FALTA] * n})
+
+    # Trabajo pendiente: (doc, desde, hasta) de lo que no está en caché, sin repetir documentos
+    pendientes: list[tuple[int, int, int]] = []
+    primero: dict[tuple[str, str], int] = {}
+    for d, doc in enumerate(docs):
+        if doc["clave"] in primero:
+            continue
+        primero[doc["clave"]] = d
+        faltan = []
+        for p in range(len(doc["paginas"])):
+            ok, valor = _cache_get(doc["clave"] + (p,))
+            if ok:
+                doc["paginas"][p] = valor
+            else:
+                faltan.append(p)
+        pendientes += [(d, a, b) for a, b in _rangos(faltan, tam)]
+
+    def _guardar(d: int, desde: int, resultados: list) -> None:
+        doc = docs[d]
+        for k, valor in enumerate(resultados):
+            doc["paginas"][desde + k] = valor
+            _cache_put(doc["clave"] + (desde + k,), valor, maximo_cache)
+
+    n_workers = workers_para(len(pendientes), workers=workers, memoria_mb=memoria_mb)
+    if n_workers <= 1:
+        for d, a, b in pendientes:
+            _guardar(d, a, _procesar_rango(docs[d]["parser"], docs[d]["path"], a, b, abrir)[0])
+    else:
+        _en_paralelo(docs, pendientes, n_workers, memoria_mb, abrir, _guardar)
+
+    _soltar_sin_cache({doc["huella"] for doc in docs})
+    return [docs[primero[doc["clave"]]]["paginas"] for doc in docs]
+
+
+def _en_paralelo(docs, pendientes, n_workers, memoria_mb, abrir, guardar) -> None:
+    """Reparte `pendientes` en procesos con a lo sumo `en_vuelo_max` tareas en vuelo."""
+    limite_mb = memoria_mb / n_workers
+    en_vuelo_max = n_workers
+    cola = list(pendientes)
+    en_vuelo: dict[Future, tuple[int, int, int]] = {}
+    logger.info("[PDF] %d tareas (%d documentos) en %d procesos (techo %d MB).",
+                len(cola), len(docs), n_workers, memoria_mb)
+
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                 max_tasks_per_child=TAREAS_POR_WORKER) as pool:
+            while cola or en_vuelo:
+                while cola and len(en_vuelo) < en_vuelo_max:
+                    d, a, b = cola.pop(0)
+                    futuro = pool.submit(_procesar_rango, docs[d]["parser"], docs[d]["path"], a, b, abrir)
+                    en_vuelo[futuro] = (d, a, b)
+                # El primero en vuelo (orden de envío): los resultados se ubican por página igual
+                futuro = next(iter(en_vuelo))
+                d, a, b = en_vuelo.pop(futuro)
+                resultados, pico = futuro.result()
+                guardar(d, a, resultados)
+                if pico is not None and pico > limite_mb and en_vuelo_max > 1:
+                    en_vuelo_max -= 1
+                    logger.warning("[PDF] pico de %.0f MB en un proceso (límite %.0f MB): bajo a %d tareas en vuelo.",
+                                   pico, limite_mb, en_vuelo_max)
+    except BrokenProcessPool as exc:
+        faltan = [t for t in pendientes if any(p is _FALTA for p in docs[t[0]]["paginas"][t[1]:t[2]])]
+        logger.warning("[PDF] pool caído (%s): %d tareas se parsean en este proceso.", exc, len(faltan))
+        for d, a, b in faltan:
+            guardar(d, a, _procesar_rango(docs[d]["parser"], docs[d]["path"], a, b, abrir)[0])
+
+
+def parsear_paginas(path: str | Path, parser: ParserPagina, **kwargs: Any) -> list[Any]:
+    """Un solo PDF: `parser` por página (rangos de páginas en paralelo si el PDF es grande)."""
+    return parsear_documentos([(path, parser)], **kwargs)[0]
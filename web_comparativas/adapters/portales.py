@@ -1,8 +1,9 @@
 from pathlib import Path
 import pandas as pd
-from openpyxl import load_workbook
 import unicodedata, re
 
+from web_comparativas.adapters import streaming as _streaming
+
 BASE_DIR = Path(__file__).resolve().parents[1]  # .../web_comparativas
 MARCAS_PATH = BASE_DIR / "marcas.xlsm"
 
@@ -338,6 +339,7 @@ def _parse_flat_provider_table(
     selected_sheet: str,
     all_sheets: list,
     detected_cols: list,
+    filas=None,
 ) -> tuple[pd.DataFrame, dict]:
     """
     Parser para archivos de comparativa en formato tabla plana, donde el
@@ -346,6 +348,9 @@ def _parse_flat_provider_table(
     Ejemplo de cabecera detectada:
       Renglón | Alternativa | Precio unitario | Proveedor | Cantidad Ofertada | ...
 
+    `df` alcanza con que llegue hasta la cabecera; `filas` (opcional) son las
+    filas de datos en streaming. Sin `filas` se toman las de `df`.
+
     Devuelve (df_normalizado, diag_dict).
     Si falla, devuelve (DataFrame vacío, diag_dict con failed_stage).
     """
@@ -393,51 +398,60 @@ def _parse_flat_provider_table(
         )
         return pd.DataFrame(), diag
 
-    # Construir filas desde header_row_idx + 1
+    # Construir filas desde header_row_idx + 1 (en lotes de columnas tipadas)
     data_start = header_row_idx + 1
-    diag["rows_read"] = max(0, df.shape[0] - data_start)
+    if filas is None:
+        filas = (tuple(r) for r in df.iloc[data_start:].itertuples(index=False, name=None))
     out_rows: list[dict] = []
+    # rows_read cuenta hasta la última fila con algún dato: openpyxl read-only entrega
+    # las filas vacías del final de la hoja, que pandas/la lectura completa descartaban.
+    rows_read = 0
+    vacias_pendientes = 0
+
+    numericas = {"Precio unitario", "Cantidad ofertada", "Total por renglón", "Cantidad solicitada"}
+    tipos = {c: _parse_latam for c in numericas if c in col_map}
+    marcas: dict = {}
+
+    for lote in _streaming.en_lotes(filas):
+        for fila in lote:
+            if all(_streaming.vacio(v) for v in fila):
+                vacias_pendientes += 1
+            else:
+                rows_read += vacias_pendientes + 1
+                vacias_pendientes = 0
+        cols = _streaming.columnas(lote, col_map, tipos)
+        provs = cols.get("Proveedor")
+        precios = cols.get("Precio unitario")
+
+        for i in range(len(lote)):
+            # Saltar filas completamente vacías de datos útiles (sin proveedor ni precio)
+            prov_raw = provs[i] if provs is not None else None
+            prov_str = "" if _streaming.vacio(prov_raw) else str(prov_raw).strip()
+            price_val = precios[i] if precios is not None else None
+            if not prov_str and price_val is None:
+                continue
 
-    prov_idx  = col_map.get("Proveedor")
-    price_idx = col_map.get("Precio unitario")
-
-    for r in range(data_start, df.shape[0]):
-        row = df.iloc[r]
-
-        # Leer proveedor y precio para filtro de fila vacía
-        prov_raw  = row[prov_idx]  if prov_idx  is not None and prov_idx  < len(row) else None
-        price_raw = row[price_idx] if price_idx is not None and price_idx < len(row) else None
-
-        prov_str  = str(prov_raw).strip()  if prov_raw  is not None and not (isinstance(prov_raw,  float) and pd.isna(prov_raw))  else ""
-        price_val = _parse_latam(price_raw)
-
-        # Saltar filas completamente vacías de datos útiles
-        if not prov_str and price_val is None:
-            continue
-
-        rec: dict = {}
-        for canonical, col_idx in col_map.items():
-            v = row[col_idx] if col_idx < len(row) else None
-            rec[canonical] = None if (v is None or (isinstance(v, float) and pd.isna(v))) else v
-
-        # Normalizar numéricos
-        rec["Precio unitario"]    = _parse_latam(rec.get("Precio unitario"))
-        rec["Cantidad ofertada"]  = _parse_latam(rec.get("Cantidad ofertada"))
-        rec["Total por renglón"]  = _parse_latam(rec.get("Total por renglón"))
-        if "Cantidad solicitada" in rec:
-            rec["Cantidad solicitada"] = _parse_latam(rec.get("Cantidad solicitada"))
+            rec: dict = {}
+            for canonical in col_map:
+                v = cols[canonical][i]
+                rec[canonical] = None if (isinstance(v, float) and pd.isna(v)) else v
+            for c in ("Precio unitario", "Cantidad ofertada", "Total por renglón"):
+                rec.setdefault(c, None)
 
-        # Proveedor como string limpio
-        if rec.get("Proveedor") is not None:
-            rec["Proveedor"] = str(rec["Proveedor"]).strip()
+            # Proveedor como string limpio
+            if rec.get("Proveedor") is not None:
+                rec["Proveedor"] = str(rec["Proveedor"]).strip()
 
-        # Detección de marca si no tiene columna propia
-        if "Marca" not in col_map:
-            espec = rec.get("Especificación técnica") or rec.get("Observaciones")
-            rec["Marca"] = _detectar_marca(espec)
+            # Detección de marca si no tiene columna propia (memo por texto: se repite mucho)
+            if "Marca" not in col_map:
+                espec = rec.get("Especificación técnica") or rec.get("Observaciones")
+                if espec not in marcas:
+                    marcas[espec] = _detectar_marca(espec)
+                rec["Marca"] = marcas[espec]
 
-        out_rows.append(rec)
+            out_rows.append(rec)
 
+    diag["rows_read"] = rows_read
     diag["rows_normalized"] = len(out_rows)
 
     if not out_rows:
@@ -462,11 +476,20 @@ def _parse_flat_provider_table(
 
 
 def _normalize_core(path: Path, hoja: str | None = None):
+    with _streaming.abrir(path) as libro:
+        return _normalize_libro(libro, Path(path), hoja)
+
+
+# Filas que se cargan en memoria para buscar la cabecera (cubre `search_rows`
+# de _find_header_and_provider_rows); el resto de la hoja se lee en streaming.
+_HEAD_ROWS = 60
+
+
+def _normalize_libro(libro, path: Path, hoja: str | None = None):
     import logging as _log
     _logger = _log.getLogger("web_comp.portales")
 
-    wb = load_workbook(path, data_only=True)
-    all_sheets = wb.sheetnames
+    all_sheets = libro.sheet_names
     _logger.info("[portales] Hojas disponibles en %s: %s", path.name, all_sheets)
 
     # Selección de hoja: preferir la indicada, luego buscar la más prometedora
@@ -476,27 +499,25 @@ def _normalize_core(path: Path, hoja: str | None = None):
         for keyword in ("comparativo", "cuadro", "oferta", "licitacion", "proveedores", "precios"):
             if keyword in n:
                 score += 2
-        ws_candidate = wb[ws_name]
         # Premiar hojas con más datos
-        if ws_candidate.max_row and ws_candidate.max_row > 5:
+        if libro.mas_filas_que(ws_name, 5):
             score += 1
         return score
 
     if hoja and hoja in all_sheets:
-        ws = wb[hoja]
         selected_sheet = hoja
     else:
         # Elegir la hoja con mayor score; como tiebreak, la primera
-        best = max(all_sheets, key=_sheet_score)
-        ws = wb[best]
-        selected_sheet = best
+        selected_sheet = max(all_sheets, key=_sheet_score)
         if hoja:
             _logger.warning("[portales] Hoja '%s' no encontrada, usando '%s'", hoja, selected_sheet)
 
     _logger.info("[portales] Hoja seleccionada: '%s'", selected_sheet)
 
-    data = [[cell for cell in row] for row in ws.iter_rows(values_only=True)]
-    df = pd.DataFrame(data)
+    # Solo la cabecera (primeras _HEAD_ROWS filas) va a un DataFrame; los datos
+    # se consumen después desde `resto` sin materializar la hoja entera.
+    head, resto = libro.primeras_filas(selected_sheet, _HEAD_ROWS)
+    df = _streaming.frame_crudo(head)
 
     header_row_idx, provider_row_idx = _find_header_and_provider_rows(df)
 
@@ -517,13 +538,13 @@ def _normalize_core(path: Path, hoja: str | None = None):
         for alt_sheet in all_sheets:
             if alt_sheet == selected_sheet:
                 continue
-            ws2 = wb[alt_sheet]
-            data2 = [[cell for cell in row] for row in ws2.iter_rows(values_only=True)]
-            df2 = pd.DataFrame(data2)
+            head2, resto2 = libro.primeras_filas(alt_sheet, _HEAD_ROWS)
+            df2 = _streaming.frame_crudo(head2)
             h2, p2 = _find_header_and_provider_rows(df2)
             if h2 is not None:
                 _logger.info("[portales] Cabecera encontrada en hoja alternativa '%s' fila %d", alt_sheet, h2)
                 df, header_row_idx, provider_row_idx, selected_sheet = df2, h2, p2, alt_sheet
+                head, resto = head2, resto2
                 break
 
         if header_row_idx is None:
@@ -534,6 +555,9 @@ def _normalize_core(path: Path, hoja: str | None = None):
             )
             return pd.DataFrame(), _diag_empty
 
+    # Filas de datos: lo que quedó de la cabecera después de header_row_idx + el resto en streaming
+    filas = _streaming.encadenar(head, header_row_idx + 1, resto)
+
     row_headers = df.iloc[header_row_idx]
     detected_cols = [str(v).strip() for v in row_headers.tolist() if v and str(v).strip()]
     _logger.info("[portales] Fila de cabecera: %d | Columnas detectadas: %s", header_row_idx, detected_cols[:20])
@@ -566,7 +590,7 @@ def _normalize_core(path: Path, hoja: str | None = None):
         )
         if _looks_like_flat_provider_table(row_headers):
             flat_out, flat_diag = _parse_flat_provider_table(
-                df, header_row_idx, selected_sheet, all_sheets, detected_cols
+                df, header_row_idx, selected_sheet, all_sheets, detected_cols, filas=filas
             )
             if flat_out is not None and not flat_out.empty:
                 _logger.info(
@@ -587,33 +611,45 @@ def _normalize_core(path: Path, hoja: str | None = None):
             return pd.DataFrame(), _diag_empty
 
     # ── Parser de bloques (camino original) ─────────────────────────────────
+    # El mapeo de columnas de cada bloque depende solo de la cabecera: se arma
+    # una vez (antes se recalculaba por fila y por bloque). Las columnas se leen
+    # por lote y ya tipadas con _parse_latam.
+    rc = fixed_cols.get("Renglón", None)
+    indices: dict = {("fijo", k): i for k, i in fixed_cols.items()}
+    tipos: dict = {}
+    bloques = []
+    for b, (prov_name, start, end) in enumerate(blocks):
+        mapping = _map_cols_in_block(df, header_row_idx, start, end)
+        for campo, c in mapping.items():
+            indices[(b, campo)] = c
+            if campo != "Especificación técnica":
+                tipos[(b, campo)] = _parse_latam
+        bloques.append((b, str(prov_name).strip()))
+
     out_rows = []
-    for r in range(header_row_idx + 1, df.shape[0]):
-        row = df.iloc[r]
-        rc = fixed_cols.get("Renglón", None)
-        if rc is None or pd.isna(row[rc]):
-            continue
+    marcas: dict = {}
+    for lote in _streaming.en_lotes(filas if rc is not None else ()):
+        cols = _streaming.columnas(lote, indices, tipos)
+        renglones = cols[("fijo", "Renglón")]
+        for i in range(len(lote)):
+            if pd.isna(renglones[i]):
+                continue
 
-        base = {}
-        for k, i in fixed_cols.items():
-            base[k] = row[i] if i < len(row) else None
-
-        for (prov_name, start, end) in blocks:
-            mapping = _map_cols_in_block(df, header_row_idx, start, end)
-            rec = base.copy()
-            rec["Proveedor"] = str(prov_name).strip()
-
-            pu    = _parse_latam(row[mapping["Precio unitario"]])    if "Precio unitario"    in mapping else None
-            co    = _parse_latam(row[mapping["Cantidad ofertada"]])  if "Cantidad ofertada"  in mapping else None
-            tot   = _parse_latam(row[mapping["Total por renglón"]])  if "Total por renglón"  in mapping else None
-            espec = row[mapping["Especificación técnica"]]           if "Especificación técnica" in mapping else None
-
-            rec["Precio unitario"]     = pu
-            rec["Cantidad ofertada"]   = co
-            rec["Total por renglón"]   = tot
-            rec["Especificación técnica"] = espec
-            rec["Marca"] = _detectar_marca(espec)
-            out_rows.append(rec)
+            base = {k: cols[("fijo", k)][i] for k in fixed_cols}
+
+            for b, prov_name in bloques:
+                rec = base.copy()
+                rec["Proveedor"] = prov_name
+
+                espec = cols[(b, "Especificación técnica")][i] if (b, "Especificación técnica") in cols else None
+                rec["Precio unitario"]     = cols[(b, "Precio unitario")][i]   if (b, "Precio unitario")   in cols else None
+                rec["Cantidad ofertada"]   = cols[(b, "Cantidad ofertada")][i] if (b, "Cantidad ofertada") in cols else None
+                rec["Total por renglón"]   = cols[(b, "Total por renglón")][i] if (b, "Total por renglón") in cols else None
+                rec["Especificación técnica"] = espec
+                if espec not in marcas:
+                    marcas[espec] = _detectar_marca(espec)
+                rec["Marca"] = marcas[espec]
+                out_rows.append(rec)
 
     _logger.info(
         "[portales] Filas extraídas: %d | Bloques de proveedor: %d | Hoja: '%s'",
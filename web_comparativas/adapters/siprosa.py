@@ -19,6 +19,8 @@ from typing import Any, Dict, List
 import numpy as np
 import pandas as pd
 
+from web_comparativas.adapters import streaming as _streaming
+
 
 # === ESTRUCTURA NORMALIZADA (idéntica a tu Excel + Rubro) ===
 OUTPUT_COLS = [
@@ -211,8 +213,9 @@ def _cut_contiguous_block(df: pd.DataFrame, key_cols: List[str], max_blank_run:
 
 
 # ---------- rubro robusto (mejora: escanea varias celdas) ----------
-def _extract_rubro_value(xls: pd.ExcelFile) -> str:
+def _extract_rubro_value(hojas: Dict[str, List[tuple]]) -> str:
     """
+    `hojas`: filas crudas por hoja (ver `_leer_hojas`).
     Busca una celda que contenga "Rubro" y luego:
     - Escanea hacia la derecha (hasta +12 columnas) en la misma fila
     - Si no encuentra, escanea hacia abajo (hasta +20 filas) en la misma columna
@@ -231,8 +234,8 @@ def _extract_rubro_value(xls: pd.ExcelFile) -> str:
     RIGHT_SCAN = 12
     DOWN_SCAN = 20
 
-    for sh in xls.sheet_names:
-        tmp = pd.read_excel(xls, sheet_name=sh, header=None)
+    for rows in hojas.values():
+        tmp = _streaming.frame_crudo(rows)
         if tmp.empty:
             continue
 
@@ -270,15 +273,16 @@ def _extract_rubro_value(xls: pd.ExcelFile) -> str:
     return "Sin dato"
 
 
-def _load_internal_table(xls: pd.ExcelFile) -> pd.DataFrame:
-    for sh in xls.sheet_names:
-        raw = pd.read_excel(xls, sheet_name=sh, header=None)
+def _load_internal_table(hojas: Dict[str, List[tuple]]) -> pd.DataFrame:
+    for rows in hojas.values():
+        raw = _streaming.frame_crudo(rows)
         if raw.empty:
             continue
         hdr = _find_header_row(raw)
         if hdr is None:
             continue
-        df = pd.read_excel(xls, sheet_name=sh, header=hdr)
+        # misma hoja, con la fila `hdr` como cabecera (sin volver a leer el archivo)
+        df = _streaming.frame_con_cabecera(rows, hdr)
         df = df.dropna(how="all")
         df = _cut_contiguous_block(df, key_cols=["id", "producto", "nombre producto", "precio", "proveedor"])
         if df.shape[1] >= 7 and df.shape[0] >= 1:
@@ -448,11 +452,22 @@ def _assign_renglon(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _leer_hojas(path: Path) -> Dict[str, List[tuple]]:
+    """
+    Filas crudas de cada hoja, leídas UNA vez por archivo.
+    Antes cada hoja se leía hasta 3 veces con pd.read_excel (rubro, búsqueda de
+    cabecera y tabla con header=hdr); ahora las tres etapas usan estas filas
+    (xlsx/xlsm en streaming read-only; .xls vía pandas).
+    """
+    with _streaming.abrir(path) as libro:
+        return {sh: list(libro.filas(sh)) for sh in libro.sheet_names}
+
+
 def _process_excel(path: Path) -> pd.DataFrame:
-    xls = pd.ExcelFile(path)
-    rubro = _extract_rubro_value(xls)
+    hojas = _leer_hojas(path)
+    rubro = _extract_rubro_value(hojas)
 
-    raw_tbl = _load_internal_table(xls)
+    raw_tbl = _load_internal_table(hojas)
     if raw_tbl.empty:
         return pd.DataFrame(columns=OUTPUT_COLS)
 
@@ -0,0 +1,228 @@
+"""Lectura en streaming de planillas fuente (xlsx/csv) para los adapters.
+
+Los adapters abrían el libro entero con openpyxl en modo normal (todo el árbol
+de celdas en memoria) o con `pd.read_excel`, armaban un DataFrame con TODAS las
+celdas de la hoja y recién ahí buscaban la cabecera fila por fila. Con decenas de
+miles de renglones la memoria se dispara. Ahora (oct-2026):
+  - xlsx/xlsm: openpyxl `read_only=True` + `iter_rows(values_only=True)`: las
+    filas se leen a medida que se consumen;
+  - csv: camino rápido con el módulo `csv` (encoding utf-8/latin-1 y separador
+    detectados sobre una muestra); celdas vacías → None, como en Excel;
+  - la cabecera se busca en las primeras N filas (`primeras_filas`) y el resto
+    sigue siendo un iterador;
+  - `en_lotes` + `columnas` entregan lotes de columnas ya tipadas al normalizador;
+  - .xls/.xlsb (sin lector streaming) caen a pandas, como antes.
+
+No depende de la app: testeable y medible por separado (ver
+tests/test_streaming_reader.py, benchmark con WC_BENCH=1).
+"""
+from __future__ import annotations
+
+import csv
+import math
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+
+XLSX_EXTS = {".xlsx", ".xlsm", ".xltx", ".xltm"}
+CSV_EXTS = {".csv", ".txt"}
+LOTE = 5000
+_CSV_SEPS_PREFERIDOS = (";", "\t", "|", ",")
+_CSV_MUESTRA = 64 * 1024
+
+
+def vacio(v: Any) -> bool:
+    """None / NaN / '' (lo que `pd.isna` consideraría faltante en una celda)."""
+    if v is None:
+        return True
+    if isinstance(v, float):
+        return math.isnan(v)
+    return isinstance(v, str) and v == ""
+
+
+def _csv_separador(lineas: list[str]) -> str:
+    """Separador más consistente: el que aparece la misma cantidad de veces en más líneas.
+
+    `csv.Sniffer` sobre toda la muestra elige ',' en exportaciones con ';' y decimales
+    latinos ("51,25"): la coma también es consistente en las filas de datos. Acá puntúa
+    cantidad modal × líneas que la tienen (la cabecera y el título también cuentan) y en
+    empate gana el primero de `_CSV_SEPS_PREFERIDOS`.
+    """
+    mejor, mejor_puntaje = ",", 0
+    for sep in _CSV_SEPS_PREFERIDOS:
+        cuentas: dict[int, int] = {}
+        for linea in lineas:
+            n = linea.count(sep)
+            if n:
+                cuentas[n] = cuentas.get(n, 0) + 1
+        if not cuentas:
+            continue
+        modal, veces = max(cuentas.items(), key=lambda kv: (kv[1], kv[0]))
+        if modal * veces > mejor_puntaje:
+            mejor, mejor_puntaje = sep, modal * veces
+    return mejor
+
+
+def _csv_formato(path: Path) -> tuple[str, str]:
+    with Path(path).open("rb") as f:
+        muestra = f.read(_CSV_MUESTRA)
+        if len(muestra) == _CSV_MUESTRA:
+            # muestra cortada: sin la última línea parcial, un carácter multibyte
+            # partido al final no hace caer a latin-1 un archivo utf-8
+            corte = muestra.rfind(b"\n")
+            if corte > 0:
+                muestra = muestra[:corte]
+    for enc in ("utf-8-sig", "latin-1"):
+        try:
+            texto = muestra.decode(enc, errors="strict")
+            break
+        except UnicodeDecodeError:
+            continue
+    lineas = [l for l in texto.splitlines() if l.strip()]
+    return enc, _csv_separador(lineas)
+
+
+class Libro:
+    """Libro abierto para lectura secuencial por hoja (usar como context manager)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        ext = self.path.suffix.lower()
+        self._wb = None
+        self._frames: Optional[dict[str, pd.DataFrame]] = None
+        if ext in CSV_EXTS:
+            self.tipo = "csv"
+            self._csv = _csv_formato(self.path)
+            self.sheet_names = [self.path.stem]
+        elif ext in XLSX_EXTS:
+            from openpyxl import load_workbook
+
+            self.tipo = "xlsx"
+            self._wb = load_workbook(self.path, read_only=True, data_only=True)
+            self.sheet_names = list(self._wb.sheetnames)
+        else:
+            self.tipo = "pandas"                # .xls (xlrd) / .xlsb (pyxlsb): sin streaming
+            engine = {".xls": "xlrd", ".xlsb": "pyxlsb"}.get(ext)
+            self._frames = pd.read_excel(self.path, sheet_name=None, header=None, engine=engine)
+            self.sheet_names = list(self._frames)
+
+    def __enter__(self) -> "Libro":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def mas_filas_que(self, hoja: str, n: int) -> bool:
+        """True si la hoja tiene más de `n` filas (lee a lo sumo n + 1)."""
+        return len(list(islice(self.filas(hoja), n + 1))) > n
+
+    def filas(self, hoja: Optional[str] = None) -> Iterator[tuple]:
+        """Filas de la hoja como tuplas de valores (None = celda vacía)."""
+        hoja = hoja or self.sheet_names[0]
+        if self.tipo == "xlsx":
+            ws = self._wb[hoja]
+            # En read_only, iter_rows corta en la <dimension> declarada por la hoja, que
+            # algunos generadores dejan desactualizada (se perdían filas y columnas). Como
+            # pandas, se ignora: se leen las filas que hay y pueden venir de distinto largo.
+            ws.reset_dimensions()
+            return ws.iter_rows(values_only=True)
+        if self.tipo == "csv":
+            return self._filas_csv()
+        df = self._frames[hoja].astype(object).where(self._frames[hoja].notna(), None)
+        return (tuple(r) for r in df.itertuples(index=False, name=None))
+
+    def _filas_csv(self) -> Iterator[tuple]:
+        enc, sep = self._csv
+        with self.path.open("r", encoding=enc, errors="replace", newline="") as f:
+            for fila in csv.reader(f, delimiter=sep):
+                yield tuple((c if c.strip() else None) for c in fila)
+
+    def primeras_filas(self, hoja: Optional[str], n: int) -> tuple[list[tuple], Iterator[tuple]]:
+        """(primeras `n` filas, iterador con el resto): para detectar la cabecera sin leer todo."""
+        it = iter(self.filas(hoja))
+        return list(islice(it, n)), it
+
+
+def abrir(path: Path) -> Libro:
+    return Libro(path)
+
+
+def detectar_cabecera(filas: list[tuple], puntaje: Callable[[tuple], float],
+                      minimo: float = 1, desde: int = 0) -> Optional[int]:
+    """Índice de la fila con mayor `puntaje` (>= minimo) entre `filas`; None si ninguna llega."""
+    mejor, mejor_p = None, minimo - 1
+    for i in range(desde, len(filas)):
+        p = puntaje(filas[i])
+        if p > mejor_p:
+            mejor, mejor_p = i, p
+    return mejor if mejor_p >= minimo else None
+
+
+def en_lotes(filas: Iterable[tuple], tam: int = LOTE) -> Iterator[list[tuple]]:
+    it = iter(filas)
+    while True:
+        lote = list(islice(it, tam))
+        if not lote:
+            return
+        yield lote
+
+
+def columnas(lote: list[tuple], indices: dict[str, int],
+             tipos: Optional[dict[str, Callable[[Any], Any]]] = None) -> dict[str, list]:
+    """Lote de filas → {nombre: lista de valores de la columna `indices[nombre]`}, convertidos con `tipos`."""
+    tipos = tipos or {}
+    out: dict[str, list] = {}
+    for nombre, j in indices.items():
+        vals = [fila[j] if j < len(fila) else None for fila in lote]
+        conv = tipos.get(nombre)
+        out[nombre] = [conv(v) for v in vals] if conv is not None else vals
+    return out
+
+
+def frame_crudo(filas: Iterable[tuple]) -> pd.DataFrame:
+    """Filas → DataFrame sin cabecera (como `read_excel(header=None)`)."""
+    return pd.DataFrame(list(filas))
+
+
+def _nombres_columnas(cabecera: tuple, ancho: int) -> list[str]:
+    """Nombres al estilo pandas: vacías → 'Unnamed: i', repetidas → 'x.1', 'x.2'."""
+    nombres, vistos = [], {}
+    for i in range(ancho):
+        v = cabecera[i] if i < len(cabecera) else None
+        base = f"Unnamed: {i}" if vacio(v) else (str(v) if not isinstance(v, str) else v)
+        n = vistos.get(base, 0)
+        vistos[base] = n + 1
+        nombres.append(base if n == 0 else f"{base}.{n}")
+    return nombres
+
+
+def frame_con_cabecera(filas: Iterable[tuple], fila_cabecera: int = 0) -> pd.DataFrame:
+    """Filas → DataFrame con la fila `fila_cabecera` como nombres (como `read_excel(header=n)`)."""
+    it = iter(filas)
+    for _ in range(fila_cabecera):
+        next(it, None)
+    cabecera = next(it, None)
+    if cabecera is None:
+        return pd.DataFrame()
+    datos = list(it)
+    ancho = max([len(cabecera)] + [len(f) for f in datos]) if datos else len(cabecera)
+    df = pd.DataFrame(datos).reindex(columns=range(ancho))
+    df.columns = _nombres_columnas(cabecera, ancho)
+    return df.infer_objects()
+
+
+def leer_frame(path: Path, hoja: Optional[str] = None, fila_cabecera: int = 0) -> pd.DataFrame:
+    with abrir(path) as libro:
+        return frame_con_cabecera(libro.filas(hoja), fila_cabecera)
+
+
+def encadenar(cabeza: list[tuple], desde: int, resto: Iterator[tuple]) -> Iterator[tuple]:
+    """Filas de datos: las de `cabeza` a partir de `desde` y después el resto del iterador."""
+    return chain(islice(cabeza, desde, None), resto)
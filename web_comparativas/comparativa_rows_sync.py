@@ -0,0 +1,333 @@
+"""Sincronización normalized.xlsx -> comparativa_rows (Reporte de Perfiles).
+
+Antes esto vivía duplicado en `services.classify_and_process` y en
+`migrations.backfill_comparativa_rows`: `df.iterrows()` + try/except celda por celda +
+`bulk_insert_mappings`, un upload por vez. Un re-sync completo tardaba horas.
+
+Ahora (oct-2026):
+  - `filas_comparativa` convierte el DataFrame ENTERO por columna (`pd.to_numeric`,
+    `.str.strip()`), con la misma semántica que el loop viejo;
+  - `escribir_filas` borra e inserta las filas de un upload en UNA transacción: COPY
+    FROM STDIN en Postgres, executemany en SQLite;
+  - `sincronizar_uploads` procesa muchos uploads con el parseo del Excel repartido en
+    procesos (openpyxl es Python puro: hilos no ayudan), con progreso y reanudable.
+
+El parseo (`parsear_normalizado`) no toca la base: es lo que corre en los procesos hijos.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import io
+import logging
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from web_comparativas.models import IS_POSTGRES, ComparativaRow, SessionLocal, Upload
+
+logger = logging.getLogger("wc.comparativa_rows")
+
+# Columna del Excel normalizado (orden estándar de los adapters) -> columna del modelo.
+EXCEL_COL_MAP = {
+    "Proveedor": "proveedor",
+    "Renglón": "renglon",
+    "Alternativa": "alternativa",
+    "Código": "codigo",
+    "Descripción": "descripcion",
+    "Cantidad solicitada": "cantidad_solicitada",
+    "Unidad de medida": "unidad_medida",
+    "Precio unitario": "precio_unitario",
+    "Cantidad ofertada": "cantidad_ofertada",
+    "Total por renglón": "total_por_renglon",
+    "Especificación técnica": "especificacion_tecnica",
+    "Marca": "marca",
+    "Posicion": "posicion",
+    "Rubro": "rubro",
+}
+COLUMNAS_FLOAT = ("cantidad_solicitada", "precio_unitario", "cantidad_ofertada", "total_por_renglon")
+COLUMNAS_INT = ("posicion",)
+
+# Metadata del upload que se denormaliza en cada fila.
+COLUMNAS_META = ("upload_id", "fecha_apertura", "nro_proceso", "comprador", "plataforma", "cuenta", "provincia")
+COLUMNAS = COLUMNAS_META + tuple(EXCEL_COL_MAP.values())
+
+ESTADOS_SINCRONIZABLES = ("done", "reviewing", "dashboard")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Conversión (sin base de datos)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _fecha_apertura(valor: Any) -> dt.date | None:
+    if not valor:
+        return None
+    try:
+        return dt.date.fromisoformat(str(valor).strip()[:10])
+    except ValueError:
+        return None
+
+
+def meta_upload(up: Any) -> dict[str, Any]:
+    """Metadata de un Upload (ORM o Row con los mismos atributos) para cada fila."""
+    return {
+        "upload_id": up.id,
+        "fecha_apertura": _fecha_apertura(getattr(up, "apertura_fecha", None)),
+        "nro_proceso": up.proceso_nro,
+        "comprador": up.buyer_hint,
+        "plataforma": up.platform_hint,
+        "cuenta": up.cuenta_nro,
+        "provincia": up.province_hint,
+    }
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    # Paridad con el loop viejo (`str(v).strip() if v else None`): los falsy (0, "",
+    # False) quedan en None; un texto solo con espacios queda como "".
+    vacio = serie.isna() | serie.isin(["", 0])
+    return serie.astype(str).str.strip().astype(object).where(~vacio, None)
+
+
+def filas_comparativa(df: pd.DataFrame, meta: dict[str, Any]) -> pd.DataFrame:
+    """DataFrame del normalized.xlsx -> DataFrame con las columnas de comparativa_rows.
+
+    Conversión por columna: numéricos con `to_numeric(errors="coerce")` (lo que no es
+    número queda NULL, como antes el `except: None`), `posicion` truncada a entero y el
+    resto como texto sin espacios. Las columnas del mapa que falten quedan en NULL.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    n = len(df)
+    salida = pd.DataFrame(index=range(n))
+    for clave in COLUMNAS_META:
+        salida[clave] = [meta.get(clave)] * n
+    for excel_col, model_col in EXCEL_COL_MAP.items():
+        if excel_col not in df.columns:
+            salida[model_col] = None
+            continue
+        serie = df[excel_col].reset_index(drop=True)
+        if model_col in COLUMNAS_FLOAT:
+            salida[model_col] = pd.to_numeric(serie, errors="coerce").astype("float64")
+        elif model_col in COLUMNAS_INT:
+            numeros = pd.to_numeric(serie, errors="coerce").astype("float64")
+            # `int(v)` trunca. Fuera del rango de INTEGER (o inf) queda NULL: antes pasaba
+            # el int de Python y en Postgres rompía el INSERT del upload entero.
+            salida[model_col] = np.trunc(numeros.where(numeros.abs() < 2**31)).astype("Int64")
+        else:
+            salida[model_col] = _texto(serie)
+    return salida
+
+
+def parsear_normalizado(contenido: bytes, meta: dict[str, Any]) -> pd.DataFrame:
+    """Bytes del normalized.xlsx -> filas listas para `escribir_filas`. Sin I/O de base."""
+    df = pd.read_excel(io.BytesIO(contenido), engine="openpyxl")
+    return filas_comparativa(df, meta)
+
+
+def a_registros(filas: pd.DataFrame) -> list[dict[str, Any]]:
+    """Filas -> list[dict] con None (no NaN/NA) para los nulos."""
+    return filas.astype(object).where(filas.notna(), None).to_dict("records")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Escritura
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _copy_postgres(session: Session, filas: pd.DataFrame) -> None:
+    buffer = io.StringIO()
+    filas.to_csv(buffer, header=False, index=False, na_rep="\\N", date_format="%Y-%m-%d")
+    buffer.seek(0)
+    # Cursor crudo de la MISMA conexión de la sesión: el COPY queda en la transacción
+    # del DELETE y se confirma (o se revierte) junto con él.
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {ComparativaRow.__tablename__} ({', '.join(filas.columns)}) "
+            "FROM STDIN WITH (FORMAT CSV, NULL '\\N')",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def escribir_filas(session: Session, upload_id: int, filas: pd.DataFrame) -> int:
+    """Reemplaza las filas de un upload. NO hace commit: el llamador decide.
+
+    Borrar + insertar en la misma transacción hace que un upload quede entero o no
+    quede: es lo que vuelve reanudable al backfill.
+    """
+    session.execute(delete(ComparativaRow).where(ComparativaRow.upload_id == upload_id))
+    if filas.empty:
+        return 0
+    if IS_POSTGRES:
+        _copy_postgres(session, filas)
+    else:
+        session.execute(insert(ComparativaRow.__table__), a_registros(filas))
+    return len(filas)
+
+
+def sincronizar_upload(session: Session, up: Any, contenido: bytes) -> int:
+    """Parsea y escribe las filas de UN upload (camino de `classify_and_process`)."""
+    return escribir_filas(session, up.id, parsear_normalizado(contenido, meta_upload(up)))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Backfill masivo
+# ──────────────────────────────────────────────────────────────────────────────
+
+def uploads_pendientes(
+    session: Session,
+    *,
+    resync: bool = False,
+    desde_id: int | None = None,
+    limite: int | None = None,
+) -> list[int]:
+    """Ids a sincronizar, en orden. Sin `resync` se saltean los que ya tienen filas."""
+    q = (
+        select(Upload.id)
+        .where(Upload.status.in_(ESTADOS_SINCRONIZABLES), Upload.normalized_content.isnot(None))
+        .order_by(Upload.id.asc())
+    )
+    if desde_id is not None:
+        q = q.where(Upload.id > desde_id)
+    if not resync:
+        q = q.where(~select(ComparativaRow.id).where(ComparativaRow.upload_id == Upload.id).exists())
+    if limite is not None:
+        q = q.limit(limite)
+    return [upload_id for (upload_id,) in session.execute(q).all()]
+
+
+def _leer_upload(session: Session, upload_id: int) -> tuple[dict[str, Any], bytes] | None:
+    row = session.execute(
+        select(
+            Upload.id, Upload.apertura_fecha, Upload.proceso_nro, Upload.buyer_hint,
+            Upload.platform_hint, Upload.cuenta_nro, Upload.province_hint,
+            Upload.normalized_content,
+        ).where(Upload.id == upload_id)
+    ).first()
+    if row is None or row.normalized_content is None:
+        return None
+    return meta_upload(row), bytes(row.normalized_content)
+
+
+class _Progreso:
+    """Cuenta uploads/filas y calcula la marca de agua: el mayor id tal que TODOS los
+    anteriores terminaron. Con workers en paralelo terminan fuera de orden, así que el
+    último id terminado no sirve para reanudar; la marca de agua sí."""
+
+    def __init__(self, ids: list[int], callback: Callable[[dict[str, Any]], None] | None) -> None:
+        self._orden = ids
+        self._hechos: set[int] = set()
+        self._pos = 0
+        self.marca_agua: int | None = None
+        self.ok = 0
+        self.errores = 0
+        self.filas = 0
+        self._callback = callback
+        self._inicio = time.monotonic()
+
+    def terminar(self, upload_id: int, filas: int | None) -> None:
+        if filas is None:
+            self.errores += 1
+        else:
+            self.ok += 1
+            self.filas += filas
+        self._hechos.add(upload_id)
+        while self._pos < len(self._orden) and self._orden[self._pos] in self._hechos:
+            self.marca_agua = self._orden[self._pos]
+            self._pos += 1
+        if self._callback is not None:
+            self._callback(self.estado())
+
+    def estado(self) -> dict[str, Any]:
+        return {
+            "total": len(self._orden), "ok": self.ok, "errores": self.errores,
+            "filas": self.filas, "marca_agua": self.marca_agua,
+            "segundos": round(time.monotonic() - self._inicio, 1),
+        }
+
+
+def sincronizar_uploads(
+    upload_ids: Iterable[int] | None = None,
+    *,
+    workers: int = 1,
+    resync: bool = False,
+    desde_id: int | None = None,
+    limite: int | None = None,
+    progreso: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Sincroniza muchos uploads. Devuelve el estado final de `_Progreso`.
+
+    `workers=1` parsea en el mismo proceso (default: Render tiene 512MB). Con más, el
+    parseo va a un ProcessPoolExecutor con a lo sumo `2 * workers` uploads en vuelo
+    (memoria acotada); la lectura del BLOB y la escritura siguen en este proceso, una
+    transacción por upload. Un upload que falla se loguea y no frena al resto.
+
+    Reanudar: sin `resync` alcanza con volver a correrlo (saltea los que ya tienen
+    filas). Con `resync`, pasar `desde_id=<marca_agua>` del último progreso.
+    """
+    session = SessionLocal()
+    try:
+        ids = list(upload_ids) if upload_ids is not None else uploads_pendientes(
+            session, resync=resync, desde_id=desde_id, limite=limite,
+        )
+        estado = _Progreso(ids, progreso)
+        logger.info("[COMP_ROWS] %d uploads a sincronizar (workers=%d, resync=%s).", len(ids), workers, resync)
+
+        def escribir(upload_id: int, filas: pd.DataFrame) -> None:
+            try:
+                n = escribir_filas(session, upload_id, filas)
+                session.commit()
+            except Exception as exc:
+                session.rollback()
+                logger.warning("[COMP_ROWS] upload %s: error al escribir — %s", upload_id, exc)
+                estado.terminar(upload_id, None)
+            else:
+                estado.terminar(upload_id, n)
+
+        if workers <= 1:
+            for upload_id in ids:
+                leido = _leer_upload(session, upload_id)
+                if leido is None:
+                    estado.terminar(upload_id, 0)
+                    continue
+                try:
+                    filas = parsear_normalizado(leido[1], leido[0])
+                except Exception as exc:
+                    logger.warning("[COMP_ROWS] upload %s: error al parsear — %s", upload_id, exc)
+                    estado.terminar(upload_id, None)
+                    continue
+                escribir(upload_id, filas)
+            return estado.estado()
+
+        en_vuelo: dict[Future, int] = {}
+
+        def drenar(hasta: int) -> None:
+            while len(en_vuelo) > hasta:
+                futuro = next(iter(en_vuelo))
+                upload_id = en_vuelo.pop(futuro)
+                try:
+                    filas = futuro.result()
+                except Exception as exc:
+                    logger.warning("[COMP_ROWS] upload %s: error al parsear — %s", upload_id, exc)
+                    estado.terminar(upload_id, None)
+                    continue
+                escribir(upload_id, filas)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for upload_id in ids:
+                leido = _leer_upload(session, upload_id)
+                # El BLOB ya viajó al proceso hijo: se suelta la referencia de la sesión.
+                session.expire_all()
+                if leido is None:
+                    estado.terminar(upload_id, 0)
+                    continue
+                en_vuelo[pool.submit(parsear_normalizado, leido[1], leido[0])] = upload_id
+                drenar(2 * workers - 1)
+            drenar(0)
+        return estado.estado()
+    finally:
+        session.close()
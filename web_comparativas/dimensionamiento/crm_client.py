@@ -8,9 +8,16 @@ Implementa el circuito probado en Postman, en este orden y por CADA envío:
   4. POST /Api/V8/module  (type=Opportunities)                -> crea la oportunidad
   5. POST /Api/V8/module  (type=KNN_BitacoraMsj)              -> deja la bitácora
 
-El token NO se cachea: se pide uno nuevo en cada envío (decisión explícita — evita
-lidiar con expiración/invalidación a cambio de un request extra por envío, que es
-despreciable frente al volumen real de envíos).
+Gateway (oct-2026): el paso 1 y el paso 2 se hacían en CADA carga de /list (token +
+lista completa de usuarios) y el paso 3 una vez por cuenta en cada modal. Ahora:
+  - el token se reutiliza hasta CRM_TOKEN_TTL_SEG (por debajo de la 1h del CRM) y, si
+    igual el CRM lo rechaza (401/403), se pide uno nuevo y se reintenta UNA vez;
+  - el directorio de usuarios vive CRM_USUARIOS_TTL_SEG y se refresca en segundo plano
+    cuando está por vencer, con un índice por usuario normalizado;
+  - las consultas de cuentas se cachean por corrida (`alcance`) y se resuelven en lotes
+    con concurrencia acotada (CRM_CONCURRENCIA) sobre una única sesión con pool.
+Todas las cachés son del proceso y se separan por entorno (base_url + modo + client_id):
+cambiar CRM_MODO nunca reutiliza datos del otro CRM.
 
 CREDENCIALES: SIEMPRE de entorno, nunca hardcodeadas. La app carga
 `web_comparativas/.env` (no el de la raíz):
@@ -26,9 +33,13 @@ import datetime as dt
 import logging
 import os
 import tempfile
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger("wc.oportunidades.crm")
 
@@ -49,6 +60,8 @@ CRM_SISTEMA_ORIGEN = "SIEM"
 MODULE_OPPORTUNITIES = "Opportunities"
 MODULE_BITACORA = "KNN_BitacoraMsj"
 
+_T = TypeVar("_T")
+
 
 class CrmError(Exception):
     """Falla del circuito de envío, clasificada para que la UI diga algo útil.
@@ -134,6 +147,43 @@ def crm_config() -> dict[str, str]:
     }
 
 
+def _segundos_env(nombre: str, default: float) -> float:
+    raw = (os.getenv(nombre) or "").strip()
+    if not raw:
+        return default
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        logger.warning("[CRM] %s='%s' no es un número; se usa %s.", nombre, raw, default)
+        return default
+
+
+def CRM_TOKEN_TTL_SEG() -> float:
+    """Vida del token cacheado. El CRM lo emite por 1h: 55 min deja margen de reloj."""
+    return _segundos_env("CRM_TOKEN_TTL_SEG", 3300.0)
+
+
+def CRM_USUARIOS_TTL_SEG() -> float:
+    """Vida del directorio de usuarios_rendidores (altas/bajas de usuarios son raras)."""
+    return _segundos_env("CRM_USUARIOS_TTL_SEG", 600.0)
+
+
+def CRM_CUENTAS_TTL_SEG() -> float:
+    """Vida de una cuenta ENCONTRADA en la caché por corrida."""
+    return _segundos_env("CRM_CUENTAS_TTL_SEG", 900.0)
+
+
+def CRM_CUENTAS_NO_ENCONTRADAS_TTL_SEG() -> float:
+    """Vida de un 'no existe'. Corta a propósito: el mensaje al usuario es "dala de alta
+    en el CRM", y después de hacerlo no puede quedar bloqueado hasta la próxima corrida."""
+    return _segundos_env("CRM_CUENTAS_NO_ENCONTRADAS_TTL_SEG", 120.0)
+
+
+def CRM_CONCURRENCIA() -> int:
+    """Consultas de cuentas simultáneas contra el CRM (y tamaño del pool de conexiones)."""
+    return max(int(_segundos_env("CRM_CONCURRENCIA", 4)), 1)
+
+
 _CRM_CA_PEM_TEMP_PATH: str | None = None
 
 
@@ -214,6 +264,11 @@ def _nueva_sesion(cfg: dict[str, Any]) -> requests.Session:
     """Sesión HTTP con la política TLS de la config aplicada a TODOS los requests."""
     sesion = requests.Session()
     sesion.verify = cfg["verify"]
+    # Pool del tamaño de la concurrencia: los hilos de `consultar_cuentas` reutilizan
+    # conexiones keep-alive (un handshake TLS por hilo, no uno por cuenta).
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=CRM_CONCURRENCIA())
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
     return sesion
 
 
@@ -391,7 +446,8 @@ def _valor(registro: dict[str, Any], claves: tuple[str, ...]) -> str | None:
 # ──────────────────────────────────────────────────────────────────────────────
 
 def obtener_token(sesion: requests.Session, cfg: dict[str, str]) -> str:
-    """POST /Api/access_token con client_credentials. Token nuevo por envío."""
+    """POST /Api/access_token con client_credentials. Siempre pide uno nuevo: el resto
+    del módulo pasa por `token_vigente`, que es el que cachea."""
     url = f"{cfg['base_url']}/Api/access_token"
     resp = _request(
         sesion, "POST", url, paso="autenticación",
@@ -426,6 +482,58 @@ def _headers(token: str) -> dict[str, str]:
     }
 
 
+def _ahora() -> float:
+    return time.monotonic()
+
+
+def _clave_entorno(cfg: dict[str, Any]) -> tuple[str, str, str]:
+    return (cfg.get("base_url") or "", cfg.get("modo") or "", cfg.get("client_id") or "")
+
+
+_tokens_lock = threading.Lock()
+_tokens: dict[tuple[str, str, str], tuple[str, float]] = {}
+
+
+def token_vigente(
+    sesion: requests.Session,
+    cfg: dict[str, str],
+    *,
+    renovar: bool = False,
+) -> str:
+    """Token del entorno, reutilizado hasta CRM_TOKEN_TTL_SEG. `renovar` fuerza uno nuevo.
+
+    Dos requests concurrentes con la caché vacía pueden pedir un token cada uno: es
+    inocuo (ambos son válidos) y evita serializar el login detrás de un lock.
+    """
+    clave = _clave_entorno(cfg)
+    if not renovar:
+        with _tokens_lock:
+            guardado = _tokens.get(clave)
+        if guardado and guardado[1] > _ahora():
+            return guardado[0]
+    token = obtener_token(sesion, cfg)
+    with _tokens_lock:
+        _tokens[clave] = (token, _ahora() + CRM_TOKEN_TTL_SEG())
+    return token
+
+
+def _con_token(
+    sesion: requests.Session,
+    cfg: dict[str, str],
+    operacion: Callable[[str], _T],
+) -> _T:
+    """Corre `operacion(token)` con el token cacheado. Si el CRM lo rechaza (revocado,
+    reinicio del CRM, reloj corrido) pide uno nuevo y reintenta UNA sola vez: un 401/403
+    significa que el CRM no procesó el request, así que repetirlo no duplica nada."""
+    try:
+        return operacion(token_vigente(sesion, cfg))
+    except CrmError as exc:
+        if exc.kind != "auth" or exc.paso == "autenticación":
+            raise
+        logger.info("[CRM] token rechazado en '%s'; se renueva y se reintenta.", exc.paso)
+        return operacion(token_vigente(sesion, cfg, renovar=True))
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Paso 2 — usuario asignado
 # ──────────────────────────────────────────────────────────────────────────────
@@ -488,6 +596,98 @@ def buscar_match_usuario(
     return None
 
 
+class DirectorioUsuarios:
+    """Snapshot de usuarios_rendidores de un entorno, con índice por usuario normalizado.
+
+    La clave es la misma normalización que `buscar_match_usuario` (parte local, minúsculas),
+    así el match por índice y el lineal dan SIEMPRE el mismo resultado.
+    """
+
+    def __init__(self, usuarios: list[dict[str, str]], cargado_en: float) -> None:
+        self.usuarios = usuarios
+        self.cargado_en = cargado_en
+        self._por_usuario: dict[str, dict[str, str]] = {}
+        for u in usuarios:
+            self._por_usuario.setdefault(_usuario_desde_email(u["usuario"]), u)
+
+    def buscar(self, email_o_usuario: str | None) -> dict[str, str] | None:
+        clave = _usuario_desde_email(email_o_usuario)
+        return self._por_usuario.get(clave) if clave else None
+
+    def match(self, email_siem: str | None) -> dict[str, str] | None:
+        """Mismo contrato que `buscar_match_usuario`, en O(1)."""
+        u = self.buscar(email_siem)
+        return {"id": u["id"], "usuario": u["usuario"], "origen": "match"} if u else None
+
+
+# A partir de esta fracción del TTL se sigue sirviendo el snapshot, pero se dispara un
+# refresco en segundo plano: /list nunca espera al CRM mientras haya datos vigentes.
+_REFRESCO_ANTICIPADO = 0.8
+
+_directorios_lock = threading.Lock()
+_directorios: dict[tuple[str, str, str], DirectorioUsuarios] = {}
+_refrescos_en_curso: set[tuple[str, str, str]] = set()
+
+
+def _cargar_directorio(cfg: dict[str, str]) -> DirectorioUsuarios:
+    with _nueva_sesion(cfg) as sesion:
+        registros = _con_token(sesion, cfg, lambda token: listar_usuarios(sesion, cfg, token))
+    directorio = DirectorioUsuarios(normalizar_usuarios(registros), _ahora())
+    with _directorios_lock:
+        _directorios[_clave_entorno(cfg)] = directorio
+    return directorio
+
+
+def _refrescar_en_segundo_plano(cfg: dict[str, str]) -> threading.Thread | None:
+    clave = _clave_entorno(cfg)
+    with _directorios_lock:
+        if clave in _refrescos_en_curso:
+            return None
+        _refrescos_en_curso.add(clave)
+
+    def tarea() -> None:
+        try:
+            _cargar_directorio(cfg)
+        except CrmError as exc:
+            logger.warning("[CRM] no se pudo refrescar usuarios_rendidores: %s", exc.mensaje)
+        finally:
+            with _directorios_lock:
+                _refrescos_en_curso.discard(clave)
+
+    hilo = threading.Thread(target=tarea, name="crm-directorio", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def directorio_usuarios(cfg: dict[str, str] | None = None) -> DirectorioUsuarios:
+    """Directorio vigente del entorno: caché, refresco en segundo plano o carga sincrónica.
+
+    Si la carga sincrónica falla y hay un snapshot vencido, se sirve ese snapshot (con
+    WARNING) en lugar de romper el modal: el envío real igual falla si el CRM está caído.
+    """
+    cfg = cfg or crm_config()
+    ttl = CRM_USUARIOS_TTL_SEG()
+    with _directorios_lock:
+        actual = _directorios.get(_clave_entorno(cfg))
+    if actual is not None:
+        edad = _ahora() - actual.cargado_en
+        if edad < ttl * _REFRESCO_ANTICIPADO:
+            return actual
+        if edad < ttl:
+            _refrescar_en_segundo_plano(cfg)
+            return actual
+    try:
+        return _cargar_directorio(cfg)
+    except CrmError as exc:
+        if actual is None:
+            raise
+        logger.warning(
+            "[CRM] usuarios_rendidores no respondió (%s); se usa el directorio de hace %.0fs.",
+            exc.mensaje, _ahora() - actual.cargado_en,
+        )
+        return actual
+
+
 def contexto_asignacion(email_siem: str | None) -> dict[str, Any]:
     """Todo lo necesario para decidir el usuario asignado, sin enviar nada.
 
@@ -497,15 +697,15 @@ def contexto_asignacion(email_siem: str | None) -> dict[str, Any]:
     envía no eligió es exactamente lo que esto evita.
     """
     cfg = crm_config()
-    with _nueva_sesion(cfg) as sesion:
-        token = obtener_token(sesion, cfg)
-        usuarios = normalizar_usuarios(listar_usuarios(sesion, cfg, token))
+    directorio = directorio_usuarios(cfg)
+    # Copias: el router filtra/extiende la lista y no puede tocar el snapshot compartido.
+    usuarios = [dict(u) for u in directorio.usuarios]
     sugerido = (cfg.get("usuario_fallback_id") or "").strip() or None
     if sugerido and not any(u["id"] == sugerido for u in usuarios):
         logger.warning("[CRM] CRM_USUARIO_FALLBACK_ID=%s no está en usuarios_rendidores.", sugerido)
         sugerido = None
     return {
-        "match": buscar_match_usuario(usuarios, email_siem),
+        "match": directorio.match(email_siem),
         "usuarios": usuarios,
         "sugerido_id": sugerido,
     }
@@ -573,38 +773,141 @@ def buscar_cuenta_id(
     return str(buscar_cuenta(sesion, cfg, token, n_cuenta)["id"])
 
 
+def _resultado_cuenta(
+    sesion: requests.Session,
+    cfg: dict[str, str],
+    token: str,
+    number: str,
+) -> dict[str, Any]:
+    """Una cuenta -> resultado serializable. Nunca lanza: el error queda en el dict."""
+    try:
+        account = buscar_cuenta(sesion, cfg, token, number)
+    except CrmError as exc:
+        if exc.kind == "cuenta_no_encontrada":
+            return {"exists": False}
+        return {
+            "exists": None, "error": exc.mensaje, "kind": exc.kind,
+            "reintentable": exc.reintentable,
+        }
+    return {
+        "exists": True,
+        "crm_account_id": account["id"],
+        "crm_nombre": account.get("name"),
+        "crm_numero_cuenta": account.get("n_cuenta_c"),
+        "crm_cuit": account.get("cuit"),
+        "crm_razon_social": account.get("razon_social"),
+        "crm_documento": account.get("documento"),
+    }
+
+
+def _consultar_lote(
+    sesion: requests.Session,
+    cfg: dict[str, str],
+    numeros: list[str],
+) -> dict[str, dict[str, Any]]:
+    """Resuelve `numeros` con hasta CRM_CONCURRENCIA hilos sobre la MISMA sesión.
+
+    Si alguna consulta vuelve con `auth` (token cacheado que el CRM ya no acepta), se
+    renueva el token una vez y se repiten solo esas.
+    """
+    def correr(token: str, lote: list[str]) -> dict[str, dict[str, Any]]:
+        hilos = min(CRM_CONCURRENCIA(), len(lote))
+        if hilos <= 1:
+            return {n: _resultado_cuenta(sesion, cfg, token, n) for n in lote}
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="crm-cuentas") as pool:
+            return dict(zip(lote, pool.map(lambda n: _resultado_cuenta(sesion, cfg, token, n), lote)))
+
+    if not numeros:
+        return {}
+    results = correr(token_vigente(sesion, cfg), numeros)
+    rechazadas = [n for n, r in results.items() if r.get("kind") == "auth"]
+    if rechazadas:
+        logger.info("[CRM] token rechazado al consultar cuentas; se renueva y se reintenta.")
+        results.update(correr(token_vigente(sesion, cfg, renovar=True), rechazadas))
+    return results
+
+
+# Caché por corrida de las consultas de cuentas: {entorno: (alcance, {numero: (resultado,
+# vence)})}. Solo se guarda el alcance vigente de cada entorno; una corrida nueva descarta
+# la anterior entera. Los errores (exists=None) no se cachean nunca.
+_cuentas_lock = threading.Lock()
+_cuentas_cache: dict[tuple[str, str, str], tuple[str, dict[str, tuple[dict[str, Any], float]]]] = {}
+
+
+def _cuentas_cacheadas(cfg: dict[str, str], alcance: str, numeros: list[str]) -> dict[str, dict[str, Any]]:
+    ahora = _ahora()
+    with _cuentas_lock:
+        guardado = _cuentas_cache.get(_clave_entorno(cfg))
+        if guardado is None or guardado[0] != alcance:
+            return {}
+        entradas = guardado[1]
+        return {
+            n: dict(entradas[n][0]) for n in numeros
+            if n in entradas and entradas[n][1] > ahora
+        }
+
+
+def _guardar_cuentas(cfg: dict[str, str], alcance: str, results: dict[str, dict[str, Any]]) -> None:
+    ahora = _ahora()
+    ttl_si, ttl_no = CRM_CUENTAS_TTL_SEG(), CRM_CUENTAS_NO_ENCONTRADAS_TTL_SEG()
+    with _cuentas_lock:
+        clave = _clave_entorno(cfg)
+        guardado = _cuentas_cache.get(clave)
+        if guardado is None or guardado[0] != alcance:
+            guardado = (alcance, {})
+            _cuentas_cache[clave] = guardado
+        for number, result in results.items():
+            if result.get("exists") is True:
+                guardado[1][number] = (dict(result), ahora + ttl_si)
+            elif result.get("exists") is False:
+                guardado[1][number] = (dict(result), ahora + ttl_no)
+
+
 def consultar_cuentas(
-    numeros: list[str], *, detener_si_primera_existe: bool = False,
+    numeros: list[str],
+    *,
+    detener_si_primera_existe: bool = False,
+    alcance: str | None = None,
 ) -> dict[str, Any]:
-    """Valida varias cuentas con una sola sesion/token, sin crear registros."""
+    """Valida varias cuentas con una sola sesion/token, sin crear registros.
+
+    Con `detener_si_primera_existe` se consulta primero la cuenta original y, solo si no
+    existe, el resto en paralelo. `alcance` (p.ej. "run:42") habilita la caché por
+    corrida; sin alcance todo sale del CRM en el momento.
+    """
     cfg = crm_config()
     unique = list(dict.fromkeys(str(value).strip() for value in numeros if str(value).strip()))
-    results: dict[str, dict[str, Any]] = {}
-    with _nueva_sesion(cfg) as session:
-        token = obtener_token(session, cfg)
-        for number in unique:
-            try:
-                account = buscar_cuenta(session, cfg, token, number)
-                results[number] = {
-                    "exists": True,
-                    "crm_account_id": account["id"],
-                    "crm_nombre": account.get("name"),
-                    "crm_numero_cuenta": account.get("n_cuenta_c"),
-                    "crm_cuit": account.get("cuit"),
-                    "crm_razon_social": account.get("razon_social"),
-                    "crm_documento": account.get("documento"),
-                }
-                if detener_si_primera_existe and number == unique[0]:
-                    break
-            except CrmError as exc:
-                if exc.kind == "cuenta_no_encontrada":
-                    results[number] = {"exists": False}
-                else:
-                    results[number] = {
-                        "exists": None, "error": exc.mensaje, "kind": exc.kind,
-                        "reintentable": exc.reintentable,
-                    }
-    return {"crm_modo": cfg["modo"], "results": results}
+    results = _cuentas_cacheadas(cfg, alcance, unique) if alcance is not None else {}
+
+    def respuesta(numeros_salida: list[str]) -> dict[str, Any]:
+        return {"crm_modo": cfg["modo"], "results": {n: results[n] for n in numeros_salida if n in results}}
+
+    if detener_si_primera_existe and unique and results.get(unique[0], {}).get("exists"):
+        return respuesta(unique[:1])
+    pendientes = [n for n in unique if n not in results]
+    if pendientes:
+        nuevos: dict[str, dict[str, Any]] = {}
+        with _nueva_sesion(cfg) as session:
+            if detener_si_primera_existe and pendientes[0] == unique[0]:
+                nuevos.update(_consultar_lote(session, cfg, pendientes[:1]))
+                pendientes = [] if nuevos[unique[0]].get("exists") else pendientes[1:]
+            nuevos.update(_consultar_lote(session, cfg, pendientes))
+        results.update(nuevos)
+        if alcance is not None:
+            _guardar_cuentas(cfg, alcance, nuevos)
+    if detener_si_primera_existe and unique and results.get(unique[0], {}).get("exists"):
+        return respuesta(unique[:1])
+    return respuesta(unique)
+
+
+def limpiar_caches() -> None:
+    """Vacía token, directorio y cuentas de todos los entornos (tests / cambio de credenciales)."""
+    with _tokens_lock:
+        _tokens.clear()
+    with _directorios_lock:
+        _directorios.clear()
+    with _cuentas_lock:
+        _cuentas_cache.clear()
 
 def _crear_registro(
     sesion: requests.Session,
@@ -802,19 +1105,21 @@ def enviar_oportunidad(
 
     assigned_user_id = asignado["id"]
     with _nueva_sesion(cfg) as sesion:
-        token = obtener_token(sesion, cfg)
-        account_id = crm_account_id_validado or buscar_cuenta_id(sesion, cfg, token, n_cuenta)
-
-        crm_id = crear_oportunidad(
-            sesion, cfg, token,
-            nombre=nombre,
-            assigned_user_id=assigned_user_id,
-            account_id=account_id,
-            amount=amount,
-            description=description,
-            id_sistema_origen=id_sistema_origen,
-            date_closed=fecha_cierre_tentativa(),
-        )
+        def alta(token: str) -> tuple[str, str, str]:
+            account_id = crm_account_id_validado or buscar_cuenta_id(sesion, cfg, token, n_cuenta)
+            crm_id = crear_oportunidad(
+                sesion, cfg, token,
+                nombre=nombre,
+                assigned_user_id=assigned_user_id,
+                account_id=account_id,
+                amount=amount,
+                description=description,
+                id_sistema_origen=id_sistema_origen,
+                date_closed=fecha_cierre_tentativa(),
+            )
+            return token, account_id, crm_id
+
+        token, account_id, crm_id = _con_token(sesion, cfg, alta)
 
         bitacora_id: str | None = None
         bitacora_error: str | None = None
@@ -22,6 +22,11 @@ Solución: resolución DETERMINISTA anclada en CUIT (order-independent, auditabl
 La prioridad nivel 1 > nivel 3 resuelve el caso Sanatorio Argentino (dos CUITs, mismo
 nombre canónico) sin guard de CUIT ni dependencia del orden de iteración.
 
+Claves persistentes (oct-2026): la entidad_key de cada CUIT y de cada nombre huérfano
+se guarda en `dimensionamiento_identidad_claves` y se conserva entre corridas. La ingesta
+resuelve en modo INCREMENTAL (solo lo no visto antes) y aplica records con un JOIN contra
+esa tabla; el modo completo queda para auditorías (backfill --completo).
+
 Números de referencia validados contra la base local (run 7, 364.887 filas):
   Flag test OFF: 256 entidades = 158 Sí + 98 No | 186 anclas · 117 adjuntadas · 70 propias · 0 ambiguas
   Flag test ON:  254 = 157 + 97
@@ -136,11 +141,35 @@ class ResolveResult:
     stats: dict[str, int] = field(default_factory=dict)
 
 
-def resolve_entities(session: Session, import_run_id: int, *, exclude_test: bool | None = None) -> ResolveResult:
-    """Ejecuta la resolución determinista. Solo lectura; no escribe nada."""
+def _cargar_claves(session: Session) -> tuple[dict[str, int], dict[str, int]]:
+    """Claves persistentes (ver DimensionamientoIdentidadClave): (cuit→key, nombre→key)."""
+    cuit_claves: dict[str, int] = {}
+    ori_claves: dict[str, int] = {}
+    for tipo, valor, key in session.execute(
+        text("SELECT tipo, valor, entidad_key FROM dimensionamiento_identidad_claves")
+    ):
+        (cuit_claves if tipo == "cuit" else ori_claves)[valor] = int(key)
+    return cuit_claves, ori_claves
+
+
+def resolve_entities(
+    session: Session, import_run_id: int, *, exclude_test: bool | None = None, incremental: bool = False
+) -> ResolveResult:
+    """Ejecuta la resolución determinista. Solo lectura; no escribe nada.
+
+    Claves ESTABLES entre corridas (oct-2026): los CUITs y nombres huérfanos que ya están
+    en `dimensionamiento_identidad_claves` conservan su entidad_key; solo los nuevos
+    reciben una (a partir de la máxima conocida, mismo orden que antes). Con la tabla
+    vacía la numeración es idéntica a la histórica (anclas 0..N, después propias).
+
+    incremental=True: los nombres huérfanos ya conocidos NO se vuelven a matchear (se
+    usa su clave persistida); solo los nuevos pasan por los 3 niveles. incremental=False
+    (auditoría) re-matchea todo desde cero y reporta en stats["reasignadas"] cuántos
+    nombres cambiarían de entidad. Si el modo incremental rompe el invariante 1:1, se
+    reintenta completo.
+    """
     if exclude_test is None:
         exclude_test = test_names_enabled()
-    test_canon = {canon(t) for t in _TEST_ORIGINAL_NAMES}
 
     rows = session.execute(
         text(
@@ -155,6 +184,28 @@ def resolve_entities(session: Session, import_run_id: int, *, exclude_test: bool
         ),
         {"run": import_run_id},
     ).all()
+    claves = _cargar_claves(session)
+    if incremental:
+        try:
+            return _resolver(import_run_id, rows, claves, exclude_test=exclude_test, incremental=True)
+        except ValueError:
+            logger.warning(
+                "[DIM][IDENTITY] run=%s: el modo incremental rompe el invariante 1:1; se resuelve completo.",
+                import_run_id,
+            )
+    return _resolver(import_run_id, rows, claves, exclude_test=exclude_test, incremental=False)
+
+
+def _resolver(
+    import_run_id: int,
+    rows: list,
+    claves: tuple[dict[str, int], dict[str, int]],
+    *,
+    exclude_test: bool,
+    incremental: bool,
+) -> ResolveResult:
+    test_canon = {canon(t) for t in _TEST_ORIGINAL_NAMES}
+    cuit_claves, ori_claves = claves
 
     # PASO 1 — anclas por CUIT / recolección de huérfanos (filas sin CUIT)
     anchor_rows: dict[str, list[tuple]] = defaultdict(list)   # cuit → filas
@@ -169,27 +220,45 @@ def resolve_entities(session: Session, import_run_id: int, *, exclude_test: bool
         else:
             orphan_rows[o].append(row)
 
-    # Índices de matching de las anclas
+    # Claves: anclas por CUIT (ordenadas), luego propias por nombre (ordenadas). Las ya
+    # persistidas se conservan; las nuevas siguen a la máxima conocida.
+    next_key = max([*cuit_claves.values(), *ori_claves.values()], default=-1) + 1
+    claves_nuevas = 0
+    cuit_to_key: dict[str, int] = {}
+    for cu in sorted(anchor_rows):
+        k = cuit_claves.get(cu)
+        if k is None:
+            k = next_key
+            next_key += 1
+            claves_nuevas += 1
+        cuit_to_key[cu] = k
+    anchor_keys = set(cuit_to_key.values())
+    claves_de_cuit = anchor_keys | set(cuit_claves.values())
+
+    # Índices de matching de las anclas (solo si hay algún nombre que matchear)
     idx_exact: dict[str, set[str]] = defaultdict(set)
     idx_canon_ori: dict[str, set[str]] = defaultdict(set)
     idx_canon_hom: dict[str, set[str]] = defaultdict(set)
-    for cu, rs in anchor_rows.items():
-        for hom, o, visible, prov, n in rs:
-            idx_exact[o].add(cu)
-            if canon(o):
-                idx_canon_ori[canon(o)].add(cu)
-            if not _is_sin_dato(hom):
-                idx_canon_hom[canon(hom)].add(cu)
-
-    # Claves estables: anclas por CUIT (ordenadas), luego propias por nombre (ordenadas).
-    # entidad_key = índice determinista → estable entre corridas para los mismos datos.
-    cuit_to_key: dict[str, int] = {cu: i for i, cu in enumerate(sorted(anchor_rows))}
+    a_matchear = [name for name in sorted(orphan_rows) if not (incremental and name in ori_claves)]
+    if a_matchear:
+        for cu, rs in anchor_rows.items():
+            for hom, o, visible, prov, n in rs:
+                idx_exact[o].add(cu)
+                if canon(o):
+                    idx_canon_ori[canon(o)].add(cu)
+                if not _is_sin_dato(hom):
+                    idx_canon_hom[canon(hom)].add(cu)
 
     # PASO 2 — adjuntar huérfanos por prioridad estricta
     ambiguous: list[dict[str, Any]] = []
-    orphan_name_to_cuit: dict[str, str] = {}
-    own_names: list[str] = []
+    orphan_name_to_key: dict[str, int] = {}
+    usadas = set(anchor_keys)
+    reasignadas = 0
     for name in sorted(orphan_rows):
+        if incremental and name in ori_claves:
+            orphan_name_to_key[name] = ori_claves[name]
+            usadas.add(ori_claves[name])
+            continue
         target_cuit = None
         for level, idx in ((1, idx_exact), (2, idx_canon_ori), (3, idx_canon_hom)):
             key = name if level == 1 else canon(name)
@@ -200,29 +269,27 @@ def resolve_entities(session: Session, import_run_id: int, *, exclude_test: bool
             if len(matches) > 1:
                 ambiguous.append({"nombre": name, "nivel": level, "anclas": sorted(matches)})
         if target_cuit is not None:
-            orphan_name_to_cuit[name] = target_cuit
+            k = cuit_to_key[target_cuit]
         else:
-            own_names.append(name)
-
-    # claves de entidades propias, después de las anclas
-    next_key = len(cuit_to_key)
-    own_name_to_key: dict[str, int] = {}
-    for name in own_names:  # ya ordenado
-        own_name_to_key[name] = next_key
-        next_key += 1
+            # Entidad propia: conserva su clave si sigue siendo suya (no la de un CUIT al
+            # que estaba adjuntado ni la de otra entidad de esta corrida).
+            k = ori_claves.get(name)
+            if k is None or k in usadas or k in claves_de_cuit:
+                k = next_key
+                next_key += 1
+                if name not in ori_claves:
+                    claves_nuevas += 1
+            usadas.add(k)
+        if name in ori_claves and ori_claves[name] != k:
+            reasignadas += 1
+        orphan_name_to_key[name] = k
 
     # Consolidar filas por entidad
     ent_rows: dict[int, list[tuple]] = defaultdict(list)
     for cu, rs in anchor_rows.items():
         ent_rows[cuit_to_key[cu]].extend(rs)
-    orphan_name_to_key: dict[str, int] = {}
     for name, rs in orphan_rows.items():
-        if name in orphan_name_to_cuit:
-            k = cuit_to_key[orphan_name_to_cuit[name]]
-        else:
-            k = own_name_to_key[name]
-        orphan_name_to_key[name] = k
-        ent_rows[k].extend(rs)
+        ent_rows[orphan_name_to_key[name]].extend(rs)
 
     # PASO 3 — clasificación + nombre visible + provincia dominante + mapa visible→key
     entities: list[ClientEntity] = []
@@ -287,14 +354,17 @@ def resolve_entities(session: Session, import_run_id: int, *, exclude_test: bool
     _log_defensive_checks(entities, exclude_test)
 
     stats = {
+        "modo": "incremental" if incremental else "completo",
         "anclas": len(cuit_to_key),
-        "adjuntadas": len(orphan_name_to_cuit),
-        "propias": len(own_name_to_key),
+        "adjuntadas": sum(1 for k in orphan_name_to_key.values() if k in anchor_keys),
+        "propias": sum(1 for k in orphan_name_to_key.values() if k not in anchor_keys),
         "total": len(entities),
         "si": sum(1 for e in entities if e.es_cliente),
         "no": sum(1 for e in entities if not e.es_cliente),
         "ambiguas": len(ambiguous),
         "filas": sum(e.total_registros for e in entities),
+        "claves_nuevas": claves_nuevas,
+        "reasignadas": reasignadas,
     }
     logger.info("[DIM][IDENTITY] resolución run=%s exclude_test=%s stats=%s", import_run_id, exclude_test, stats)
     if ambiguous:
@@ -334,29 +404,64 @@ def _log_defensive_checks(entities: list[ClientEntity], exclude_test: bool) -> N
                     )
 
 
+def _guardar_claves(session: Session, import_run_id: int, result: ResolveResult) -> None:
+    """Upsert de las claves de la corrida en `dimensionamiento_identidad_claves`.
+
+    Marca `ultimo_run_id` en TODAS las claves que usa la corrida (es lo que acota el JOIN
+    de records) y, en modo completo, corrige la entidad de los nombres reasignados.
+    """
+    now = dt.datetime.utcnow()
+    filas = [
+        {"tipo": "cuit", "valor": cu, "key": k, "run": import_run_id, "ts": now}
+        for cu, k in result.cuit_to_key.items()
+    ] + [
+        {"tipo": "ori", "valor": name, "key": k, "run": import_run_id, "ts": now}
+        for name, k in result.orphan_name_to_key.items()
+    ]
+    if not filas:
+        return
+    session.execute(
+        text(
+            "INSERT INTO dimensionamiento_identidad_claves "
+            "(tipo, valor, entidad_key, primer_run_id, ultimo_run_id, created_at, updated_at) "
+            "VALUES (:tipo, :valor, :key, :run, :run, :ts, :ts) "
+            "ON CONFLICT (tipo, valor) DO UPDATE SET "
+            " entidad_key = excluded.entidad_key, ultimo_run_id = excluded.ultimo_run_id, "
+            " updated_at = excluded.updated_at"
+        ),
+        filas,  # executemany
+    )
+
+
 def persist_records_and_registry(
-    session: Session, import_run_id: int, *, exclude_test: bool | None = None, commit: bool = True
+    session: Session,
+    import_run_id: int,
+    *,
+    exclude_test: bool | None = None,
+    commit: bool = True,
+    incremental: bool = True,
 ) -> dict[str, int]:
     """Resuelve y persiste la parte PESADA: registry + records.cliente_entidad_id.
 
     SETEADO, no por loop. El resolvedor (Python) YA decidió la asignación por prioridad
-    (cuit → exacto → canon(original) → canon(homologado)); acá el SQL SOLO la APLICA:
-    los mapeos cuit→entidad y nombre_original→entidad se cargan en tablas TEMP y se aplican
-    con 2 `UPDATE ... FROM` (una pasada cada uno) en vez de ~373 sentencias. Esto evita el
-    statement_timeout de 55s de Postgres que cancelaba el loop.
+    (cuit → exacto → canon(original) → canon(homologado)); acá el SQL SOLO la APLICA.
+
+    Desde oct-2026 los mapeos cuit→entidad y nombre_original→entidad viven en la tabla
+    persistente `dimensionamiento_identidad_claves` (se upsertean junto con el registry),
+    así que records se actualiza con 2 `UPDATE ... FROM` contra esa tabla, sin TEMP, y
+    escribiendo SOLO las filas cuya entidad cambió (con upsert de ingesta, casi ninguna).
+    incremental=True (default de la ingesta) solo resuelve CUITs/nombres no vistos antes;
+    False re-matchea todo (auditoría / --completo del backfill). Ver resolve_entities.
 
-    Las TEMP son por-conexión y viven dentro de UNA sola transacción (se crean, pueblan y
-    aplican sin commit intermedio), así no cruzan un commit ni el cambio de conexión del
-    pool, y dos backfills simultáneos no colisionan. Con commit=True hay commits POR FASE
-    (registry, records) para que el progreso parcial sobreviva; con commit=False (finalize)
-    todo va en la transacción del llamador.
+    Con commit=True hay commits POR FASE (registry+claves, records) para que el progreso
+    parcial sobreviva; con commit=False (finalize) todo va en la transacción del llamador.
 
     NO toca el summary (eso lo hace ensure_entidad_columns_populated / capa A).
     """
-    result = resolve_entities(session, import_run_id, exclude_test=exclude_test)
+    result = resolve_entities(session, import_run_id, exclude_test=exclude_test, incremental=incremental)
     now = dt.datetime.utcnow()
 
-    # ── Fase 1: registry (reemplazo total, INSERT por lotes) ──
+    # ── Fase 1: registry (reemplazo total, INSERT por lotes) + claves persistentes ──
     _set_unlimited_timeout(session)
     session.execute(
         text("DELETE FROM dimensionamiento_cliente_entidad WHERE import_run_id = :run"),
@@ -380,48 +485,41 @@ def persist_records_and_registry(
             ),
             registry_rows,  # executemany
         )
+    _guardar_claves(session, import_run_id, result)
     if commit:
         session.commit()
 
-    # ── Fase 2: records.cliente_entidad_id (SETEADO, TEMP confinadas a esta transacción) ──
+    # ── Fase 2: records.cliente_entidad_id (JOIN contra las claves de esta corrida) ──
     _set_unlimited_timeout(session)
-    # DROP IF EXISTS por si una corrida previa dejó residuo en una conexión reutilizada.
-    session.execute(text("DROP TABLE IF EXISTS _dim_cuit_map"))
-    session.execute(text("DROP TABLE IF EXISTS _dim_ori_map"))
-    session.execute(text("CREATE TEMP TABLE _dim_cuit_map (cuit TEXT PRIMARY KEY, eid INTEGER)"))
-    session.execute(text("CREATE TEMP TABLE _dim_ori_map (name TEXT PRIMARY KEY, eid INTEGER)"))
-    cuit_rows = [{"cuit": cu, "eid": k} for cu, k in result.cuit_to_key.items()]
-    ori_rows = [{"name": name, "eid": k} for name, k in result.orphan_name_to_key.items()]
-    if cuit_rows:
-        session.execute(text("INSERT INTO _dim_cuit_map (cuit, eid) VALUES (:cuit, :eid)"), cuit_rows)
-    if ori_rows:
-        session.execute(text("INSERT INTO _dim_ori_map (name, eid) VALUES (:name, :eid)"), ori_rows)
-
+    distinta = (
+        "AND (dimensionamiento_records.cliente_entidad_id IS NULL "
+        "     OR dimensionamiento_records.cliente_entidad_id <> k.entidad_key)"
+    )
     # Anclas por CUIT (una sola pasada). Aplica el mapeo ya resuelto por igualdad de cuit.
     session.execute(
         text(
-            "UPDATE dimensionamiento_records SET cliente_entidad_id = _dim_cuit_map.eid "
-            "FROM _dim_cuit_map "
+            "UPDATE dimensionamiento_records SET cliente_entidad_id = k.entidad_key "
+            "FROM dimensionamiento_identidad_claves k "
             "WHERE dimensionamiento_records.import_run_id = :run "
-            "AND dimensionamiento_records.cuit = _dim_cuit_map.cuit"
+            "AND k.tipo = 'cuit' AND k.ultimo_run_id = :run "
+            "AND dimensionamiento_records.cuit = k.valor " + distinta
         ),
         {"run": import_run_id},
     )
-    # Huérfanos (filas SIN cuit) por nombre original EXACTO. El mapeo orphan_name_to_key ya
-    # codifica la prioridad de 3 niveles del resolvedor; acá solo se aplica por igualdad.
+    # Huérfanos (filas SIN cuit) por nombre original EXACTO. El mapeo ya codifica la
+    # prioridad de 3 niveles del resolvedor; acá solo se aplica por igualdad.
     session.execute(
         text(
-            "UPDATE dimensionamiento_records SET cliente_entidad_id = _dim_ori_map.eid "
-            "FROM _dim_ori_map "
+            "UPDATE dimensionamiento_records SET cliente_entidad_id = k.entidad_key "
+            "FROM dimensionamiento_identidad_claves k "
             "WHERE dimensionamiento_records.import_run_id = :run "
+            "AND k.tipo = 'ori' AND k.ultimo_run_id = :run "
             "AND (dimensionamiento_records.cuit IS NULL OR TRIM(dimensionamiento_records.cuit) = '' "
             "     OR UPPER(TRIM(dimensionamiento_records.cuit)) = :sin) "
-            "AND COALESCE(dimensionamiento_records.cliente_nombre_original, '') = _dim_ori_map.name"
+            "AND COALESCE(dimensionamiento_records.cliente_nombre_original, '') = k.valor " + distinta
         ),
         {"run": import_run_id, "sin": _SIN_DATO},
     )
-    session.execute(text("DROP TABLE IF EXISTS _dim_cuit_map"))
-    session.execute(text("DROP TABLE IF EXISTS _dim_ori_map"))
     if commit:
         session.commit()
 
@@ -524,9 +622,17 @@ def ensure_entidad_columns_populated(session: Session, import_run_id: int, *, co
     return missing
 
 
-def rebuild_client_entities(session: Session, import_run_id: int, *, exclude_test: bool | None = None, commit: bool = True) -> dict[str, int]:
-    """Backfill completo (para script/one-off): records+registry (pesado) + summary (C)."""
-    stats = persist_records_and_registry(session, import_run_id, exclude_test=exclude_test, commit=False)
+def rebuild_client_entities(
+    session: Session, import_run_id: int, *, exclude_test: bool | None = None, commit: bool = True,
+    incremental: bool = True,
+) -> dict[str, int]:
+    """Backfill completo (para script/one-off): records+registry (pesado) + summary (C).
+
+    incremental=False re-matchea todos los nombres (auditoría); las claves siguen estables.
+    """
+    stats = persist_records_and_registry(
+        session, import_run_id, exclude_test=exclude_test, commit=False, incremental=incremental,
+    )
     ensure_entidad_columns_populated(session, import_run_id, commit=False)
     if commit:
         session.commit()
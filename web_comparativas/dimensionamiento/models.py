@@ -204,6 +204,14 @@ class OportunidadSummary(Base):
     # Identidad de la oportunidad
     codigo_articulo = Column(String(120), nullable=False, index=True)
     cliente_visible = Column(Text, nullable=True, index=True)
+    # Identidad ESTABLE persistida (`oportunidades.opportunity_stable_id`), la misma que
+    # `crm_envios.oportunidad_id` y `oportunidad_asignaciones_manuales.oportunidad_id`.
+    # Permite excluir enviadas y aplicar asignaciones manuales como predicado SQL en el
+    # listado paginado. Nullable: las filas previas se completan al primer listado.
+    oportunidad_id = Column(String(40), nullable=True, index=True)
+    # Huella del contenido calculado (`oportunidades.huella_oportunidad`): el rebuild
+    # incremental conserva la fila si el par dio exactamente lo mismo (oct-2026).
+    huella = Column(String(16), nullable=True)
     cuit = Column(String(32), nullable=True)
     # Nº de cuenta de FUSION del cliente (dataset: columna `cuenta_interna`). Es la clave
     # con la que el CRM resuelve la cuenta (`Cuentas_por_numero_fusion?n_cuenta_c=`), NO
@@ -463,3 +471,27 @@ class DimensionamientoClienteEntidad(Base):
         UniqueConstraint("import_run_id", "entidad_key", name="uq_dim_cliente_entidad_run_key"),
         Index("ix_dim_cliente_entidad_run_cli", "import_run_id", "es_cliente"),
     )
+
+
+class DimensionamientoIdentidadClave(Base):
+    """Claves de entidad PERSISTENTES entre corridas (oct-2026).
+
+    Una fila por CUIT ancla (`tipo='cuit'`) y por nombre original huérfano
+    (`tipo='ori'`, filas sin CUIT) ya resuelto alguna vez, con la `entidad_key` que se le
+    asignó. El resolvedor incremental solo resuelve lo que NO está acá, y
+    `records.cliente_entidad_id` se aplica con un JOIN contra esta tabla. Ver identity.py.
+    """
+    __tablename__ = "dimensionamiento_identidad_claves"
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String(8), nullable=False)             # 'cuit' | 'ori'
+    valor = Column(Text, nullable=False)                 # CUIT (trim) o nombre original exacto
+    entidad_key = Column(Integer, nullable=False, index=True)
+    primer_run_id = Column(Integer, nullable=True)
+    ultimo_run_id = Column(Integer, nullable=True, index=True)  # último run que la usó
+    created_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("tipo", "valor", name="uq_dim_identidad_clave_tipo_valor"),
+    )
@@ -20,10 +20,11 @@ import hashlib
 import logging
 import os
 import statistics
-from collections import defaultdict
 from typing import Any
 
-from sqlalchemy import case, delete, func, select
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, case, delete, func, literal, select
 from sqlalchemy.orm import Session
 
 from web_comparativas.models import IS_POSTGRES
@@ -156,7 +157,7 @@ def opportunity_stable_id(cliente_visible: str | None, codigo_articulo: str | No
     """ID estable y determinístico de una oportunidad (control de duplicados en CRM).
 
     Es sha1(cliente_visible | codigo_articulo) normalizado (16 hex). Coincide con el
-    GRANO del motor (la clave del dict `pares`), por lo que es el mismo entre corridas.
+    GRANO del motor (la clave cliente+codigo de `pares`), por lo que es el mismo entre corridas.
     DELIBERADAMENTE NO incluye:
       - cuit / unidad_negocio: son atributos del renglón más reciente del par → pueden
         driftear entre recálculos; cuit además es nullable.
@@ -280,11 +281,122 @@ def _detectar_ultimo_mes_completo(session: Session, run_id: int) -> dict[str, An
     }
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Agregaciones set-based (SQL) — oct-2026
+#
+# Antes: dos pases que traían CADA renglón de la ventana a Python y acumulaban en
+# dicts de defaultdict por par. Ahora la base devuelve directamente la MATRIZ MENSUAL
+# por par (una fila por cliente+codigo+mes, ya sumada) y el renglón representativo
+# por ROW_NUMBER(); el resto (medianas, tipo, actividad, filtros) es pandas por columna.
+# ──────────────────────────────────────────────────────────────────────────────
+
+_COLS_PAR = ["cliente_visible", "codigo_articulo"]
+
+
+def _par_valido(R) -> tuple:
+    return (
+        R.codigo_articulo.is_not(None),
+        R.codigo_articulo != "",
+        R.cliente_visible.is_not(None),
+        R.cliente_visible != "",
+    )
+
+
+def _pares_no_participo(run_id: int, window_start: dt.date, window_end: dt.date):
+    """Universo de pares = pares con al menos un renglón NO_PARTICIPO en la ventana."""
+    R = DimensionamientoRecord
+    return (
+        select(R.cliente_visible, R.codigo_articulo)
+        .where(R.import_run_id == run_id)
+        .where(R.resultado_participacion == ESTADO_NO_PARTICIPO)
+        .where(R.fecha >= window_start)
+        .where(R.fecha < window_end)
+        .where(*_par_valido(R))
+        .distinct()
+        .subquery("pares_np")
+    )
+
+
+def _join_pares(pares):
+    R = DimensionamientoRecord
+    return and_(
+        pares.c.cliente_visible == R.cliente_visible,
+        pares.c.codigo_articulo == R.codigo_articulo,
+    )
+
+
+def _matriz_mensual(
+    session: Session, run_id: int, window_start: dt.date, window_end: dt.date,
+) -> pd.DataFrame:
+    """Una fila por (cliente, codigo, mes) de la ventana, solo para pares NO_PARTICIPO.
+
+    np_cant/np_val: sumas NO_PARTICIPO (monto recuperable); cli_cant: suma de TODOS los
+    estados (recurrencia real del cliente); ultima: fecha más reciente del mes.
+    """
+    R = DimensionamientoRecord
+    pares = _pares_no_participo(run_id, window_start, window_end)
+    es_np = R.resultado_participacion == ESTADO_NO_PARTICIPO
+    cantidad = func.coalesce(R.cantidad_demandada, 0.0)
+    mes = _month_label_expr(R.fecha)
+    stmt = (
+        select(
+            R.cliente_visible,
+            R.codigo_articulo,
+            mes,
+            func.sum(case((es_np, cantidad), else_=0.0)),
+            func.sum(case((es_np, func.coalesce(R.valorizacion_estimada, 0.0)), else_=0.0)),
+            func.sum(cantidad),
+            func.max(R.fecha),
+        )
+        .join(pares, _join_pares(pares))
+        .where(R.import_run_id == run_id)
+        .where(R.fecha >= window_start)
+        .where(R.fecha < window_end)
+        .group_by(R.cliente_visible, R.codigo_articulo, mes)
+    )
+    return pd.DataFrame(
+        session.execute(stmt).all(),
+        columns=[*_COLS_PAR, "mes", "np_cant", "np_val", "cli_cant", "ultima"],
+    )
+
+
+_COLS_ATRIBUTOS = [
+    "cuit", "cuenta_interna", "provincia", "producto_nombre_original",
+    "descripcion_articulo", "familia", "unidad_negocio", "plataforma", "is_identified",
+]
+
+
+def _atributos_representativos(
+    session: Session, run_id: int, window_start: dt.date, window_end: dt.date,
+) -> pd.DataFrame:
+    """Renglón más reciente de cada par (cualquier estado). Empate de fecha: mayor id,
+    que es el último que veía el recorrido fila a fila de antes."""
+    R = DimensionamientoRecord
+    pares = _pares_no_participo(run_id, window_start, window_end)
+    orden = func.row_number().over(
+        partition_by=(R.cliente_visible, R.codigo_articulo),
+        order_by=(R.fecha.desc(), R.id.desc()),
+    ).label("rn")
+    ranked = (
+        select(R.cliente_visible, R.codigo_articulo, *[getattr(R, c) for c in _COLS_ATRIBUTOS], orden)
+        .join(pares, _join_pares(pares))
+        .where(R.import_run_id == run_id)
+        .where(R.fecha >= window_start)
+        .where(R.fecha < window_end)
+        .subquery("ranked")
+    )
+    columnas = [*_COLS_PAR, *_COLS_ATRIBUTOS]
+    stmt = select(*[ranked.c[c] for c in columnas]).where(ranked.c.rn == 1)
+    return pd.DataFrame(session.execute(stmt).all(), columns=columnas)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Cálculo de efectividad por codigo_articulo (histórico completo del run)
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _efectividad_por_codigo(session: Session, run_id: int) -> dict[str, dict[str, Any]]:
+def _efectividad_por_codigo(session: Session, run_id: int, codigos=None) -> dict[str, dict[str, Any]]:
+    """`codigos` (selectable de una columna, opcional) acota el GROUP BY a los códigos
+    que interesan; sin él se calcula para todo el catálogo del run."""
     R = DimensionamientoRecord
     stmt = (
         select(
@@ -299,6 +411,8 @@ def _efectividad_por_codigo(session: Session, run_id: int) -> dict[str, dict[str
         .where(R.codigo_articulo != "")
         .group_by(R.codigo_articulo)
     )
+    if codigos is not None:
+        stmt = stmt.where(R.codigo_articulo.in_(codigos))
     out: dict[str, dict[str, Any]] = {}
     for codigo, ganados, comprado_otra, en_espera, clientes in session.execute(stmt):
         ganados = int(ganados or 0)
@@ -320,6 +434,40 @@ def _efectividad_por_codigo(session: Session, run_id: int) -> dict[str, dict[str
 # Cálculo principal
 # ──────────────────────────────────────────────────────────────────────────────
 
+# Versión de las reglas de scoring: entra en la `huella` de cada fila, así un cambio de
+# parámetros invalida todas las filas conservables del modo incremental.
+_VERSION_REGLAS = 1
+
+_COLS_HUELLA = (
+    "codigo_articulo", "cliente_visible", "cuit", "cuenta_interna", "provincia",
+    "producto_nombre", "familia", "unidad_negocio", "plataforma", "tipo_oportunidad",
+    "estado_actividad", "meses_demanda_cliente_12m", "meses_no_participo_12m",
+    "ventana_meses", "consumo_tipico_mensual", "consumo_min_mensual",
+    "consumo_max_mensual", "ultima_demanda", "meses_desde_ultima_demanda",
+    "precio_unitario_estimado", "monto_oportunidad", "efectividad", "ganados",
+    "comprado_otra", "en_espera", "clientes_distintos", "tipo_multiplicador",
+    "multiplicador_actividad", "score",
+)
+
+
+def huella_oportunidad(row: dict[str, Any]) -> str:
+    """Hash del CONTENIDO calculado de una fila (sin run ni ids). Dos corridas que dan
+    la misma huella para un par produjeron exactamente la misma oportunidad. Los float
+    se redondean: el orden de suma en SQL puede mover el último bit sin cambiar nada."""
+    partes = [str(_VERSION_REGLAS)]
+    for col in _COLS_HUELLA:
+        valor = row.get(col)
+        if isinstance(valor, float):
+            valor = round(valor, 6)
+        partes.append(repr(valor))
+    return hashlib.sha1("\x1f".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+def _meses_absolutos(fechas: pd.Series) -> pd.Series:
+    fechas = pd.to_datetime(fechas)
+    return fechas.dt.year * 12 + fechas.dt.month
+
+
 def computar_oportunidades(session: Session, run_id: int) -> dict[str, Any]:
     """Calcula las oportunidades del run (sin escribir en la tabla).
 
@@ -347,121 +495,10 @@ def computar_oportunidades(session: Session, run_id: int) -> dict[str, Any]:
     # Fin de ventana EXCLUSIVO = primer día del mes siguiente a ref_month.
     window_end = _subtract_months(ref_month, -1)
 
-    # Efectividad por codigo (histórico completo).
-    efectividad_map = _efectividad_por_codigo(session, run_id)
+    # Matriz mensual por par: define el universo (pares con NO_PARTICIPO en la ventana),
+    # el monto recuperable (solo NO_PARTICIPO) y la recurrencia/actividad (todos los estados).
+    matriz = _matriz_mensual(session, run_id, window_start, window_end)
 
-    # ── Pase 1: DEMANDA NO_PARTICIPO (define la oportunidad y el monto recuperable) ──
-    # El universo de pares = pares con demanda NO_PARTICIPO. consumo/precio/monto se
-    # calculan SOLO con estas filas.
-    np_stmt = (
-        select(
-            R.cliente_visible,
-            R.codigo_articulo,
-            R.fecha,
-            R.cantidad_demandada,
-            R.valorizacion_estimada,
-        )
-        .where(R.import_run_id == run_id)
-        .where(R.resultado_participacion == ESTADO_NO_PARTICIPO)
-        .where(R.fecha >= window_start)
-        .where(R.fecha < window_end)
-        .where(R.codigo_articulo.is_not(None))
-        .where(R.codigo_articulo != "")
-        .where(R.cliente_visible.is_not(None))
-        .where(R.cliente_visible != "")
-    )
-
-    pares: dict[tuple[str, str], dict[str, Any]] = {}
-    for cliente, codigo, fecha, cantidad, valorizacion in session.execute(np_stmt):
-        if isinstance(fecha, dt.datetime):
-            fecha = fecha.date()
-        cantidad = float(cantidad or 0)
-        valorizacion = float(valorizacion or 0)
-        key = (cliente, codigo)
-        par = pares.get(key)
-        if par is None:
-            par = {
-                "cliente_visible": cliente,
-                "codigo_articulo": codigo,
-                "np_monthly": defaultdict(float),   # "YYYY-MM" -> sum(cantidad) NO_PARTICIPO
-                "cli_monthly": defaultdict(float),   # "YYYY-MM" -> sum(cantidad) TODOS los estados
-                "total_cant": 0.0,                   # NO_PARTICIPO
-                "total_val": 0.0,                    # NO_PARTICIPO
-                "ultima_demanda": None,              # all-states (se setea en pase 2)
-                "_attr_fecha": None,                 # all-states
-                "cuit": None,
-                "cuenta_interna": None,              # Nº de cuenta de FUSION (clave del CRM)
-                "provincia": None,
-                "producto_nombre": None,
-                "familia": None,
-                "unidad_negocio": None,
-                "plataforma": None,
-                "is_identified": False,
-            }
-            pares[key] = par
-        month_key = f"{fecha.year:04d}-{fecha.month:02d}"
-        par["np_monthly"][month_key] += cantidad
-        par["total_cant"] += cantidad
-        par["total_val"] += valorizacion
-
-    # ── Pase 2: DEMANDA DEL CLIENTE en TODOS los estados (recurrencia + actividad) ──
-    # Solo enriquece pares ya presentes (los que tienen NO_PARTICIPO). Define
-    # meses_demanda_cliente_12m, ultima_demanda y los atributos representativos.
-    all_stmt = (
-        select(
-            R.cliente_visible,
-            R.codigo_articulo,
-            R.fecha,
-            R.cantidad_demandada,
-            R.cuit,
-            R.cuenta_interna,
-            R.provincia,
-            R.producto_nombre_original,
-            R.descripcion_articulo,
-            R.familia,
-            R.unidad_negocio,
-            R.plataforma,
-            R.is_identified,
-        )
-        .where(R.import_run_id == run_id)
-        .where(R.fecha >= window_start)
-        .where(R.fecha < window_end)
-        .where(R.codigo_articulo.is_not(None))
-        .where(R.codigo_articulo != "")
-        .where(R.cliente_visible.is_not(None))
-        .where(R.cliente_visible != "")
-    )
-    for row in session.execute(all_stmt):
-        (
-            cliente, codigo, fecha, cantidad,
-            cuit, cuenta_interna, provincia, prod_orig, desc_art, familia, unidad,
-            plataforma, is_identified,
-        ) = row
-        key = (cliente, codigo)
-        par = pares.get(key)
-        if par is None:
-            continue  # par sin demanda NO_PARTICIPO -> no es oportunidad
-        if isinstance(fecha, dt.datetime):
-            fecha = fecha.date()
-        cantidad = float(cantidad or 0)
-        month_key = f"{fecha.year:04d}-{fecha.month:02d}"
-        par["cli_monthly"][month_key] += cantidad
-        if par["ultima_demanda"] is None or fecha > par["ultima_demanda"]:
-            par["ultima_demanda"] = fecha
-        # Atributos representativos = renglón más reciente del par (cualquier estado).
-        if par["_attr_fecha"] is None or fecha >= par["_attr_fecha"]:
-            par["_attr_fecha"] = fecha
-            par["cuit"] = cuit
-            par["cuenta_interna"] = normalizar_cuenta_fusion(cuenta_interna)
-            par["provincia"] = provincia
-            par["producto_nombre"] = prod_orig or desc_art
-            par["familia"] = familia
-            par["unidad_negocio"] = unidad
-            par["plataforma"] = plataforma
-            par["is_identified"] = bool(is_identified)
-
-    # Funnel de descartes (contados de forma INDEPENDIENTE sobre el universo de
-    # candidatos = pares con demanda>0 y precio>0).
     discard = {
         "sin_demanda": 0,        # ningún mes con suma > 0
         "precio_cero": 0,        # SUM(cantidad)=0 -> precio no calculable
@@ -470,108 +507,6 @@ def computar_oportunidades(session: Session, run_id: int) -> dict[str, Any]:
         "monto_bajo": 0,         # monto_oportunidad < PARAM_MONTO_MIN_ARS
         "sin_ganados": 0,        # ganados == 0
     }
-    candidatos = 0
-    rows: list[dict[str, Any]] = []
-
-    for (cliente, codigo), par in pares.items():
-        # Demanda NO_PARTICIPO -> monto recuperable (NO cambia).
-        np_sums = [v for v in par["np_monthly"].values() if v > 0]
-        meses_no_participo = len(np_sums)
-        if meses_no_participo == 0:
-            discard["sin_demanda"] += 1
-            continue
-
-        total_cant = par["total_cant"]
-        total_val = par["total_val"]
-        # Precio unitario estimado, manejando división por cero explícitamente.
-        if total_cant <= 0:
-            discard["precio_cero"] += 1
-            continue
-        precio_unitario = total_val / total_cant
-        if precio_unitario <= 0:
-            discard["precio_cero"] += 1
-            continue
-
-        # A partir de acá es un CANDIDATO (tiene demanda y precio válido).
-        candidatos += 1
-
-        consumo_tipico = float(statistics.median(np_sums))
-        consumo_min = float(min(np_sums))
-        consumo_max = float(max(np_sums))
-        monto = consumo_tipico * precio_unitario
-
-        # Demanda del cliente (TODOS los estados) -> clasifica el tipo (recurrencia real).
-        cli_sums = [v for v in par["cli_monthly"].values() if v > 0]
-        meses_demanda_cliente = len(cli_sums)
-
-        eff = efectividad_map.get(codigo, {
-            "ganados": 0, "comprado_otra": 0, "en_espera": 0,
-            "clientes_distintos": 0, "efectividad": 0.0,
-        })
-        ganados = eff["ganados"]
-        efectividad = eff["efectividad"]
-
-        tipo = _clasificar_tipo(meses_demanda_cliente)
-        tipo_mult = TIPO_MULTIPLICADOR[tipo]
-
-        # Actividad y última demanda sobre TODOS los estados (cuán reciente es la necesidad).
-        ultima_demanda = par["ultima_demanda"]
-        meses_desde = _month_diff(ref_month, _month_floor(ultima_demanda))
-        estado_act = ESTADO_ACTIVA if meses_desde <= PARAM_RECENCIA_MESES else ESTADO_DORMIDA
-        act_mult = ACTIVIDAD_MULTIPLICADOR[estado_act]
-
-        score = monto * efectividad * tipo_mult * act_mult
-
-        # Filtros (contados independientemente).
-        fail_identified = not par["is_identified"]
-        fail_eff = efectividad < PARAM_EFECTIVIDAD_MIN
-        fail_monto = monto < PARAM_MONTO_MIN_ARS
-        fail_ganados = ganados <= 0
-        if fail_identified:
-            discard["no_identificado"] += 1
-        if fail_eff:
-            discard["efectividad_baja"] += 1
-        if fail_monto:
-            discard["monto_bajo"] += 1
-        if fail_ganados:
-            discard["sin_ganados"] += 1
-
-        if fail_identified or fail_eff or fail_monto or fail_ganados:
-            continue
-
-        rows.append({
-            "import_run_id": run_id,
-            "codigo_articulo": codigo,
-            "cliente_visible": cliente,
-            "cuit": par["cuit"],
-            "cuenta_interna": par["cuenta_interna"],
-            "provincia": par["provincia"],
-            "producto_nombre": par["producto_nombre"],
-            "familia": par["familia"],
-            "unidad_negocio": par["unidad_negocio"],
-            "plataforma": par["plataforma"],
-            "tipo_oportunidad": tipo,
-            "estado_actividad": estado_act,
-            "meses_demanda_cliente_12m": meses_demanda_cliente,
-            "meses_no_participo_12m": meses_no_participo,
-            "ventana_meses": VENTANA_MESES,
-            "consumo_tipico_mensual": consumo_tipico,
-            "consumo_min_mensual": consumo_min,
-            "consumo_max_mensual": consumo_max,
-            "ultima_demanda": ultima_demanda,
-            "meses_desde_ultima_demanda": meses_desde,
-            "precio_unitario_estimado": precio_unitario,
-            "monto_oportunidad": monto,
-            "efectividad": efectividad,
-            "ganados": ganados,
-            "comprado_otra": eff["comprado_otra"],
-            "en_espera": eff["en_espera"],
-            "clientes_distintos": eff["clientes_distintos"],
-            "tipo_multiplicador": tipo_mult,
-            "multiplicador_actividad": act_mult,
-            "score": score,
-        })
-
     stats = {
         "run_id": run_id,
         "ref_month": ref_month.isoformat(),
@@ -582,28 +517,228 @@ def computar_oportunidades(session: Session, run_id: int) -> dict[str, Any]:
         "umbral_mes_completo": (anchor["umbral"] if anchor else None),
         "volumen_referencia": (anchor["volumen_referencia"] if anchor else None),
         "meses_clasificacion": (anchor["clasificacion"] if anchor else None),
-        "pares_no_participo": len(pares),
-        "candidatos": candidatos,
-        "calificadas": len(rows),
+        "pares_no_participo": 0,
+        "candidatos": 0,
+        "calificadas": 0,
         "discard": discard,
     }
+    if matriz.empty:
+        return {"rows": [], "stats": stats}
+
+    for col in ("np_cant", "np_val", "cli_cant"):
+        matriz[col] = matriz[col].astype("float64")
+    pares = matriz.groupby(_COLS_PAR, sort=True).agg(
+        total_cant=("np_cant", "sum"),
+        total_val=("np_val", "sum"),
+        ultima_demanda=("ultima", "max"),
+    )
+    np_pos = matriz.loc[matriz["np_cant"] > 0].groupby(_COLS_PAR)["np_cant"]
+    pares["meses_no_participo"] = np_pos.size()
+    pares["consumo_tipico"] = np_pos.median()
+    pares["consumo_min"] = np_pos.min()
+    pares["consumo_max"] = np_pos.max()
+    pares["meses_demanda_cliente"] = matriz.loc[matriz["cli_cant"] > 0].groupby(_COLS_PAR).size()
+    pares[["meses_no_participo", "meses_demanda_cliente"]] = (
+        pares[["meses_no_participo", "meses_demanda_cliente"]].fillna(0).astype(int)
+    )
+    stats["pares_no_participo"] = len(pares)
+
+    # Funnel: sin demanda -> precio no calculable -> candidato.
+    sin_demanda = pares["meses_no_participo"] == 0
+    discard["sin_demanda"] = int(sin_demanda.sum())
+    pares = pares.loc[~sin_demanda]
+    precio = pares["total_val"] / pares["total_cant"].where(pares["total_cant"] > 0)
+    precio_ok = precio > 0
+    discard["precio_cero"] = int((~precio_ok).sum())
+    cand = pares.loc[precio_ok].copy()
+    cand["precio_unitario"] = precio.loc[precio_ok]
+    stats["candidatos"] = len(cand)
+    if cand.empty:
+        return {"rows": [], "stats": stats}
+
+    cand["monto"] = cand["consumo_tipico"] * cand["precio_unitario"]
+
+    codigos = select(_pares_no_participo(run_id, window_start, window_end).c.codigo_articulo)
+    efectividad_map = _efectividad_por_codigo(session, run_id, codigos)
+    eff = pd.DataFrame.from_dict(efectividad_map, orient="index")
+    cand = cand.reset_index()
+    if eff.empty:
+        eff = pd.DataFrame(columns=["ganados", "comprado_otra", "en_espera", "clientes_distintos", "efectividad"])
+    cand = cand.merge(eff, how="left", left_on="codigo_articulo", right_index=True)
+    for col in ("ganados", "comprado_otra", "en_espera", "clientes_distintos"):
+        cand[col] = cand[col].fillna(0).astype(int)
+    cand["efectividad"] = cand["efectividad"].fillna(0.0).astype("float64")
+
+    meses = cand["meses_demanda_cliente"]
+    cand["tipo"] = np.select(
+        [meses >= PARAM_ESTABLE_MIN, meses >= PARAM_RECURRENTE_MIN, meses >= PARAM_INTERMITENTE_MIN],
+        [TIPO_ESTABLE, TIPO_RECURRENTE, TIPO_INTERMITENTE],
+        default=TIPO_PUNTUAL,
+    )
+    cand["tipo_mult"] = cand["tipo"].map(TIPO_MULTIPLICADOR)
+    # Actividad y última demanda sobre TODOS los estados (cuán reciente es la necesidad).
+    cand["meses_desde"] = (ref_month.year * 12 + ref_month.month) - _meses_absolutos(cand["ultima_demanda"])
+    cand["estado_act"] = np.where(cand["meses_desde"] <= PARAM_RECENCIA_MESES, ESTADO_ACTIVA, ESTADO_DORMIDA)
+    cand["act_mult"] = cand["estado_act"].map(ACTIVIDAD_MULTIPLICADOR)
+    cand["score"] = cand["monto"] * cand["efectividad"] * cand["tipo_mult"] * cand["act_mult"]
+
+    attrs = _atributos_representativos(session, run_id, window_start, window_end)
+    cand = cand.merge(attrs, how="left", on=_COLS_PAR)
+    identificado = cand["is_identified"].fillna(False).astype(bool)
+
+    # Filtros (contados independientemente sobre los candidatos).
+    fail_identified = ~identificado
+    fail_eff = cand["efectividad"] < PARAM_EFECTIVIDAD_MIN
+    fail_monto = cand["monto"] < PARAM_MONTO_MIN_ARS
+    fail_ganados = cand["ganados"] <= 0
+    discard["no_identificado"] = int(fail_identified.sum())
+    discard["efectividad_baja"] = int(fail_eff.sum())
+    discard["monto_bajo"] = int(fail_monto.sum())
+    discard["sin_ganados"] = int(fail_ganados.sum())
+    ok = cand.loc[~(fail_identified | fail_eff | fail_monto | fail_ganados)]
+
+    rows: list[dict[str, Any]] = []
+    for r in ok.itertuples(index=False):
+        producto = r.producto_nombre_original if isinstance(r.producto_nombre_original, str) and r.producto_nombre_original else None
+        ultima = r.ultima_demanda
+        if isinstance(ultima, dt.datetime):
+            ultima = ultima.date()
+        row = {
+            "import_run_id": run_id,
+            "codigo_articulo": r.codigo_articulo,
+            "cliente_visible": r.cliente_visible,
+            "oportunidad_id": opportunity_stable_id(r.cliente_visible, r.codigo_articulo),
+            "cuit": _nulo(r.cuit),
+            "cuenta_interna": normalizar_cuenta_fusion(_nulo(r.cuenta_interna)),
+            "provincia": _nulo(r.provincia),
+            "producto_nombre": producto or _nulo(r.descripcion_articulo),
+            "familia": _nulo(r.familia),
+            "unidad_negocio": _nulo(r.unidad_negocio),
+            "plataforma": _nulo(r.plataforma),
+            "tipo_oportunidad": str(r.tipo),
+            "estado_actividad": str(r.estado_act),
+            "meses_demanda_cliente_12m": int(r.meses_demanda_cliente),
+            "meses_no_participo_12m": int(r.meses_no_participo),
+            "ventana_meses": VENTANA_MESES,
+            "consumo_tipico_mensual": float(r.consumo_tipico),
+            "consumo_min_mensual": float(r.consumo_min),
+            "consumo_max_mensual": float(r.consumo_max),
+            "ultima_demanda": ultima,
+            "meses_desde_ultima_demanda": int(r.meses_desde),
+            "precio_unitario_estimado": float(r.precio_unitario),
+            "monto_oportunidad": float(r.monto),
+            "efectividad": float(r.efectividad),
+            "ganados": int(r.ganados),
+            "comprado_otra": int(r.comprado_otra),
+            "en_espera": int(r.en_espera),
+            "clientes_distintos": int(r.clientes_distintos),
+            "tipo_multiplicador": float(r.tipo_mult),
+            "multiplicador_actividad": float(r.act_mult),
+            "score": float(r.score),
+        }
+        row["huella"] = huella_oportunidad(row)
+        rows.append(row)
+
+    stats["calificadas"] = len(rows)
     return {"rows": rows, "stats": stats}
 
 
+def _nulo(valor: Any) -> Any:
+    """NaN de pandas (columna sin dato tras el merge) -> None, para la base."""
+    return None if valor is None or (isinstance(valor, float) and np.isnan(valor)) else valor
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Rebuild run-scoped (mismo patrón que _rebuild_summary_for_run)
 # ──────────────────────────────────────────────────────────────────────────────
 
+_LOTE_IDS = 500
+
+
+def _run_previo_con_filas(session: Session, target_run_id: int) -> int | None:
+    """Run cuyas filas sirven de base al modo incremental: el propio run si ya tiene
+    oportunidades (re-cálculo tras un ajuste), si no el último run anterior con filas."""
+    S = OportunidadSummary
+    previo = session.execute(
+        select(func.max(S.import_run_id)).where(S.import_run_id <= target_run_id)
+    ).scalar()
+    return int(previo) if previo is not None else None
+
+
+def _aplicar_incremental(
+    session: Session, target_run_id: int, previo_run_id: int, rows: list[dict[str, Any]],
+) -> dict[str, int]:
+    """Aplica solo la diferencia contra las filas de `previo_run_id`.
+
+    Fila con mismo `oportunidad_id` y misma `huella` -> se conserva; se insertan
+    únicamente las nuevas o cambiadas.
+      - mismo run (re-cálculo): la fila conservada queda con su `id` y se borran solo
+        las previas que cambiaron o ya no califican;
+      - run nuevo: las filas del run previo NO se tocan (historia por run, igual que
+        el modo completo); las conservadas se copian al run nuevo con un
+        INSERT ... SELECT en la base, sin pasar por Python.
+    """
+    S = OportunidadSummary
+    previas = session.execute(
+        select(S.id, S.oportunidad_id, S.huella).where(S.import_run_id == previo_run_id)
+    ).all()
+    # Filas sin oportunidad_id/huella (anteriores a esas columnas) no se pueden comparar:
+    # quedan fuera del índice y por lo tanto se reescriben.
+    por_oportunidad = {
+        oportunidad_id: (row_id, huella)
+        for row_id, oportunidad_id, huella in previas
+        if oportunidad_id and huella
+    }
+    conservar: list[int] = []
+    insertar: list[dict[str, Any]] = []
+    for row in rows:
+        previa = por_oportunidad.get(row["oportunidad_id"])
+        if previa is not None and previa[1] == row["huella"]:
+            conservar.append(previa[0])
+        else:
+            insertar.append(row)
+    if previo_run_id == target_run_id:
+        ids_conservados = set(conservar)
+        borrar = [row_id for row_id, _, _ in previas if row_id not in ids_conservados]
+        for i in range(0, len(borrar), _LOTE_IDS):
+            session.execute(delete(S).where(S.id.in_(borrar[i:i + _LOTE_IDS])))
+    else:
+        borrar = []
+        tabla = S.__table__
+        columnas = [c for c in tabla.columns if c.name != "id"]
+        origen = [
+            literal(target_run_id).label("import_run_id") if c.name == "import_run_id" else c
+            for c in columnas
+        ]
+        for i in range(0, len(conservar), _LOTE_IDS):
+            session.execute(
+                tabla.insert().from_select(
+                    [c.name for c in columnas],
+                    select(*origen).where(tabla.c.id.in_(conservar[i:i + _LOTE_IDS])),
+                )
+            )
+    if insertar:
+        session.execute(S.__table__.insert(), insertar)
+    return {"conservadas": len(conservar), "insertadas": len(insertar), "borradas": len(borrar)}
+
+
 def rebuild_oportunidades_for_run(
     session: Session,
     run_id: int | None = None,
     *,
     commit: bool = True,
+    incremental: bool = False,
 ) -> dict[str, Any]:
     """Borra las oportunidades del run e inserta las calculadas. Idempotente.
 
     Si OPORTUNIDADES_ENABLED está off, no toca nada. Respeta el run activo si
     run_id es None.
+
+    `incremental=True` compara contra las filas del run previo (ver
+    `_run_previo_con_filas`) y reescribe solo los pares que cambiaron; los que dieron
+    igual conservan su fila (copiada si el previo es otro run). Sin filas previas cae
+    al rebuild completo. Las filas de `run_id` quedan igual que con el rebuild
+    completo y, como en él, las de otros runs no se modifican.
     """
     if not OPORTUNIDADES_ENABLED():
         logger.info("[OPORTUNIDADES] kill-switch OFF (OPORTUNIDADES_ENABLED) — rebuild omitido.")
@@ -614,7 +749,7 @@ def rebuild_oportunidades_for_run(
         logger.warning("[OPORTUNIDADES] No hay run activo (success). Rebuild omitido.")
         return {"status": "no_run", "rows": 0}
 
-    logger.info("[OPORTUNIDADES] Rebuild start run_id=%s", target_run_id)
+    logger.info("[OPORTUNIDADES] Rebuild start run_id=%s incremental=%s", target_run_id, incremental)
     result = computar_oportunidades(session, target_run_id)
     rows = result["rows"]
     stats = result["stats"]
@@ -626,12 +761,19 @@ def rebuild_oportunidades_for_run(
         stats.get("umbral_mes_completo"), stats.get("max_fecha"),
     )
 
-    # Borrado run-scoped + inserción.
-    session.execute(
-        delete(OportunidadSummary).where(OportunidadSummary.import_run_id == target_run_id)
-    )
-    if rows:
-        session.execute(OportunidadSummary.__table__.insert(), rows)
+    previo_run_id = _run_previo_con_filas(session, target_run_id) if incremental else None
+    if previo_run_id is not None:
+        stats["modo"] = "incremental"
+        stats["run_previo"] = previo_run_id
+        stats["incremental"] = _aplicar_incremental(session, target_run_id, previo_run_id, rows)
+    else:
+        # Borrado run-scoped + inserción.
+        stats["modo"] = "completo"
+        session.execute(
+            delete(OportunidadSummary).where(OportunidadSummary.import_run_id == target_run_id)
+        )
+        if rows:
+            session.execute(OportunidadSummary.__table__.insert(), rows)
     if commit:
         session.commit()
 
@@ -642,7 +784,7 @@ def rebuild_oportunidades_for_run(
         or 0
     )
     logger.info(
-        "[OPORTUNIDADES] Rebuild done run_id=%s calificadas=%s candidatos=%s",
-        target_run_id, inserted, stats.get("candidatos"),
+        "[OPORTUNIDADES] Rebuild done run_id=%s calificadas=%s candidatos=%s modo=%s %s",
+        target_run_id, inserted, stats.get("candidatos"), stats["modo"], stats.get("incremental") or "",
     )
     return {"status": "ok", "rows": inserted, "stats": stats}
@@ -1,9 +1,10 @@
 """Cálculo de visibilidad por cartera comercial de Oportunidades (Mercado Privado).
 
-Conectado a `oportunidades_router.py` (endpoint `/list`) detrás del kill-switch
-`OPORTUNIDADES_CARTERA_ENABLED` (`oportunidades.py`), default OFF: con el switch
-apagado el router ni siquiera llama a `oportunidades_visibles_para` — el listado
-sigue devolviendo las mismas filas a todo el mundo, sin excepción.
+Conectado a `oportunidades_router.py` (endpoints `/list` y `/pagina`) detrás del
+kill-switch `OPORTUNIDADES_CARTERA_ENABLED` (`oportunidades.py`), default OFF: con el
+switch apagado el router ni siquiera llama a `oportunidades_visibles_para` /
+`predicado_visibilidad` — el listado sigue devolviendo las mismas filas a todo el
+mundo, sin excepción.
 
 Fórmula (confirmada con negocio, ago-2026 — los 16 vendedores de Operadores.xlsx son
 la fuerza de venta real: hay tanto Analistas como Supervisores entre ellos, cada uno
@@ -31,7 +32,7 @@ con cartera propia):
 """
 from __future__ import annotations
 
-from sqlalchemy import func
+from sqlalchemy import false, func, or_, select
 from sqlalchemy.orm import Session
 
 from web_comparativas.models import User, VendedorFusion
@@ -97,54 +98,108 @@ def supervisores_a_cargo(db: Session, gerente_id: int) -> list[int]:
     return [r[0] for r in filas]
 
 
+def _alcance_cartera(db: Session, user: User) -> tuple[set[int], bool, bool] | None:
+    """Alcance de la fórmula del docstring del módulo, sin tocar oportunidades.
+
+    Devuelve (user_ids cuya cartera se ve, incluye buffer, incluye asignadas a mano a
+    este usuario), o None para acceso total. Lo comparten el filtro en memoria
+    (`oportunidades_visibles_para`) y el predicado SQL (`predicado_visibilidad`), así
+    las dos variantes no pueden divergir.
+    """
+    rol = _rol(user)
+    if rol in _ROLES_FULL_READ:
+        return None
+    if rol in _ROLES_ANALISTA:
+        return {user.id}, False, True
+    if rol in _ROLES_SUPERVISOR:
+        return {user.id} | set(analistas_a_cargo(db, user.id)), True, False
+    if rol in _ROLES_GERENTE:
+        supervisores_ids = set(supervisores_a_cargo(db, user.id))
+        analistas_ids: set[int] = set()
+        for sid in supervisores_ids:
+            analistas_ids.update(analistas_a_cargo(db, sid))
+        # Sin cartera propia (ver docstring) y sin buffer: eso es turf del Supervisor.
+        return supervisores_ids | analistas_ids, False, False
+    return set(), False, False
+
+
 def oportunidades_visibles_para(
     db: Session, user: User, oportunidades: list[OportunidadSummary]
 ) -> list[OportunidadSummary]:
     """Subconjunto de `oportunidades` (típicamente el run activo completo) visible
     para este usuario, según su rol. Función pura respecto del kill-switch: quien la
     llame decide si corresponde (hoy nadie la llama todavía)."""
-    rol = _rol(user)
-    if rol in _ROLES_FULL_READ:
+    alcance = _alcance_cartera(db, user)
+    if alcance is None:
         return list(oportunidades)
+    user_ids, con_buffer, con_manuales = alcance
 
     vendedor_por_oportunidad = {
         o.id: codigo_vendedor_de_cuenta(o.cuenta_interna) for o in oportunidades
     }
     vinculados = vendedores_vinculados(db)
+    codigos = {c for c, uid in vinculados.items() if uid in user_ids}
+    visibles_ids = {oid for oid, cod in vendedor_por_oportunidad.items() if cod in codigos}
 
-    def cartera_de(user_ids: set[int]) -> set[int]:
-        codigos = {c for c, uid in vinculados.items() if uid in user_ids}
-        return {oid for oid, cod in vendedor_por_oportunidad.items() if cod in codigos}
-
-    if rol in _ROLES_ANALISTA:
+    if con_buffer:
+        visibles_ids |= {
+            oid for oid, cod in vendedor_por_oportunidad.items() if cod not in vinculados
+        }
+    if con_manuales:
         asignadas_a_mano = {
             r[0] for r in
             db.query(OportunidadAsignacionManual.oportunidad_id)
             .filter(OportunidadAsignacionManual.analista_user_id == user.id)
             .all()
         }
-        manual_ids = {
+        visibles_ids |= {
             o.id for o in oportunidades
             if opportunity_stable_id(o.cliente_visible, o.codigo_articulo) in asignadas_a_mano
         }
-        visibles_ids = cartera_de({user.id}) | manual_ids
 
-    elif rol in _ROLES_SUPERVISOR:
-        equipo_ids = set(analistas_a_cargo(db, user.id))
-        buffer_ids = {
-            oid for oid, cod in vendedor_por_oportunidad.items() if cod not in vinculados
-        }
-        visibles_ids = cartera_de({user.id}) | cartera_de(equipo_ids) | buffer_ids
+    return [o for o in oportunidades if o.id in visibles_ids]
 
-    elif rol in _ROLES_GERENTE:
-        supervisores_ids = set(supervisores_a_cargo(db, user.id))
-        analistas_ids: set[int] = set()
-        for sid in supervisores_ids:
-            analistas_ids.update(analistas_a_cargo(db, sid))
-        # Sin cartera propia (ver docstring) y sin buffer: eso es turf del Supervisor.
-        visibles_ids = cartera_de(supervisores_ids) | cartera_de(analistas_ids)
 
-    else:
-        visibles_ids = set()
+def predicado_visibilidad(db: Session, user: User, run_id: int):
+    """La misma visibilidad que `oportunidades_visibles_para`, como predicado SQL
+    sobre `oportunidades_summary` (None = sin filtro).
 
-    return [o for o in oportunidades if o.id in visibles_ids]
+    La cartera se traduce a la lista de cuentas del run que resuelven a cada vendedor:
+    se lee UN `DISTINCT cuenta_interna` del run (cientos de valores, no cientos de
+    miles de filas) y se lo pasa por el mismo `codigo_vendedor_de_cuenta`, de modo que
+    la normalización de la cuenta es idéntica a la del filtro en memoria. Las
+    asignaciones manuales entran por `oportunidad_id` persistido (subconsulta).
+    """
+    alcance = _alcance_cartera(db, user)
+    if alcance is None:
+        return None
+    user_ids, con_buffer, con_manuales = alcance
+    S = OportunidadSummary
+
+    cuentas = db.execute(
+        select(S.cuenta_interna).where(S.import_run_id == run_id).distinct()
+    ).scalars().all()
+    vendedor_por_cuenta = {c: codigo_vendedor_de_cuenta(c) for c in cuentas}
+    vinculados = vendedores_vinculados(db)
+    codigos = {c for c, uid in vinculados.items() if uid in user_ids}
+
+    condiciones = []
+    propias = sorted(c for c, cod in vendedor_por_cuenta.items() if c is not None and cod in codigos)
+    if propias:
+        condiciones.append(S.cuenta_interna.in_(propias))
+    if con_buffer:
+        buffer = sorted(
+            c for c, cod in vendedor_por_cuenta.items() if c is not None and cod not in vinculados
+        )
+        # Sin cuenta no resuelve a ningún vendedor: también es buffer.
+        condiciones.append(S.cuenta_interna.is_(None))
+        if buffer:
+            condiciones.append(S.cuenta_interna.in_(buffer))
+    if con_manuales:
+        condiciones.append(
+            S.oportunidad_id.in_(
+                select(OportunidadAsignacionManual.oportunidad_id)
+                .where(OportunidadAsignacionManual.analista_user_id == user.id)
+            )
+        )
+    return or_(*condiciones) if condiciones else false()
@@ -0,0 +1,112 @@
+"""Índice en memoria del maestro de artículos de Forecast (alta de clientes manuales).
+
+`search_articles` recorría la lista completa con `q in code or q in desc` en cada
+tecla del diálogo de cliente manual, y `get_new_client_catalog` releía el CSV
+maestro en cada apertura. Ahora (oct-2026) forecast_service arma un
+`ArticleIndex` una vez por huella del maestro (mtime + tamaño de los archivos) y
+lo comparte entre requests:
+  - texto normalizado sin acentos ni mayúsculas (`plegar`) de código y descripción;
+  - índice de trigramas (posting lists `array('i')`) para acotar candidatos en
+    consultas de 3+ caracteres; consultas más cortas recorren los textos ya
+    normalizados;
+  - ranking: código exacto > prefijo de código > prefijo de descripción >
+    prefijo de palabra > substring > todas las palabras; empate = orden del maestro;
+  - `get(codigo)`: lookup exacto para validar las entradas de clientes manuales.
+
+Sin dependencias de la app (solo stdlib): testeable sin levantar el servicio.
+"""
+from __future__ import annotations
+
+import heapq
+import unicodedata
+from array import array
+from typing import Any, Iterable
+
+_SEP = "\x1f"   # separa código y descripción: ningún término normalizado lo contiene
+
+
+def plegar(texto: Any) -> str:
+    """Minúsculas, sin acentos y con espacios colapsados."""
+    s = unicodedata.normalize("NFKD", str(texto or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.lower().split())
+
+
+def _trigramas(texto: str) -> set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class ArticleIndex:
+    """Índice de solo lectura sobre una lista de artículos (dicts del catálogo)."""
+
+    def __init__(self, articulos: Iterable[dict], huella: Any = None):
+        self.items: list[dict] = list(articulos)
+        self.huella = huella
+        self._codes = [plegar(a.get("codigo_serie")) for a in self.items]
+        self._descs = [plegar(a.get("descripcion")) for a in self.items]
+        self._textos = [f"{c}{_SEP}{d}" for c, d in zip(self._codes, self._descs)]
+        self._por_codigo: dict[str, int] = {}
+        for i, code in enumerate(self._codes):
+            self._por_codigo.setdefault(code, i)
+        self._tri: dict[str, array] = {}
+        for i, texto in enumerate(self._textos):
+            for tri in _trigramas(texto):
+                lista = self._tri.get(tri)
+                if lista is None:
+                    lista = self._tri[tri] = array("i")
+                lista.append(i)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, codigo: Any) -> dict | None:
+        """Artículo con ese código exacto (normalizado), o None."""
+        i = self._por_codigo.get(plegar(codigo))
+        return None if i is None else self.items[i]
+
+    def _candidatos(self, terminos: list[str]) -> Iterable[int]:
+        largos = [t for t in terminos if len(t) >= 3]
+        if not largos:
+            return range(len(self.items))
+        postings = []
+        for t in largos:
+            for tri in _trigramas(t):
+                lista = self._tri.get(tri)
+                if lista is None:
+                    return ()
+                postings.append(lista)
+        postings.sort(key=len)
+        cand = set(postings[0])
+        for lista in postings[1:]:
+            cand.intersection_update(lista)
+            if not cand:
+                break
+        return cand
+
+    def _puntaje(self, i: int, q: str) -> int:
+        code, desc = self._codes[i], self._descs[i]
+        if code == q:
+            return 0
+        if code.startswith(q):
+            return 1
+        if desc.startswith(q):
+            return 2
+        if f" {q}" in desc:
+            return 3
+        if q in code or q in desc:
+            return 4
+        return 5
+
+    def search(self, q: str = "", limit: int = 30) -> list[dict]:
+        """Top-`limit` artículos que contienen todas las palabras de `q`, rankeados."""
+        q = plegar(q)
+        if not q:
+            return self.items[:limit]
+        terminos = q.split(" ")
+        textos = self._textos
+        matches = (
+            i for i in self._candidatos(terminos)
+            if all(t in textos[i] for t in terminos)
+        )
+        mejores = heapq.nsmallest(limit, ((self._puntaje(i, q), i) for i in matches))
+        return [self.items[i] for _, i in mejores]
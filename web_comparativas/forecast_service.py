@@ -13,13 +13,13 @@ import re
 import threading
 import time
 import datetime as dt
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from contextlib import contextmanager
 from contextvars import ContextVar
 from functools import wraps
 from pathlib import Path
 from types import SimpleNamespace
-from typing import Any
+from typing import Any, Iterable
 
 import numpy as np
 import pandas as pd
@@ -39,6 +39,10 @@ try:
 except ImportError:
     _sa_text = None  # type: ignore[assignment]
 
+from web_comparativas import forecast_sql as _fsql
+from web_comparativas import forecast_summaries as _fsum
+from web_comparativas import forecast_article_index as _articles
+
 logger = logging.getLogger("wc.forecast")
 logger.setLevel(logging.INFO)
 
@@ -251,11 +255,20 @@ def _resp_set(key: str, value: Any) -> None:
             total -= dropped_size
 
 
-def clear_response_cache() -> None:
-    """Flush the service-level response cache (after reload or client-save)."""
+def clear_response_cache(*, override_selectors: "Iterable[str] | None" = None) -> None:
+    """Flush the service-level response cache (after reload or client-save).
+
+    `override_selectors`: when the flush follows an override change on known
+    clients (approve / reject), the approvals impact service only recomputes those;
+    without it (data reload) its cached base rows are dropped too.
+    """
+    _bump_override_version(override_selectors)
+    if override_selectors is None:
+        _reset_approval_impacts(rows=True)
     with _resp_cache_lock:
         _resp_cache.clear()
         _resp_inflight.clear()
+    _clear_base_agg_cache()
     with _PROD_CODE_CACHE_LOCK:
         _PROD_CODE_CACHE.clear()
     with _LAB_CODE_CACHE_LOCK:
@@ -296,6 +309,7 @@ def _clear_cache_for_override_save(user_id: int) -> None:
     Other regular users' cached results are NOT affected (their overrides didn't
     change), so they keep their warm cache and avoid unnecessary recomputation.
     """
+    _bump_override_version()
     clear_user_cache(user_id)
     admin_key_count = 0
     with _resp_cache_lock:
@@ -677,13 +691,14 @@ def _override_identity(scope: str | None, subneg: str = "", codigo_serie: str =
     )
 
 
-def _fetch_override_records(
+def _query_override_records(
     user_id: int | None,
     client_selector: str | None = None,
     client_selectors: list[str] | None = None,
     *,
     all_users: bool = False,
 ) -> list[Any]:
+    """Lectura directa de la tabla de overrides (sin snapshot). Ver _fetch_override_records."""
     if SessionLocal is None or ForecastUserOverride is None:
         return []
     owner_scope = _OVERRIDE_OWNER_SCOPE.get()
@@ -840,6 +855,122 @@ def _fetch_override_records(
         return list(by_identity.values())
 
 
+# ── Snapshot versionado de overrides ─────────────────────────────────────────
+# chart-data, client-table, treemap y el impacto de aprobaciones re-consultaban la
+# tabla de overrides (más el historial de solicitudes) y reconstruían los mapas en
+# cada request. El snapshot guarda registros + consolidados + mapas por alcance
+# (usuario / admin / selector / owner scope / preview) y vale mientras no cambie
+# _OVERRIDE_VERSION. Todo escritor lo incrementa: _upsert_override_record,
+# _deactivate_override, deactivate_override_by_id, save_client_overrides,
+# save_group_expectations y materialize_approved_change_request (antes del commit)
+# y la invalidación de caché posterior al commit (clear_response_cache /
+# _clear_cache_for_override_save), que cubre la carrera lectura-antes-del-commit.
+# El TTL es solo una red para escrituras de otros procesos (scripts) (oct-2026).
+
+_OVERRIDE_VERSION = 0
+_OVERRIDE_SNAPSHOTS: "OrderedDict[tuple, SimpleNamespace]" = OrderedDict()
+_OVERRIDE_SNAPSHOT_LOCK = threading.Lock()
+_OVERRIDE_SNAPSHOT_MAX = 64
+_OVERRIDE_SNAPSHOT_TTL = 300  # 5 min
+
+
+# Bitácora de escrituras: (versión, selectores tocados | None = desconocido). La
+# usa el servicio de impacto de aprobaciones para recalcular solo esos clientes.
+_OVERRIDE_CHANGES: "deque[tuple[int, frozenset | None]]" = deque(maxlen=256)
+
+
+def _bump_override_version(selectors: "Iterable[str] | None" = None) -> int:
+    """Invalida todos los snapshots de overrides (llamar en cada escritura).
+
+    `selectors`: clientes cuyo override cambió, si el escritor los conoce.
+    """
+    global _OVERRIDE_VERSION
+    touched = None
+    if selectors is not None:
+        touched = frozenset(_clean_override_text(v).lower() for v in selectors if _clean_override_text(v))
+    with _OVERRIDE_SNAPSHOT_LOCK:
+        _OVERRIDE_VERSION += 1
+        _OVERRIDE_SNAPSHOTS.clear()
+        _OVERRIDE_CHANGES.append((_OVERRIDE_VERSION, touched))
+        return _OVERRIDE_VERSION
+
+
+def _override_changes_since(version: int, until: int) -> "set[str] | None":
+    """Selectores tocados en (version, until]; None si alguna escritura no los informó."""
+    with _OVERRIDE_SNAPSHOT_LOCK:
+        entries = [(v, sel) for v, sel in _OVERRIDE_CHANGES if version < v <= until]
+    if len(entries) != until - version or any(sel is None for _, sel in entries):
+        return None
+    out: set[str] = set()
+    for _, sel in entries:
+        out.update(sel)
+    return out
+
+
+def _get_override_snapshot(
+    user_id: int | None,
+    client_selector: str | None = None,
+    client_selectors: list[str] | None = None,
+    *,
+    all_users: bool = False,
+) -> SimpleNamespace:
+    """Registros de override + consolidados + mapas compilados, cacheados por versión.
+
+    Campos: `records` (lo mismo que devolvía _fetch_override_records), `maps`
+    (_build_override_maps de `records`), `consolidated` (_consolidate_override_records),
+    `consolidated_maps` (los mapas que arman los caminos PG sobre los consolidados) y
+    `version`. Tratar como solo lectura.
+    """
+    key = (
+        _OVERRIDE_OWNER_SCOPE.get(),
+        _PENDING_PREVIEW_USER.get(),
+        None if all_users else (int(user_id) if user_id else None),
+        bool(all_users),
+        None if client_selector is None else _clean_override_text(client_selector),
+        tuple(sorted({_clean_override_text(v) for v in client_selectors or [] if _clean_override_text(v)})),
+    )
+    with _OVERRIDE_SNAPSHOT_LOCK:
+        version = _OVERRIDE_VERSION
+        snap = _OVERRIDE_SNAPSHOTS.get(key)
+        if snap is not None and time.monotonic() - snap.ts < _OVERRIDE_SNAPSHOT_TTL:
+            _OVERRIDE_SNAPSHOTS.move_to_end(key)
+            return snap
+
+    records = _query_override_records(
+        user_id, client_selector=client_selector, client_selectors=client_selectors, all_users=all_users,
+    )
+    consolidated = _consolidate_override_records(records, "snapshot") if records else []
+    snap = SimpleNamespace(
+        records=records,
+        maps=_build_override_maps(records),
+        consolidated=consolidated,
+        consolidated_maps=_build_override_maps(consolidated),
+        version=version,
+        ts=time.monotonic(),
+    )
+    with _OVERRIDE_SNAPSHOT_LOCK:
+        # Si hubo una escritura mientras se consultaba, el snapshot ya nació viejo:
+        # se devuelve (es lo que leyó esta request) pero no se guarda.
+        if version == _OVERRIDE_VERSION:
+            _OVERRIDE_SNAPSHOTS[key] = snap
+            while len(_OVERRIDE_SNAPSHOTS) > _OVERRIDE_SNAPSHOT_MAX:
+                _OVERRIDE_SNAPSHOTS.popitem(last=False)
+    return snap
+
+
+def _fetch_override_records(
+    user_id: int | None,
+    client_selector: str | None = None,
+    client_selectors: list[str] | None = None,
+    *,
+    all_users: bool = False,
+) -> list[Any]:
+    snap = _get_override_snapshot(
+        user_id, client_selector=client_selector, client_selectors=client_selectors, all_users=all_users,
+    )
+    return list(snap.records)
+
+
 def _override_record_user_ids(records: list[Any], limit: int = 20) -> list[int]:
     ids: list[int] = []
     for rec in records or []:
@@ -976,8 +1107,7 @@ def _build_overrides_snapshot_locked(
     client_selector: str | None = None,
     is_admin: bool = False,
 ) -> dict[str, dict[tuple[str, str], float]]:
-    records = _fetch_override_records(user_id, client_selector=client_selector, all_users=is_admin)
-    maps = _build_override_maps(records)
+    maps = _get_override_snapshot(user_id, client_selector=client_selector, all_users=is_admin).maps
     snapshot: dict[str, dict[tuple[str, str], float]] = {}
     for (selector, codigo, month), payload in maps["cell"].items():
         snapshot.setdefault(selector, {})[(codigo, month)] = float(payload["monthly_pct"])
@@ -1033,6 +1163,90 @@ def _resolve_override_for_row(
     }
 
 
+_OVERRIDE_SELECTOR_COLUMNS = ("fantasia", "cliente_id", "_cliente", "Cliente")
+
+# Niveles de precedencia de la resolución vectorizada, en el MISMO orden que
+# _resolve_override_for_row: (prioridad, tabla compilada, claves del join, scope).
+# "wildcard" = override de subneg "" (todo el grupo), solo para filas con subneg.
+_OVERRIDE_LEVELS = (
+    (0, "cell", ("selector", "codigo", "month"), FORECAST_SCOPE_CELL),
+    (1, "product", ("selector", "codigo"), FORECAST_SCOPE_PRODUCT),
+    (2, "subneg", ("selector", "subneg"), FORECAST_SCOPE_SUBNEG),
+    (3, "wildcard", ("selector",), FORECAST_SCOPE_SUBNEG),
+)
+
+
+def _compile_override_frames(maps: dict[str, Any]) -> dict[str, pd.DataFrame]:
+    """Compila los dicts de _build_override_maps a tablas de lookup por nivel.
+
+    Cada clave ya es única (last-wins lo resolvió _build_override_maps), así que un
+    merge contra estas tablas devuelve a lo sumo un payload por (fila, selector, nivel).
+    """
+    def _frame(items, key_cols: tuple[str, ...]) -> pd.DataFrame:
+        rows = [
+            (*key, payload["monthly_pct"], payload["annual_pct"], payload.get("effective_from_month"))
+            for key, payload in items
+        ]
+        return pd.DataFrame(rows, columns=[*key_cols, "_ov_monthly", "_ov_annual", "_ov_efm"])
+
+    subneg = _frame(maps["subneg"].items(), ("selector", "subneg"))
+    return {
+        "cell": _frame(maps["cell"].items(), ("selector", "codigo", "month")),
+        "product": _frame(maps["product"].items(), ("selector", "codigo")),
+        "subneg": subneg,
+        "wildcard": subneg.loc[subneg["subneg"] == ""].drop(columns="subneg"),
+    }
+
+
+def _clean_override_series(values) -> np.ndarray:
+    """_clean_override_text por valor ÚNICO (los selectores/códigos se repiten mucho)."""
+    serie = pd.Series(values, dtype=object)
+    limpios = {v: _clean_override_text(v) for v in pd.unique(serie)}
+    return serie.map(limpios).to_numpy(dtype=object)
+
+
+def _resolve_overrides_vectorized(
+    keys: pd.DataFrame, frames: dict[str, pd.DataFrame]
+) -> pd.DataFrame:
+    """Resuelve overrides para muchas filas con un merge por nivel de alcance.
+
+    `keys`: columnas pos, month, subneg, codigo y sel0..selN (candidatos en orden de
+    prioridad). Devuelve una fila por `pos` que matcheó: pos, scope, _ov_monthly,
+    _ov_annual. Precedencia idéntica a _resolve_override_for_row: primero el nivel
+    (cell > product > subneg > wildcard) y, dentro del nivel, el primer candidato cuyo
+    override está vigente (effective_from_month vacío o <= mes de la fila).
+    """
+    sel_cols = [c for c in keys.columns if c.startswith("sel")]
+    base_cols = ["pos", "month", "subneg", "codigo"]
+    largo = pd.concat(
+        [
+            keys[base_cols].assign(selector=keys[col], rank=rank)
+            for rank, col in enumerate(sel_cols)
+        ],
+        ignore_index=True,
+    )
+    largo = largo.loc[largo["selector"] != ""]
+
+    hallados = []
+    for level, nombre, join_cols, scope in _OVERRIDE_LEVELS:
+        tabla = frames[nombre]
+        if tabla.empty or largo.empty:
+            continue
+        lado = largo.loc[largo["subneg"] != ""] if nombre == "wildcard" else largo
+        m = lado.merge(tabla, on=list(join_cols), how="inner")
+        if m.empty:
+            continue
+        vigente = m["month"] >= m["_ov_efm"].fillna("")
+        m = m.loc[vigente.to_numpy(dtype=bool)]
+        hallados.append(m[["pos", "rank", "_ov_monthly", "_ov_annual"]].assign(level=level, scope=scope))
+
+    if not hallados:
+        return pd.DataFrame(columns=["pos", "scope", "_ov_monthly", "_ov_annual"])
+    todos = pd.concat(hallados, ignore_index=True)
+    todos = todos.sort_values(["pos", "level", "rank"], kind="stable").drop_duplicates("pos", keep="first")
+    return todos[["pos", "scope", "_ov_monthly", "_ov_annual"]]
+
+
 def _selector_candidates_for_df(df: pd.DataFrame) -> list[str]:
     selectors: set[str] = set()
     for col in ("fantasia", "cliente_id", "_cliente", "Cliente"):
@@ -1045,6 +1259,75 @@ def _selector_candidates_for_df(df: pd.DataFrame) -> list[str]:
     return sorted(selectors)
 
 
+def _resolve_override_winners(
+    df: pd.DataFrame,
+    records: list[Any],
+    maps: dict[str, Any],
+    max_hist_date: pd.Timestamp | None = None,
+) -> tuple[np.ndarray, pd.DataFrame]:
+    """Posiciones afectadas por algún selector + override ganador por posición.
+
+    No copia `df`: solo lee las columnas de selector y, para las filas afectadas
+    (típicamente unas pocas miles de ~700K), fecha/subneg/código. Devuelve
+    (posiciones afectadas no históricas, DataFrame pos/scope/_ov_monthly/_ov_annual)
+    con `pos` posicional (0-based) sobre `df`.
+    """
+    # Build override selectors and find affected positions BEFORE resolving.
+    _override_selectors_pre: set[str] = {
+        _clean_override_text(getattr(rec, "client_selector", "") or "")
+        for rec in records
+    }
+    _override_selectors_pre.discard("")
+
+    # Vectorized mask over selector columns (much faster than Python list scan).
+    if _override_selectors_pre:
+        _aff_mask = np.zeros(len(df), dtype=bool)
+        for _sc in _OVERRIDE_SELECTOR_COLUMNS:
+            if _sc in df.columns:
+                _aff_mask |= df[_sc].astype(str).str.strip().isin(_override_selectors_pre).to_numpy(dtype=bool)
+        _affected_pos_arr = np.where(_aff_mask)[0]  # positional (0-based)
+    else:
+        _affected_pos_arr = np.array([], dtype=int)
+
+    # Historical rows stay as base: drop them from the affected set up front.
+    if len(_affected_pos_arr) and "fecha" in df.columns and max_hist_date is not None:
+        _fecha_aff = df["fecha"].iloc[_affected_pos_arr]
+        _hist = (_fecha_aff.notna() & (_fecha_aff <= max_hist_date)).to_numpy(dtype=bool)
+        _affected_pos_arr = _affected_pos_arr[~_hist]
+
+    _n_aff = len(_affected_pos_arr)
+    logger.info(
+        "[FORECAST PATCH] applying overrides to %d/%d rows (selectors=%d)",
+        _n_aff, len(df), len(_override_selectors_pre),
+    )
+    if _n_aff == 0:
+        return _affected_pos_arr, pd.DataFrame(columns=["pos", "scope", "_ov_monthly", "_ov_annual"])
+
+    # Resolve overrides for affected rows only: one priority-ordered merge per scope
+    # level against the compiled lookup frames (oct-2026; replaces the per-row
+    # _resolve_override_for_row loop, same precedence and last-wins semantics).
+    _df_aff = df.iloc[_affected_pos_arr]
+    # month_keys: numpy datetime64[M] cast is ~156ms vs ~2400ms for dt.strftime.
+    if "fecha" in _df_aff.columns:
+        month_keys = _df_aff["fecha"].values.astype("datetime64[M]").astype(str).astype(object)
+        month_keys[pd.isna(_df_aff["fecha"]).values] = ""
+    else:
+        month_keys = np.full(_n_aff, "", dtype=object)
+    _empty = np.full(_n_aff, "", dtype=object)
+    _cod_col = next((c for c in ("codigo_serie", "articulo", "descripcion") if c in _df_aff.columns), None)
+    keys = pd.DataFrame({
+        "pos": _affected_pos_arr,
+        "month": month_keys,
+        "subneg": _clean_override_series(_df_aff["subneg"].to_numpy()) if "subneg" in _df_aff.columns else _empty,
+        "codigo": _clean_override_series(_df_aff[_cod_col].to_numpy()) if _cod_col else _empty,
+    })
+    for _rank, _sc in enumerate(_OVERRIDE_SELECTOR_COLUMNS):
+        keys[f"sel{_rank}"] = (
+            _clean_override_series(_df_aff[_sc].to_numpy()) if _sc in _df_aff.columns else _empty
+        )
+    return _affected_pos_arr, _resolve_overrides_vectorized(keys, _compile_override_frames(maps))
+
+
 def _apply_override_effects_to_dataframe(
     df: pd.DataFrame,
     user_id: int | None,
@@ -1058,8 +1341,8 @@ def _apply_override_effects_to_dataframe(
         return df if df is not None else pd.DataFrame(), {"subneg_growths": {}, "selectors": []}
 
     if _records is not None:
-        # Caller pre-fetched records scoped to this client; _resolve_override_for_row
-        # handles selector/subneg matching per-row — no extra filter needed here.
+        # Caller pre-fetched records scoped to this client; the resolution below
+        # handles selector/subneg matching per row — no extra filter needed here.
         records = list(_records)
     else:
         selectors = _selector_candidates_for_df(df)
@@ -1079,115 +1362,23 @@ def _apply_override_effects_to_dataframe(
         out["_has_override"] = False
         return out, maps
 
-    # ── VECTORIZED pre-computation (replaces slow per-row Python loops) ────────
-    # month_keys: numpy datetime64[M] cast is ~156ms vs ~2400ms for dt.strftime.
-    import numpy as _np
-    if "fecha" in out.columns:
-        _fecha_arr = out["fecha"].values
-        _nat_mask = pd.isna(out["fecha"]).values
-        _mk_arr = _fecha_arr.astype("datetime64[M]").astype(str)
-        _mk_arr[_nat_mask] = ""
-        month_keys: list[str] = _mk_arr.tolist()
-    else:
-        month_keys = [""] * len(out)
-
-    # Build override selectors and find affected positions BEFORE building value lists.
-    # This lets us skip building 702K-row lists for columns we only need for ~1K rows.
-    _override_selectors_pre: set[str] = {
-        _clean_override_text(getattr(rec, "client_selector", "") or "")
-        for rec in records
-    }
-    _override_selectors_pre.discard("")
-
-    # Vectorized mask over selector columns (much faster than Python list scan).
-    if _override_selectors_pre:
-        _aff_mask = pd.Series(False, index=out.index)
-        for _sc in ("fantasia", "cliente_id", "_cliente", "Cliente"):
-            if _sc in out.columns:
-                _aff_mask |= out[_sc].astype(str).str.strip().isin(_override_selectors_pre)
-        _affected_pos_arr = _np.where(_aff_mask.values)[0]  # positional (0-based)
-    else:
-        _affected_pos_arr = _np.array([], dtype=int)
-
-    # Build per-row value arrays ONLY for affected rows (tiny subset, typically < 0.2%).
-    _n_aff = len(_affected_pos_arr)
-    if _n_aff > 0:
-        _df_aff = out.iloc[_affected_pos_arr]
-        fantasia_vals: list[str] = (
-            [_clean_override_text(v) for v in _df_aff["fantasia"]]
-            if "fantasia" in _df_aff.columns else [""] * _n_aff
-        )
-        cliente_id_vals: list[str] = (
-            [_clean_override_text(v) for v in _df_aff["cliente_id"]]
-            if "cliente_id" in _df_aff.columns else [""] * _n_aff
-        )
-        _cliente_vals: list[str] = (
-            [_clean_override_text(v) for v in _df_aff["_cliente"]]
-            if "_cliente" in _df_aff.columns else [""] * _n_aff
-        )
-        Cliente_vals: list[str] = (
-            [_clean_override_text(v) for v in _df_aff["Cliente"]]
-            if "Cliente" in _df_aff.columns else [""] * _n_aff
-        )
-        subneg_vals: list[str] = (
-            [_clean_override_text(v) for v in _df_aff["subneg"]]
-            if "subneg" in _df_aff.columns else [""] * _n_aff
-        )
-        _cod_src_aff = (
-            _df_aff["codigo_serie"] if "codigo_serie" in _df_aff.columns
-            else _df_aff["articulo"] if "articulo" in _df_aff.columns
-            else _df_aff["descripcion"] if "descripcion" in _df_aff.columns
-            else pd.Series([""] * _n_aff)
-        )
-        codigo_vals: list[str] = [_clean_override_text(v) for v in _cod_src_aff]
-    else:
-        # No affected rows — these lists won't be used but need to exist
-        fantasia_vals = cliente_id_vals = _cliente_vals = Cliente_vals = subneg_vals = codigo_vals = []
-
-    # ── Partition: resolve overrides only for affected rows ──────────────────
-    # _affected_pos_arr and value lists were already built in the pre-computation
-    # section above using vectorized pandas operations.
-    _base_monthly = _monthly_pct_from_annual_growth(base_growth_pct)
-    _n = len(out)
-
-    logger.info(
-        "[FORECAST PATCH] applying overrides to %d/%d rows (selectors=%d)",
-        _n_aff, _n, len(_override_selectors_pre),
-    )
+    _affected_pos_arr, winners = _resolve_override_winners(df, records, maps, max_hist_date)
 
     # Initialize all rows as base (vectorized — no Python loop).
-    scopes: list[str] = ["base"] * _n
-    monthlies: list[float] = [_base_monthly] * _n
-    annual_effects: list[float] = [1.0] * _n
-    flags: list[bool] = [False] * _n
-
-    # Resolve overrides for affected rows only.
-    # j = local index (0..n_aff-1); global_i = positional index in out.
-    if _n_aff > 0:
-        _fecha_col = out["fecha"] if "fecha" in out.columns else None
-        for j, global_i in enumerate(_affected_pos_arr):
-            if _fecha_col is not None and max_hist_date is not None:
-                row_date = _fecha_col.iloc[global_i]
-                if pd.notna(row_date) and row_date <= max_hist_date:
-                    continue  # historical row stays as base
-
-            selector_candidates: list[str] = []
-            for val in (fantasia_vals[j], cliente_id_vals[j], _cliente_vals[j], Cliente_vals[j]):
-                if val and val not in selector_candidates:
-                    selector_candidates.append(val)
-
-            resolved = _resolve_override_for_row(
-                selector_candidates=selector_candidates,
-                subneg=subneg_vals[j],
-                codigo_serie=codigo_vals[j],
-                forecast_month=month_keys[global_i],
-                maps=maps,
-                base_growth_pct=base_growth_pct,
-            )
-            scopes[global_i] = str(resolved["scope"])
-            monthlies[global_i] = float(resolved["monthly_pct"])
-            annual_effects[global_i] = 1.0 + float(resolved["annual_pct"]) / 100.0
-            flags[global_i] = str(resolved["scope"]) != "base"
+    _n = len(out)
+    scopes = np.full(_n, "base", dtype=object)
+    monthlies = np.full(_n, _monthly_pct_from_annual_growth(base_growth_pct), dtype=float)
+    annual_effects = np.ones(_n, dtype=float)
+    flags = np.zeros(_n, dtype=bool)
+    if len(_affected_pos_arr):
+        # Affected rows that resolve to base still carry the base annual effect.
+        annual_effects[_affected_pos_arr] = 1.0 + float(base_growth_pct or 0.0) / 100.0
+    if not winners.empty:
+        _pos = winners["pos"].to_numpy(dtype=int)
+        scopes[_pos] = winners["scope"].to_numpy(dtype=object)
+        monthlies[_pos] = winners["_ov_monthly"].to_numpy(dtype=float)
+        annual_effects[_pos] = 1.0 + winners["_ov_annual"].to_numpy(dtype=float) / 100.0
+        flags[_pos] = True
 
     out["_override_scope"] = scopes
     out["_monthly_pct"] = monthlies
@@ -1200,114 +1391,192 @@ def _apply_override_effects_to_dataframe(
 # Aprobaciones Forecast — captura de modificaciones (registro de control)
 # ---------------------------------------------------------------------------
 
-# ── Resolver de base valorizada por alcance ──────────────────────────────────
-# Estima el monto base (monto_yhat) ANUAL — sin filtrar por mes — para cada
-# alcance posible de un override. Usa la MISMA fuente real que Forecast:
-#   - Producción (PostgreSQL): tabla forecast_valorizado.
-#   - Local (SQLite): parquet df_valorizado.
-# Precalcula agregados una sola vez (cache TTL) → resolución O(1) por registro,
-# robusta a casing/espacios. NO depende de que el override tenga período.
+def _scope_norm(s: Any) -> str:
+    return str(s or "").strip().lower()
 
-_SCOPE_RESOLVER_CACHE: dict[str, Any] = {"data": None, "ts": 0.0}
-_SCOPE_RESOLVER_TTL = 600  # segundos
 
+# ── Snapshot de dimensiones de Forecast ───────────────────────────────────────
+# El resolver de alcances, el mapa cliente→{grupo, perfil} y el mapa subneg→neg
+# se armaban cada uno por su lado con .iterrows() (8 queries en PG) al vencer su
+# TTL, y el primer request después del vencimiento pagaba la reconstrucción.
+# Desde oct-2026 salen de UN snapshot: una sola lectura agregada de
+# forecast_valorizado / df_valorizado por (fantasia, grupo, perfil, subneg, neg,
+# codigo_serie) y una pasada vectorizada (claves normalizadas, sentinelas de
+# grupo, subneg→neg 1:1). Se sirve stale-while-revalidate: pasado
+# _FORECAST_DIMS_REFRESH_AT del TTL un thread lo reconstruye mientras se sigue
+# sirviendo el anterior; solo el arranque en frío (o force=True) construye en línea.
 
-def _scope_norm(s: Any) -> str:
-    return str(s or "").strip().lower()
+_FORECAST_DIMS_TTL = 600            # segundos
+_FORECAST_DIMS_REFRESH_AT = 0.8     # fracción del TTL desde la que se refresca en background
+_FORECAST_DIMS_RETRY = 30           # segundos mínimos entre intentos de refresco
+_FORECAST_DIMS_COLS = ("fantasia", "nombre_grupo", "perfil", "subneg", "neg", "codigo_serie")
+_FORECAST_DIMS: dict[str, Any] = {"data": None, "ts": 0.0, "intento": 0.0, "refrescando": False}
+_FORECAST_DIMS_LOCK = threading.Lock()
 
 
-def build_scope_value_resolver() -> dict:
-    """Construye los agregados de monto_yhat por alcance. Best-effort."""
-    res: dict[str, Any] = {
-        "ok": False, "source": None, "rows": 0,
+def _empty_scope_resolver(source: str | None = None) -> dict:
+    return {
+        "ok": False, "source": source, "rows": 0,
         "client": {}, "group": {}, "subneg": {}, "codigo": {}, "perfil": {},
         "client_subneg": {}, "client_codigo": {},
     }
+
+
+def _load_forecast_dims_frame() -> "pd.DataFrame":
+    """monto_yhat por combinación de dimensiones (sin mes): la base del snapshot."""
+    if engine is not None and "postgresql" in str(engine.url):
+        return _query_agg(
+            "SELECT TRIM(fantasia) AS fantasia, TRIM(nombre_grupo) AS nombre_grupo, "
+            "TRIM(perfil) AS perfil, TRIM(subneg) AS subneg, TRIM(neg) AS neg, "
+            "TRIM(codigo_serie) AS codigo_serie, SUM(monto_yhat) AS monto_yhat "
+            "FROM forecast_valorizado GROUP BY 1,2,3,4,5,6"
+        )
+    df = get_data().get("df_valorizado", pd.DataFrame())
+    cols = [c for c in _FORECAST_DIMS_COLS if df is not None and c in df.columns]
+    if df is None or df.empty or not cols:
+        return pd.DataFrame()
+    if "monto_yhat" not in df.columns:
+        return df[cols].drop_duplicates()
+    return (
+        df.groupby(cols, dropna=False, sort=False)["monto_yhat"]
+        .sum().reset_index()
+    )
+
+
+def build_forecast_dimensions(df: "pd.DataFrame | None" = None) -> SimpleNamespace:
+    """Snapshot {client_dim, subneg_neg, resolver} en una pasada vectorizada.
+
+    `df` es el agregado de _load_forecast_dims_frame (se lee si no se pasa).
+    Best-effort: ante cualquier error devuelve mapas vacíos (rows=0).
+    """
     is_pg = engine is not None and "postgresql" in str(engine.url)
+    source = "postgresql:forecast_valorizado" if is_pg else "parquet:df_valorizado"
+    snap = SimpleNamespace(client_dim={}, subneg_neg={}, resolver=_empty_scope_resolver(source), rows=0)
     try:
-        if is_pg:
-            res["source"] = "postgresql:forecast_valorizado"
+        if df is None:
+            df = _load_forecast_dims_frame()
+        if df is None or df.empty:
+            return snap
+        vacia = pd.Series(pd.NA, index=df.index, dtype="string")
+        txt = {c: df[c].astype("string").str.strip() if c in df.columns else vacia for c in _FORECAST_DIMS_COLS}
+        low = {c: s.str.lower() for c, s in txt.items()}
+        lleno = {c: s.fillna("").ne("") for c, s in txt.items()}
+
+        # cliente → {grupo, perfil}: MAX por cliente (mismo criterio que el GROUP BY de PG).
+        m = lleno["fantasia"]
+        if m.any():
+            agg = pd.DataFrame({
+                "grupo": txt["nombre_grupo"][m].fillna(""), "perfil": txt["perfil"][m].fillna(""),
+            }).groupby(low["fantasia"][m], sort=False).max()
+            grupo = agg["grupo"].astype(object)
+            grupo = grupo.where(~grupo.str.upper().isin(_SIN_GRUPO_SENTINELS), None)
+            perfil = agg["perfil"].astype(object).where(agg["perfil"].ne(""), None)
+            snap.client_dim = {
+                f: {"grupo": g, "perfil": p}
+                for f, g, p in zip(agg.index.tolist(), grupo.tolist(), perfil.tolist())
+            }
 
-            def _agg1(col: str) -> dict:
-                df = _query_agg(
-                    f"SELECT LOWER(TRIM({col})) AS k, SUM(monto_yhat) AS v "
-                    f"FROM forecast_valorizado WHERE {col} IS NOT NULL GROUP BY 1"
-                )
-                if df is None or df.empty:
+        # subneg → neg: solo subnegocios con un único negocio (ambiguos omitidos).
+        m = lleno["subneg"] & lleno["neg"]
+        if m.any():
+            por_sub = txt["neg"][m].groupby(low["subneg"][m], sort=False)
+            unico = por_sub.first()[por_sub.nunique().eq(1)]
+            snap.subneg_neg = dict(zip(unico.index.tolist(), unico.astype(object).tolist()))
+
+        # Resolver de montos anuales por alcance.
+        if "monto_yhat" in df.columns:
+            v = pd.to_numeric(df["monto_yhat"], errors="coerce").fillna(0.0).astype(float)
+            res = snap.resolver
+
+            def _sum(*cols: str) -> dict:
+                mask = lleno[cols[0]]
+                for c in cols[1:]:
+                    mask = mask & lleno[c]
+                if not mask.any():
                     return {}
-                return {str(r["k"]): float(r["v"] or 0.0) for _, r in df.iterrows() if r["k"]}
-
-            res["client"] = _agg1("fantasia")
-            res["group"] = _agg1("nombre_grupo")
-            res["subneg"] = _agg1("subneg")
-            res["codigo"] = _agg1("codigo_serie")
-            res["perfil"] = _agg1("perfil")
-
-            df_cs = _query_agg(
-                "SELECT LOWER(TRIM(fantasia)) AS k1, LOWER(TRIM(subneg)) AS k2, "
-                "SUM(monto_yhat) AS v FROM forecast_valorizado "
-                "WHERE fantasia IS NOT NULL AND subneg IS NOT NULL GROUP BY 1,2"
-            )
-            if df_cs is not None and not df_cs.empty:
-                res["client_subneg"] = {
-                    (str(r["k1"]), str(r["k2"])): float(r["v"] or 0.0)
-                    for _, r in df_cs.iterrows() if r["k1"] and r["k2"]
-                }
-            df_cc = _query_agg(
-                "SELECT LOWER(TRIM(fantasia)) AS k1, LOWER(TRIM(codigo_serie)) AS k2, "
-                "SUM(monto_yhat) AS v FROM forecast_valorizado "
-                "WHERE fantasia IS NOT NULL AND codigo_serie IS NOT NULL GROUP BY 1,2"
-            )
-            if df_cc is not None and not df_cc.empty:
-                res["client_codigo"] = {
-                    (str(r["k1"]), str(r["k2"])): float(r["v"] or 0.0)
-                    for _, r in df_cc.iterrows() if r["k1"] and r["k2"]
-                }
-        else:
-            res["source"] = "parquet:df_valorizado"
-            df = get_data().get("df_valorizado", pd.DataFrame())
-            if df is not None and not df.empty and "monto_yhat" in df.columns:
-                def _g(col: str) -> dict:
-                    if col not in df.columns:
-                        return {}
-                    key = df[col].astype(str).str.strip().str.lower()
-                    t = df.groupby(key)["monto_yhat"].sum()
-                    return {k: float(v) for k, v in t.items() if k}
-
-                res["client"] = _g("fantasia")
-                res["group"] = _g("nombre_grupo")
-                res["subneg"] = _g("subneg")
-                res["codigo"] = _g("codigo_serie")
-                res["perfil"] = _g("perfil")
-                if {"fantasia", "subneg"}.issubset(df.columns):
-                    k1 = df["fantasia"].astype(str).str.strip().str.lower()
-                    k2 = df["subneg"].astype(str).str.strip().str.lower()
-                    t = df.groupby([k1, k2])["monto_yhat"].sum()
-                    res["client_subneg"] = {(a, b): float(v) for (a, b), v in t.items()}
-                if {"fantasia", "codigo_serie"}.issubset(df.columns):
-                    k1 = df["fantasia"].astype(str).str.strip().str.lower()
-                    k2 = df["codigo_serie"].astype(str).str.strip().str.lower()
-                    t = df.groupby([k1, k2])["monto_yhat"].sum()
-                    res["client_codigo"] = {(a, b): float(v) for (a, b), v in t.items()}
-
-        res["rows"] = len(res["client"]) + len(res["subneg"])
-        res["ok"] = bool(res["client"] or res["subneg"] or res["codigo"] or res["perfil"])
+                keys = [low[c][mask] for c in cols]
+                t = v[mask].groupby(keys[0] if len(keys) == 1 else keys, sort=False).sum()
+                return dict(zip(t.index.tolist(), t.tolist()))
+
+            res["client"] = _sum("fantasia")
+            res["group"] = _sum("nombre_grupo")
+            res["subneg"] = _sum("subneg")
+            res["codigo"] = _sum("codigo_serie")
+            res["perfil"] = _sum("perfil")
+            res["client_subneg"] = _sum("fantasia", "subneg")
+            res["client_codigo"] = _sum("fantasia", "codigo_serie")
+            res["rows"] = len(res["client"]) + len(res["subneg"])
+            res["ok"] = bool(res["client"] or res["subneg"] or res["codigo"] or res["perfil"])
+        snap.rows = len(df)
     except Exception as exc:
-        logger.warning("build_scope_value_resolver error: %s", exc)
-    return res
+        logger.warning("build_forecast_dimensions error: %s", exc)
+        return SimpleNamespace(client_dim={}, subneg_neg={}, resolver=_empty_scope_resolver(source), rows=0)
+    return snap
+
+
+def _refresh_forecast_dimensions() -> SimpleNamespace:
+    """Reconstruye el snapshot y lo publica si trajo datos (nunca pisa uno más nuevo)."""
+    inicio = time.time()
+    snap = build_forecast_dimensions()
+    with _FORECAST_DIMS_LOCK:
+        _FORECAST_DIMS["intento"] = time.time()
+        if snap.rows and inicio >= _FORECAST_DIMS["ts"]:
+            _FORECAST_DIMS["data"] = snap
+            _FORECAST_DIMS["ts"] = inicio
+    return snap
+
+
+def _schedule_forecast_dims_refresh() -> bool:
+    """Lanza el refresco en background (uno a la vez, con espaciado entre intentos)."""
+    with _FORECAST_DIMS_LOCK:
+        if _FORECAST_DIMS["refrescando"] or time.time() - _FORECAST_DIMS["intento"] < _FORECAST_DIMS_RETRY:
+            return False
+        _FORECAST_DIMS["refrescando"] = True
+
+    def _run() -> None:
+        t0 = time.perf_counter()
+        try:
+            snap = _refresh_forecast_dimensions()
+            logger.info("[FORECAST dims] refrescado en %.0f ms — %d filas", (time.perf_counter() - t0) * 1000, snap.rows)
+        except Exception as exc:
+            logger.warning("[FORECAST dims] refresco falló: %s", exc)
+        finally:
+            with _FORECAST_DIMS_LOCK:
+                _FORECAST_DIMS["refrescando"] = False
+
+    threading.Thread(target=_run, name="forecast-dims-refresh", daemon=True).start()
+    return True
+
+
+def get_forecast_dimensions(force: bool = False) -> SimpleNamespace:
+    """Snapshot de dimensiones, stale-while-revalidate. force=True lo reconstruye en línea."""
+    with _FORECAST_DIMS_LOCK:
+        snap = _FORECAST_DIMS["data"]
+        edad = time.time() - _FORECAST_DIMS["ts"]
+    if force or snap is None:
+        return _refresh_forecast_dimensions()
+    if edad >= _FORECAST_DIMS_TTL * _FORECAST_DIMS_REFRESH_AT:
+        _schedule_forecast_dims_refresh()
+    return snap
+
+
+# ── Resolver de base valorizada por alcance ──────────────────────────────────
+# Estima el monto base (monto_yhat) ANUAL — sin filtrar por mes — para cada
+# alcance posible de un override. Usa la MISMA fuente real que Forecast:
+#   - Producción (PostgreSQL): tabla forecast_valorizado.
+#   - Local (SQLite): parquet df_valorizado.
+# Sale del snapshot de dimensiones → resolución O(1) por registro, robusta a
+# casing/espacios. NO depende de que el override tenga período.
+
+
+def build_scope_value_resolver() -> dict:
+    """Construye los agregados de monto_yhat por alcance. Best-effort."""
+    return build_forecast_dimensions().resolver
 
 
 def get_scope_value_resolver(force: bool = False) -> dict:
-    """Resolver cacheado (TTL). force=True lo reconstruye."""
-    now = time.time()
-    cached = _SCOPE_RESOLVER_CACHE.get("data")
-    if (not force) and cached is not None and (now - _SCOPE_RESOLVER_CACHE.get("ts", 0) < _SCOPE_RESOLVER_TTL):
-        return cached
-    data = build_scope_value_resolver()
-    if data.get("ok"):
-        _SCOPE_RESOLVER_CACHE["data"] = data
-        _SCOPE_RESOLVER_CACHE["ts"] = now
-    return data
+    """Resolver del snapshot de dimensiones. force=True lo reconstruye."""
+    return get_forecast_dimensions(force).resolver
 
 
 def resolve_scope_base(
@@ -1366,20 +1635,36 @@ def compute_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool =
     forecast_change_request vigente para asignarle el status.
 
     Misma precedencia/last-wins que la curva (vía _apply_override_effects_to_dataframe
-    + _build_override_maps); no introduce reglas paralelas.
+    + _build_override_maps); no introduce reglas paralelas. Cálculo completo sin
+    cache: la pantalla de aprobaciones usa `get_approval_curve_impacts`.
     """
-    recs = [r for r in _fetch_override_records(None, all_users=bool(is_admin))
-            if getattr(r, "is_active", False)]
-    if not recs:
-        return {}
     # MISMA consolidación que la curva en producción (_pg_get_chart_data_inner):
     # un único override por alcance, el más reciente (records ya vienen ordenados
-    # por updated_at ASC). Evita doble conteo de duplicados activos.
-    recs = _consolidate_override_records(recs, "approvals")
-    selectors = _build_override_maps(recs).get("selectors", [])
-    if not selectors:
+    # por updated_at ASC). Evita doble conteo de duplicados activos. Sale del
+    # snapshot versionado, compartido con la curva.
+    snap = _get_override_snapshot(None, all_users=bool(is_admin))
+    recs, selectors = _approval_active_records(snap)
+    if not recs or not selectors:
         return {}
+    ov = _load_approval_base_rows(selectors)
+    if ov is None or ov.empty:
+        return {}
+    return _merge_approval_impact_parts(
+        _approval_impact_parts(ov, recs, growth_pct=growth_pct, is_admin=is_admin)
+    )
+
 
+def _approval_active_records(snap) -> tuple[list, list[str]]:
+    """(overrides activos consolidados, selectores) del snapshot."""
+    recs = [r for r in snap.consolidated if getattr(r, "is_active", False)]
+    if not recs:
+        return [], []
+    maps = snap.consolidated_maps if len(recs) == len(snap.consolidated) else _build_override_maps(recs)
+    return recs, list(maps.get("selectors", []))
+
+
+def _load_approval_base_rows(selectors: list[str]) -> pd.DataFrame:
+    """Filas base (fecha × cliente × subneg × serie, monto_yhat) de los selectores."""
     is_pg = engine is not None and "postgresql" in str(engine.url)
     try:
         if is_pg:
@@ -1393,25 +1678,34 @@ def compute_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool =
         else:
             df = get_data().get("df_valorizado", pd.DataFrame())
             if df is None or df.empty or "monto_yhat" not in df.columns or "fantasia" not in df.columns:
-                return {}
+                return pd.DataFrame()
             sel_norm = {_clean_override_text(s) for s in selectors}
             fnorm = df["fantasia"].astype(str).map(_clean_override_text)
             sub_df = df[fnorm.isin(sel_norm)].copy()
             if sub_df.empty:
-                return {}
+                return pd.DataFrame()
             sub_df["base_val"] = sub_df["monto_yhat"]
             gcols = [c for c in ("fecha", "fantasia", "cliente_id", "subneg", "codigo_serie") if c in sub_df.columns]
             ov = sub_df.groupby(gcols, dropna=False)["base_val"].sum().reset_index()
     except Exception as exc:
         logger.warning("compute_approval_curve_impacts load failed: %s", exc)
-        return {}
+        return pd.DataFrame()
     if ov is None or ov.empty:
-        return {}
-
+        return pd.DataFrame()
     # fecha → datetime (necesario para _apply_override_effects_to_dataframe).
     if "fecha" in ov.columns:
         ov["fecha"] = pd.to_datetime(ov["fecha"], errors="coerce")
+    return ov
+
+
+def _approval_impact_parts(
+    ov: pd.DataFrame, recs: list, *, growth_pct: float, is_admin: bool,
+) -> dict[str, dict[tuple, dict]]:
+    """Impactos sin redondear particionados por el cliente (fantasia) de la fila.
 
+    La resolución de overrides es fila a fila, así que una partición se puede
+    recalcular sola cuando cambia un override de ese cliente.
+    """
     # Reusar EXACTAMENTE la resolución de overrides de la curva. max_hist_date=None
     # porque el valorizado es proyección (todo futuro) → todas las filas vigentes.
     ov, _ = _apply_override_effects_to_dataframe(
@@ -1472,7 +1766,7 @@ def compute_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool =
         elif _sc == FORECAST_SCOPE_CELL:
             _oid_by_key[(_sc, _sel, _sub, _cod, _mon)] = _rid
 
-    out: dict[tuple, dict] = {}
+    parts: dict[str, dict[tuple, dict]] = {}
     for _, r in ov.iterrows():
         d = float(r.get("_delta") or 0.0)
         if d == 0.0:
@@ -1495,6 +1789,7 @@ def compute_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool =
             ident = {"subneg": sub, "codigo": cod, "month": month}
         else:
             continue
+        out = parts.setdefault(_clean_override_text(r.get("fantasia", "") or ""), {})
         agg = out.get(key)
         if agg is None:
             out[key] = {"impact": d, "ogp": round((ae - 1.0) * 100.0, 2),
@@ -1502,11 +1797,132 @@ def compute_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool =
                         "override_id": _oid_by_key.get(key), **ident}
         else:
             agg["impact"] += d
+    return parts
+
+
+def _merge_approval_impact_parts(parts: dict[str, dict[tuple, dict]]) -> dict:
+    """Une las particiones en el dict de `compute_approval_curve_impacts` (redondeado)."""
+    out: dict[tuple, dict] = {}
+    for part in parts.values():
+        for key, info in part.items():
+            agg = out.get(key)
+            if agg is None:
+                out[key] = dict(info)
+            else:
+                agg["impact"] += info["impact"]
     for v in out.values():
         v["impact"] = round(v["impact"], 2)
     return out
 
 
+# ── Servicio de impacto de aprobaciones ──────────────────────────────────────
+# El medidor de meta de Aprobaciones llamaba a compute_approval_curve_impacts en
+# cada apertura: recarga de overrides, consulta de forecast_valorizado para todos
+# los selectores y el motor de overrides completo. Ahora (oct-2026) el resultado
+# queda en memoria por (growth_pct, is_admin) junto con la versión de overrides con
+# la que se calculó, particionado por cliente. Si la versión avanzó y todas las
+# escrituras intermedias informaron sus selectores (aprobar / rechazar vía
+# materialize_approved_change_request y compañía), solo se recalculan las
+# particiones de esos clientes; si alguna no los informó, recálculo completo. Las
+# filas base de forecast_valorizado también quedan cacheadas y solo se consultan
+# las de selectores nuevos; un reload de datos (clear_response_cache sin
+# selectores) las descarta.
+
+_APPROVAL_IMPACT_STATES: dict[tuple, SimpleNamespace] = {}
+_APPROVAL_BASE_ROWS: SimpleNamespace | None = None      # df (+_part, _cli) y selectores cargados
+_APPROVAL_IMPACT_LOCK = threading.Lock()
+
+
+def _reset_approval_impacts(*, rows: bool) -> None:
+    global _APPROVAL_BASE_ROWS
+    with _APPROVAL_IMPACT_LOCK:
+        _APPROVAL_IMPACT_STATES.clear()
+        if rows:
+            _APPROVAL_BASE_ROWS = None
+
+
+def _approval_base_rows(selectors: list[str]) -> pd.DataFrame:
+    """Filas base de `selectors` (solo consulta las de selectores aún no cargados)."""
+    global _APPROVAL_BASE_ROWS
+    wanted = {_clean_override_text(s) for s in selectors if _clean_override_text(s)}
+    with _APPROVAL_IMPACT_LOCK:
+        cache = _APPROVAL_BASE_ROWS
+    if cache is None:
+        cache = SimpleNamespace(df=pd.DataFrame(), loaded=frozenset())
+    missing = [s for s in selectors if _clean_override_text(s) in wanted - cache.loaded]
+    if missing:
+        new = _load_approval_base_rows(missing)
+        if not new.empty:
+            new["_part"] = new["fantasia"].map(lambda v: _clean_override_text(v or ""))
+            new["_cli"] = (
+                new["cliente_id"].map(lambda v: _clean_override_text(v or "").lower())
+                if "cliente_id" in new.columns else ""
+            )
+        df = pd.concat([cache.df, new], ignore_index=True) if not cache.df.empty else new
+        cache = SimpleNamespace(df=df, loaded=cache.loaded | wanted)
+        with _APPROVAL_IMPACT_LOCK:
+            _APPROVAL_BASE_ROWS = cache
+    if cache.df.empty:
+        return cache.df
+    # Igual que la carga completa: solo filas de clientes que hoy son selectores.
+    return cache.df[cache.df["_part"].isin(wanted)]
+
+
+def get_approval_curve_impacts(growth_pct: float = 25.0, *, is_admin: bool = True) -> dict:
+    """Mismo resultado que `compute_approval_curve_impacts`, cacheado e incremental.
+
+    Tratar como solo lectura: es el mismo dict para todas las requests de una versión.
+    """
+    snap = _get_override_snapshot(None, all_users=bool(is_admin))
+    key = (round(float(growth_pct), 4), bool(is_admin))
+    with _APPROVAL_IMPACT_LOCK:
+        state = _APPROVAL_IMPACT_STATES.get(key)
+    if state is not None and state.version == snap.version:
+        return state.impacts
+
+    t0 = time.perf_counter()
+    recs, selectors = _approval_active_records(snap)
+    touched = None if state is None else _override_changes_since(state.version, snap.version)
+    if not recs or not selectors:
+        parts: dict[str, dict[tuple, dict]] = {}
+        mode = "empty"
+    else:
+        rows = _approval_base_rows(selectors)
+        if rows.empty:
+            parts = {}
+            mode = "empty"
+        elif touched is None:
+            parts = _approval_impact_parts(
+                rows.drop(columns=["_part", "_cli"]), recs, growth_pct=growth_pct, is_admin=is_admin,
+            )
+            mode = "full"
+        else:
+            # Particiones afectadas: la del propio cliente y las de filas que lo
+            # referencian por cliente_id (el matching de overrides mira ambos).
+            lowered = rows["_part"].str.lower()
+            hit = lowered.isin(touched) | rows["_cli"].isin(touched)
+            affected = set(rows.loc[hit, "_part"]) | {p for p in state.parts if p.lower() in touched}
+            parts = {p: v for p, v in state.parts.items() if p not in affected}
+            if affected:
+                sub = rows[rows["_part"].isin(affected)].drop(columns=["_part", "_cli"])
+                parts.update(_approval_impact_parts(sub, recs, growth_pct=growth_pct, is_admin=is_admin))
+            mode = f"incremental:{len(affected)}"
+    impacts = _merge_approval_impact_parts(parts)
+    with _OVERRIDE_SNAPSHOT_LOCK:
+        current = _OVERRIDE_VERSION
+    # Si hubo una escritura durante el cálculo, se devuelve pero no se guarda.
+    if snap.version == current:
+        with _APPROVAL_IMPACT_LOCK:
+            _APPROVAL_IMPACT_STATES[key] = SimpleNamespace(
+                version=snap.version, parts=parts, impacts=impacts,
+            )
+    logger.info(
+        "[FORECAST approvals] impacts mode=%s keys=%s elapsed_ms=%.1f",
+        mode, len(impacts), (time.perf_counter() - t0) * 1000,
+    )
+    return impacts
+
+
 def estimate_scope_amount(
     *,
     perfil: str | None = None,
@@ -1534,10 +1950,6 @@ def estimate_scope_amount(
 _SIN_GRUPO_SENTINELS = {"SIN GRUPO", "SIN GRUPO / OTROS", "", "NAN", "NONE"}
 
 
-_CLIENT_DIM_CACHE: dict[str, Any] = {"data": None, "ts": 0.0}
-_CLIENT_DIM_TTL = 600  # segundos
-
-
 def build_client_dim_map() -> dict[str, dict]:
     """Mapa cliente(fantasía normalizada) → {grupo, perfil}.
 
@@ -1545,60 +1957,12 @@ def build_client_dim_map() -> dict[str, dict]:
     crecimiento": en producción usa PG forecast_valorizado; en local el parquet
     df_valorizado. Cada cliente tiene 1 grupo y 1 perfil. Best-effort: {} si falla.
     """
-    out: dict[str, dict] = {}
-    is_pg = engine is not None and "postgresql" in str(engine.url)
-    try:
-        if is_pg:
-            df = _query_agg(
-                "SELECT LOWER(TRIM(fantasia)) AS f, "
-                "MAX(TRIM(nombre_grupo)) AS grupo, MAX(TRIM(perfil)) AS perfil "
-                "FROM forecast_valorizado WHERE fantasia IS NOT NULL GROUP BY 1"
-            )
-            if df is None or df.empty:
-                return out
-            for _, r in df.iterrows():
-                f = str(r.get("f") or "").strip()
-                if not f:
-                    continue
-                grp = str(r.get("grupo") or "").strip()
-                perf = str(r.get("perfil") or "").strip()
-                out[f] = {
-                    "grupo": None if grp.upper() in _SIN_GRUPO_SENTINELS else grp,
-                    "perfil": perf or None,
-                }
-        else:
-            df = get_data().get("df_valorizado", pd.DataFrame())
-            if df is None or df.empty or "fantasia" not in df.columns:
-                return out
-            cols = [c for c in ("fantasia", "nombre_grupo", "perfil") if c in df.columns]
-            sub = df[cols].dropna(subset=["fantasia"]).drop_duplicates("fantasia")
-            for _, r in sub.iterrows():
-                f = str(r.get("fantasia") or "").strip().lower()
-                if not f:
-                    continue
-                grp = str(r.get("nombre_grupo") or "").strip()
-                perf = str(r.get("perfil") or "").strip()
-                out[f] = {
-                    "grupo": None if grp.upper() in _SIN_GRUPO_SENTINELS else grp,
-                    "perfil": perf or None,
-                }
-    except Exception as exc:
-        logger.warning("build_client_dim_map error: %s", exc)
-        return {}
-    return out
+    return build_forecast_dimensions().client_dim
 
 
 def get_client_dim_map(force: bool = False) -> dict[str, dict]:
-    """Mapa cliente→{grupo,perfil} cacheado (TTL)."""
-    now = time.time()
-    cached = _CLIENT_DIM_CACHE.get("data")
-    if (not force) and cached is not None and (now - _CLIENT_DIM_CACHE.get("ts", 0) < _CLIENT_DIM_TTL):
-        return cached
-    data = build_client_dim_map()
-    if data:
-        _CLIENT_DIM_CACHE["data"] = data
-        _CLIENT_DIM_CACHE["ts"] = now
-    return data
+    """Mapa cliente→{grupo,perfil} del snapshot de dimensiones."""
+    return get_forecast_dimensions(force).client_dim
 
 
 def get_client_group_map() -> dict[str, str]:
@@ -1614,72 +1978,22 @@ def get_client_perfil_map() -> dict[str, str]:
 
 
 # ── Mapa subnegocio → negocio (derivación 1:1 confirmada en el maestro) ───────
-_SUBNEG_NEG_CACHE: dict[str, Any] = {"data": None, "ts": 0.0}
-_SUBNEG_NEG_TTL = 600  # segundos
-
-
 def build_subneg_neg_map() -> dict[str, str]:
     """Mapa subnegocio(normalizado lower/trim) → negocio.
 
-    MISMA fuente y criterio que build_client_dim_map: en producción usa PG
-    forecast_valorizado; en local el parquet df_valorizado. La relación subneg→neg
-    es 1:1 en el maestro (verificado). Best-effort: {} si la fuente falla.
+    MISMA fuente y criterio que build_client_dim_map. La relación subneg→neg es
+    1:1 en el maestro (verificado). Best-effort: {} si la fuente falla.
 
     Solo se incluyen subnegocios con un ÚNICO negocio asociado: si un subneg fuese
     ambiguo (>1 neg) se OMITE, y subnegocios sin match (p. ej. 'General') tampoco
     aparecen → el lookup devuelve None y el registro queda con neg NULL sin romper.
     """
-    out: dict[str, str] = {}
-    is_pg = engine is not None and "postgresql" in str(engine.url)
-    try:
-        if is_pg:
-            df = _query_agg(
-                "SELECT LOWER(TRIM(subneg)) AS s, MAX(TRIM(neg)) AS neg "
-                "FROM forecast_valorizado "
-                "WHERE subneg IS NOT NULL AND TRIM(subneg) <> '' "
-                "AND neg IS NOT NULL AND TRIM(neg) <> '' "
-                "GROUP BY 1 HAVING COUNT(DISTINCT TRIM(neg)) = 1"
-            )
-            if df is None or df.empty:
-                return out
-            for _, r in df.iterrows():
-                s = str(r.get("s") or "").strip()
-                neg = str(r.get("neg") or "").strip()
-                if s and neg:
-                    out[s] = neg
-        else:
-            df = get_data().get("df_valorizado", pd.DataFrame())
-            if df is None or df.empty or "subneg" not in df.columns or "neg" not in df.columns:
-                return out
-            # Vectorizado — antes iteraba fila a fila con .iterrows() sobre las
-            # ~700K filas de df_valorizado (~17s medidos). str.strip/lower +
-            # groupby corren en C, no en el loop de Python: mismo resultado,
-            # milisegundos en vez de segundos (medido: ver PROJECT_ACTIVE.md).
-            sub = df[["subneg", "neg"]].dropna()
-            s_norm = sub["subneg"].astype(str).str.strip().str.lower()
-            neg_norm = sub["neg"].astype(str).str.strip()
-            mask = (s_norm != "") & (neg_norm != "")
-            grouped = pd.DataFrame({"s": s_norm[mask], "neg": neg_norm[mask]}).groupby("s")["neg"].unique()
-            for s, negs in grouped.items():
-                if len(negs) == 1:  # solo 1:1, ambiguos omitidos
-                    out[s] = negs[0]
-    except Exception as exc:
-        logger.warning("build_subneg_neg_map error: %s", exc)
-        return {}
-    return out
+    return build_forecast_dimensions().subneg_neg
 
 
 def get_subneg_neg_map(force: bool = False) -> dict[str, str]:
-    """Mapa subneg→neg cacheado (TTL). Lookup por LOWER(TRIM(subneg))."""
-    now = time.time()
-    cached = _SUBNEG_NEG_CACHE.get("data")
-    if (not force) and cached is not None and (now - _SUBNEG_NEG_CACHE.get("ts", 0) < _SUBNEG_NEG_TTL):
-        return cached
-    data = build_subneg_neg_map()
-    if data:
-        _SUBNEG_NEG_CACHE["data"] = data
-        _SUBNEG_NEG_CACHE["ts"] = now
-    return data
+    """Mapa subneg→neg del snapshot de dimensiones. Lookup por LOWER(TRIM(subneg))."""
+    return get_forecast_dimensions(force).subneg_neg
 
 
 def _classify_change_type(old_pct: float | None, new_pct: float | None) -> str:
@@ -1906,6 +2220,7 @@ def _upsert_override_record(
         user_id=user_id,
         user_email=user_email,
     )
+    _bump_override_version([client_id])
 
 
 def _deactivate_override(
@@ -1945,6 +2260,7 @@ def _deactivate_override(
         user_id=user_id,
         user_email=user_email,
     )
+    _bump_override_version([client_id])
     return
 
     rec = existing_map.get(identity)
@@ -1981,6 +2297,7 @@ def deactivate_override_by_id(
         return None
     if rec is None or not getattr(rec, "is_active", False):
         return None
+    _bump_override_version([getattr(rec, "client_selector", "") or ""])
     rec.is_active = False
     rec.updated_by = reviewer_email
     rec.updated_at = dt.datetime.utcnow()
@@ -2008,6 +2325,7 @@ def materialize_approved_change_request(session, cr, *, reviewer_email: str | No
         FORECAST_SCOPE_SUBNEG, FORECAST_SCOPE_PRODUCT, FORECAST_SCOPE_CELL
     }:
         raise ValueError("propuesta incompleta")
+    _bump_override_version([selector])
 
     rec = (
         session.query(ForecastUserOverride)
@@ -2884,31 +3202,52 @@ def _annotate_rows_with_growth_pct(
         row["_growth_inherited"] = bool(info["inherited"])
 
 
-def _get_patched_df_val(user_id: int | None = None, df_source=None, *, is_admin: bool = False) -> "pd.DataFrame":
-    """Return df_valorizado with SQL overrides applied (copy — never mutates cache)."""
+# ── Overlay copy-on-write sobre df_valorizado ────────────────────────────────
+# Antes _get_patched_df_val copiaba las ~700K filas del cache en cada request
+# (y otra vez dentro de _apply_override_effects_to_dataframe) aunque los overrides
+# tocaran unas pocas miles. El overlay guarda solo las filas con override vigente
+# (posición → valores ya multiplicados por _annual_eff); el cache queda de solo
+# lectura y cada caller materializa únicamente las filas que su filtro conserva
+# (oct-2026).
+
+_PATCH_VALUE_COLUMNS = ("yhat_cliente", "monto_yhat", "li_cliente", "ls_cliente", "monto_li", "monto_ls")
+
+
+def _get_valorizado_overlay(
+    user_id: int | None = None, df_source=None, *, is_admin: bool = False
+) -> SimpleNamespace:
+    """df_valorizado cacheado (sin copiar) + overlay disperso de overrides.
+
+    Campos: `base` (frame del cache, NO mutar), `pos` (posiciones 0-based con
+    override vigente), `scope`/`monthly`/`annual_eff` (por posición del overlay),
+    `values` (columna → valores parcheados) y `coerce` (con overrides las columnas
+    de valor salen numéricas con NaN→0, igual que el parche histórico).
+    """
     if df_source is not None:
         df = df_source
     else:
-        data = get_data()
-        df = data.get("df_valorizado", None)
-    if df is None or df.empty:
-        return df if df is not None else pd.DataFrame()
-
-    # Pre-fetch override records once here to avoid _selector_candidates_for_df(702K rows)
-    # inside _apply_override_effects_to_dataframe, which scans all rows to build SQL IN clause.
-    _records = _fetch_override_records(user_id, all_users=is_admin)
+        df = get_data().get("df_valorizado", None)
+    if df is None:
+        df = pd.DataFrame()
+    overlay = SimpleNamespace(
+        base=df,
+        pos=np.array([], dtype=int),
+        scope=np.array([], dtype=object),
+        monthly=np.array([], dtype=float),
+        annual_eff=np.array([], dtype=float),
+        values={},
+        coerce=False,
+    )
+    if df.empty:
+        return overlay
 
+    # Pre-fetch override records once here to avoid _selector_candidates_for_df(702K rows),
+    # which scans all rows to build SQL IN clause.
+    _snap = _get_override_snapshot(user_id, all_users=is_admin)
+    _records = _snap.records
     if not _records:
-        # Fast path: no overrides — skip expensive df.copy() + row-by-row loop.
-        # Just add the 4 sentinel columns and return. Values are unchanged from cache.
         logger.info("[FORECAST PATCH] skipped apply overrides reason=no_overrides uid=%s is_admin=%s", user_id, is_admin)
-        out = df.copy()
-        out["_override_scope"] = "base"
-        out["_monthly_pct"] = _monthly_pct_from_annual_growth(0.0)
-        out["_annual_eff"] = 1.0
-        out["_has_override"] = False
-        out.drop(columns=["_month_key"], inplace=True, errors="ignore")
-        return out
+        return overlay
 
     data = get_data()
     df_main = data.get("df_main", pd.DataFrame())
@@ -2916,25 +3255,78 @@ def _get_patched_df_val(user_id: int | None = None, df_source=None, *, is_admin:
     if not df_main.empty and "tipo" in df_main.columns and "fecha" in df_main.columns:
         max_hist_date = df_main[df_main["tipo"] == "hist"]["fecha"].max()
 
-    patched, _maps = _apply_override_effects_to_dataframe(
-        df,
-        user_id=user_id,
-        base_growth_pct=0.0,
-        max_hist_date=max_hist_date,
-        _records=_records,
-        is_admin=is_admin,
+    _, winners = _resolve_override_winners(df, _records, _snap.maps, max_hist_date)
+    overlay.coerce = True
+    if winners.empty:
+        return overlay
+    winners = winners.sort_values("pos", kind="stable")
+    overlay.pos = winners["pos"].to_numpy(dtype=int)
+    overlay.scope = winners["scope"].to_numpy(dtype=object)
+    overlay.monthly = winners["_ov_monthly"].to_numpy(dtype=float)
+    overlay.annual_eff = 1.0 + winners["_ov_annual"].to_numpy(dtype=float) / 100.0
+    for col in _PATCH_VALUE_COLUMNS:
+        if col in df.columns:
+            base_vals = pd.to_numeric(df[col].iloc[overlay.pos], errors="coerce").fillna(0).to_numpy(dtype=float)
+            overlay.values[col] = base_vals * overlay.annual_eff
+    return overlay
+
+
+def _materialize_valorizado_overlay(overlay: SimpleNamespace, mask=None) -> "pd.DataFrame":
+    """Filas de `overlay.base` seleccionadas por `mask` con los overrides aplicados.
+
+    Copia solo el subconjunto filtrado (el cache nunca se muta) y le agrega las 4
+    columnas centinela (_override_scope/_monthly_pct/_annual_eff/_has_override).
+    `mask`: booleana alineada posicionalmente con `overlay.base`; None = todas.
+    """
+    base = overlay.base
+    if base.empty:
+        return base.copy()
+    if mask is None:
+        keep = np.ones(len(base), dtype=bool)
+        out = base.copy()
+    else:
+        keep = np.asarray(mask, dtype=bool)
+        out = base[keep].copy()
+    out.drop(columns=["_month_key"], inplace=True, errors="ignore")
+    if overlay.coerce:
+        for col in _PATCH_VALUE_COLUMNS:
+            if col in out.columns:
+                out[col] = pd.to_numeric(out[col], errors="coerce").fillna(0).astype(float)
+
+    n = len(out)
+    scopes = np.full(n, "base", dtype=object)
+    monthlies = np.full(n, _monthly_pct_from_annual_growth(0.0), dtype=float)
+    annual_effects = np.ones(n, dtype=float)
+    flags = np.zeros(n, dtype=bool)
+    if len(overlay.pos) and n:
+        en_filtro = keep[overlay.pos]
+        # Posición de cada fila base dentro del subconjunto materializado.
+        local = (np.cumsum(keep) - 1)[overlay.pos[en_filtro]]
+        scopes[local] = overlay.scope[en_filtro]
+        monthlies[local] = overlay.monthly[en_filtro]
+        annual_effects[local] = overlay.annual_eff[en_filtro]
+        flags[local] = True
+        for col, vals in overlay.values.items():
+            if col in out.columns:
+                arr = out[col].to_numpy(dtype=float, copy=True)
+                arr[local] = vals[en_filtro]
+                out[col] = arr
+    out["_override_scope"] = scopes
+    out["_monthly_pct"] = monthlies
+    out["_annual_eff"] = annual_effects
+    out["_has_override"] = flags
+    return out
+
+
+def _get_patched_df_val(user_id: int | None = None, df_source=None, *, is_admin: bool = False) -> "pd.DataFrame":
+    """Return df_valorizado with SQL overrides applied (copy — never mutates cache).
+
+    Materializa el frame completo; los caminos calientes (client-table, treemap)
+    usan _get_valorizado_overlay y materializan solo lo que filtran.
+    """
+    return _materialize_valorizado_overlay(
+        _get_valorizado_overlay(user_id=user_id, df_source=df_source, is_admin=is_admin)
     )
-    if not patched.empty:
-        future_mask = patched["_has_override"]
-        for col in ("yhat_cliente", "monto_yhat", "li_cliente", "ls_cliente", "monto_li", "monto_ls"):
-            if col in patched.columns:
-                patched[col] = pd.to_numeric(patched[col], errors="coerce").fillna(0).astype(float)
-                patched.loc[future_mask, col] = (
-                    patched.loc[future_mask, col].astype(float)
-                    * patched.loc[future_mask, "_annual_eff"].astype(float)
-                )
-    patched.drop(columns=["_month_key"], inplace=True, errors="ignore")
-    return patched
 
 
 # ---------------------------------------------------------------------------
@@ -3465,6 +3857,12 @@ def _safe_in(col: str, vals: list) -> str:
     vals = _norm_filter_list(vals)
     if not vals:
         return ""
+    # Dentro de un bind scope (chart / client-table / treemap en PG) la lista viaja
+    # como array bind: mismo texto de statement para cualquier selección.
+    if engine is not None and "postgresql" in str(engine.url):
+        ref = _fsql.bind(col, vals)
+        if ref:
+            return f"{col} = ANY({ref})"
     clean_vals = ["'" + str(v).replace("'", "''") + "'" for v in vals]
     if len(clean_vals) > 20 and engine is not None and "postgresql" in str(engine.url):
         return f"{col} = ANY(ARRAY[{','.join(clean_vals)}])"
@@ -3714,9 +4112,11 @@ def _build_filter_sql(
     products_as_codes = _norm_filter_list(products_as_codes) if products_as_codes is not None else None
     parts = ["1=1"]
     if start_date:
-        parts.append(f"fecha >= '{start_date}'")
+        ref = _fsql.bind("fecha_desde", str(start_date)) if engine is not None and "postgresql" in str(engine.url) else None
+        parts.append(f"fecha >= {ref}" if ref else f"fecha >= '{start_date}'")
     if end_date:
-        parts.append(f"fecha <= '{end_date}'")
+        ref = _fsql.bind("fecha_hasta", str(end_date)) if engine is not None and "postgresql" in str(engine.url) else None
+        parts.append(f"fecha <= {ref}" if ref else f"fecha <= '{end_date}'")
     if profiles:
         c = _safe_in("perfil", profiles)
         if c:
@@ -3743,6 +4143,76 @@ def _build_filter_sql(
     return " AND ".join(parts)
 
 
+# ---------------------------------------------------------------------------
+# Agregados base independientes del crecimiento (oct-2026)
+# growth_pct forma parte de la clave de _resp_cache, así que cada movimiento del
+# slider era un MISS que volvía a correr todo el SQL de chart / client-table. Pero
+# ninguna de esas consultas depende de growth_pct: la tasa (global, wildcard de
+# grupo u override por subneg) se aplica siempre en pandas sobre el agregado. Dentro
+# de _growth_base_scope() cada resultado de _query_agg se memoiza por (SQL, binds):
+# el agregado base se calcula una vez por set de filtros y el slider solo re-ejecuta
+# el post-proceso en memoria. Solo tablas forecast_* (cambian con reload_data →
+# clear_response_cache); los errores no se cachean.
+# ---------------------------------------------------------------------------
+_GROWTH_BASE_SCOPE: ContextVar[bool] = ContextVar("forecast_growth_base_scope", default=False)
+_BASE_AGG_CACHE: "OrderedDict[tuple, tuple[float, pd.DataFrame, int]]" = OrderedDict()
+_BASE_AGG_LOCK = threading.Lock()
+_BASE_AGG_TTL = _RESP_TTL_DATA
+_BASE_AGG_MAX_ITEMS = 256
+_BASE_AGG_MAX_ENTRY_BYTES = 16_000_000
+_BASE_AGG_MAX_TOTAL_BYTES = 96_000_000
+
+
+@contextmanager
+def _growth_base_scope():
+    """Memoiza los agregados de _query_agg del bloque (ver comentario de arriba)."""
+    token = _GROWTH_BASE_SCOPE.set(True)
+    try:
+        yield
+    finally:
+        _GROWTH_BASE_SCOPE.reset(token)
+
+
+def _base_agg_key(sql: str) -> tuple:
+    params = _fsql.params_para(sql)
+    return (sql, tuple(
+        (k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in sorted(params.items())
+    ))
+
+
+def _base_agg_get(key: tuple) -> "pd.DataFrame | None":
+    with _BASE_AGG_LOCK:
+        entry = _BASE_AGG_CACHE.get(key)
+        if entry is None:
+            return None
+        if (time.monotonic() - entry[0]) >= _BASE_AGG_TTL:
+            _BASE_AGG_CACHE.pop(key, None)
+            return None
+        _BASE_AGG_CACHE.move_to_end(key)
+    # Los callers renombran / agregan columnas in place: se entrega una copia.
+    return entry[1].copy()
+
+
+def _base_agg_set(key: tuple, df: "pd.DataFrame") -> None:
+    size = int(df.memory_usage(deep=True).sum()) if not df.empty else 0
+    if size > _BASE_AGG_MAX_ENTRY_BYTES:
+        return
+    with _BASE_AGG_LOCK:
+        _BASE_AGG_CACHE[key] = (time.monotonic(), df.copy(), size)
+        _BASE_AGG_CACHE.move_to_end(key)
+        total = sum(e[2] for e in _BASE_AGG_CACHE.values())
+        while (
+            len(_BASE_AGG_CACHE) > _BASE_AGG_MAX_ITEMS or total > _BASE_AGG_MAX_TOTAL_BYTES
+        ) and _BASE_AGG_CACHE:
+            _, (_, _, dropped) = _BASE_AGG_CACHE.popitem(last=False)
+            total -= dropped
+
+
+def _clear_base_agg_cache() -> None:
+    with _BASE_AGG_LOCK:
+        _BASE_AGG_CACHE.clear()
+
+
 def _query_agg(sql: str, _conn=None) -> "pd.DataFrame":
     """Execute a read-only SQL query on PostgreSQL; returns empty DataFrame on any error.
 
@@ -3753,18 +4223,31 @@ def _query_agg(sql: str, _conn=None) -> "pd.DataFrame":
 
     Pass _conn to reuse an existing engine connection (avoids pool exhaustion when
     multiple queries are needed in the same request).
+
+    Los placeholders `:nombre` que dejaron _safe_in/_build_filter_sql dentro de un
+    bind scope se resuelven acá (forecast_sql.ejecutar: PREPARE/EXECUTE cacheado por
+    conexión).
+
+    Dentro de _growth_base_scope() el resultado se sirve de / guarda en el cache de
+    agregados base.
     """
     t0 = time.perf_counter()
+    memo_key = None
+    if _GROWTH_BASE_SCOPE.get() and engine is not None and "sqlite" not in str(engine.url):
+        memo_key = _base_agg_key(sql)
+        cached = _base_agg_get(memo_key)
+        if cached is not None:
+            logger.debug("[FORECAST SQL] base-agg HIT rows=%d sql=%.120s", len(cached), " ".join(sql.split()))
+            return cached
     try:
         if engine is None or "sqlite" in str(engine.url):
             return pd.DataFrame()
-        stmt = _sa_text(sql) if _sa_text is not None else sql
         if _conn is not None:
-            result = _conn.execute(stmt)
+            result = _fsql.ejecutar(_conn, sql, text=_sa_text)
             df = pd.DataFrame(result.mappings().all())
         else:
             with engine.connect() as conn:
-                result = conn.execute(stmt)
+                result = _fsql.ejecutar(conn, sql, text=_sa_text)
                 df = pd.DataFrame(result.mappings().all())
         if not df.empty and "fecha" in df.columns:
             df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
@@ -3777,6 +4260,8 @@ def _query_agg(sql: str, _conn=None) -> "pd.DataFrame":
             approx_mem,
             " ".join(sql.split()),
         )
+        if memo_key is not None:
+            _base_agg_set(memo_key, df)
         return df
     except Exception as exc:
         elapsed_ms = (time.perf_counter() - t0) * 1000
@@ -3792,6 +4277,10 @@ def _query_agg_hi_mem(sql: str, work_mem: str = "16MB") -> "pd.DataFrame":
     cualquier problema reintenta sin work_mem (mismo resultado, más lento)."""
     if engine is None or "postgresql" not in str(engine.url) or _sa_text is None:
         return _query_agg(sql)          # SQLite/otros: camino normal, sin work_mem
+    if _GROWTH_BASE_SCOPE.get():
+        cached = _base_agg_get(_base_agg_key(sql))
+        if cached is not None:
+            return cached               # agregado base ya memoizado: ni BEGIN ni SET LOCAL
     try:
         with engine.begin() as conn:    # BEGIN ... COMMIT explícito (1 transacción)
             conn.execute(_sa_text(f"SET LOCAL work_mem = '{work_mem}'"))
@@ -3801,6 +4290,142 @@ def _query_agg_hi_mem(sql: str, work_mem: str = "16MB") -> "pd.DataFrame":
         return _query_agg(sql)          # fallback defensivo
 
 
+# ---------------------------------------------------------------------------
+# Plan de consultas concurrente (oct-2026)
+# _pg_get_chart_data_inner corría historia, proyección, facturación 2026, bases de
+# override y metadata una detrás de otra: en frío sumaban varios segundos aunque
+# ninguna depende del resultado de otra. _run_query_plan las lanza en paralelo,
+# cada una en su propia conexión del pool y su propia transacción con
+# `SET LOCAL statement_timeout` (una consulta colgada se corta en el servidor y
+# degrada igual que cualquier error de _query_agg: DataFrame vacío). Los resultados
+# vuelven en el orden del plan, no en el de llegada, así que el merge posterior es
+# el mismo que con la ejecución secuencial.
+# ---------------------------------------------------------------------------
+_QUERY_POOL = None
+_QUERY_POOL_LOCK = threading.Lock()
+_QUERY_TIMINGS: ContextVar[dict[str, float] | None] = ContextVar("forecast_query_timings", default=None)
+
+
+def FORECAST_QUERY_CONCURRENCY() -> int:
+    """Consultas simultáneas por request (1 = secuencial). pool_size del engine = 15."""
+    try:
+        return max(int(os.environ.get("FORECAST_QUERY_CONCURRENCY", "4")), 1)
+    except ValueError:
+        return 4
+
+
+def FORECAST_QUERY_TIMEOUT_S() -> float:
+    """Tope por consulta del plan; debajo de la espera de 55 s de _with_resp_cache."""
+    try:
+        return max(float(os.environ.get("FORECAST_QUERY_TIMEOUT_S", "45")), 1.0)
+    except ValueError:
+        return 45.0
+
+
+@contextmanager
+def forecast_query_timings():
+    """Recolecta los ms por subconsulta de los planes que corran en el bloque.
+
+    El router lo abre alrededor de get_chart_data y pasa el
+    dict a _log_api_perf. Un HIT de cache no ejecuta planes: queda vacío.
+    """
+    timings: dict[str, float] = {}
+    token = _QUERY_TIMINGS.set(timings)
+    try:
+        yield timings
+    finally:
+        _QUERY_TIMINGS.reset(token)
+
+
+def _query_pool():
+    global _QUERY_POOL
+    with _QUERY_POOL_LOCK:
+        if _QUERY_POOL is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _QUERY_POOL = ThreadPoolExecutor(
+                max_workers=FORECAST_QUERY_CONCURRENCY(), thread_name_prefix="forecast-sql",
+            )
+        return _QUERY_POOL
+
+
+def _query_agg_with_timeout(sql: str, timeout_s: float) -> "pd.DataFrame":
+    """_query_agg en su propia transacción con statement_timeout (solo PostgreSQL)."""
+    if engine is None or "postgresql" not in str(engine.url) or _sa_text is None:
+        return _query_agg(sql)
+    if _GROWTH_BASE_SCOPE.get():
+        cached = _base_agg_get(_base_agg_key(sql))
+        if cached is not None:
+            return cached
+    try:
+        with engine.begin() as conn:
+            conn.execute(_sa_text(f"SET LOCAL statement_timeout = {int(timeout_s * 1000)}"))
+            return _query_agg(sql, _conn=conn)
+    except Exception as exc:
+        logger.error("[FORECAST] plan query error: %s | SQL (first 200): %.200s", exc, sql)
+        return pd.DataFrame()
+
+
+def _run_query_plan(
+    plan: "dict[str, str | Any]", *, label: str = "forecast",
+) -> "tuple[dict[str, Any], dict[str, float]]":
+    """Ejecuta un plan {nombre: SQL | callable sin argumentos}; devuelve (resultados, ms).
+
+    Los SQL pasan por _query_agg (binds del scope, PREPARE, memo de agregados base);
+    los callables cubren lecturas que no son un SELECT suelto (p. ej. clientes
+    manuales). Cada tarea corre en una copia del contexto del caller para heredar
+    bind_scope / _growth_base_scope / scope de overrides. Un resultado que no llega a
+    tiempo queda como DataFrame vacío. Los tiempos se suman a forecast_query_timings()
+    como "<label>.<nombre>".
+    """
+    from concurrent.futures import TimeoutError as _FutureTimeout
+    from contextvars import copy_context
+
+    timeout_s = FORECAST_QUERY_TIMEOUT_S()
+    timings: dict[str, float] = {}
+
+    def _medida(nombre, item):
+        t0 = time.perf_counter()
+        try:
+            return item() if callable(item) else _query_agg_with_timeout(item, timeout_s)
+        finally:
+            timings[nombre] = (time.perf_counter() - t0) * 1000
+
+    results: dict[str, Any] = {}
+    t_plan = time.perf_counter()
+    if FORECAST_QUERY_CONCURRENCY() <= 1 or len(plan) <= 1:
+        for nombre, item in plan.items():
+            results[nombre] = _medida(nombre, item)
+    else:
+        pool = _query_pool()
+        futures = {
+            nombre: pool.submit(copy_context().run, _medida, nombre, item)
+            for nombre, item in plan.items()
+        }
+        deadline = time.perf_counter() + timeout_s + 5.0
+        for nombre, fut in futures.items():
+            try:
+                results[nombre] = fut.result(timeout=max(deadline - time.perf_counter(), 0.0))
+            except _FutureTimeout:
+                logger.error("[FORECAST] plan %s: %s sin respuesta en %.0f s", label, nombre, timeout_s)
+                timings.setdefault(nombre, timeout_s * 1000)
+                results[nombre] = pd.DataFrame()
+            except Exception as exc:
+                logger.error("[FORECAST] plan %s: %s falló: %s", label, nombre, exc)
+                results[nombre] = pd.DataFrame()
+    wall_ms = (time.perf_counter() - t_plan) * 1000
+    sink = _QUERY_TIMINGS.get()
+    if sink is not None:
+        for nombre in plan:
+            if nombre in timings:
+                sink[f"{label}.{nombre}"] = round(timings[nombre], 1)
+        sink[f"{label}.plan_wall"] = round(wall_ms, 1)
+    logger.info(
+        "[FORECAST] plan %s wall_ms=%.1f %s", label, wall_ms,
+        " ".join(f"{n}={timings.get(n, 0.0):.1f}" for n in plan),
+    )
+    return results, timings
+
+
 def _pg_resolve_prod_codes(products: list, _conn=None) -> "list | None":
     """Return codigo_serie list for given product names/codes, or None if no product filter.
     Queries both forecast_main and forecast_valorizado to ensure all products are resolved."""
@@ -4330,6 +4955,44 @@ def _forecast_summary_available(table: str = "forecast_valorizado_summary") -> b
     return exists
 
 
+_SUMMARY_COLS_CACHE: dict = {}           # table -> (checked_monotonic, frozenset)
+
+
+def _forecast_summary_columns(table: str) -> frozenset:
+    """Columnas reales de una summary; vacío si no existe o con el kill-switch.
+
+    Mismo gate y TTL que `_forecast_summary_available`: lo consume el router de
+    grano, que necesita saber si la tabla tiene las medidas que pide la consulta.
+    """
+    if engine is None or "postgresql" not in str(engine.url):
+        return frozenset()
+    if os.environ.get("FORECAST_USE_SUMMARY", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return frozenset()
+    now = time.monotonic()
+    with _SUMMARY_AVAIL_LOCK:
+        entry = _SUMMARY_COLS_CACHE.get(table)
+        if entry and (now - entry[0]) < _SUMMARY_AVAIL_TTL:
+            return entry[1]
+    df = _query_agg(
+        f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table}'"
+    )
+    cols = frozenset(df["column_name"].astype(str)) if not df.empty else frozenset()
+    with _SUMMARY_AVAIL_LOCK:
+        _SUMMARY_COLS_CACHE[table] = (now, cols)
+    return cols
+
+
+def _pick_summary_table(*fragments: str | None) -> str:
+    """Router de grano: summary más chica que cubre SELECT / WHERE, o forecast_valorizado.
+
+    `fragments`: las partes de la consulta que referencian columnas (lista del
+    SELECT, WHERE, GROUP BY). Granos y orden en `forecast_summaries.GRANOS`.
+    """
+    table = _fsum.elegir_tabla(fragments, _forecast_summary_columns)
+    logger.debug("[FORECAST summary] grano=%s", table)
+    return table
+
+
 def _pg_valorizado_has_codigo_serie() -> bool:
     """Return True if forecast_valorizado has a codigo_serie column (cached after first check).
 
@@ -4514,10 +5177,11 @@ def _pg_get_chart_data(
     _EMPTY = {"history": [], "forecast": [], "val_2026": [], "kpis": {}}
     _step = "init"
     try:
-        return _pg_get_chart_data_inner(
-            user_id, start_date, end_date, profiles, neg, subneg, products, view_money, growth_pct,
-            is_admin=is_admin, cartera_branches=cartera_branches,
-        )
+        with _fsql.bind_scope(), _growth_base_scope():
+            return _pg_get_chart_data_inner(
+                user_id, start_date, end_date, profiles, neg, subneg, products, view_money, growth_pct,
+                is_admin=is_admin, cartera_branches=cartera_branches,
+            )
     except Exception as exc:
         import traceback
         _tb_str = traceback.format_exc()
@@ -4542,11 +5206,12 @@ def _pg_get_chart_data_inner(
     _ch_build_ms = 0.0
     global_overrides = bool(is_admin)
     _ch_t0 = time.perf_counter()
-    _ovr_records = _fetch_override_records(user_id, all_users=global_overrides)
+    # Snapshot versionado: registros ya consolidados + mapas, sin round trip ni
+    # rebuild mientras nadie escriba overrides.
+    _ovr_snap = _get_override_snapshot(user_id, all_users=global_overrides)
     _ch_override_fetch_ms = (time.perf_counter() - _ch_t0) * 1000
-    _ovr_original_count = len(_ovr_records)
-    if _ovr_records:
-        _ovr_records = _consolidate_override_records(_ovr_records, "chart-data")
+    _ovr_original_count = len(_ovr_snap.records)
+    _ovr_records = list(_ovr_snap.consolidated)
     _ovr_active = bool(_ovr_records)
     _ovr_user_ids = _override_record_user_ids(_ovr_records)
 
@@ -4587,28 +5252,19 @@ def _pg_get_chart_data_inner(
             products=None if val_prod is not None else products,
             extra=_cartera_extra,
         )
-        _ch_t0 = time.perf_counter()
-        df_meta = _query_agg(
+        _meta_sql = (
             f"SELECT COUNT(DISTINCT codigo_serie) AS n_products "
             f"FROM forecast_valorizado WHERE {val_where_meta}"
         )
-        _ch_meta_ms = (time.perf_counter() - _ch_t0) * 1000
     elif cartera_branches is None:
-        _ch_t0 = time.perf_counter()
-        df_meta = _query_agg(
+        _meta_sql = (
             f"SELECT COUNT(DISTINCT codigo_serie) AS n_products "
             f"FROM forecast_main WHERE {main_where}"
         )
-        _ch_meta_ms = (time.perf_counter() - _ch_t0) * 1000
     else:
-        df_meta = pd.DataFrame({"n_products": [0]})
-    if df_meta.empty:
-        logger.debug("[FORECAST INNER] df_meta empty — returning _EMPTY")
-        return _EMPTY
-    n_products = int(df_meta["n_products"].iloc[0] or 0)
+        _meta_sql = None
     _cached_mhd = _get_max_hist_date_cached()
     max_hist = _cached_mhd if _cached_mhd is not None else pd.Timestamp("2000-01-01")
-    logger.debug("[FORECAST INNER] meta n_products=%s max_hist=%s", n_products, max_hist)
 
     # WHERE for forecast_imp_hist: only has perfil + codigo_serie + fecha (no neg/subneg)
     # hist/fact tables always have codigo_serie — use prod_codes (not val_prod) here.
@@ -4679,7 +5335,7 @@ def _pg_get_chart_data_inner(
     # plata fuera de la cartera" es NO mostrar esta línea/KPI en vez de mostrarla sin
     # filtrar — se fuerza vacía, sin consultar la tabla.
     if cartera_branches is not None:
-        df_hist = pd.DataFrame(columns=["fecha", "Total_Venta"])
+        _hist_sql = None
     elif view_money:
         # CANONICAL SERIES FILTER: restrict imp_hist to the 3039 series that exist in
         # forecast_valorizado (same inner-join the original app.py applied at load time).
@@ -4694,43 +5350,132 @@ def _pg_get_chart_data_inner(
         else:
             # Fallback to original subquery when cache miss / empty result
             _canon_clause = " AND codigo_serie IN (SELECT DISTINCT codigo_serie FROM forecast_valorizado)"
-        _ch_t0 = time.perf_counter()
-        df_hist = _query_agg(
+        _hist_sql = (
             f"SELECT fecha, SUM(COALESCE(imp_hist, 0)) AS total_venta "
             f"FROM forecast_imp_hist "
             f"WHERE {hist_where}{_canon_clause}{_hist_neg_subquery} "
             f"GROUP BY fecha ORDER BY fecha"
         )
-        _ch_hist_ms = (time.perf_counter() - _ch_t0) * 1000
         # forecast_main fallback intentionally omitted: y/yhat are TEXT in production,
         # SUM(COALESCE(y,0)) raises a type error caught by _query_agg → empty anyway.
     else:
         # Units path — forecast_main.y is TEXT in production so this will be empty;
         # kept for local/SQLite mode where y is numeric.
-        _ch_t0 = time.perf_counter()
-        df_hist = _query_agg(
+        _hist_sql = (
             f"SELECT fecha, SUM(COALESCE(y::numeric, 0)) AS total_venta "
             f"FROM forecast_main WHERE {main_where} AND tipo = 'hist' GROUP BY fecha ORDER BY fecha"
         )
-        _ch_hist_ms = (time.perf_counter() - _ch_t0) * 1000
-    # Normalise alias to Title-Case so downstream code is unchanged
-    if not df_hist.empty and "total_venta" in df_hist.columns:
-        df_hist.rename(columns={"total_venta": "Total_Venta"}, inplace=True)
 
-    logger.debug("[FORECAST INNER] hist_rows=%s — querying forecast", len(df_hist))
     # Forecast: from valorizado (monto_yhat=money, yhat_cliente=units; monto_li/monto_ls=band)
     val_col    = "monto_yhat"    if view_money else "yhat_cliente"
     val_col_li = "monto_li"      if view_money else "li_cliente"
     val_col_ls = "monto_ls"      if view_money else "ls_cliente"
-    _ch_t0 = time.perf_counter()
-    df_fcst = _query_agg(
+    # Router de grano: sin producto ni cartera alcanza subneg×perfil×mes.
+    _fcst_table = _pick_summary_table(f"fecha, {val_col}, {val_col_li}, {val_col_ls}", val_where)
+    _fcst_sql = (
         f"SELECT fecha, "
         f"SUM(COALESCE({val_col}, 0)) AS total_forecast, "
         f"SUM(COALESCE({val_col_li}, 0)) AS total_li, "
         f"SUM(COALESCE({val_col_ls}, 0)) AS total_ls "
-        f"FROM forecast_valorizado WHERE {val_where} GROUP BY fecha ORDER BY fecha"
+        f"FROM {_fcst_table} WHERE {val_where} GROUP BY fecha ORDER BY fecha"
+    )
+
+    # Bases de override: solo dependen de los selectores del snapshot y de val_where.
+    _override_sql = None
+    _used_delta = False
+    if _ovr_active:
+        try:
+            _ovr_maps_pre = _ovr_snap.consolidated_maps
+            _ovr_selectors = _ovr_maps_pre.get("selectors", [])
+            logger.info(
+                "[FORECAST INNER] delta_path selectors=%s ovr_records=%s",
+                len(_ovr_selectors), len(_ovr_records),
+            )
+            if _ovr_selectors:
+                _sel_f = f"({_safe_in('fantasia', _ovr_selectors)})"
+                _override_sql = (
+                    f"SELECT fecha, fantasia, cliente_id, subneg, codigo_serie, "
+                    f"SUM(COALESCE({val_col}, 0)) AS base_val "
+                    f"FROM forecast_valorizado WHERE {val_where} AND {_sel_f} "
+                    f"GROUP BY fecha, fantasia, cliente_id, subneg, codigo_serie ORDER BY fecha"
+                )
+            _used_delta = True
+        except Exception as _delta_exc:
+            logger.warning(
+                "[FORECAST INNER] delta_path FAILED (%s) -- fallback to full table load",
+                _delta_exc,
+            )
+        if not _used_delta:
+            _override_sql = (
+                f"SELECT fecha, fantasia, cliente_id, subneg, codigo_serie, "
+                f"SUM(COALESCE({val_col}, 0)) AS base_val "
+                f"FROM forecast_valorizado WHERE {val_where} "
+                f"GROUP BY fecha, fantasia, cliente_id, subneg, codigo_serie ORDER BY fecha"
+            )
+
+    # Facturación real 2026 — fuente única: forecast_fact_2026.
+    # Sin filtro de series canónicas: en vista Todos se devuelve el total real completo.
+    # El filtro por Perfil/Neg/Subneg/Producto se aplica solo cuando el usuario los activa.
+    # La query NO capa el mes superior (trae desde 2026-01-01 en adelante) porque df_fact_raw
+    # alimenta también el cálculo de accuracy más abajo (que tiene su propia lógica de "mes
+    # abierto"). El recorte a meses CERRADOS (tope dinámico) se aplica al graficar y al KPI.
+    _fact_parts = ["fecha >= '2026-01-01'"]
+    if profiles:
+        # Filter directly by tipocli (commercial profile enriched at load time from clientes.csv).
+        # Do NOT use JOIN with forecast_valorizado: that table misses clients that exist in
+        # forecast_fact_2026, causing an undercount.  tipocli is the authoritative profile column.
+        _fact_tipocli = _safe_in("tipocli", profiles)
+        if _fact_tipocli:
+            _fact_parts.append(_fact_tipocli)
+        print(f"[FORECAST FACT2026] profiles={profiles} → tipocli filter: {_fact_tipocli or 'NONE'}", flush=True)
+    if fact_series_only_where:
+        _fact_parts.append(
+            f"codigo_serie IN ("
+            f"  SELECT DISTINCT fm.codigo_serie FROM forecast_main fm WHERE {fact_series_only_where}"
+            f")"
+        )
+    if cartera_branches is not None:
+        _fact_parts.append(_cartera_sql(cartera_branches, fact_by_series=True) or "1=0")
+    _fact_sql = (
+        f"SELECT fecha, SUM(COALESCE(imp_hist, 0)) AS total_venta "
+        f"FROM forecast_fact_2026 WHERE {' AND '.join(_fact_parts)} "
+        f"GROUP BY fecha ORDER BY fecha"
     )
-    _ch_forecast_ms = (time.perf_counter() - _ch_t0) * 1000
+
+    # ── Fan-out: ninguna de estas lecturas depende de otra (ver _run_query_plan) ──
+    _plan: dict[str, Any] = {}
+    if _meta_sql:
+        _plan["meta"] = _meta_sql
+    if _hist_sql:
+        _plan["hist"] = _hist_sql
+    _plan["forecast"] = _fcst_sql
+    if _override_sql:
+        _plan["override_rows"] = _override_sql
+    _plan["fact"] = _fact_sql
+    if cartera_branches is None:
+        _plan["manual"] = lambda: _get_manual_entries_df(
+            user_id, start_date, end_date, neg, subneg, is_admin=is_admin, profiles_filter=profiles,
+        )
+    _res, _plan_ms = _run_query_plan(_plan, label="chart")
+    _ch_meta_ms = _plan_ms.get("meta", 0.0)
+    _ch_hist_ms = _plan_ms.get("hist", 0.0)
+    _ch_forecast_ms = _plan_ms.get("forecast", 0.0)
+    _ch_fact_ms = _plan_ms.get("fact", 0.0)
+
+    df_meta = _res["meta"] if _meta_sql else pd.DataFrame({"n_products": [0]})
+    if df_meta.empty:
+        logger.debug("[FORECAST INNER] df_meta empty — returning _EMPTY")
+        return _EMPTY
+    n_products = int(df_meta["n_products"].iloc[0] or 0)
+    logger.debug("[FORECAST INNER] meta n_products=%s max_hist=%s", n_products, max_hist)
+
+    df_hist = _res["hist"] if _hist_sql else pd.DataFrame(columns=["fecha", "Total_Venta"])
+    # Normalise alias to Title-Case so downstream code is unchanged
+    if not df_hist.empty and "total_venta" in df_hist.columns:
+        df_hist.rename(columns={"total_venta": "Total_Venta"}, inplace=True)
+    logger.debug("[FORECAST INNER] hist_rows=%s", len(df_hist))
+
+    df_fcst = _res["forecast"]
     # Normalise aliases (PostgreSQL returns lowercase regardless of AS casing)
     if not df_fcst.empty:
         rename_map = {k: v for k, v in {
@@ -4780,40 +5525,10 @@ def _pg_get_chart_data_inner(
         )
     if _ovr_active:
         _t_ovr = time.perf_counter()
-        _used_delta = False
-        _override_rows = pd.DataFrame()
-        try:
-            _ovr_maps_pre = _build_override_maps(_ovr_records)
-            _ovr_selectors = _ovr_maps_pre.get("selectors", [])
-            logger.info(
-                "[FORECAST INNER] delta_path selectors=%s ovr_records=%s",
-                len(_ovr_selectors), len(_ovr_records),
-            )
-            if _ovr_selectors:
-                _sel_f = f"({_safe_in('fantasia', _ovr_selectors)})"
-                _override_rows = _query_agg(
-                    f"SELECT fecha, fantasia, cliente_id, subneg, codigo_serie, "
-                    f"SUM(COALESCE({val_col}, 0)) AS base_val "
-                    f"FROM forecast_valorizado WHERE {val_where} AND {_sel_f} "
-                    f"GROUP BY fecha, fantasia, cliente_id, subneg, codigo_serie ORDER BY fecha"
-                )
-                logger.info(
-                    "[FORECAST INNER] delta_rows=%s selectors=%s",
-                    len(_override_rows), len(_ovr_selectors),
-                )
-            _used_delta = True
-        except Exception as _delta_exc:
-            logger.warning(
-                "[FORECAST INNER] delta_path FAILED (%s) -- fallback to full table load",
-                _delta_exc,
-            )
-        if not _used_delta:
-            _override_rows = _query_agg(
-                f"SELECT fecha, fantasia, cliente_id, subneg, codigo_serie, "
-                f"SUM(COALESCE({val_col}, 0)) AS base_val "
-                f"FROM forecast_valorizado WHERE {val_where} "
-                f"GROUP BY fecha, fantasia, cliente_id, subneg, codigo_serie ORDER BY fecha"
-            )
+        _override_rows = _res.get("override_rows", pd.DataFrame())
+        if _used_delta:
+            logger.info("[FORECAST INNER] delta_rows=%s", len(_override_rows))
+        else:
             logger.warning("[FORECAST INNER] FALLBACK full_rows=%s", len(_override_rows))
         if not _override_rows.empty:
             _override_rows, _ovr_maps = _apply_override_effects_to_dataframe(
@@ -4880,7 +5595,7 @@ def _pg_get_chart_data_inner(
                 df_fcst.drop(columns=["Total_User_Adj_SQL"], inplace=True)
             _future_mask = df_fcst["fecha"] > max_hist
             _adj_diff = (df_fcst.loc[_future_mask, "Total_User_Adj"] - df_fcst.loc[_future_mask, "Total_Adj"]).abs().sum()
-            _t_ovr_ms = (time.perf_counter() - _t_ovr) * 1000
+            _t_ovr_ms = (time.perf_counter() - _t_ovr) * 1000 + _plan_ms.get("override_rows", 0.0)
             _ch_override_ms = _t_ovr_ms
             logger.info(
                 "[FORECAST INNER] ovr_complete: overridden=%s adj_diff=%.0f elapsed_ms=%.1f delta=%s",
@@ -4892,13 +5607,10 @@ def _pg_get_chart_data_inner(
                     len(_ovr_records), _n_overridden,
                 )
         else:
-            _ch_override_ms = (time.perf_counter() - _t_ovr) * 1000
+            _ch_override_ms = (time.perf_counter() - _t_ovr) * 1000 + _plan_ms.get("override_rows", 0.0)
 
     # ── Inject manual client entries into PG forecast totals ─────────────
-    _manual_df_pg_chart = (
-        _get_manual_entries_df(user_id, start_date, end_date, neg, subneg, is_admin=is_admin, profiles_filter=profiles)
-        if cartera_branches is None else pd.DataFrame()
-    )
+    _manual_df_pg_chart = _res["manual"] if cartera_branches is None else pd.DataFrame()
     if not _manual_df_pg_chart.empty and not df_fcst.empty:
         _val_col_m_pg = "monto_yhat" if view_money else "yhat_cliente"
         _manual_monthly_pg = (
@@ -4957,37 +5669,7 @@ def _pg_get_chart_data_inner(
         }])
         df_fcst = pd.concat([bridge, df_fcst.sort_values("fecha")], ignore_index=True)
 
-    logger.debug("[FORECAST INNER] querying fact2026")
-    # Facturación real 2026 — fuente única: forecast_fact_2026.
-    # Sin filtro de series canónicas: en vista Todos se devuelve el total real completo.
-    # El filtro por Perfil/Neg/Subneg/Producto se aplica solo cuando el usuario los activa.
-    # La query NO capa el mes superior (trae desde 2026-01-01 en adelante) porque df_fact_raw
-    # alimenta también el cálculo de accuracy más abajo (que tiene su propia lógica de "mes
-    # abierto"). El recorte a meses CERRADOS (tope dinámico) se aplica al graficar y al KPI.
-    _fact_parts = ["fecha >= '2026-01-01'"]
-    if profiles:
-        # Filter directly by tipocli (commercial profile enriched at load time from clientes.csv).
-        # Do NOT use JOIN with forecast_valorizado: that table misses clients that exist in
-        # forecast_fact_2026, causing an undercount.  tipocli is the authoritative profile column.
-        _fact_tipocli = _safe_in("tipocli", profiles)
-        if _fact_tipocli:
-            _fact_parts.append(_fact_tipocli)
-        print(f"[FORECAST FACT2026] profiles={profiles} → tipocli filter: {_fact_tipocli or 'NONE'}", flush=True)
-    if fact_series_only_where:
-        _fact_parts.append(
-            f"codigo_serie IN ("
-            f"  SELECT DISTINCT fm.codigo_serie FROM forecast_main fm WHERE {fact_series_only_where}"
-            f")"
-        )
-    if cartera_branches is not None:
-        _fact_parts.append(_cartera_sql(cartera_branches, fact_by_series=True) or "1=0")
-    _ch_t0 = time.perf_counter()
-    df_fact_raw = _query_agg(
-        f"SELECT fecha, SUM(COALESCE(imp_hist, 0)) AS total_venta "
-        f"FROM forecast_fact_2026 WHERE {' AND '.join(_fact_parts)} "
-        f"GROUP BY fecha ORDER BY fecha"
-    )
-    _ch_fact_ms = (time.perf_counter() - _ch_t0) * 1000
+    df_fact_raw = _res["fact"]
     # Normalise alias
     if not df_fact_raw.empty and "total_venta" in df_fact_raw.columns:
         df_fact_raw.rename(columns={"total_venta": "Total_Venta"}, inplace=True)
@@ -5139,10 +5821,11 @@ def _pg_get_client_table(
     """Shell: catches all exceptions so the router never sees a 500 from this path."""
     _EMPTY = {"months": [], "rows": [], "totals": {}, "min_val": 0, "max_val": 0, "total_projected": 0}
     try:
-        result = _pg_get_client_table_inner(
-            user_id, start_date, end_date, profiles, neg, subneg, products, view_money, growth_pct, lab_products,
-            is_admin=is_admin, cartera_branches=cartera_branches,
-        )
+        with _fsql.bind_scope(), _growth_base_scope():
+            result = _pg_get_client_table_inner(
+                user_id, start_date, end_date, profiles, neg, subneg, products, view_money, growth_pct, lab_products,
+                is_admin=is_admin, cartera_branches=cartera_branches,
+            )
         if cartera_branches is not None:
             return result
         return _inject_manual_client_rows_into_table(
@@ -5198,18 +5881,20 @@ def _pg_get_client_table_inner(
     )
 
     _ct_base_t0 = time.perf_counter()
-    # Rama summary (PR-2): sin filtro de producto y con la tabla 1 disponible -> lee el
-    # agregado pre-calculado con work_mem alto (el ORDER BY fecha derramaba a disco).
+    # Rama summary (PR-2): el router de grano elige la summary que cubre los filtros
+    # (cliente×subneg×mes también con cartera; con producto no hay grano con cliente
+    # y va a crudo) y se lee con work_mem alto (el ORDER BY fecha derramaba a disco).
     # Si el summary da vacío o (en plata) monto all-zero, df_agg=None y cae al bloque
     # crudo de abajo, que conserva el fallback yhat×precio IDÉNTICO a hoy.
-    _use_summary = (cartera_branches is None and prod_codes is None and _forecast_summary_available())
+    _ct_col = "monto_yhat" if view_money else "yhat_cliente"
+    _ct_table = _pick_summary_table(f"fantasia, nombre_grupo, fecha, {_ct_col}", val_where)
+    _use_summary = _ct_table != _fsum.TABLA_CRUDA
     df_agg = None
     if _use_summary:
-        _ct_col = "monto_yhat" if view_money else "yhat_cliente"
         df_agg = _query_agg_hi_mem(
             f"SELECT fantasia, nombre_grupo, fecha, "
             f"SUM(COALESCE({_ct_col}, 0)) AS val "
-            f"FROM forecast_valorizado_summary WHERE {val_where} "
+            f"FROM {_ct_table} WHERE {val_where} "
             f"GROUP BY fantasia, nombre_grupo, fecha ORDER BY fecha"
         )
         if df_agg.empty or (view_money and df_agg["val"].sum() == 0):
@@ -5270,11 +5955,10 @@ def _pg_get_client_table_inner(
     max_hist_date = _get_max_hist_date_cached()
 
     _ct_fetch_t0 = time.perf_counter()
-    _ovr_records_ct = _fetch_override_records(user_id, all_users=is_admin)
+    _ovr_snap_ct = _get_override_snapshot(user_id, all_users=is_admin)
     _ct_fetch_ovr_ms = (time.perf_counter() - _ct_fetch_t0) * 1000
-    _ct_ovr_original_count = len(_ovr_records_ct)
-    if _ovr_records_ct:
-        _ovr_records_ct = _consolidate_override_records(_ovr_records_ct, "client-table")
+    _ct_ovr_original_count = len(_ovr_snap_ct.records)
+    _ovr_records_ct = list(_ovr_snap_ct.consolidated)
     overrides_active = bool(_ovr_records_ct)
     # Peso $ por subnegocio para el blend de la pill; se llena con las filas delta, que
     # ya se levantan mas abajo a nivel subneg. Vacio si no hay overrides: esos clientes
@@ -5289,7 +5973,7 @@ def _pg_get_client_table_inner(
         _used_delta_ct = False
         _ct_rows_loaded = 0
         try:
-            _ovr_maps_ct = _build_override_maps(_ovr_records_ct)
+            _ovr_maps_ct = _ovr_snap_ct.consolidated_maps
             _selectors_ct = _ovr_maps_ct.get("selectors", [])
             _forecast_diag(
                 "[CLIENT_TABLE] delta_path selectors=%s ovr_records=%s",
@@ -5557,10 +6241,11 @@ def _pg_get_treemap_data(
     """Shell: catches all exceptions so the router never sees a 500 from this path."""
     _EMPTY = {"ids": [], "labels": [], "parents": [], "values": [], "colors": [], "periods": [], "canals": []}
     try:
-        return _pg_get_treemap_data_inner(
-            user_id, start_date, end_date, profiles, neg, subneg, products, view_money, period_date,
-            is_admin=is_admin, cartera_branches=cartera_branches,
-        )
+        with _fsql.bind_scope():
+            return _pg_get_treemap_data_inner(
+                user_id, start_date, end_date, profiles, neg, subneg, products, view_money, period_date,
+                is_admin=is_admin, cartera_branches=cartera_branches,
+            )
     except Exception as exc:
         import traceback as _tb
         print(
@@ -5617,23 +6302,17 @@ def _pg_get_treemap_data_inner(
         if not period_df.empty:
             periods = [str(v)[:10] for v in period_df["fecha"].dropna().tolist()]
     _tm_base_t0 = time.perf_counter()
-    # Rama summary: sin filtro de producto y con la tabla 1 disponible -> lee el
-    # agregado pre-calculado (gate default = forecast_valorizado_summary). Treemap
-    # no ORDER BY -> HashAggregate en RAM, no necesita work_mem.
-    if cartera_branches is None and prod_codes is None and _forecast_summary_available():
-        df_tree = _query_agg(
-            f"SELECT perfil, nombre_grupo, fantasia, cliente_id, "
-            f"SUM(COALESCE({val_col}, 0)) AS monto "
-            f"FROM forecast_valorizado_summary WHERE {val_where} "
-            f"GROUP BY perfil, nombre_grupo, fantasia, cliente_id"
-        )
-    else:
-        df_tree = _query_agg(
-            f"SELECT perfil, nombre_grupo, fantasia, cliente_id, "
-            f"SUM(COALESCE({val_col}, 0)) AS monto "
-            f"FROM forecast_valorizado WHERE {val_where} "
-            f"GROUP BY perfil, nombre_grupo, fantasia, cliente_id"
-        )
+    # Router de grano: sin filtro de producto lee el agregado pre-calculado
+    # cliente×subneg×mes (también con cartera: filtra por cliente_id/neg, que la
+    # summary tiene); con producto va a crudo. Treemap no ORDER BY -> HashAggregate
+    # en RAM, no necesita work_mem.
+    _tm_table = _pick_summary_table(f"perfil, nombre_grupo, fantasia, cliente_id, {val_col}", val_where)
+    df_tree = _query_agg(
+        f"SELECT perfil, nombre_grupo, fantasia, cliente_id, "
+        f"SUM(COALESCE({val_col}, 0)) AS monto "
+        f"FROM {_tm_table} WHERE {val_where} "
+        f"GROUP BY perfil, nombre_grupo, fantasia, cliente_id"
+    )
     if df_tree.empty:
         return {**_EMPTY, "periods": periods}
     _tm_base_ms = (time.perf_counter() - _tm_base_t0) * 1000
@@ -5642,11 +6321,10 @@ def _pg_get_treemap_data_inner(
     max_hist_date = _get_max_hist_date_cached()
 
     _tm_fetch_t0 = time.perf_counter()
-    _ovr_records_tm = _fetch_override_records(user_id, all_users=is_admin)
+    _ovr_snap_tm = _get_override_snapshot(user_id, all_users=is_admin)
     _tm_fetch_ovr_ms = (time.perf_counter() - _tm_fetch_t0) * 1000
-    _tm_ovr_original_count = len(_ovr_records_tm)
-    if _ovr_records_tm:
-        _ovr_records_tm = _consolidate_override_records(_ovr_records_tm, "treemap-data")
+    _tm_ovr_original_count = len(_ovr_snap_tm.records)
+    _ovr_records_tm = list(_ovr_snap_tm.consolidated)
     _forecast_diag(
         "[TREEMAP] user=%s overrides_active=%s override_count=%s effective_override_count=%s is_admin=%s",
         user_id, bool(_ovr_records_tm), _tm_ovr_original_count, len(_ovr_records_tm), is_admin,
@@ -5654,7 +6332,7 @@ def _pg_get_treemap_data_inner(
     if bool(_ovr_records_tm):
         _tm_delta_t0 = time.perf_counter()
         try:
-            _ovr_maps_tm = _build_override_maps(_ovr_records_tm)
+            _ovr_maps_tm = _ovr_snap_tm.consolidated_maps
             _selectors_tm = _ovr_maps_tm.get("selectors", [])
             _forecast_diag(
                 "[TREEMAP] delta_path selectors=%s ovr_records=%s",
@@ -6139,14 +6817,13 @@ def preload_valorizado_parquet() -> None:
 
     Calienta, en orden (cada uno depende del anterior estando ya en memoria):
       1. get_data()            — parquet + CSVs -> _data_cache (~10-20s en frío).
-      2. get_client_dim_map()  — cliente->{grupo,perfil}, TTL 600s.
-      3. get_subneg_neg_map()  — subneg->neg, TTL 600s.
-    Antes solo se precalentaba (1); (2) y (3) quedaban fríos hasta el primer
-    request real que los tocara — que en Aprobaciones Forecast es CUALQUIER
-    guardado (`_require_proposal_scope` los usa para autorizar). Medido en vivo:
-    (1) ~14-20s, (2) ~5-8s, (3) ~17s con el .iterrows() viejo — ver
-    build_subneg_neg_map, ya vectorizado — stackeados, explican los minutos de
-    espera en el primer guardado tras un arranque/reload.
+      2. get_forecast_dimensions() — snapshot cliente->{grupo,perfil},
+         subneg->neg y resolver de alcances (stale-while-revalidate, TTL 600s).
+    Antes solo se precalentaba (1); (2) quedaba frío hasta el primer request
+    real que lo tocara — que en Aprobaciones Forecast es CUALQUIER guardado
+    (`_require_proposal_scope` lo usa para autorizar). Medido en vivo: (1)
+    ~14-20s y los mapas viejos con .iterrows() ~5-17s cada uno — stackeados,
+    explican los minutos de espera en el primer guardado tras un arranque/reload.
 
     - On SQLite/local: corre en background; requests posteriores usan cache tibia.
     - On PostgreSQL/Render: get_data() devuelve {} enseguida — todo el resto es no-op.
@@ -6172,23 +6849,13 @@ def preload_valorizado_parquet() -> None:
 
         t1 = time.monotonic()
         try:
-            dim = get_client_dim_map(force=True)
-            logger.info(
-                "[FORECAST PRELOAD] get_client_dim_map() loaded in %.0f ms — %d clientes",
-                (time.monotonic() - t1) * 1000, len(dim),
-            )
-        except Exception as exc:
-            logger.error("[FORECAST PRELOAD] get_client_dim_map() failed: %s", exc, exc_info=True)
-
-        t2 = time.monotonic()
-        try:
-            neg_map = get_subneg_neg_map(force=True)
+            dims = get_forecast_dimensions(force=True)
             logger.info(
-                "[FORECAST PRELOAD] get_subneg_neg_map() loaded in %.0f ms — %d subnegocios",
-                (time.monotonic() - t2) * 1000, len(neg_map),
+                "[FORECAST PRELOAD] get_forecast_dimensions() loaded in %.0f ms — %d clientes, %d subnegocios",
+                (time.monotonic() - t1) * 1000, len(dims.client_dim), len(dims.subneg_neg),
             )
         except Exception as exc:
-            logger.error("[FORECAST PRELOAD] get_subneg_neg_map() failed: %s", exc, exc_info=True)
+            logger.error("[FORECAST PRELOAD] get_forecast_dimensions() failed: %s", exc, exc_info=True)
 
         logger.info("[FORECAST PRELOAD] done in %.0f ms total", (time.monotonic() - t0) * 1000)
 
@@ -7170,9 +7837,12 @@ def get_client_table(
         )
 
     data = get_data()
-    df_val = _get_patched_df_val(user_id=user_id, is_admin=is_admin)
+    # Overlay: df_val es el cache de solo lectura; los overrides se aplican al
+    # materializar el subconjunto filtrado (df_c), sin copiar las ~700K filas.
+    _overlay = _get_valorizado_overlay(user_id=user_id, is_admin=is_admin)
+    df_val = _overlay.base
     print(f"[CLIENT_TABLE] sqlite path — df_val rows={len(df_val)} "
-          f"has_override_rows={int(df_val['_has_override'].sum()) if not df_val.empty and '_has_override' in df_val.columns else 'N/A'}",
+          f"has_override_rows={len(_overlay.pos)}",
           flush=True)
     df_main = data.get("df_main", pd.DataFrame())
 
@@ -7230,7 +7900,7 @@ def get_client_table(
     if cartera_branches is not None:
         mask &= _cartera_mask(df_val, cartera_branches)
 
-    df_c = df_val[mask].copy()
+    df_c = _materialize_valorizado_overlay(_overlay, mask)
     if df_c.empty:
         return _empty_result_with_manual()
 
@@ -7289,7 +7959,7 @@ def get_client_table(
         df_c["_grupo"] = ""
 
     # Apply growth only to non-overridden future rows BEFORE pivoting.
-    # _get_patched_df_val already multiplied overridden rows by their override factor,
+    # The overlay already multiplied overridden rows by their override factor,
     # so applying global growth again to those rows would double-count.
     if growth_pct != 0 and not df_main.empty and "tipo" in df_main.columns and "fecha" in df_main.columns:
         _max_hist = df_main[df_main["tipo"] == "hist"]["fecha"].max()
@@ -7305,7 +7975,7 @@ def get_client_table(
             _dm = df_c["fecha"] > _max_hist
             if "_has_override" in df_c.columns:
                 # Los overrides ya vienen multiplicados por su propio factor desde
-                # _get_patched_df_val: aplicarles ademas la global seria doble conteo.
+                # el overlay: aplicarles ademas la global seria doble conteo.
                 _dm = _dm & (~df_c["_has_override"].fillna(False))
             df_c.loc[_dm, val_col] = df_c.loc[_dm, val_col].astype(float) * _factor
 
@@ -7475,19 +8145,23 @@ def get_treemap_data(
         if light:
             return light
 
-    df_val = _get_patched_df_val(user_id=user_id, is_admin=is_admin)
-    if cartera_branches is not None and not df_val.empty:
-        df_val = df_val[_cartera_mask(df_val, cartera_branches)].copy()
+    # Overlay: se filtra sobre el cache de solo lectura y se materializa solo df_f.
+    _overlay = _get_valorizado_overlay(user_id=user_id, is_admin=is_admin)
+    df_val = _overlay.base
     if df_val.empty:
         return _EMPTY
+    mask = pd.Series(True, index=df_val.index)
+    if cartera_branches is not None:
+        mask &= _cartera_mask(df_val, cartera_branches)
+        if not mask.any():
+            return _EMPTY
 
     # ── Collect available periods (from full df_val, before filtering) ────
     periods: list[str] = []
     if "fecha" in df_val.columns:
-        periods = sorted(str(m)[:10] for m in df_val["fecha"].dropna().unique())
+        periods = sorted(str(m)[:10] for m in df_val.loc[mask, "fecha"].dropna().unique())
 
     # ── Date / filter mask ─────────────────────────────────────────────────
-    mask = pd.Series(True, index=df_val.index)
     if period_date and "fecha" in df_val.columns:
         target_month = pd.to_datetime(period_date).replace(day=1)
         mask &= df_val["fecha"] == target_month
@@ -7504,7 +8178,7 @@ def get_treemap_data(
         mask &= df_val["neg"].isin(neg)
     if subneg and "subneg" in df_val.columns:
         mask &= df_val["subneg"].isin(subneg)
-    df_f = df_val[mask].copy()
+    df_f = _materialize_valorizado_overlay(_overlay, mask)
 
     # ── Inject manual client entries ───────────────────────────────────────
     _manual_df_tm = (
@@ -8489,6 +9163,7 @@ def add_articles_to_manual_client(user_id, manual_client_id, entries):
     """Append new article-month entries to an existing manual client."""
     if SessionLocal is None or ForecastManualClient is None or ForecastManualEntry is None:
         raise RuntimeError("SessionLocal not available")
+    entries = _validate_manual_entries(entries)
 
     session = SessionLocal()
     try:
@@ -8549,6 +9224,7 @@ def add_articles_by_client_name(user_id, created_by, client_name, perfil, entrie
     """
     if SessionLocal is None or ForecastManualClient is None or ForecastManualEntry is None:
         raise RuntimeError("SessionLocal not available")
+    entries = _validate_manual_entries(entries)
 
     session = SessionLocal()
     try:
@@ -8688,10 +9364,10 @@ def _merge_manual_into_base_negocios(base_negocios: list, manual_negocios: list)
             base_negocios.append(m_neg)
 
 
-def get_new_client_catalog(user_id=None):
-    """Return catalog for the new-client form: negocios, subnegocios, articulos, grupos."""
+def _load_article_master() -> dict:
+    """Lee el maestro de artículos: negocios, subnegocios y articulos (CSV o parquet)."""
     import pandas as pd
-    result = {"negocios": [], "subnegocios": [], "articulos": [], "grupos": []}
+    result = {"negocios": [], "subnegocios": [], "articulos": []}
 
     try:
         if FORECAST_FILE.exists():
@@ -8762,7 +9438,67 @@ def get_new_client_catalog(user_id=None):
                         grupos.add(gs)
     except Exception as exc:
         logger.warning("[FORECAST manual] get_new_client_catalog grupos CSV error: %s", exc)
+    result["grupos_csv"] = grupos
+    return result
+
+
+# ── Índice del maestro de artículos ──────────────────────────────────────────
+# Se arma una vez por huella (mtime_ns + tamaño) de los archivos del maestro y lo
+# comparten search_articles, get_new_client_catalog y la validación de entradas
+# de clientes manuales. Ver forecast_article_index.py (oct-2026).
+
+_ARTICLE_INDEX: SimpleNamespace | None = None   # index, master (negocios/subnegocios/grupos_csv)
+_ARTICLE_INDEX_LOCK = threading.Lock()
+
+
+def _article_master_fingerprint() -> tuple:
+    out = []
+    for path in (FORECAST_FILE, NEGOCIOS_FILE, _VALORIZADO_PARQUET, CLIENTES_FILE):
+        try:
+            st = path.stat()
+            out.append((str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((str(path), None, None))
+    return tuple(out)
+
+
+def _get_article_index() -> SimpleNamespace:
+    """Índice + resto del maestro vigente; se reconstruye solo si cambia la huella."""
+    global _ARTICLE_INDEX
+    huella = _article_master_fingerprint()
+    cached = _ARTICLE_INDEX
+    if cached is not None and cached.index.huella == huella:
+        return cached
+    with _ARTICLE_INDEX_LOCK:
+        cached = _ARTICLE_INDEX
+        if cached is not None and cached.index.huella == huella:
+            return cached
+        t0 = time.perf_counter()
+        master = _load_article_master()
+        cached = SimpleNamespace(
+            index=_articles.ArticleIndex(master.pop("articulos"), huella=huella),
+            master=master,
+        )
+        _ARTICLE_INDEX = cached
+    logger.info(
+        "[FORECAST manual] article index rebuilt articles=%d elapsed_ms=%.1f",
+        len(cached.index), (time.perf_counter() - t0) * 1000,
+    )
+    return cached
+
+
+def get_new_client_catalog(user_id=None):
+    """Return catalog for the new-client form: negocios, subnegocios, articulos, grupos."""
+    import pandas as pd
+    snap = _get_article_index()
+    result = {
+        "negocios": list(snap.master["negocios"]),
+        "subnegocios": list(snap.master["subnegocios"]),
+        "articulos": list(snap.index.items),
+        "grupos": [],
+    }
 
+    grupos = set(snap.master["grupos_csv"])
     if _data_cache:
         try:
             df_v2 = _data_cache.get("df_valorizado", pd.DataFrame())
@@ -8778,47 +9514,51 @@ def get_new_client_catalog(user_id=None):
     return result
 
 
-_ARTICLE_CACHE: list = []
-_ARTICLE_CACHE_TS: float = 0.0
-_ARTICLE_CACHE_TTL: float = 300.0  # seconds
-
-
 def _get_article_list() -> list:
-    """Return full article list, refreshing every 5 minutes."""
-    import time
-    global _ARTICLE_CACHE, _ARTICLE_CACHE_TS
-    now = time.monotonic()
-    if _ARTICLE_CACHE and (now - _ARTICLE_CACHE_TS) < _ARTICLE_CACHE_TTL:
-        return _ARTICLE_CACHE
-    catalog = get_new_client_catalog()
-    _ARTICLE_CACHE = catalog.get("articulos", [])
-    _ARTICLE_CACHE_TS = now
-    return _ARTICLE_CACHE
+    """Return full article list (shared master index)."""
+    return _get_article_index().index.items
 
 
 def search_articles(q: str = "", limit: int = 30):
-    """Search articles by codigo_serie or descripcion across the full catalog."""
-    q = (q or "").strip().lower()
-    arts = _get_article_list()
-
-    if not q:
-        return arts[:limit]
-
-    matched = []
-    for a in arts:
-        code = (a.get("codigo_serie") or "").lower()
-        desc = (a.get("descripcion") or "").lower()
-        if q in code or q in desc:
-            matched.append(a)
-        if len(matched) >= limit:
-            break
-    return matched
+    """Search articles by codigo_serie or descripcion across the full catalog (ranked)."""
+    return _get_article_index().index.search(q, limit)
+
+
+def _validate_manual_entries(entries: list[dict]) -> list[dict]:
+    """Valida los códigos de las entradas contra el índice del maestro.
+
+    Completa descripcion / neg / subneg / unidad_medida vacíos con los del maestro.
+    Sin maestro disponible (índice vacío) no valida: el alta no puede depender de
+    que el archivo esté en el deploy.
+    """
+    index = _get_article_index().index
+    if not len(index):
+        return entries
+    unknown = []
+    out = []
+    for e in entries:
+        art = index.get(e.get("codigo_serie"))
+        if art is None:
+            unknown.append(str(e.get("codigo_serie", "") or "").strip())
+            continue
+        e = dict(e)
+        e["codigo_serie"] = art["codigo_serie"]
+        for field in ("descripcion", "neg", "subneg"):
+            if not str(e.get(field, "") or "").strip():
+                e[field] = art.get(field, "")
+        if not str(e.get("unidad_medida", "") or "").strip():
+            e["unidad_medida"] = art.get("unidad_medida") or "Unid."
+        out.append(e)
+    if unknown:
+        raise ValueError(f"Artículo(s) inexistente(s) en el maestro: {', '.join(sorted(set(unknown)))}")
+    return out
 
 
 def create_manual_client(user_id, created_by, nombre_cliente, grupo, entries):
     """Persist a new manual forecast client with its article-month entries."""
     if SessionLocal is None or ForecastManualClient is None or ForecastManualEntry is None:
         raise RuntimeError("SessionLocal not available")
+    entries = _validate_manual_entries(entries)
 
     print(f"[MANUAL_CLIENT CREATE] payload: nombre={nombre_cliente!r} grupo={grupo!r} entries={len(entries)}", flush=True)
     for i, e in enumerate(entries[:5]):
@@ -0,0 +1,152 @@
+"""SQL parametrizado para las consultas PostgreSQL de Forecast.
+
+`_safe_in` / `_build_filter_sql` / `_cartera_sql` armaban el WHERE interpolando
+literales: cada combinación de filtros (y cada lista de cuentas de cartera) era un
+texto de statement distinto, Postgres replanificaba siempre y Python re-escapaba
+listas IN de miles de cuentas en cada request.
+
+Ahora (oct-2026), dentro de un `bind_scope()`:
+  - `bind(prefijo, valor)` registra el valor en el scope y devuelve `:nombre`; los
+    fragmentos quedan como `col = ANY(:perfil_0)` / `fecha >= :fecha_desde`. El
+    nombre depende solo del prefijo y del orden de aparición, así que la misma forma
+    de request produce el mismo texto aunque cambien los valores;
+  - `ejecutar(conn, sql)` toma del scope solo los binds que el texto referencia y,
+    en Postgres, usa PREPARE/EXECUTE con un cache por conexión física
+    (`conn.info`, se pierde con la conexión): el plan se arma una vez por forma y
+    conexión en vez de una vez por request.
+
+Fuera de un scope `bind` devuelve None y los helpers siguen interpolando literales
+como antes (caminos fríos, scripts). El scope viaja en un ContextVar, igual que
+`_OVERRIDE_OWNER_SCOPE` en forecast_service.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+logger = logging.getLogger("wc.forecast.sql")
+
+# Statements preparados por conexión física; los más viejos se DEALLOCATEan.
+PREPARED_MAX_POR_CONEXION = 64
+_INFO_KEY = "forecast_prepared"
+
+_BINDS: ContextVar[dict[str, Any] | None] = ContextVar("forecast_sql_binds", default=None)
+
+# `:nombre` que no sea parte de un cast `::tipo` ni de un literal tipo '10:30'.
+_PARAM_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+@contextmanager
+def bind_scope() -> Iterator[dict[str, Any]]:
+    """Activa la parametrización para las consultas del bloque (anidable)."""
+    actual = _BINDS.get()
+    if actual is not None:
+        yield actual
+        return
+    token = _BINDS.set({})
+    try:
+        yield _BINDS.get()
+    finally:
+        _BINDS.reset(token)
+
+
+def bind(prefijo: str, valor: Any) -> str | None:
+    """Registra `valor` en el scope activo y devuelve su placeholder; None sin scope.
+
+    El mismo valor con el mismo prefijo reutiliza el nombre (una lista de cuentas de
+    cartera aparece en varias consultas del mismo request).
+    """
+    binds = _BINDS.get()
+    if binds is None:
+        return None
+    slug = _SLUG_RE.sub("_", str(prefijo).lower()).strip("_") or "p"
+    mismos = [nombre for nombre in binds if nombre.rsplit("_", 1)[0] == slug]
+    for nombre in mismos:
+        if binds[nombre] == valor:
+            return ":" + nombre
+    nombre = f"{slug}_{len(mismos)}"
+    binds[nombre] = valor
+    return ":" + nombre
+
+
+def nombres(sql: str) -> list[str]:
+    """Placeholders referenciados por `sql`, en orden de primera aparición."""
+    vistos: dict[str, None] = {}
+    for m in _PARAM_RE.finditer(sql):
+        vistos.setdefault(m.group(1), None)
+    return list(vistos)
+
+
+def params_para(sql: str) -> dict[str, Any]:
+    """Binds del scope activo que `sql` referencia (vacío sin scope)."""
+    binds = _BINDS.get() or {}
+    return {n: binds[n] for n in nombres(sql) if n in binds}
+
+
+def a_posicional(sql: str, orden: list[str]) -> str:
+    """`:nombre` → `$n` según `orden` (sintaxis de PREPARE)."""
+    idx = {n: i + 1 for i, n in enumerate(orden)}
+    return _PARAM_RE.sub(lambda m: f"${idx[m.group(1)]}" if m.group(1) in idx else m.group(0), sql)
+
+
+def _preparar(conn, sql: str, orden: list[str]) -> str | None:
+    """Nombre del statement preparado para `sql` en esta conexión (lo crea si falta).
+
+    None si no se puede preparar (p. ej. Postgres no infiere el tipo de un
+    parámetro): queda marcado y esa forma va siempre por el camino con binds.
+    """
+    cache: OrderedDict[str, str | None] = conn.info.setdefault(_INFO_KEY, OrderedDict())
+    if sql in cache:
+        cache.move_to_end(sql)
+        return cache[sql]
+    nombre: str | None = "fc_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+    try:
+        # SAVEPOINT: un PREPARE fallido no puede abortar la transacción del caller.
+        with conn.begin_nested():
+            conn.exec_driver_sql(f"PREPARE {nombre} AS {a_posicional(sql, orden)}")
+    except Exception as exc:
+        logger.info("[FORECAST SQL] PREPARE no disponible (%s): %.160s", exc, " ".join(sql.split()))
+        nombre = None
+    cache[sql] = nombre
+    while len(cache) > PREPARED_MAX_POR_CONEXION:
+        _, viejo = cache.popitem(last=False)
+        if viejo:
+            try:
+                conn.exec_driver_sql(f"DEALLOCATE {viejo}")
+            except Exception:
+                pass
+    return nombre
+
+
+def ejecutar(conn, sql: str, *, text=None, preparar: bool = True):
+    """Ejecuta `sql` con los binds del scope; PREPARE/EXECUTE en Postgres.
+
+    `text`: el constructor `sqlalchemy.text` (inyectado por forecast_service, que
+    lo importa de forma opcional). Devuelve el Result de SQLAlchemy.
+    """
+    params = params_para(sql)
+    es_pg = conn.dialect.name == "postgresql"
+    # Los '%' obligarían a escapar para el paramstyle del driver: esas formas (LIKE)
+    # van por el camino con binds sin preparar.
+    if params and preparar and es_pg and "%" not in sql:
+        orden = nombres(sql)
+        if all(n in params for n in orden):
+            nombre = _preparar(conn, sql, orden)
+            if nombre:
+                args = tuple(params[n] for n in orden)
+                marcas = ", ".join(["%s"] * len(args))
+                try:
+                    return conn.exec_driver_sql(f"EXECUTE {nombre} ({marcas})", args)
+                except Exception:
+                    # Conexión reseteada (DISCARD/DEALLOCATE externos): se vuelve a
+                    # preparar en la próxima ejecución.
+                    conn.info.pop(_INFO_KEY, None)
+                    raise
+    stmt = text(sql) if text is not None else sql
+    return conn.execute(stmt, params) if params else conn.execute(stmt)
@@ -0,0 +1,227 @@
+"""Summaries agregadas de Forecast por grano, con refresco incremental por mes.
+
+Hasta ahora había una sola summary con fecha (`forecast_valorizado_summary`,
+cliente × subneg × mes) y solo la usaban treemap / client-table sin filtro de
+producto ni cartera; el chart y cualquier request con producto escaneaban
+`forecast_valorizado` completo.
+
+Ahora (oct-2026) este módulo es la única definición de los granos:
+  - `GRANOS`: tabla, dimensiones e índice de cada summary, del más chico al más
+    grande. Todas llevan las mismas medidas (`MEDIDAS`, las que existan en crudo);
+  - `refrescar(conn)`: lo llama reload_valorizado.py después de cargar. Compara
+    una firma por mes (COUNT + suma de hashes de fila, independiente del orden)
+    contra `forecast_summary_state` y solo re-agrega los meses que cambiaron. Si la
+    tabla falta, cambió de forma o no tiene estado, la reconstruye completa
+    (build + swap como antes);
+  - `elegir_tabla(fragmentos, columnas_de)`: router de grano. Devuelve la primera
+    summary cuyas columnas cubren todo lo que el SELECT / WHERE referencia, o la
+    tabla cruda si ninguna alcanza.
+
+Sin dependencias de la app: reload_valorizado.py lo importa sin levantar
+forecast_service. Refresco solo PostgreSQL.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+logger = logging.getLogger("wc.forecast.summaries")
+
+TABLA_CRUDA = "forecast_valorizado"
+TABLA_ESTADO = "forecast_summary_state"
+
+MEDIDAS = ("monto_yhat", "yhat_cliente", "monto_li", "monto_ls", "li_cliente", "ls_cliente")
+
+# Columnas de forecast_valorizado que un SELECT / WHERE puede referenciar: si una
+# aparece y la summary no la tiene, ese grano no sirve.
+VOCABULARIO = (
+    "perfil", "neg", "subneg", "nombre_grupo", "fantasia", "cliente_id",
+    "codigo_serie", "descripcion", "fecha",
+) + MEDIDAS
+
+
+@dataclass(frozen=True)
+class Grano:
+    tabla: str
+    dims: tuple[str, ...]
+    indice: str
+    idx_cols: tuple[str, ...]
+
+
+# Orden = preferencia del router (menos filas primero).
+GRANOS: tuple[Grano, ...] = (
+    Grano("forecast_subneg_summary",
+          ("perfil", "neg", "subneg", "fecha"),
+          "idx_fss_filtros", ("perfil", "neg", "subneg", "fecha")),
+    Grano("forecast_product_month_summary",
+          ("perfil", "neg", "subneg", "codigo_serie", "fecha"),
+          "idx_fpms_filtros", ("codigo_serie", "fecha")),
+    Grano("forecast_valorizado_summary",
+          ("perfil", "neg", "subneg", "nombre_grupo", "fantasia", "cliente_id", "fecha"),
+          "idx_fvs_filtros", ("perfil", "neg", "subneg", "fecha")),
+)
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_BIND_RE = re.compile(r"(?<![:\w]):[A-Za-z_]\w*")
+_VOCAB_RE = re.compile(r"\b(" + "|".join(VOCABULARIO) + r")\b")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Router de grano
+# ─────────────────────────────────────────────────────────────────────────────
+
+def columnas_referenciadas(*fragmentos: str | None) -> set[str]:
+    """Columnas de `VOCABULARIO` que aparecen en los fragmentos SQL.
+
+    Ignora literales ('FAR') y placeholders (:perfil_0): solo cuentan las
+    referencias a columnas.
+    """
+    vistas: set[str] = set()
+    for frag in fragmentos:
+        if not frag:
+            continue
+        limpio = _BIND_RE.sub(" ", _LITERAL_RE.sub(" ", frag))
+        vistas.update(_VOCAB_RE.findall(limpio))
+    return vistas
+
+
+def elegir_tabla(fragmentos: Iterable[str | None], columnas_de: Callable[[str], frozenset]) -> str:
+    """Summary más chica que cubre los fragmentos; `TABLA_CRUDA` si ninguna.
+
+    `columnas_de(tabla)`: columnas reales de la tabla (vacío si no existe o si las
+    summaries están apagadas). Se miran las columnas reales, no las de `GRANOS`: una
+    tabla construida por una versión anterior (sin monto_li, p. ej.) no se elige
+    para consultas que la necesitan.
+    """
+    necesarias = columnas_referenciadas(*fragmentos)
+    for grano in GRANOS:
+        cols = columnas_de(grano.tabla)
+        if cols and necesarias <= cols:
+            return grano.tabla
+    return TABLA_CRUDA
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Refresco incremental
+# ─────────────────────────────────────────────────────────────────────────────
+
+def planificar(actuales: dict[str, str], guardadas: dict[str, str]) -> tuple[list[str], list[str]]:
+    """(meses a re-agregar, meses a borrar) comparando firmas por mes."""
+    cambiados = sorted(m for m, firma in actuales.items() if guardadas.get(m) != firma)
+    borrados = sorted(m for m in guardadas if m not in actuales)
+    return cambiados, borrados
+
+
+def _columnas(conn, tabla: str, text) -> set[str]:
+    filas = conn.execute(text(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = :t"
+    ), {"t": tabla}).fetchall()
+    return {str(f[0]) for f in filas}
+
+
+def _select_grano(grano: Grano, medidas: tuple[str, ...], where: str | None = None) -> str:
+    dims = ", ".join(grano.dims)
+    sumas = ", ".join(f"SUM(COALESCE({m}, 0)) AS {m}" for m in medidas)
+    filtro = f" WHERE {where}" if where else ""
+    return f"SELECT {dims}, {sumas} FROM {TABLA_CRUDA}{filtro} GROUP BY {dims}"
+
+
+def firmas_por_mes(conn, text) -> dict[str, str]:
+    """Firma por mes de forecast_valorizado: filas + suma de hashes de 60 bits por fila."""
+    filas = conn.execute(text(
+        f"SELECT fecha::date::text AS mes, "
+        f"COUNT(*)::text || ':' || COALESCE(SUM(('x' || substr(md5(v::text), 1, 15))::bit(60)::bigint), 0)::text AS firma "
+        f"FROM {TABLA_CRUDA} v WHERE fecha IS NOT NULL GROUP BY 1"
+    )).fetchall()
+    return {str(mes): str(firma) for mes, firma in filas}
+
+
+def _reconstruir(conn, grano: Grano, medidas: tuple[str, ...], text) -> None:
+    base, idx = grano.tabla, grano.indice
+    # BUILD (self-healing: limpia restos de una corrida fallida previa)
+    conn.execute(text(f"DROP TABLE IF EXISTS {base}_new"))
+    conn.execute(text(f"CREATE TABLE {base}_new AS {_select_grano(grano, medidas)}"))
+    conn.execute(text(f"CREATE INDEX {idx}_new ON {base}_new ({', '.join(grano.idx_cols)})"))
+    # SWAP atomico (el DROP del _old va antes del rename del índice: libera el nombre)
+    conn.execute(text(f"DROP TABLE IF EXISTS {base}_old"))
+    conn.execute(text(f"ALTER TABLE IF EXISTS {base} RENAME TO {base}_old"))
+    conn.execute(text(f"ALTER TABLE {base}_new RENAME TO {base}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {base}_old"))
+    conn.execute(text(f"ALTER INDEX IF EXISTS {idx}_new RENAME TO {idx}"))
+
+
+def _guardar_estado(conn, tabla: str, firmas: dict[str, str], text, *, todo: bool) -> None:
+    if todo:
+        conn.execute(text(f"DELETE FROM {TABLA_ESTADO} WHERE tabla = :t"), {"t": tabla})
+    for mes, firma in firmas.items():
+        conn.execute(text(
+            f"INSERT INTO {TABLA_ESTADO} (tabla, mes, firma, refreshed_at) "
+            f"VALUES (:t, CAST(:m AS date), :f, now()) "
+            f"ON CONFLICT (tabla, mes) DO UPDATE SET firma = EXCLUDED.firma, refreshed_at = now()"
+        ), {"t": tabla, "m": mes, "f": firma})
+
+
+def refrescar(conn, *, completo: bool = False) -> dict[str, dict]:
+    """Refresca todas las summaries de `GRANOS` dentro de la transacción de `conn`.
+
+    `completo=True` fuerza build + swap de todas. Devuelve, por tabla,
+    `{"modo": "completo" | "incremental" | "sin_cambios" | "omitido", "meses": n}`.
+    """
+    from sqlalchemy import text
+
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TABLA_ESTADO} ("
+        f"tabla TEXT NOT NULL, mes DATE NOT NULL, firma TEXT NOT NULL, "
+        f"refreshed_at TIMESTAMP NOT NULL DEFAULT now(), PRIMARY KEY (tabla, mes))"
+    ))
+    crudas = _columnas(conn, TABLA_CRUDA, text)
+    medidas = tuple(m for m in MEDIDAS if m in crudas)
+    actuales = firmas_por_mes(conn, text)
+    resumen: dict[str, dict] = {}
+
+    for grano in GRANOS:
+        if not set(grano.dims) <= crudas:
+            logger.warning("Summary %s omitida: faltan columnas en %s (%s).",
+                           grano.tabla, TABLA_CRUDA, sorted(set(grano.dims) - crudas))
+            resumen[grano.tabla] = {"modo": "omitido", "meses": 0}
+            continue
+        guardadas = {
+            str(mes): str(firma) for mes, firma in conn.execute(text(
+                f"SELECT mes::text, firma FROM {TABLA_ESTADO} WHERE tabla = :t"
+            ), {"t": grano.tabla}).fetchall()
+        }
+        forma_ok = _columnas(conn, grano.tabla, text) == set(grano.dims) | set(medidas)
+        if completo or not forma_ok or not guardadas:
+            _reconstruir(conn, grano, medidas, text)
+            _guardar_estado(conn, grano.tabla, actuales, text, todo=True)
+            resumen[grano.tabla] = {"modo": "completo", "meses": len(actuales)}
+            logger.info("Summary %s reconstruida completa (%d meses).", grano.tabla, len(actuales))
+            continue
+
+        cambiados, borrados = planificar(actuales, guardadas)
+        if not cambiados and not borrados:
+            resumen[grano.tabla] = {"modo": "sin_cambios", "meses": 0}
+            logger.info("Summary %s sin cambios.", grano.tabla)
+            continue
+        tocados = cambiados + borrados
+        conn.execute(
+            text(f"DELETE FROM {grano.tabla} WHERE fecha::date = ANY(CAST(:meses AS date[]))"),
+            {"meses": tocados},
+        )
+        if cambiados:
+            select_sql = _select_grano(grano, medidas, "fecha::date = ANY(CAST(:meses AS date[]))")
+            conn.execute(text(f"INSERT INTO {grano.tabla} ({', '.join(grano.dims + medidas)}) {select_sql}"),
+                         {"meses": cambiados})
+        if borrados:
+            conn.execute(
+                text(f"DELETE FROM {TABLA_ESTADO} WHERE tabla = :t AND mes = ANY(CAST(:meses AS date[]))"),
+                {"t": grano.tabla, "meses": borrados},
+            )
+        _guardar_estado(conn, grano.tabla, {m: actuales[m] for m in cambiados}, text, todo=False)
+        conn.execute(text(f"ANALYZE {grano.tabla}"))
+        resumen[grano.tabla] = {"modo": "incremental", "meses": len(tocados)}
+        logger.info("Summary %s: %d meses re-agregados, %d borrados.",
+                    grano.tabla, len(cambiados), len(borrados))
+    return resumen
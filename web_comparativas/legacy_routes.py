@@ -9,10 +9,18 @@ import json
 import datetime as dt
 import unicodedata
 import re
+import hashlib
 import logging
+import threading
 from types import SimpleNamespace
 from web_comparativas.usage_service import log_usage_event, get_usage_summary
 from web_comparativas import services
+from web_comparativas import oportunidades_snapshot as _oppsnap
+from web_comparativas import upload_jobs
+from web_comparativas import report_artifacts as _reports
+from web_comparativas import view_store as _view_store
+from web_comparativas import mail_store as _mail_store
+from web_comparativas.adapter_registry import benchmark as _adapter_benchmark
 from typing import Any, Optional, List, Dict
 from dotenv import load_dotenv
 load_dotenv()
@@ -55,7 +63,6 @@ from fastapi.responses import (
     FileResponse,
     JSONResponse,
     PlainTextResponse,
-    StreamingResponse,  # ­ƒæê agregado para devolver el PDF en memoria
     Response,          # ­ƒæê NECESARIO para devolver bytes del PDF
 )
 from fastapi.templating import Jinja2Templates
@@ -100,7 +107,7 @@ from .auth import hash_password, verify_password
 from .visibility_service import (
     uploads_visible_query,
     visible_user_ids,
-    kpis_for_home,
+    home_panel,
     recent_done as vis_recent_done,
     _is_auditor,   # función centralizada — no redefinir localmente
 )
@@ -280,8 +287,9 @@ def _save_oportunidades_excel(file: UploadFile) -> int:
         shutil.copyfileobj(file.file, f)
     tmp_path.replace(OPP_FILE)
     try:
-        df = pd.read_excel(OPP_FILE, dtype=str, engine="openpyxl")
-        return int(len(df))
+        # Compila el snapshot ya en la subida: el primer request no paga el Excel.
+        snap = _opp_snapshot(refresh=True)
+        return len(snap) if snap is not None else -1
     except Exception:
         return -1
 
@@ -294,8 +302,8 @@ def _oportunidades_status() -> dict:
     if OPP_FILE.exists():
         info["has_file"] = True
         try:
-            df = pd.read_excel(OPP_FILE, dtype=str)
-            info["rows"] = int(len(df))
+            snap = _opp_snapshot()
+            info["rows"] = len(snap) if snap is not None else None
         except Exception:
             info["rows"] = None
 
@@ -351,78 +359,101 @@ def _opp_parse_date(s) -> dt.date | None:
     except Exception:
         return None
 
-def _opp_load_df() -> pd.DataFrame | None:
-    if not OPP_FILE.exists():
+OPP_SNAPSHOT_FILE = OPP_DIR / "reporte_oportunidades.parquet"
+_OPP_SNAPSHOT: _oppsnap.OppSnapshot | None = None
+_OPP_SNAPSHOT_LOCK = threading.Lock()
+
+_OPP_FECHA_COLS = ["Fecha Apertura", "Apertura", "Fecha", "Fecha de Publicación", "Publicación"]
+_OPP_PRESU_COLS = [
+    "Presupuesto oficial",
+    "Presupuesto",
+    "Monto",
+    "Importe Total",
+    "Total Presupuesto",
+    "Monto Total",
+    "Importe",
+]
+_OPP_ESTADO_COLS = ["Estado", "Tipo Proceso", "Carácter"]
+
+
+def _opp_compile_snapshot() -> _oppsnap.OppSnapshot | None:
+    """Excel maestro → snapshot tipado (+ Parquet junto al xlsx). Una vez por archivo."""
+    huella = _oppsnap.huella(OPP_FILE)
+    if huella is None:
         return None
-    try:
-        df = pd.read_excel(OPP_FILE, dtype=str, engine="openpyxl").fillna("")
-        # normaliza encabezados visuales (conservamos los originales)
-        df.columns = [str(c).strip() for c in df.columns]
+    df = pd.read_excel(OPP_FILE, dtype=str, engine="openpyxl").fillna("")
+    # normaliza encabezados visuales (conservamos los originales)
+    df.columns = [str(c).strip() for c in df.columns]
+    fuentes = {
+        "_dt": _opp_pick(df, _OPP_FECHA_COLS),
+        "_budget": _opp_pick(df, _OPP_PRESU_COLS),
+        "_state": _opp_pick(df, _OPP_ESTADO_COLS),
+    }
+    compilado = _oppsnap.compilar(
+        df,
+        fuentes=fuentes,
+        dimensiones=[c for c in _opp_filter_cols(df).values() if c],
+        parse_fecha=_opp_parse_date,
+        parse_monto=_opp_parse_number,
+    )
+    sha = _oppsnap.sha256(OPP_FILE)
+    _oppsnap.guardar(compilado, OPP_SNAPSHOT_FILE, huella=huella, sha=sha, fuentes=fuentes)
+    return _oppsnap.OppSnapshot(compilado, huella=huella, sha=sha, fuentes=fuentes)
 
-        # --- PRE-CÁLCULO DE COLUMNAS NORMALIZADAS (OPTIMIZACIÓN) ---
-        # 1. Fechas (_dt)
-        fecha_col = _opp_pick(
-            df,
-            ["Fecha Apertura", "Apertura", "Fecha", "Fecha de Publicación", "Publicación"],
-        )
-        if fecha_col:
-            # Parseo vectorizado (o map si es complejo, pero se hace 1 sola vez)
-            df["_dt"] = df[fecha_col].apply(_opp_parse_date)
-        else:
-            df["_dt"] = pd.NaT
 
-        # 2. Presupuesto (_budget)
-        presu_col = _opp_pick(
-            df,
-            [
-                "Presupuesto oficial",
-                "Presupuesto",
-                "Monto",
-                "Importe Total",
-                "Total Presupuesto",
-                "Monto Total",
-                "Importe",
-            ],
-        )
-        if presu_col:
-            df["_budget"] = df[presu_col].map(_opp_parse_number)
-        else:
-            df["_budget"] = 0.0
-
-        # 3. Estado Normalizado (_state) => EMERGENCIA / REGULAR
-        estado_col = _opp_pick(df, ["Estado", "Tipo Proceso", "Carácter"])
-        if estado_col:
-            # La lógica es: si contiene "emerg" (case insensitive) -> EMERGENCIA, sino REGULAR
-            s_lower = df[estado_col].astype(str).str.lower().fillna("")
-            df["_state"] = np.where(
-                s_lower.str.contains("emerg"), "EMERGENCIA", "REGULAR"
+def _opp_snapshot(refresh: bool = False) -> _oppsnap.OppSnapshot | None:
+    """Snapshot vigente del maestro: memoria → Parquet (misma huella/sha) → Excel."""
+    global _OPP_SNAPSHOT
+    huella = _oppsnap.huella(OPP_FILE)
+    if huella is None:
+        return None
+    snap = _OPP_SNAPSHOT
+    if not refresh and snap is not None and snap.huella == huella:
+        return snap
+    with _OPP_SNAPSHOT_LOCK:
+        snap = _OPP_SNAPSHOT
+        if refresh or snap is None or snap.huella != huella:
+            snap = None if refresh else _oppsnap.cargar(
+                OPP_SNAPSHOT_FILE, huella=huella, sha=lambda: _oppsnap.sha256(OPP_FILE)
             )
-        else:
-            df["_state"] = "REGULAR"
+            _OPP_SNAPSHOT = snap or _opp_compile_snapshot()
+        return _OPP_SNAPSHOT
+
 
-        return df
+def _opp_load_df() -> pd.DataFrame | None:
+    if not OPP_FILE.exists():
+        return None
+    try:
+        # Ya trae _dt, _budget y _state precalculados (ver oportunidades_snapshot).
+        snap = _opp_snapshot()
+        return snap.frame() if snap is not None else None
     except Exception as e:
         print("[_opp_load_df] Error:", e)
         return None
 
 
-def _opp_apply_filters(
-    df: pd.DataFrame,
-    q: str,
-    buyer: str,
-    platform: str,
-    province: str,
-    date_from: str,
-    date_to: str,
-    process_type: str = "",
-    cuenta: str = "",
-) -> pd.DataFrame:
-    # Usamos copy para no afectar el cache global, pero ya trae _dt, _budget, _state
-    out = df.copy()
+def _opp_derived(df: pd.DataFrame, key: str, col: str | None) -> pd.Series | None:
+    """Columna derivada del snapshot (`_dt`/`_budget`) si salió de `col`; si no, None."""
+    snap = _OPP_SNAPSHOT
+    if col and key in df.columns and snap is not None and snap.es_propio(df) and snap.fuentes.get(key) == col:
+        return df[key]
+    return None
+
+
+def _opp_enrich(df: pd.DataFrame, date_col: str | None, presu_col: str | None, state_col: str | None) -> None:
+    """Asegura _dt/_budget/_state desde las columnas dadas; reusa las del snapshot si coinciden."""
+    if _opp_derived(df, "_dt", date_col) is None:
+        df["_dt"] = _oppsnap.por_valor(df[date_col], _opp_parse_date) if date_col else pd.NaT
+    if _opp_derived(df, "_budget", presu_col) is None:
+        df["_budget"] = _oppsnap.por_valor(df[presu_col], _opp_parse_number, dtype=float) if presu_col else 0.0
+    if _opp_derived(df, "_state", state_col) is None:
+        df["_state"] = _oppsnap.derivar_estados(df[state_col]).to_numpy() if state_col else "REGULAR"
 
-    # columnas candidatas
+
+def _opp_filter_cols(df: pd.DataFrame) -> dict[str, str | None]:
+    """Columnas que usa _opp_apply_filters (y que el snapshot indexa por código)."""
     buyer_col = _opp_pick(
-        out,
+        df,
         [
             "Comprador",
             "Repartici├│n",
@@ -433,11 +464,11 @@ def _opp_apply_filters(
         ],
     )
     platf_col = _opp_pick(
-        out,
+        df,
         ["Plataforma", "Portal", "Origen", "Sistema", "Platform"],
     )
     prov_col = _opp_pick(
-        out,
+        df,
         [
             "Provincia",
             "Provincia/Municipio",
@@ -447,21 +478,16 @@ def _opp_apply_filters(
             "Departamento",
         ],
     )
-    # fecha_col se usa para pickear, pero usamos _dt para filtrar
-    fecha_col = _opp_pick(
-        out,
-        ["Fecha Apertura", "Apertura", "Fecha", "Fecha de Publicaci├│n", "Publicaci├│n"],
-    )
     desc_col = _opp_pick(
-        out,
+        df,
         ["Descripci├│n", "Descripcion", "Objeto", "Detalle", "Rengl├│n", "Renglon"],
     )
     proc_col = _opp_pick(
-        out,
+        df,
         ["N┬░ Proceso", "Nro Proceso", "Proceso", "Expediente"],
     )
     cuenta_col = _opp_pick(
-        out,
+        df,
         [
             "C├│digo",
             "Codigo",
@@ -476,73 +502,80 @@ def _opp_apply_filters(
         ],
     )
 
-    # b├║squeda libre
+    tipo_col = _opp_pick(df, ["Tipo", "Modalidad", "Procedimiento"])
+    return {
+        "buyer": buyer_col,
+        "platform": platf_col,
+        "province": prov_col,
+        "desc": desc_col,
+        "proc": proc_col,
+        "cuenta": cuenta_col,
+        "tipo": tipo_col,
+    }
+
+
+def _opp_apply_filters(
+    df: pd.DataFrame,
+    q: str,
+    buyer: str,
+    platform: str,
+    province: str,
+    date_from: str,
+    date_to: str,
+    process_type: str = "",
+    cuenta: str = "",
+) -> pd.DataFrame:
+    # Las condiciones se acumulan en UNA máscara y el frame se corta una sola vez
+    # (el resultado es una copia: el snapshot global no se toca). Sobre un frame
+    # del snapshot cada `contains` corre por valor distinto (índice por código).
+    cols = _opp_filter_cols(df)
+    snap = _OPP_SNAPSHOT
+
+    def _match(col: str, prueba) -> np.ndarray:
+        if snap is not None:
+            return snap.coincidencias(df, col, prueba)
+        return np.asarray(prueba(df[col].astype(str)), dtype=bool)
+
+    mask = np.ones(len(df), dtype=bool)
+
+    # búsqueda libre
     if q.strip():
         like = q.strip().lower()
         cols_buscar = [
-            c
-            for c in [desc_col, buyer_col, platf_col, prov_col, proc_col, cuenta_col]
-            if c
+            cols[k]
+            for k in ("desc", "buyer", "platform", "province", "proc", "cuenta")
+            if cols[k]
         ]
         if cols_buscar:
-            m = False
+            m = np.zeros(len(df), dtype=bool)
             for c in cols_buscar:
-                m = m | out[c].astype(str).str.lower().str.contains(like, na=False)
-            out = out[m]
-
-    # filtros por campo
-    if buyer.strip() and buyer_col:
-        out = out[
-            out[buyer_col]
-            .astype(str)
-            .str.contains(buyer.strip(), case=False, na=False)
-        ]
-    if platform.strip() and platf_col:
-        out = out[
-            out[platf_col]
-            .astype(str)
-            .str.contains(platform.strip(), case=False, na=False)
-        ]
-    if province.strip() and prov_col:
-        out = out[
-            out[prov_col]
-            .astype(str)
-            .str.contains(province.strip(), case=False, na=False)
-        ]
-    if cuenta.strip() and cuenta_col:
-        out = out[
-            out[cuenta_col]
-            .astype(str)
-            .str.contains(cuenta.strip(), case=False, na=False)
-        ]
-
-    # rango de fechas (OPTIMIZADO: usa _dt)
-    if "_dt" in out.columns and (date_from.strip() or date_to.strip()):
-        # Aseguramos que _dt sea datetime (o NaT)
-        # (Ya deber├¡a venir listo de _opp_load_df)
-        dates = out["_dt"]
+                m |= _match(c, lambda s: s.str.lower().str.contains(like, na=False))
+            mask &= m
+
+    # filtros por campo (y por Tipo / Modalidad)
+    for valor, col in (
+        (buyer, cols["buyer"]),
+        (platform, cols["platform"]),
+        (province, cols["province"]),
+        (cuenta, cols["cuenta"]),
+        (process_type, cols["tipo"]),
+    ):
+        if valor.strip() and col:
+            mask &= _match(col, lambda s, v=valor.strip(): s.str.contains(v, case=False, na=False))
 
+    # rango de fechas (usa _dt precalculado: date o None)
+    if "_dt" in df.columns and (date_from.strip() or date_to.strip()):
+        dates = df["_dt"]
         if date_from.strip():
             dfm = _opp_parse_date(date_from.strip())
             if dfm:
-                # dfm es date, dates son date/NaT. Comparamos directo.
-                # Ojo: pd.NaT >= date es False (normalmente).
-                out = out[dates >= dfm]
+                mask &= (dates >= dfm).to_numpy(dtype=bool)
         if date_to.strip():
             dtm = _opp_parse_date(date_to.strip())
             if dtm:
-                out = out[dates <= dtm]
-
-    # filtro por Tipo / Modalidad
-    tipo_col = _opp_pick(out, ["Tipo", "Modalidad", "Procedimiento"])
-    if process_type.strip() and tipo_col:
-        out = out[
-            out[tipo_col]
-            .astype(str)
-            .str.contains(process_type.strip(), case=False, na=False)
-        ]
+                mask &= (dates <= dtm).to_numpy(dtype=bool)
 
-    return out
+    return df[mask]
 
 def _opp_compute_kpis(df: pd.DataFrame) -> dict:
     if df is None or df.empty:
@@ -573,10 +606,15 @@ def _opp_compute_kpis(df: pd.DataFrame) -> dict:
     }
 
     if presu_col:
-        k["budget_total"] = float(pd.Series(df[presu_col]).map(_opp_parse_number).sum())
+        montos = _opp_derived(df, "_budget", presu_col)
+        if montos is None:
+            montos = _oppsnap.por_valor(df[presu_col], _opp_parse_number, dtype=float)
+        k["budget_total"] = float(montos.sum())
 
     if fecha_col:
-        fechas = pd.Series(df[fecha_col]).map(_opp_parse_date)
+        fechas = _opp_derived(df, "_dt", fecha_col)
+        if fechas is None:
+            fechas = _oppsnap.por_valor(df[fecha_col], _opp_parse_date)
         try:
             fmin = fechas.dropna().min()
             fmax = fechas.dropna().max()
@@ -605,6 +643,19 @@ REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 # tu plantilla real (la que est├í en static/reports)
 PDF_TEMPLATE_PATH = BASE_DIR / "static" / "reports" / "Informe Comparativas.pdf"
 
+# Almacén de PDFs generados por (upload, tipo, versión de datos): ver report_artifacts.
+# Subir REPORT_RENDER_VERSION al cambiar el layout invalida todo lo generado.
+REPORT_STORE = _reports.ReportStore(REPORTS_DIR / "artifacts")
+REPORT_RENDER_VERSION = 2
+
+
+def _report_template_huella() -> str:
+    try:
+        st = PDF_TEMPLATE_PATH.stat()
+        return f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return "sin-plantilla"
+
 # tu PDF de dise├▒o es 960 x 540 (landscape)
 PDF_PAGE_WIDTH = 960
 PDF_PAGE_HEIGHT = 540
@@ -698,6 +749,8 @@ def render_informe_comparativas(data_pdf: dict) -> bytes:
 
     posiciones = data_pdf.get("posiciones") or []
 
+    # El PDF queda guardado y se sirve igual en cada descarga: la fecha impresa es la
+    # de la versión de datos (cuándo se generó el artefacto), no la de la descarga.
     hoy = dt.datetime.now().strftime("%d/%m/%Y %H:%M")
 
     # ---------------- P├üGINAS ----------------
@@ -710,7 +763,7 @@ def render_informe_comparativas(data_pdf: dict) -> bytes:
         c.drawString(60, 450, f"Repartici├│n / Comprador: {comprador}")
         if apertura:
             c.drawString(60, 430, f"Fecha de apertura: {apertura}")
-        c.drawString(60, 410, f"Generado: {hoy}")
+        c.drawString(60, 410, f"Datos al: {hoy}")
         if plataforma:
             c.drawString(60, 390, f"Plataforma: {plataforma}")
         if provincia:
@@ -818,7 +871,7 @@ def render_informe_comparativas(data_pdf: dict) -> bytes:
         if nro_proceso:
             c.drawString(60, 450, f"Proceso: {nro_proceso}")
 
-        c.drawString(60, 430, f"Fecha: {hoy}")
+        c.drawString(60, 430, f"Datos al: {hoy}")
 
     drawers = [_draw_p1, _draw_p2, _draw_p3, _draw_p4, _draw_p5]
 
@@ -1226,29 +1279,13 @@ def _boot():
     # 4) backfill de nombres
     _backfill_names()
 
-    # 5) inicializar archivo de notificaciones si no existe
-    notif_file = BASE_DIR / "data" / "email_sent.json"
-    if not notif_file.exists():
-        try:
-            notif_file.write_text("{}", encoding="utf-8")
-        except Exception:
-            pass
-
-    # 6) inicializar archivo de reseteo de contrase├▒a si no existe
-    pass_reset_file = BASE_DIR / "data" / "password_resets.json"
-    if not pass_reset_file.exists():
-        try:
-            pass_reset_file.write_text("{}", encoding="utf-8")
-        except Exception:
-            pass
+    # 5) avisos enviados y tokens de reseteo: tablas de mail_store (los JSON
+    #    viejos se importan en el startup de main.py)
 
 
 # ======================================================================
 # ­ƒæë UTILIDADES DE NOTIFICACIONES POR MAIL
 # ======================================================================
-_EMAIL_LOG_PATH = BASE_DIR / "data" / "email_sent.json"
-
-
 def _mail_is_ready() -> bool:
     """
     Devuelve True si hay un m├│dulo email_service con alg├║n m├®todo de env├¡o.
@@ -1267,47 +1304,14 @@ def _mail_is_ready() -> bool:
     )
 
 
-def _load_email_log() -> Dict[str, List[int]]:
-    """
-    Estructura en disco:
-    {
-      "123": [1, 5, 9],  # upload_id=123 => notificado a users 1,5,9
-      "124": [1]
-    }
-    """
-    try:
-        if _EMAIL_LOG_PATH.exists():
-            data = json.loads(_EMAIL_LOG_PATH.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                return data
-    except Exception:
-        pass
-    return {}
-
-
-def _save_email_log(data: Dict[str, List[int]]):
-    try:
-        _EMAIL_LOG_PATH.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-    except Exception as e:
-        logger.warning("No se pudo guardar email_sent.json: %s", e)
-
-
+# Log de avisos enviados: tabla upload_email_sent (mail_store), antes email_sent.json.
 def _was_email_sent(upload_id: int, user_id: int) -> bool:
-    data = _load_email_log()
-    arr = data.get(str(upload_id)) or []
-    return int(user_id) in arr
+    return _mail_store.email_enviado(upload_id, user_id)
 
 
 def _mark_email_sent(upload_id: int, user_id: int):
-    data = _load_email_log()
-    arr = data.get(str(upload_id)) or []
-    if int(user_id) not in arr:
-        arr.append(int(user_id))
-    data[str(upload_id)] = arr
-    _save_email_log(data)
+    # INSERT ... ON CONFLICT DO NOTHING: idempotente aunque dos workers lo marquen
+    _mail_store.marcar_email_enviado(upload_id, user_id)
 
 
 def _collect_followers(upload: UploadModel) -> List[User]:
@@ -1425,73 +1429,21 @@ def _maybe_notify_finalized(upload: UploadModel):
 # ======================================================================
 # SOPORTE PARA RESETEO DE CONTRASE├æA POR TOKEN
 # ======================================================================
-_PASSWORD_RESET_PATH = BASE_DIR / "data" / "password_resets.json"
-
-
-def _load_password_resets() -> dict:
-    """
-    Estructura esperada:
-    {
-        "token1": {"email": "user@dominio", "created_at": "..."},
-        ...
-    }
-    """
-    try:
-        if _PASSWORD_RESET_PATH.exists():
-            data = json.loads(_PASSWORD_RESET_PATH.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                return data
-    except Exception:
-        pass
-    return {}
-
-
-def _save_password_resets(data: dict):
-    try:
-        _PASSWORD_RESET_PATH.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-    except Exception as e:
-        logger.warning("No se pudo guardar password_resets.json: %s", e)
-
-
+# Tokens en la tabla password_reset_tokens (mail_store), antes password_resets.json.
 def _create_password_reset_token(email: str) -> str:
     """
     Crea un token nuevo y lo asocia al email (no revela si existe o no).
     """
-    data = _load_password_resets()
-    tok = uuid.uuid4().hex
-    data[tok] = {
-        "email": (email or "").strip().lower(),
-        "created_at": dt.datetime.utcnow().isoformat(),
-    }
-    _save_password_resets(data)
-    return tok
+    return _mail_store.crear_token_reset(email)
 
 
 def _get_password_reset_email(token: str) -> Optional[str]:
-    data = _load_password_resets()
-    item = data.get(token)
-    if not item:
-        return None
-
-    # vencimiento 24h
-    try:
-        created_at = dt.datetime.fromisoformat(item.get("created_at"))
-        if (dt.datetime.utcnow() - created_at).total_seconds() > 86400:
-            return None
-    except Exception:
-        pass
-
-    return item.get("email")
+    # vencimiento 24h (expires_at)
+    return _mail_store.email_de_token(token)
 
 
 def _consume_password_reset_token(token: str):
-    data = _load_password_resets()
-    if token in data:
-        data.pop(token, None)
-    _save_password_resets(data)
+    _mail_store.consumir_token(token)
 
 
 def _send_password_reset_email(user: User, token: str):
@@ -1570,37 +1522,10 @@ def _home_collect(user: User):
     Compila los datos del panel con visibilidad por grupos.
     Incluye KPIs de procesos + KPIs de oportunidades.
     """
-    # KPIs de procesos seg├║n visibilidad
-    kpis = kpis_for_home(db_session, user)
-
-    # cargas visibles (auditor ve todas), ordenadas de m├ís nueva a m├ís vieja
-    q_all = uploads_visible_ext(db_session, user).order_by(
-        UploadModel.created_at.desc()
-    )
-    uploads = q_all.all()
-
-    def _is_pending(st: str) -> bool:
-        s = (st or "").lower()
-        return s in ("pending", "classifying", "processing", "reviewing")
-
-    def _is_done(st: str) -> bool:
-        s = (st or "").lower()
-        return s in ("done", "dashboard", "finalizado", "tablero")
-
-    # listas de apoyo
-    pending = [u for u in uploads if _is_pending(u.status)]
-    done = [u for u in uploads if _is_done(u.status)]
-
-    # ├║ltimos 5 procesos (cualquier estado)
-    last_done = uploads[:5]
-
-    # ÔÇ£recent_doneÔÇØ en ├║ltimas 24h (solo los finalizados)
-    now = dt.datetime.utcnow()
-    recent_done_24h = [
-        u
-        for u in done
-        if u.updated_at and (now - u.updated_at).total_seconds() < 86400
-    ]
+    # Procesos según visibilidad: agregado por estado + últimos 5 + listos en 24h
+    # (proyección angosta, cacheado por alcance; ver visibility_service.home_panel)
+    panel = home_panel(db_session, user)
+    kpis = panel["kpis"]
 
     # ------------------------------------------------------------------
     # KPIs de OPORTUNIDADES (mismo archivo maestro que Buscador)
@@ -1653,11 +1578,8 @@ def _home_collect(user: User):
             opp_unseen = opp_total
 
     return {
-        "uploads": uploads,
-        "pending": pending,
-        "done": done,
-        "last_done": last_done,
-        "recent_done": recent_done_24h,
+        "last_done": panel["last_done"],
+        "recent_done": panel["recent_done"],
         "total_all": int(kpis.get("total", 0)),
         "total_pending": int(kpis.get("pending", 0)),
         "total_done": int(kpis.get("done", 0)),
@@ -3082,27 +3004,9 @@ def api_oportunidades_dimensiones_filter(
         )
 
         # === ENRIQUECIMIENTO (Necesario para helpers de agregacion) ===
-        # 1. Fecha (_dt)
-        if date_col:
-            # Parseo vectorizado
-            df_filtered["_dt"] = df_filtered[date_col].apply(_opp_parse_date)
-        else:
-            df_filtered["_dt"] = pd.NaT
-
-        # 2. Presupuesto (_budget)
-        if presu_col:
-            df_filtered["_budget"] = df_filtered[presu_col].map(_opp_parse_number)
-        else:
-            df_filtered["_budget"] = 0.0
-
-        # 3. Estado Normalizado (_state) => EMERGENCIA / REGULAR
-        if state_col:
-            s_lower = df_filtered[state_col].astype(str).str.lower().fillna("")
-            df_filtered["_state"] = np.where(
-                s_lower.str.contains("emerg"), "EMERGENCIA", "REGULAR"
-            )
-        else:
-            df_filtered["_state"] = "REGULAR"
+        # _dt/_budget/_state ya vienen del snapshot; solo se rederivan (por valor
+        # distinto) si este dashboard toma otra columna de fecha/estado.
+        _opp_enrich(df_filtered, date_col, presu_col, state_col)
 
         # --- AGREGACIONES ---
         # Top 15 Compradores
@@ -3757,8 +3661,8 @@ async def crear_carga(
         },
     )
 
-    # Procesar en segundo plano
-    background_tasks.add_task(classify_and_process, up.id, {}, touch_status=True)
+    # Procesar en segundo plano (cola durable: ver upload_jobs)
+    upload_jobs.enqueue(up.id, {}, touch_status=True)
 
     return RedirectResponse(f"/cargas/{up.id}", status_code=303)
 
@@ -4066,7 +3970,7 @@ async def crear_carga_otras_fuentes(
         "filename": final_filename,
         "platform": platform_hint,
     }
-    background_tasks.add_task(classify_and_process, up.id, metadata, touch_status=True)
+    upload_jobs.enqueue(up.id, metadata, touch_status=True)
 
     return RedirectResponse(f"/cargas/{up.id}", status_code=303)
 
@@ -4381,6 +4285,31 @@ def historial_cargas(
     return response
 
 
+# ======================================================================
+# REGISTRY DE ADAPTERS: dry-run de clasificación (solo Admin)
+# ======================================================================
+@router.get("/api/admin/adapters/dry-run")
+def adapters_dry_run(
+    filename: str = "",
+    platform: str = "",
+    province: str = "",
+    buyer: str = "",
+    bench: int = 0,
+    user: User = Depends(require_roles("admin")),
+):
+    """
+    Qué adapter elegiría classify_and_process para este filename/metadata, sin
+    procesar nada: condición por regla, tiempos (µs) y, con bench=N, el
+    micro-benchmark del despacho repetido N veces.
+    """
+    meta = {"filename": filename, "platform": platform, "province": province, "buyer": buyer}
+    reg = services._load_registry()
+    out = reg.explain(meta)
+    if bench > 0:
+        out["benchmark"] = _adapter_benchmark(reg, [meta], repeat=min(int(bench), 100_000))
+    return JSONResponse(out)
+
+
 # ======================================================================
 # ELIMINAR COMPARATIVA (solo Admin)
 # ======================================================================
@@ -5043,23 +4972,20 @@ def api_carga_avance(
             logger.warning(
                 "No se pudo enviar notificaci├│n en avance manual: %s", e
             )
+        # el tablero se sirve del bundle persistido y el reporte del almacén: dejarlos listos ya
+        if background_tasks is not None:
+            background_tasks.add_task(_ensure_tablero_bundle, up.id)
+            background_tasks.add_task(_ensure_report_artifacts, up.id)
+        else:
+            _ensure_tablero_bundle(up.id)
+            _ensure_report_artifacts(up.id)
 
     # si entramos a 'processing' y hace falta procesar ÔåÆ disparar pipeline
     try:
         if new_status == "processing" and _needs_processing(up):
-            if background_tasks is not None:
-                background_tasks.add_task(classify_and_process, up.id, {}, touch_status=True)
-            else:
-                import threading
-
-                threading.Thread(
-                    target=classify_and_process,
-                    args=(up.id, {}),
-                    kwargs={"touch_status": True},
-                    daemon=True,
-                ).start()
+            upload_jobs.enqueue(up.id, {}, touch_status=True)
     except Exception as e:
-        logger.exception("No se pudo disparar classify_and_process: %s", e)
+        logger.exception("No se pudo encolar classify_and_process: %s", e)
 
     # respuesta coherente con el stepper
     label_map = dict(services.PROCESS_STEPS)
@@ -5105,17 +5031,20 @@ def _load_processed_df(upload: UploadModel) -> Optional[pd.DataFrame]:
     El fallback a DB garantiza que funcione después de un redespliegue en Render.
     """
     try:
-        content = services.get_normalized_bytes(upload)
-        if not content:
-            return None
-        df = pd.read_excel(io.BytesIO(content))
-        df.columns = [str(c).strip() for c in df.columns]
-        return df
+        return _read_processed_bytes(services.get_normalized_bytes(upload))
     except Exception as e:
         print("[_load_processed_df] Error:", e)
         return None
 
 
+def _read_processed_bytes(content: Optional[bytes]) -> Optional[pd.DataFrame]:
+    if not content:
+        return None
+    df = pd.read_excel(io.BytesIO(content))
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
 # ======================================================================
 # API JSON PARA RANKING DEL TABLERO
 # ======================================================================
@@ -5282,38 +5211,13 @@ async def api_restaurar_archivo(
     return JSONResponse({"ok": True, "message": "Archivo restaurado y procesado correctamente."})
 
 
-@router.get("/api/tablero/{upload_id}/ranking", response_class=JSONResponse)
-def api_tablero_ranking(
-    upload_id: int,
-    request: Request,
-    max_positions: Optional[int] = Query(
-        None, description="Limitar cantidad de puestos por rengl├│n"
-    ),
-    user: User = Depends(
-        require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
-    ),
-):
+def _compute_tablero_ranking(df: Optional[pd.DataFrame], upload_id: int) -> Optional[Dict[str, Any]]:
     """
-    Ranking robusto para el tablero.
+    Ranking completo por renglón (todas las posiciones). None si no hay DF.
+    api_tablero_ranking lo sirve desde el bundle y recorta max_positions.
     """
-    up = db_session.get(UploadModel, upload_id)
-    if not up:
-        return JSONResponse({"ok": False, "error": "not_found"}, status_code=404)
-    # FIX: Forzar recarga desde DB para ranking correcto
-    try:
-        db_session.refresh(up)
-    except Exception:
-        db_session.expire(up)
-
-    # ­ƒöÆ visibilidad por grupos (pero auditor ve todo)
-    if up.user_id not in visible_user_ids_ext(db_session, user):
-        raise HTTPException(status_code=403, detail="No autorizado")
-
-    df = _load_processed_df(up)
     if df is None or df.empty:
-        return JSONResponse(
-            {"ok": True, "rows": [], "max_pos": 0, "total_rows": 0}
-        )
+        return None
 
     cols = [str(c).strip() for c in df.columns]
 
@@ -5417,16 +5321,14 @@ def api_tablero_ranking(
         if not price_col: missing.append("price")
 
         print(f"[API Ranking] {upload_id} -> columnas faltantes: {missing} | disponibles: {cols}")
-        return JSONResponse(
-            {
-                "ok": True,
-                "rows": [],
-                "max_pos": 0,
-                "total_rows": 0,
-                "debug_error": f"Columnas no detectadas: {', '.join(missing)}",
-                "available_cols": cols,
-            }
-        )
+        return {
+            "ok": True,
+            "rows": [],
+            "max_pos": 0,
+            "total_rows": 0,
+            "debug_error": f"Columnas no detectadas: {', '.join(missing)}",
+            "available_cols": cols,
+        }
     print(f"[API Ranking] {upload_id} -> item={item_col} desc={desc_col} prov={prov_col} price={price_col} total={total_col_rank}")
     line_alert_map = _detect_line_price_alerts(df).get("line_alerts", {})
 
@@ -5502,9 +5404,6 @@ def api_tablero_ranking(
         ]
         offers.sort(key=lambda x: (x["precio"], x["proveedor"]))
 
-        if max_positions is not None:
-            offers = offers[: int(max_positions)]
-
         positions = [{"pos": i + 1, **o} for i, o in enumerate(offers)]
         max_pos_found = max(max_pos_found, len(positions))
 
@@ -5521,6 +5420,64 @@ def api_tablero_ranking(
             }
         )
 
+    return {
+        "ok": True,
+        "rows": rows_out,
+        "max_pos": int(max_pos_found),
+        "total_rows": int(len(rows_out)),
+    }
+
+
+def _trim_ranking_rows(
+    rows: List[Dict[str, Any]], max_positions: Optional[int]
+) -> tuple[List[Dict[str, Any]], int]:
+    """Recorta los puestos por renglón del ranking del bundle (sin mutarlo)."""
+    if max_positions is not None:
+        rows = [
+            {**r, "positions": r["positions"][: int(max_positions)]}
+            for r in rows
+        ]
+    return rows, max((len(r["positions"]) for r in rows), default=0)
+
+
+@router.get("/api/tablero/{upload_id}/ranking", response_class=JSONResponse)
+def api_tablero_ranking(
+    upload_id: int,
+    request: Request,
+    max_positions: Optional[int] = Query(
+        None, description="Limitar cantidad de puestos por rengl├│n"
+    ),
+    user: User = Depends(
+        require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
+    ),
+):
+    """
+    Ranking robusto para el tablero.
+    """
+    up = db_session.get(UploadModel, upload_id)
+    if not up:
+        return JSONResponse({"ok": False, "error": "not_found"}, status_code=404)
+    # FIX: Forzar recarga desde DB para ranking correcto
+    try:
+        db_session.refresh(up)
+    except Exception:
+        db_session.expire(up)
+
+    # ­ƒöÆ visibilidad por grupos (pero auditor ve todo)
+    if up.user_id not in visible_user_ids_ext(db_session, user):
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    bundle = get_tablero_bundle(up)
+    ranking = (bundle or {}).get("ranking")
+    if not ranking:
+        return JSONResponse(
+            {"ok": True, "rows": [], "max_pos": 0, "total_rows": 0}
+        )
+    if "debug_error" in ranking:
+        return JSONResponse(ranking)
+
+    rows_out, max_pos_found = _trim_ranking_rows(ranking["rows"], max_positions)
+
     # ­ƒæç NUEVO: log de consulta de ranking
     log_usage_event(
         user=user,
@@ -6469,64 +6426,18 @@ def detectConsistencyAlerts(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-@router.get("/tablero/{upload_id}", response_class=HTMLResponse)
-def tablero_show(
-    request: Request,
-    upload_id: int,
-    user: User = Depends(
-        require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
-    ),
-):
-    up = db_session.get(UploadModel, upload_id)
-    if not up:
-        return HTMLResponse("Carga no encontrada", status_code=404)
-
-    # FIX CRÍTICO: Forzar recarga completa desde DB para garantizar que
-    # normalized_content y dashboard_json corresponden a ESTE upload_id,
-    # no a un objeto stale del identity map de la sesión.
-    try:
-        db_session.refresh(up)
-    except Exception:
-        db_session.expire(up)
-
-    # ­ƒöÆ Verificar visibilidad por grupos (auditor ve todo).
-    # Si el proceso es del propio usuario, SIEMPRE permitir.
-    vis_ids = visible_user_ids_ext(db_session, user)
-    if (up.user_id != user.id) and (up.user_id not in vis_ids):
-        raise HTTPException(
-            status_code=403,
-            detail="No autorizado para ver este proceso.",
-        )
-
-    role = (user.role or "").lower()
-    st = (up.status or "").lower()
-    is_admin = role == "admin"
-    is_finalized = st in ("done", "finalizado")
-
-    norm_path = services.get_normalized_path(up)
-    # Verificar disponibilidad: disco O contenido en DB (sobrevive redespliegues)
-    has_normalized = (norm_path and norm_path.exists()) or bool(getattr(up, "normalized_content", None))
-    if not has_normalized:
-        raise HTTPException(status_code=404, detail="Archivo no encontrado")
-
-    # ­ƒöÆ Regla: solo ADMIN puede ver antes de finalizado
-    if not is_admin and not is_finalized:
-        raise HTTPException(
-            status_code=403,
-            detail="Disponible cuando el admin finalice el proceso.",
-        )
-
-    # Leer dashboard.json: disco primero, DB como fallback
-    summary = services.get_dashboard_data(up)
-
-    # Detectar modo de dashboard desde diagnóstico del adapter
+def _compute_tablero_analytics(
+    up: Any, df: Optional[pd.DataFrame], summary: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    KPIs, gráficos, resumen general, efectividad Suizo, alertas de consistencia
+    y tabla preview del tablero. Sin DF usa lo que venga de dashboard.json.
+    """
     _adap_diag = {}
     if isinstance(summary, dict):
         _adap_diag = summary.get("__diag__", {}) or {}
     dashboard_mode = _adap_diag.get("parser_mode", "legacy_blocks")
 
-    df = _load_processed_df(up)
-
     # Diagnóstico de columnas para debugging
     _dash_diag: dict = {
         "dashboard_mode": dashboard_mode,
@@ -6559,18 +6470,18 @@ def tablero_show(
                     "sum": round(float(_s.fillna(0).sum()), 2),
                     "sample": [round(v, 2) for v in _s.dropna().head(5).tolist()],
                 }
-        print(f"[tablero/{upload_id}] mode={dashboard_mode} shape={df.shape} cols={list(df.columns)}")
+        print(f"[tablero/{up.id}] mode={dashboard_mode} shape={df.shape} cols={list(df.columns)}")
         price_diag = _dash_diag["numeric_summary"].get("precio_unitario", {})
         qty_diag   = _dash_diag["numeric_summary"].get("cantidad_ofertada", {})
         tot_diag   = _dash_diag["numeric_summary"].get("total_renglon", {})
-        print(f"[tablero/{upload_id}] precio sum={price_diag.get('sum')} qty sum={qty_diag.get('sum')} total sum={tot_diag.get('sum')}")
+        print(f"[tablero/{up.id}] precio sum={price_diag.get('sum')} qty sum={qty_diag.get('sum')} total sum={tot_diag.get('sum')}")
 
         kpis, chart_sup, chart_pos = compute_kpis_and_charts(df)
         df_en, col_map = enrich_df_for_dashboard(df)
         chart_sup_adj, donut_pos, donut_suizo = compute_extra_charts(
             df_en, col_map
         )
-        print(f"[tablero/{upload_id}] kpis={kpis} chart_sup_adj_labels={chart_sup_adj.get('labels','?')[:3]}")
+        print(f"[tablero/{up.id}] kpis={kpis} chart_sup_adj_labels={chart_sup_adj.get('labels','?')[:3]}")
     else:
         # usar lo que venga de dashboard.json
         kpis = summary.get(
@@ -6605,30 +6516,6 @@ def tablero_show(
         df_en if df is not None and not df.empty else None
     )
 
-    def _as_list_str(xs):
-        try:
-            return [str(x) for x in (xs or [])]
-        except Exception:
-            return []
-
-    def _as_list_float(xs):
-        out = []
-        for x in (xs or []):
-            try:
-                out.append(float(x))
-            except Exception:
-                out.append(0.0)
-        return out
-
-    def _as_list_int(xs):
-        out = []
-        for x in (xs or []):
-            try:
-                out.append(int(x))
-            except Exception:
-                out.append(0)
-        return out
-
     try:
         kpis = {
             "total_offers": float(kpis.get("total_offers", 0) or 0),
@@ -6688,6 +6575,228 @@ def tablero_show(
     else:
         table_cols, table_rows, rows_total = [], [], 0
 
+    return {
+        "kpis": kpis,
+        "chart_sup": chart_sup,
+        "chart_pos": chart_pos,
+        "chart_sup_adj": chart_sup_adj,
+        "donut_pos": donut_pos,
+        "donut_suizo": donut_suizo,
+        "lic_gen": lic_gen,
+        "suizo_eff": suizo_eff,
+        "consistency": consistency_ctx,
+        "dash_diag": _dash_diag,
+        "table_cols": table_cols,
+        "table_rows": table_rows,
+        "rows_total": rows_total,
+    }
+
+
+# ======================================================================
+# BUNDLE DE ANALÍTICA DEL TABLERO (persistido por upload)
+# ======================================================================
+# tablero_show y api_tablero_ranking re-parseaban el normalized.xlsx y
+# recalculaban KPIs, gráficos, ranking, alertas y efectividad Suizo en cada
+# vista, aunque un upload procesado no cambia. Ahora se calcula UNA vez (al
+# terminar classify_and_process o al pasar a dashboard/done) y se guarda en
+# uploads.tablero_bundle_json, junto a dashboard_json. El bundle lleva la
+# versión del esquema y la huella (sha1) del normalized: si alguna no coincide
+# se regenera en la primera vista. Subir TABLERO_BUNDLE_VERSION al cambiar
+# cualquiera de los cálculos de arriba.
+TABLERO_BUNDLE_VERSION = 1
+
+
+def _tablero_fingerprint(content: Optional[bytes]) -> Optional[str]:
+    return hashlib.sha1(content).hexdigest() if content else None
+
+
+def _bundle_json_default(v: Any) -> Any:
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, (dt.date, dt.datetime, pd.Timestamp)):
+        return v.isoformat()
+    return str(v)
+
+
+def build_tablero_bundle(up: Any, content: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    """
+    Calcula el bundle del tablero desde el normalized del upload.
+    None si el upload no tiene normalized.
+    """
+    if content is None:
+        content = services.get_normalized_bytes(up)
+    if not content:
+        return None
+    try:
+        df = _read_processed_bytes(content)
+    except Exception as e:
+        print("[build_tablero_bundle] Error:", e)
+        df = None
+    bundle = {
+        "version": TABLERO_BUNDLE_VERSION,
+        "fingerprint": _tablero_fingerprint(content),
+        "built_at": dt.datetime.utcnow().isoformat(),
+        "analytics": _compute_tablero_analytics(up, df, services.get_dashboard_data(up)),
+        "ranking": _compute_tablero_ranking(df, up.id),
+    }
+    # Ida y vuelta por JSON: la primera vista ve los mismos tipos que las siguientes.
+    return json.loads(json.dumps(bundle, ensure_ascii=False, default=_bundle_json_default))
+
+
+def _store_tablero_bundle(up: Any, bundle: Dict[str, Any]) -> bool:
+    try:
+        up.tablero_bundle_json = json.dumps(bundle, ensure_ascii=False)
+        db_session.add(up)
+        db_session.commit()
+        return True
+    except Exception as e:
+        logger.warning("[tablero %s] no se pudo persistir el bundle: %s", up.id, e)
+        try:
+            db_session.rollback()
+        except Exception:
+            pass
+        return False
+
+
+def refresh_tablero_bundle(up: Any, content: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    """Recalcula y persiste el bundle del upload (best-effort: nunca bloquea el flujo)."""
+    bundle = build_tablero_bundle(up, content)
+    if bundle is not None and _store_tablero_bundle(up, bundle):
+        logger.info("[tablero %s] bundle v%s persistido", up.id, TABLERO_BUNDLE_VERSION)
+    return bundle
+
+
+def get_tablero_bundle(up: Any) -> Optional[Dict[str, Any]]:
+    """
+    Bundle vigente del upload. Si falta, es de otra versión o de otro
+    normalized, se regenera (lazy) y se persiste.
+    """
+    content = services.get_normalized_bytes(up)
+    if not content:
+        return None
+    stored = getattr(up, "tablero_bundle_json", None)
+    if stored:
+        try:
+            bundle = json.loads(stored)
+        except Exception:
+            bundle = None
+        if (
+            isinstance(bundle, dict)
+            and bundle.get("version") == TABLERO_BUNDLE_VERSION
+            and bundle.get("fingerprint") == _tablero_fingerprint(content)
+        ):
+            return bundle
+    return refresh_tablero_bundle(up, content)
+
+
+def _ensure_tablero_bundle(upload_id: int) -> None:
+    """Genera el bundle si falta o quedó viejo (al finalizar, fuera del request)."""
+    try:
+        up = db_session.get(UploadModel, upload_id)
+        if up is not None:
+            get_tablero_bundle(up)
+    except Exception as e:
+        logger.warning("[tablero %s] bundle no generado: %s", upload_id, e)
+
+
+@router.get("/tablero/{upload_id}", response_class=HTMLResponse)
+def tablero_show(
+    request: Request,
+    upload_id: int,
+    user: User = Depends(
+        require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
+    ),
+):
+    up = db_session.get(UploadModel, upload_id)
+    if not up:
+        return HTMLResponse("Carga no encontrada", status_code=404)
+
+    # FIX CRÍTICO: Forzar recarga completa desde DB para garantizar que
+    # normalized_content y dashboard_json corresponden a ESTE upload_id,
+    # no a un objeto stale del identity map de la sesión.
+    try:
+        db_session.refresh(up)
+    except Exception:
+        db_session.expire(up)
+
+    # ­ƒöÆ Verificar visibilidad por grupos (auditor ve todo).
+    # Si el proceso es del propio usuario, SIEMPRE permitir.
+    vis_ids = visible_user_ids_ext(db_session, user)
+    if (up.user_id != user.id) and (up.user_id not in vis_ids):
+        raise HTTPException(
+            status_code=403,
+            detail="No autorizado para ver este proceso.",
+        )
+
+    role = (user.role or "").lower()
+    st = (up.status or "").lower()
+    is_admin = role == "admin"
+    is_finalized = st in ("done", "finalizado")
+
+    norm_path = services.get_normalized_path(up)
+    # Verificar disponibilidad: disco O contenido en DB (sobrevive redespliegues)
+    has_normalized = (norm_path and norm_path.exists()) or bool(getattr(up, "normalized_content", None))
+    if not has_normalized:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    # ­ƒöÆ Regla: solo ADMIN puede ver antes de finalizado
+    if not is_admin and not is_finalized:
+        raise HTTPException(
+            status_code=403,
+            detail="Disponible cuando el admin finalice el proceso.",
+        )
+
+    # Leer dashboard.json: disco primero, DB como fallback
+    summary = services.get_dashboard_data(up)
+
+    # Detectar modo de dashboard desde diagnóstico del adapter
+    _adap_diag = {}
+    if isinstance(summary, dict):
+        _adap_diag = summary.get("__diag__", {}) or {}
+    dashboard_mode = _adap_diag.get("parser_mode", "legacy_blocks")
+
+    # KPIs, gráficos, alertas y tabla salen del bundle persistido del upload
+    # (se calcula una vez; se regenera solo si cambió el normalized o la versión).
+    bundle = get_tablero_bundle(up)
+    analytics = (bundle or {}).get("analytics") or _compute_tablero_analytics(up, None, summary)
+    kpis = analytics["kpis"]
+    chart_sup = analytics["chart_sup"]
+    chart_pos = analytics["chart_pos"]
+    chart_sup_adj = analytics["chart_sup_adj"]
+    donut_pos = analytics["donut_pos"]
+    donut_suizo = analytics["donut_suizo"]
+    lic_gen = analytics["lic_gen"]
+    suizo_eff = analytics["suizo_eff"]
+    consistency_ctx = analytics["consistency"]
+    _dash_diag = analytics["dash_diag"]
+    table_cols = analytics["table_cols"]
+    table_rows = analytics["table_rows"]
+    rows_total = analytics["rows_total"]
+
+    def _as_list_str(xs):
+        try:
+            return [str(x) for x in (xs or [])]
+        except Exception:
+            return []
+
+    def _as_list_float(xs):
+        out = []
+        for x in (xs or []):
+            try:
+                out.append(float(x))
+            except Exception:
+                out.append(0.0)
+        return out
+
+    def _as_list_int(xs):
+        out = []
+        for x in (xs or []):
+            try:
+                out.append(int(x))
+            except Exception:
+                out.append(0)
+        return out
+
     chart_suppliers_labels = _as_list_str(chart_sup.get("labels", []))
     chart_suppliers_values = _as_list_float(chart_sup.get("values", []))
     chart_positions_labels = _as_list_str(chart_pos.get("labels", []))
@@ -7549,43 +7658,9 @@ def _fmt_fecha(value):
     return str(value)
 
 
-@router.get("/reportes/proceso/{upload_id}")
-def descargar_reporte_proceso(
-    upload_id: int,
-    request: Request,
-    db: Session = Depends(get_db),
-    user: User = Depends(require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")),
-):
-    # 1) Traer el proceso / upload (usar UploadModel, no Upload)
-    up = (
-        db.query(UploadModel)
-        .filter(UploadModel.id == upload_id)
-        .first()
-    )
-    if not up:
-        raise HTTPException(status_code=404, detail="Proceso no encontrado")
-
-    # 2) ­ƒöÆ Verificar visibilidad por grupos (auditor ve todo).
-    #    Si el proceso es del propio usuario, SIEMPRE permitir.
-    vis_ids = visible_user_ids_ext(db_session, user)
-    if (up.user_id != user.id) and (up.user_id not in vis_ids):
-        raise HTTPException(
-            status_code=403,
-            detail="No autorizado para ver este proceso.",
-        )
-
-    # 3) ­ƒöÆ Regla: solo ADMIN puede ver antes de finalizado
-    role = (user.role or "").lower()
-    is_admin = role == "admin"
-    st = (up.status or "").strip().lower()
-    is_finalized = st in ("done", "finalizado", "dashboard", "tablero")
-    if not is_admin and not is_finalized:
-        raise HTTPException(
-            status_code=403,
-            detail="Disponible cuando el admin finalice el proceso.",
-        )
-
-    # 4) Normalizar fechas del modelo (acepta str/date/datetime)
+def _reporte_proceso_data(up) -> dict:
+    """Payload de `render_informe_comparativas` para un upload (solo lee el modelo)."""
+    # Normalizar fechas del modelo (acepta str/date/datetime)
     apertura_raw = (
         getattr(up, "apertura_fecha", None)
         or getattr(up, "apertura", None)
@@ -7593,7 +7668,7 @@ def descargar_reporte_proceso(
     )
     apertura_str = _fmt_fecha(apertura_raw)
 
-    # 5) Otros campos que solemos tener
+    # Otros campos que solemos tener
     proceso_nro = (
         getattr(up, "proceso_nro", None)
         or getattr(up, "nro_proceso", None)
@@ -7628,7 +7703,7 @@ def descargar_reporte_proceso(
         or ""
     )
 
-    # 6) KPIs (si los guardaste como JSON en DB)
+    # KPIs (si los guardaste como JSON en DB)
     kpis = {}
     if getattr(up, "kpis_json", None):
         try:
@@ -7638,7 +7713,7 @@ def descargar_reporte_proceso(
     elif getattr(up, "kpis", None) and isinstance(up.kpis, dict):
         kpis = up.kpis
 
-    # 7) Posiciones (si est├ín serializadas en el modelo)
+    # Posiciones (si est├ín serializadas en el modelo)
     posiciones = []
     if hasattr(up, "posiciones_json") and up.posiciones_json:
         try:
@@ -7646,8 +7721,8 @@ def descargar_reporte_proceso(
         except Exception:
             posiciones = []
 
-    # 8) Payload para el generador de PDF
-    data_pdf = {
+    # Payload para el generador de PDF
+    return {
         "proceso_nro": proceso_nro,
         "comprador": comprador,
         "apertura": apertura_str,
@@ -7666,12 +7741,73 @@ def descargar_reporte_proceso(
         },
     }
 
-    # 9) Generar el PDF en memoria
-    pdf_bytes = render_informe_comparativas(data_pdf)
 
-    # 10) Devolverlo como descarga
-    filename = f"informe_proceso_{upload_id}.pdf"
-        # ... despu├®s de generar pdf_bytes = render_informe_comparativas(data_pdf)
+def _reporte_proceso_artifact(up) -> _reports.Artifact:
+    """PDF del reporte de proceso desde el almacén; se genera solo si cambió la versión."""
+    data_pdf = _reporte_proceso_data(up)
+    version = _reports.version_de(data_pdf, REPORT_RENDER_VERSION, _report_template_huella())
+    return REPORT_STORE.get_or_build(
+        up.id, "reporte_proceso", version, lambda: render_informe_comparativas(data_pdf)
+    )
+
+
+def _ensure_report_artifacts(upload_id: int) -> None:
+    """Deja generado el reporte de proceso al finalizar (fuera del request)."""
+    try:
+        up = db_session.get(UploadModel, upload_id)
+        if up is not None:
+            _reporte_proceso_artifact(up)
+    except Exception as e:
+        logger.warning("[reporte %s] PDF no pregenerado: %s", upload_id, e)
+
+
+def _serve_report_artifact(request: Request, art: _reports.Artifact, filename: str, disposition: str):
+    """Sirve el artefacto con ETag; If-None-Match coincidente → 304 sin cuerpo."""
+    headers = {"ETag": art.etag, "Cache-Control": "private, no-cache"}
+    if _reports.etag_coincide(request.headers.get("if-none-match"), art.etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return FileResponse(art.path, media_type="application/pdf", headers=headers)
+
+
+@router.get("/reportes/proceso/{upload_id}")
+def descargar_reporte_proceso(
+    upload_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")),
+):
+    # 1) Traer el proceso / upload (usar UploadModel, no Upload)
+    up = (
+        db.query(UploadModel)
+        .filter(UploadModel.id == upload_id)
+        .first()
+    )
+    if not up:
+        raise HTTPException(status_code=404, detail="Proceso no encontrado")
+
+    # 2) ­ƒöÆ Verificar visibilidad por grupos (auditor ve todo).
+    #    Si el proceso es del propio usuario, SIEMPRE permitir.
+    vis_ids = visible_user_ids_ext(db_session, user)
+    if (up.user_id != user.id) and (up.user_id not in vis_ids):
+        raise HTTPException(
+            status_code=403,
+            detail="No autorizado para ver este proceso.",
+        )
+
+    # 3) ­ƒöÆ Regla: solo ADMIN puede ver antes de finalizado
+    role = (user.role or "").lower()
+    is_admin = role == "admin"
+    st = (up.status or "").strip().lower()
+    is_finalized = st in ("done", "finalizado", "dashboard", "tablero")
+    if not is_admin and not is_finalized:
+        raise HTTPException(
+            status_code=403,
+            detail="Disponible cuando el admin finalice el proceso.",
+        )
+
+    # 4) PDF desde el almacén de artefactos (se compone una vez por versión de datos)
+    art = _reporte_proceso_artifact(up)
 
     # ── Tracking: EXPORT (reclasificado desde 'download_pdf'). Fire-and-forget.
     try:
@@ -7681,18 +7817,12 @@ def descargar_reporte_proceso(
             section="reporte_proceso",
             request=request,
             resource_id=f"reporte_proceso_{upload_id}.pdf",
-            extra_data={"format": "pdf", "upload_id": int(up.id), "proceso_nro": proceso_nro},
+            extra_data={"format": "pdf", "upload_id": int(up.id), "proceso_nro": up.proceso_nro or ""},
         )
     except Exception:
         pass
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="reporte_proceso_{upload_id}.pdf"'
-        },
-    )
+    return _serve_report_artifact(request, art, f"reporte_proceso_{upload_id}.pdf", "attachment")
 
 
 # === Informe PDF ============================================================
@@ -7707,30 +7837,41 @@ def informe_pdf(
     if not up:
         raise HTTPException(status_code=404, detail="Proceso no encontrado")
 
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=(595, 842))  # A4
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(40, 800, "Informe de licitaci├│n")
-    c.setFont("Helvetica", 11)
-    c.drawString(
-        40,
-        780,
-        f"Proceso: {up.proceso_nro or up.proceso_key or upload_id}",
+    # Lleva "Generado por": un artefacto por usuario y versión de datos del proceso.
+    generado_por = user_display(user)
+    version = _reports.version_de(
+        [up.proceso_nro, up.proceso_key, up.platform_hint, up.buyer_hint, up.province_hint, generado_por],
+        REPORT_RENDER_VERSION,
     )
-    c.drawString(40, 765, f"Plataforma: {up.platform_hint or '-'}")
-    c.drawString(40, 750, f"Comprador: {up.buyer_hint or '-'}")
-    c.drawString(40, 735, f"Provincia/Municipio: {up.province_hint or '-'}")
-    c.drawString(40, 710, f"Generado por: {user_display(user)}")
-    c.drawString(
-        40,
-        695,
-        f"Fecha: {dt.datetime.now().strftime('%d/%m/%Y %H:%M')}",
-    )
-    c.showPage()
-    c.save()
 
-    buffer.seek(0)
+    def _build() -> bytes:
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=(595, 842))  # A4
+
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(40, 800, "Informe de licitaci├│n")
+        c.setFont("Helvetica", 11)
+        c.drawString(
+            40,
+            780,
+            f"Proceso: {up.proceso_nro or up.proceso_key or upload_id}",
+        )
+        c.drawString(40, 765, f"Plataforma: {up.platform_hint or '-'}")
+        c.drawString(40, 750, f"Comprador: {up.buyer_hint or '-'}")
+        c.drawString(40, 735, f"Provincia/Municipio: {up.province_hint or '-'}")
+        c.drawString(40, 710, f"Generado por: {generado_por}")
+        # artefacto guardado: fecha de generación de esta versión, no de la descarga
+        c.drawString(
+            40,
+            695,
+            f"Datos al: {dt.datetime.now().strftime('%d/%m/%Y %H:%M')}",
+        )
+        c.showPage()
+        c.save()
+
+        return buffer.getvalue()
+
+    art = REPORT_STORE.get_or_build(up.id, f"informe_u{int(user.id)}", version, _build)
     filename = f"informe_{upload_id}.pdf"
 
     # ── Tracking: EXPORT (informe PDF de licitación). Fire-and-forget.
@@ -7746,13 +7887,7 @@ def informe_pdf(
     except Exception:
         pass
 
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'inline; filename="{filename}"'
-        },
-    )
+    return _serve_report_artifact(request, art, filename, "inline")
 
 
 # ======================================================================
@@ -8206,23 +8341,10 @@ def _preset_file_for(user_id: int) -> Path:
     return _presets_dir() / f"{int(user_id)}.json"
 
 
-def _load_user_presets(user_id: int) -> List[Dict[str, Any]]:
-    f = _preset_file_for(user_id)
-    if not f.exists():
-        return []
-    try:
-        data = json.loads(f.read_text(encoding="utf-8"))
-        return data if isinstance(data, list) else []
-    except Exception:
-        return []
-
-
-def _save_user_presets(user_id: int, presets: List[Dict[str, Any]]):
-    f = _preset_file_for(user_id)
-    f.write_text(
-        json.dumps(presets, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+def _load_user_presets(user_id: int, view: str) -> List[Dict[str, Any]]:
+    # Presets en 'saved_views' (view_store, oct-2026); el JSON viejo del usuario
+    # se importa la primera vez y queda como <id>.json.migrated.
+    return _view_store.presets(user_id, view, json_path=_preset_file_for(user_id))
 
 
 def _sanitize_filters_dict(d: Dict[str, Any]) -> Dict[str, Any]:
@@ -8255,11 +8377,7 @@ def api_presets_list(
         require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
     ),
 ):
-    items = [
-        p for p in _load_user_presets(user.id) if (p.get("view") == view)
-    ]
-    items.sort(key=lambda x: x.get("updated_at") or "", reverse=True)
-    return {"ok": True, "items": items}
+    return {"ok": True, "items": _load_user_presets(user.id, view)}
 
 
 @router.post("/api/presets", response_class=JSONResponse)
@@ -8282,39 +8400,30 @@ async def api_presets_save(
         filters = {}
 
     filters = _sanitize_filters_dict(filters)
-    presets = _load_user_presets(user.id)
-    now = dt.datetime.utcnow().isoformat()
-
-    if preset_id:
-        found = False
-        for p in presets:
-            if p.get("id") == preset_id and p.get("view") == view:
-                p["name"] = name.strip() or "Sin t├¡tulo"
-                p["filters"] = filters
-                p["updated_at"] = now
-                found = True
-                break
-        if not found:
-            return JSONResponse(
-                {"ok": False, "error": "not_found"},
-                status_code=404,
-            )
-    else:
-        presets.append(
-            {
-                "id": str(uuid.uuid4()),
-                "view": view,
-                "name": name.strip() or "Sin t├¡tulo",
-                "filters": filters,
-                "created_at": now,
-                "updated_at": now,
-            }
+    _load_user_presets(user.id, view)  # asegura la migración del JSON viejo
+
+    try:
+        _view_store.guardar_preset(
+            user.id,
+            view,
+            name.strip() or "Sin t├¡tulo",
+            filters,
+            preset_id=preset_id or None,
+        )
+    except LookupError:
+        return JSONResponse(
+            {"ok": False, "error": "not_found"},
+            status_code=404,
+        )
+    except ValueError:
+        return JSONResponse(
+            {"ok": False, "error": "name_taken"},
+            status_code=409,
         )
 
-    _save_user_presets(user.id, presets)
     return {
         "ok": True,
-        "items": [p for p in presets if p.get("view") == view],
+        "items": _load_user_presets(user.id, view),
     }
 
 
@@ -8326,18 +8435,12 @@ def api_presets_delete(
         require_roles("admin", "analista", "auditor", "supervisor")
     ),
 ):
-    presets = _load_user_presets(user.id)
-    new_list = [
-        p
-        for p in presets
-        if not (p.get("id") == pid and p.get("view") == view)
-    ]
-    if len(new_list) == len(presets):
+    _load_user_presets(user.id, view)  # asegura la migración del JSON viejo
+    if not _view_store.eliminar_preset(user.id, view, pid):
         return JSONResponse(
             {"ok": False, "error": "not_found"},
             status_code=404,
         )
-    _save_user_presets(user.id, new_list)
     return {"ok": True}
 
 
@@ -8349,10 +8452,8 @@ def api_presets_apply_redirect(
         require_roles("admin", "analista", "auditor", "supervisor", "gerente", "manager")
     ),
 ):
-    presets = _load_user_presets(user.id)
-    p = next(
-        (x for x in presets if x.get("id") == pid and x.get("view") == view),
-        None,
+    p = _view_store.obtener_preset(
+        user.id, view, pid, json_path=_preset_file_for(user.id)
     )
     if not p:
         raise HTTPException(status_code=404, detail="Preset no encontrado")
@@ -0,0 +1,255 @@
+"""Estado de correos: tokens de restablecimiento de contraseña y avisos ya enviados.
+
+Antes vivían en data/password_resets.json y data/email_sent.json: cada consulta
+leía el archivo entero y cada escritura lo reescribía (costo creciente sin límite,
+escrituras perdidas entre workers, tokens vencidos que nunca se borraban).
+Ahora (oct-2026):
+  - 'password_reset_tokens': sólo el sha256 del token (índice único) + email +
+    `expires_at` indexado; validar es un SELECT por hash, consumir un DELETE;
+  - 'upload_email_sent': marca única (upload_id, user_id); marcar es un
+    INSERT ... ON CONFLICT DO NOTHING (idempotente entre workers);
+  - `barrer_vencidos` borra los tokens vencidos (hilo periódico, `start_sweeper`);
+  - `importar_json` trae los JSON viejos en el startup y los deja como *.migrated.
+
+El token en claro sólo viaja en el link del mail; sigue siendo `uuid4().hex`.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from web_comparativas.models import PasswordResetToken, SessionLocal, UploadEmailSent
+
+logger = logging.getLogger("wc.mail_store")
+
+_Session = SessionLocal      # los tests lo reemplazan por una base en memoria
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+RESET_TTL = dt.timedelta(hours=24)
+SWEEP_SECONDS = int(os.getenv("WC_RESET_SWEEP_SECONDS", "3600"))
+
+_stop = threading.Event()
+_sweeper: Optional[threading.Thread] = None
+_sweeper_lock = threading.Lock()
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+
+
+def _insert_ignorando(s, modelo, filas: list[dict]) -> int:
+    """INSERT ... ON CONFLICT DO NOTHING (postgres/sqlite); en otros motores, fila por fila."""
+    if not filas:
+        return 0
+    nombre = s.get_bind().dialect.name
+    if nombre in ("postgresql", "sqlite"):
+        if nombre == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return s.execute(dialect_insert(modelo).values(filas).on_conflict_do_nothing()).rowcount or 0
+    n = 0
+    for fila in filas:
+        try:
+            with s.begin_nested():
+                s.execute(insert(modelo).values(**fila))
+            n += 1
+        except IntegrityError:
+            pass
+    return n
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tokens de restablecimiento
+# ──────────────────────────────────────────────────────────────────────────────
+
+def crear_token_reset(email: str, *, ttl: dt.timedelta = RESET_TTL) -> str:
+    """Token nuevo asociado al email (no revela si el usuario existe)."""
+    token = uuid.uuid4().hex
+    ahora = dt.datetime.utcnow()
+    with _Session() as s:
+        s.add(PasswordResetToken(
+            token_hash=_hash(token),
+            email=(email or "").strip().lower(),
+            created_at=ahora,
+            expires_at=ahora + ttl,
+        ))
+        s.commit()
+    return token
+
+
+def email_de_token(token: str) -> Optional[str]:
+    """Email del token si existe y no venció; None si no."""
+    if not token:
+        return None
+    with _Session() as s:
+        return s.scalar(
+            select(PasswordResetToken.email).where(
+                PasswordResetToken.token_hash == _hash(token),
+                PasswordResetToken.expires_at > dt.datetime.utcnow(),
+            )
+        )
+
+
+def consumir_token(token: str) -> bool:
+    if not token:
+        return False
+    with _Session() as s:
+        n = s.execute(
+            delete(PasswordResetToken).where(PasswordResetToken.token_hash == _hash(token))
+        ).rowcount
+        s.commit()
+    return bool(n)
+
+
+def barrer_vencidos(ahora: Optional[dt.datetime] = None) -> int:
+    """Borra los tokens vencidos (usa el índice de expires_at). Devuelve cuántos borró."""
+    ahora = ahora or dt.datetime.utcnow()
+    with _Session() as s:
+        n = s.execute(
+            delete(PasswordResetToken).where(PasswordResetToken.expires_at <= ahora)
+        ).rowcount
+        s.commit()
+    if n:
+        logger.info("[MAIL_STORE] %d tokens de reseteo vencidos borrados.", n)
+    return n or 0
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Avisos de proceso finalizado
+# ──────────────────────────────────────────────────────────────────────────────
+
+def email_enviado(upload_id: int, user_id: int) -> bool:
+    with _Session() as s:
+        return s.scalar(
+            select(UploadEmailSent.id).where(
+                UploadEmailSent.upload_id == int(upload_id),
+                UploadEmailSent.user_id == int(user_id),
+            )
+        ) is not None
+
+
+def marcar_email_enviado(upload_id: int, user_id: int) -> bool:
+    """Marca el aviso como enviado. True si la marca es nueva, False si ya estaba."""
+    with _Session() as s:
+        n = _insert_ignorando(s, UploadEmailSent, [
+            {"upload_id": int(upload_id), "user_id": int(user_id), "sent_at": dt.datetime.utcnow()},
+        ])
+        s.commit()
+    return bool(n)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Barrido periódico
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _sweep_loop(intervalo: float) -> None:
+    while not _stop.wait(intervalo):
+        try:
+            barrer_vencidos()
+        except Exception as exc:
+            logger.warning("[MAIL_STORE] barrido de tokens falló: %s", exc)
+
+
+def start_sweeper(intervalo: Optional[float] = None) -> bool:
+    """Levanta el hilo de barrido de tokens vencidos (idempotente). False si está desactivado."""
+    global _sweeper
+    intervalo = SWEEP_SECONDS if intervalo is None else intervalo
+    if intervalo <= 0:
+        return False
+    with _sweeper_lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return True
+        _stop.clear()
+        _sweeper = threading.Thread(target=_sweep_loop, args=(intervalo,),
+                                    name="mail-store-sweeper", daemon=True)
+        _sweeper.start()
+    return True
+
+
+def stop_sweeper() -> None:
+    _stop.set()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Importación de los JSON viejos
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _leer_json(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        logger.warning("[MAIL_STORE] %s ilegible (%s): no se importa.", path.name, exc)
+        return None
+    return data if isinstance(data, dict) else {}
+
+
+def _marcar_migrado(path: Path) -> None:
+    try:
+        path.replace(path.with_name(path.name + ".migrated"))
+    except OSError as exc:
+        logger.warning("[MAIL_STORE] no se pudo renombrar %s (%s); re-importarlo no duplica.", path, exc)
+
+
+def _filas_resets(data: dict, ahora: dt.datetime) -> list[dict]:
+    filas = []
+    for token, item in data.items():
+        if not isinstance(item, dict) or not item.get("email"):
+            continue
+        try:
+            creado = dt.datetime.fromisoformat(str(item.get("created_at")))
+        except ValueError:
+            creado = ahora                      # antes: sin fecha legible no vencía
+        if creado + RESET_TTL <= ahora:
+            continue                            # ya vencido: no se importa
+        filas.append({"token_hash": _hash(str(token)), "email": str(item["email"]).strip().lower(),
+                      "created_at": creado, "expires_at": creado + RESET_TTL})
+    return filas
+
+
+def _filas_email_log(data: dict, ahora: dt.datetime) -> list[dict]:
+    filas, vistos = [], set()
+    for upload_id, usuarios in data.items():
+        for user_id in (usuarios if isinstance(usuarios, list) else []):
+            try:
+                clave = (int(upload_id), int(user_id))
+            except (TypeError, ValueError):
+                continue
+            if clave not in vistos:
+                vistos.add(clave)
+                filas.append({"upload_id": clave[0], "user_id": clave[1], "sent_at": ahora})
+    return filas
+
+
+def importar_json(data_dir: Optional[Path] = None, *, lote: int = 200) -> dict[str, int]:
+    """Importa data/password_resets.json y data/email_sent.json (idempotente) y los renombra."""
+    data_dir = Path(data_dir or DATA_DIR)
+    ahora = dt.datetime.utcnow()
+    out = {"password_resets": 0, "email_sent": 0}
+    for clave, nombre, modelo, filas_de in (
+        ("password_resets", "password_resets.json", PasswordResetToken, _filas_resets),
+        ("email_sent", "email_sent.json", UploadEmailSent, _filas_email_log),
+    ):
+        path = data_dir / nombre
+        data = _leer_json(path)
+        if data is None:
+            continue
+        filas = filas_de(data, ahora)
+        with _Session() as s:
+            for i in range(0, len(filas), lote):
+                out[clave] += _insert_ignorando(s, modelo, filas[i:i + lote])
+            s.commit()
+        _marcar_migrado(path)
+    return out
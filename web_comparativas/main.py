@@ -97,6 +97,8 @@ from web_comparativas.migrations import (
     ensure_pliego_legacy_columns,
     ensure_pliego_file_binary_columns,
     ensure_forecast_perf_indexes,
+    ensure_uploads_home_indexes,
+    ensure_saved_views_store_columns,
     ensure_cliente_visible_columns,
     ensure_cliente_visible_backfill,
     ensure_comparativa_rows_table,
@@ -368,6 +370,20 @@ def run_startup_migrations_once() -> None:
     except Exception as e:
         print(f"[MIGRATION] Warning users.reporta_a_id column: {e}", flush=True)
 
+    try:
+        ensure_saved_views_store_columns()
+        print("[MIGRATION] SUCCESS: saved_views store columns checked.", flush=True)
+    except Exception as e:
+        print(f"[MIGRATION] Warning saved_views store columns: {e}", flush=True)
+
+    # Tokens de reseteo y avisos enviados: de data/*.json a tablas (mail_store, oct-2026).
+    try:
+        from web_comparativas import mail_store as _mail_store
+        importados = _mail_store.importar_json()
+        print(f"[MIGRATION] SUCCESS: mail_store JSON import checked ({importados}).", flush=True)
+    except Exception as e:
+        print(f"[MIGRATION] Warning mail_store JSON import: {e}", flush=True)
+
     try:
         ensure_vendedores_fusion_seed()
         print("[MIGRATION] SUCCESS: vendedores_fusion table/seed checked.", flush=True)
@@ -452,6 +468,12 @@ def _background_dimensionamiento_maintenance() -> None:
     except Exception as e:
         print(f"[BACKGROUND] Warning forecast perf indexes: {e}", flush=True)
 
+    try:
+        ensure_uploads_home_indexes()
+        print("[BACKGROUND] Uploads home-panel indexes checked.", flush=True)
+    except Exception as e:
+        print(f"[BACKGROUND] Warning uploads home indexes: {e}", flush=True)
+
     try:
         with SessionLocal() as session:
             snapshot = ensure_default_dashboard_snapshot(session)
@@ -494,7 +516,27 @@ async def lifespan(app: FastAPI):
         _fcast_svc.preload_valorizado_parquet()
     except Exception as _pre_exc:
         print(f"[STARTUP] forecast preload init error: {_pre_exc}", flush=True)
+    # Pool de procesamiento de cargas (cola durable upload_jobs; re-encola las trabadas).
+    try:
+        from web_comparativas import upload_jobs as _upload_jobs
+        _upload_jobs.start_pool()
+    except Exception as _jobs_exc:
+        print(f"[STARTUP] upload_jobs pool init error: {_jobs_exc}", flush=True)
+    # Barrido periódico de tokens de reseteo vencidos.
+    try:
+        from web_comparativas import mail_store as _mail_store
+        _mail_store.start_sweeper()
+    except Exception as _sweep_exc:
+        print(f"[STARTUP] mail_store sweeper init error: {_sweep_exc}", flush=True)
     yield
+    try:
+        _upload_jobs.stop_pool()
+    except Exception:
+        pass
+    try:
+        _mail_store.stop_sweeper()
+    except Exception:
+        pass
 
 
 app = FastAPI(lifespan=lifespan, version=str(int(time.time())))
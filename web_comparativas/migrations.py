@@ -409,6 +409,7 @@ def ensure_normalized_storage_columns():
     Agrega columnas de persistencia robusta a la tabla 'uploads':
     - normalized_content: almacena el Excel procesado como bytes (BYTEA / BLOB)
     - dashboard_json: almacena el JSON del dashboard como texto
+    - tablero_bundle_json: bundle versionado de analítica del tablero (KPIs, ranking, alertas)
 
     Esto permite que los datos sobrevivan redespliegues en Render
     (el filesystem de Render es efÃ­mero; PostgreSQL sÃ­ es persistente).
@@ -431,6 +432,12 @@ def ensure_normalized_storage_columns():
             "ALTER TABLE uploads ADD COLUMN dashboard_json TEXT",
             "uploads.dashboard_json",
         )
+    with engine.begin() as conn:
+        _add_column_safe(
+            conn,
+            "ALTER TABLE uploads ADD COLUMN tablero_bundle_json TEXT",
+            "uploads.tablero_bundle_json",
+        )
     print("[MIGRATION] Columnas de persistencia de archivos verificadas/creadas.", flush=True)
 
 
@@ -1339,6 +1346,60 @@ def ensure_forecast_perf_indexes():
                 print(f"[MIGRATION] Ã�ndice Forecast '{idx_name}': advertencia â€“ {e}", flush=True)
 
 
+def ensure_uploads_home_indexes():
+    """
+    Índices compuestos de 'uploads' para el panel de inicio
+    (visibility_service.home_panel): el agregado por estado y los "últimos" /
+    "listos en 24h" filtran por usuario y estado y ordenan por fecha.
+
+    PostgreSQL: CREATE INDEX CONCURRENTLY (autocommit). SQLite: índice normal.
+    Idempotente (IF NOT EXISTS).
+    """
+    indexes = [
+        ("ix_uploads_user_status_updated", "(user_id, status, updated_at)"),
+        ("ix_uploads_status_updated", "(status, updated_at)"),
+        ("ix_uploads_user_created", "(user_id, created_at)"),
+    ]
+    concurrently = "" if IS_SQLITE else "CONCURRENTLY "
+    for idx_name, expr in indexes:
+        ddl = f"CREATE INDEX {concurrently}IF NOT EXISTS {idx_name} ON uploads {expr}"
+        try:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(ddl))
+            print(f"[MIGRATION] Índice uploads '{idx_name}' verificado/creado.", flush=True)
+        except Exception as e:
+            print(f"[MIGRATION] Índice uploads '{idx_name}': advertencia – {e}", flush=True)
+
+
+def ensure_saved_views_store_columns():
+    """
+    Esquema de view_store (vistas guardadas + presets de filtros en 'saved_views'):
+    columna 'public_id' (uuid de los presets, antes en data/presets/<user>.json) y
+    su índice único. El default por usuario/vista usa el idx_savedviews_user_view_default
+    de models._ensure_saved_views_indexes; se borra el ix_saved_views_user_view_default
+    que creaba una versión anterior de esta migración (casi el mismo índice, dos veces
+    mantenido en cada escritura).
+
+    Corre en el startup: las consultas del store ya seleccionan 'public_id'.
+    Idempotente (_add_column_safe / IF NOT EXISTS).
+    """
+    with engine.begin() as conn:
+        _add_column_safe(
+            conn,
+            "ALTER TABLE saved_views ADD COLUMN public_id VARCHAR(36)",
+            "saved_views.public_id",
+        )
+    for ddl, nombre in (
+        ("CREATE UNIQUE INDEX IF NOT EXISTS uq_saved_views_public_id ON saved_views (public_id)",
+         "uq_saved_views_public_id"),
+        ("DROP INDEX IF EXISTS ix_saved_views_user_view_default",
+         "DROP ix_saved_views_user_view_default (duplicado)"),
+    ):
+        with engine.begin() as conn:
+            _add_column_safe(conn, ddl, nombre)
+    print("[MIGRATION] saved_views: public_id + índice único verificados/creados.", flush=True)
+
+
 def ensure_dimensionamiento_text_columns():
     """
     Convierte de VARCHAR(255) a TEXT las columnas descriptivas largas de las
@@ -1547,128 +1608,34 @@ def ensure_comparativa_rows_table():
                 print(f"[MIGRATION] Índice '{idx_name}': advertencia — {e}", flush=True)
 
 
-def backfill_comparativa_rows():
+def backfill_comparativa_rows(*, workers: int = 1, resync: bool = False, desde_id: int | None = None):
     """
     Parsea los normalized_content de uploads procesados e inserta filas
-    en comparativa_rows. Salta uploads que ya tienen filas. Procesa en
-    lotes de 5 para evitar OOM en Render (512MB límite).
-    """
-    import gc
-    import io
-    import datetime as _dt
-    import pandas as pd
-    from web_comparativas.models import SessionLocal, Upload as UploadModel, ComparativaRow
+    en comparativa_rows. Salta uploads que ya tienen filas (salvo `resync`).
 
-    BATCH_SIZE = 5
-    EXCEL_COL_MAP = {
-        "Proveedor": "proveedor",
-        "Renglón": "renglon",
-        "Alternativa": "alternativa",
-        "Código": "codigo",
-        "Descripción": "descripcion",
-        "Cantidad solicitada": "cantidad_solicitada",
-        "Unidad de medida": "unidad_medida",
-        "Precio unitario": "precio_unitario",
-        "Cantidad ofertada": "cantidad_ofertada",
-        "Total por renglón": "total_por_renglon",
-        "Especificación técnica": "especificacion_tecnica",
-        "Marca": "marca",
-        "Posicion": "posicion",
-        "Rubro": "rubro",
-    }
-
-    session = SessionLocal()
-    inserted_total = 0
-    try:
-        # IDs de uploads procesados sin filas en comparativa_rows
-        from sqlalchemy import select as sa_select, func as sa_func, exists, literal
-        already_synced = {
-            row[0] for row in session.execute(
-                sa_select(ComparativaRow.upload_id).distinct()
-            ).all()
-        }
+    Delegado en `comparativa_rows_sync.sincronizar_uploads` (conversión vectorizada,
+    COPY en Postgres, un upload por transacción). El default `workers=1` mantiene el
+    consumo de memoria del startup en Render (512MB); para re-syncs completos usar
+    `scripts/backfill_comparativa_rows.py --workers N`.
+    """
+    from web_comparativas.comparativa_rows_sync import sincronizar_uploads
 
-        upload_ids = [
-            row[0] for row in session.query(UploadModel.id)
-            .filter(
-                UploadModel.status.in_(["done", "reviewing", "dashboard"]),
-                UploadModel.normalized_content.isnot(None),
+    def progreso(estado: dict) -> None:
+        hechos = estado["ok"] + estado["errores"]
+        if hechos % 50 == 0 or hechos == estado["total"]:
+            print(
+                f"[BACKFILL_COMP] {hechos}/{estado['total']} uploads, {estado['filas']} filas, "
+                f"{estado['errores']} errores, {estado['segundos']}s (marca de agua: {estado['marca_agua']}).",
+                flush=True,
             )
-            .order_by(UploadModel.id.asc())
-            .all()
-            if row[0] not in already_synced
-        ]
-
-        print(f"[BACKFILL_COMP] {len(upload_ids)} uploads pendientes de sync.", flush=True)
-
-        for i in range(0, len(upload_ids), BATCH_SIZE):
-            batch_ids = upload_ids[i:i + BATCH_SIZE]
-            batch = session.query(UploadModel).filter(UploadModel.id.in_(batch_ids)).all()
 
-            for up in batch:
-                try:
-                    norm_bytes = bytes(up.normalized_content)
-                    df = pd.read_excel(io.BytesIO(norm_bytes), engine="openpyxl")
-                    df.columns = [str(c).strip() for c in df.columns]
-
-                    fecha_apertura = None
-                    if up.apertura_fecha:
-                        try:
-                            fecha_apertura = _dt.date.fromisoformat(up.apertura_fecha.strip()[:10])
-                        except Exception:
-                            pass
-
-                    rows_to_insert = []
-                    for _, row in df.iterrows():
-                        rec = {
-                            "upload_id": up.id,
-                            "fecha_apertura": fecha_apertura,
-                            "nro_proceso": up.proceso_nro,
-                            "comprador": up.buyer_hint,
-                            "plataforma": up.platform_hint,
-                            "cuenta": up.cuenta_nro,
-                            "provincia": up.province_hint,
-                        }
-                        for excel_col, model_col in EXCEL_COL_MAP.items():
-                            val = row.get(excel_col)
-                            if val is not None and not (isinstance(val, float) and pd.isna(val)):
-                                if model_col == "posicion":
-                                    try:
-                                        val = int(val)
-                                    except Exception:
-                                        val = None
-                                elif model_col in ("cantidad_solicitada", "precio_unitario",
-                                                   "cantidad_ofertada", "total_por_renglon"):
-                                    try:
-                                        val = float(val)
-                                    except Exception:
-                                        val = None
-                                else:
-                                    val = str(val).strip() if val else None
-                                rec[model_col] = val
-
-                        rows_to_insert.append(rec)
-
-                    if rows_to_insert:
-                        session.bulk_insert_mappings(ComparativaRow, rows_to_insert)
-                        inserted_total += len(rows_to_insert)
-
-                except Exception as e:
-                    print(f"[BACKFILL_COMP] Upload {up.id}: error — {e}", flush=True)
-
-            session.commit()
-            session.expire_all()
-            del batch
-            gc.collect()
-
-        print(f"[BACKFILL_COMP] Completado: {inserted_total} filas insertadas.", flush=True)
+    try:
+        estado = sincronizar_uploads(workers=workers, resync=resync, desde_id=desde_id, progreso=progreso)
     except Exception as e:
-        session.rollback()
         print(f"[BACKFILL_COMP] Error general: {e}", flush=True)
-    finally:
-        session.close()
-
-    return inserted_total
+        return 0
+    print(f"[BACKFILL_COMP] Completado: {estado['filas']} filas insertadas.", flush=True)
+    return estado["filas"]
 
 
 def ensure_cliente_visible_backfill():
@@ -695,6 +695,7 @@ class Upload(Base):
     original_content = Column(LargeBinary, nullable=True)     # bytes del archivo original subido
     normalized_content = Column(LargeBinary, nullable=True)   # bytes del Excel procesado
     dashboard_json = Column(Text, nullable=True)              # JSON del dashboard procesado
+    tablero_bundle_json = Column(Text, nullable=True)         # bundle de analítica del tablero (versionado)
 
     # Estado
     status = Column(String, default="pending", index=True)
@@ -818,6 +819,38 @@ class Run(Base):
     # upload = relationship("Upload", backref="runs")
 
 
+# ---------- Cola durable de procesamiento (ver upload_jobs.py) ----------
+class UploadJob(Base):
+    """Un pedido de classify_and_process para un upload.
+
+    status: queued → running → done | failed. Un job `running` cuyo lease venció
+    (worker caído, redeploy) vuelve a ser tomable por otro worker.
+    """
+    __tablename__ = "upload_jobs"
+    __table_args__ = (
+        Index("ix_upload_jobs_claim", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    upload_id = Column(Integer, ForeignKey("uploads.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued")
+    metadata_json = Column(Text, nullable=True)
+    touch_status = Column(Boolean, nullable=False, default=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    locked_by = Column(String(120), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    progress = Column(String(40), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<UploadJob id={self.id} upload={self.upload_id} status={self.status!r} attempts={self.attempts}>"
+
+
 # ---------- Archivos normalizados ----------
 class NormalizedFile(Base):
     __tablename__ = "normalized_files"
@@ -879,6 +912,45 @@ class EmailNotification(Base):
         return f"<EmailNotification up={self.upload_id} to={self.recipient!r} event={self.event!r}>"
 
 
+# ---------- Avisos de "proceso finalizado" ya enviados (mail_store) ----------
+class UploadEmailSent(Base):
+    """
+    Marca (upload, usuario) de aviso ya enviado: reemplaza data/email_sent.json.
+    Sin FK a propósito: las marcas importadas del JSON pueden apuntar a cargas o
+    usuarios ya borrados y sólo sirven para no repetir el mail.
+    """
+    __tablename__ = "upload_email_sent"
+    __table_args__ = (
+        UniqueConstraint("upload_id", "user_id", name="uq_upload_email_sent"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    upload_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    sent_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<UploadEmailSent up={self.upload_id} user={self.user_id}>"
+
+
+# ---------- Tokens de restablecimiento de contraseña por link (mail_store) ----------
+class PasswordResetToken(Base):
+    """
+    Token del link /password/restablecer: reemplaza data/password_resets.json.
+    Sólo se guarda el sha256 del token; el barrido periódico borra los vencidos.
+    """
+    __tablename__ = "password_reset_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    email = Column(String(255), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<PasswordResetToken id={self.id} email={self.email!r} expires={self.expires_at}>"
+
+
 # ---------- Grupos y miembros (N:N con User) ----------
 class Group(Base):
     __tablename__ = "groups"
@@ -1053,6 +1125,9 @@ class SavedView(Base):
     __tablename__ = "saved_views"
     __table_args__ = (
         UniqueConstraint("user_id", "view_id", "name", name="uq_savedview_user_view_name"),
+        # El mismo que crea _ensure_saved_views_indexes: default por usuario/vista (view_store).
+        Index("idx_savedviews_user_view_default", "user_id", "view_id", "is_default"),
+        Index("uq_saved_views_public_id", "public_id", unique=True),
     )
 
     id = Column(Integer, primary_key=True)
@@ -1061,6 +1136,9 @@ class SavedView(Base):
     name = Column(String(120), nullable=False)  # nombre legible: "Vista Suizo Compacta"
     is_default = Column(Boolean, nullable=False, default=False, index=True)
     payload = Column(JSON, nullable=False, default=dict)  # JSON con los ajustes
+    # Presets de filtros (view_id 'preset:<vista>'): id público estable (uuid), el que
+    # usaban los JSON de data/presets y las URLs /api/presets/{pid}. NULL en vistas.
+    public_id = Column(String(36), nullable=True)
     created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow,
                         nullable=False, index=True)
@@ -1601,6 +1679,8 @@ def _ensure_crm_envio_real_columns():
       - crm_envios.crm_modo        -> entorno del CRM ('test'/'prod'/'simulado')
       - crm_envio_eventos.crm_id   -> mismo id en la bitácora append-only
       - oportunidades_summary.cuenta_interna -> Nº de cuenta de FUSION del cliente
+      - oportunidades_summary.oportunidad_id -> identidad estable (listado paginado)
+      - oportunidades_summary.huella -> hash del contenido (rebuild incremental)
 
     Además RELLENA `crm_modo` en las filas viejas (ver comentario en el backfill): es
     parte de la clave única y un NULL apagaría el bloqueo de duplicados sin avisar.
@@ -1624,7 +1704,11 @@ def _ensure_crm_envio_real_columns():
                 ("crm_assigned_origen", "VARCHAR(16)"),
             ],
             "crm_envio_eventos": [("crm_id", "VARCHAR(64)")],
-            "oportunidades_summary": [("cuenta_interna", "VARCHAR(120)")],
+            "oportunidades_summary": [
+                ("cuenta_interna", "VARCHAR(120)"),
+                ("oportunidad_id", "VARCHAR(40)"),
+                ("huella", "VARCHAR(16)"),
+            ],
         }
         ddls: list[str] = []
         for tabla, columnas in faltantes.items():
@@ -1634,6 +1718,11 @@ def _ensure_crm_envio_real_columns():
             for nombre, tipo in columnas:
                 if nombre not in cols:
                     ddls.append(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {tipo}")
+        if "oportunidades_summary" in existentes:
+            ddls.append(
+                "CREATE INDEX IF NOT EXISTS ix_oportunidades_summary_oportunidad_id "
+                "ON oportunidades_summary(oportunidad_id)"
+            )
         if "crm_envios" in existentes:
             ddls.append("CREATE INDEX IF NOT EXISTS idx_crm_envios_crm_id ON crm_envios(crm_id)")
             # BACKFILL OBLIGATORIO: `crm_modo` es parte de la clave única
@@ -0,0 +1,170 @@
+"""Snapshot columnar del maestro de Oportunidades (Buscador y Dimensiones).
+
+`_opp_load_df` hacía `pd.read_excel` de reporte_oportunidades.xlsx en cada
+request del buscador y de dimensiones (varios segundos por tecla) y volvía a
+derivar `_dt`, `_budget` y `_state` fila a fila. Ahora (oct-2026) el Excel se
+compila una vez — al subirlo, o en la primera lectura si cambió — a un Parquet
+junto al xlsx:
+  - columnas tipadas: `_dt` (date), `_budget` (float), `_state`; las columnas de
+    dimensión (comprador, plataforma, provincia, tipo, ...) se guardan
+    diccionario-codificadas (categorical);
+  - huella del Excel (mtime_ns + tamaño) y sha256 en la metadata del Parquet: si
+    el archivo se tocó sin cambiar de contenido se reusa el snapshot;
+  - por cada columna de dimensión, códigos por fila + categorías: un filtro
+    `contains` se evalúa una vez por valor distinto y se traduce a máscara por
+    código (`OppSnapshot.coincidencias`); los filtros se intersectan como máscaras.
+
+Solo depende de pandas/numpy (pyarrow para el Parquet; sin él el snapshot vive
+solo en memoria): testeable sin levantar la app.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+VERSION = 1
+_META_KEY = b"web_comparativas.opp_snapshot"
+
+
+def huella(path: Path) -> str | None:
+    """mtime_ns + tamaño del archivo; None si no existe."""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def por_valor(serie: pd.Series, fn: Callable[[Any], Any], dtype: Any = None) -> pd.Series:
+    """Aplica `fn` una vez por valor distinto (los maestros repiten mucho) y expande por código."""
+    codes, uniq = pd.factorize(serie)
+    vals = np.empty(len(uniq) + 1, dtype=object)
+    vals[:-1] = [fn(u) for u in uniq]
+    vals[-1] = fn(None)                     # código -1 = faltante
+    return pd.Series(vals[codes], index=serie.index, dtype=dtype)
+
+
+def derivar_estados(serie: pd.Series) -> pd.Series:
+    """EMERGENCIA si el texto contiene 'emerg' (sin mayúsculas), si no REGULAR."""
+    return por_valor(serie, lambda v: "EMERGENCIA" if "emerg" in str(v).lower() else "REGULAR")
+
+
+def compilar(
+    df: pd.DataFrame,
+    *,
+    fuentes: dict[str, str | None],
+    dimensiones: Iterable[str],
+    parse_fecha: Callable[[Any], Any],
+    parse_monto: Callable[[Any], float],
+) -> pd.DataFrame:
+    """Frame crudo (dtype=str, sin NaN) → frame tipado con `_dt`/`_budget`/`_state`.
+
+    `fuentes` dice de qué columna sale cada derivada (None = no hay); las
+    `dimensiones` presentes quedan como categorical.
+    """
+    out = df.reset_index(drop=True)
+    fecha, presu, estado = fuentes.get("_dt"), fuentes.get("_budget"), fuentes.get("_state")
+    out["_dt"] = por_valor(out[fecha], parse_fecha) if fecha else pd.NaT
+    out["_budget"] = por_valor(out[presu], parse_monto, dtype=float) if presu else 0.0
+    out["_state"] = derivar_estados(out[estado]).astype(object) if estado else "REGULAR"
+    for col in dict.fromkeys(dimensiones):
+        if col in out.columns:
+            out[col] = out[col].astype(str).astype("category")
+    return out
+
+
+class OppSnapshot:
+    """Maestro compilado: frame servido (columnas texto) + índice por código de las dimensiones."""
+
+    def __init__(self, df: pd.DataFrame, *, huella: str | None, sha: str | None = None,
+                 fuentes: dict[str, str | None] | None = None):
+        df = df.reset_index(drop=True)
+        self.huella = huella
+        self.sha = sha
+        self.fuentes = dict(fuentes or {})
+        self.indices: dict[str, tuple[np.ndarray, pd.Series]] = {}
+        for col in list(df.columns):
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                cat = df[col].cat
+                self.indices[col] = (cat.codes.to_numpy(), pd.Series(cat.categories.astype(str), dtype=object))
+                df[col] = df[col].astype(object)
+        self.df = df
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def frame(self) -> pd.DataFrame:
+        """Copia liviana para el request: agregar columnas o filtrar no toca el snapshot."""
+        out = self.df.copy(deep=False)
+        out.attrs["opp_huella"] = self.huella
+        return out
+
+    def es_propio(self, df: pd.DataFrame) -> bool:
+        """¿`df` sale de `frame()` (filas con el índice posicional del snapshot)?"""
+        return df.attrs.get("opp_huella") == self.huella and df.index.dtype.kind in "iu"
+
+    def coincidencias(self, df: pd.DataFrame, col: str, prueba: Callable[[pd.Series], Any]) -> np.ndarray:
+        """Máscara de `prueba` (Series[str] → Series[bool]) sobre `df[col]`.
+
+        Si `col` está indexada y `df` es un frame del snapshot, `prueba` corre
+        sobre las categorías y la máscara sale por código de fila.
+        """
+        idx = self.indices.get(col)
+        if idx is not None and self.es_propio(df):
+            codes, cats = idx
+            hits = np.append(np.asarray(prueba(cats), dtype=bool), False)
+            return hits[codes[df.index.to_numpy()]]
+        return np.asarray(prueba(df[col].astype(str)), dtype=bool)
+
+
+def guardar(df: pd.DataFrame, destino: Path, *, huella: str | None, sha: str | None,
+            fuentes: dict[str, str | None]) -> bool:
+    """Escribe el frame compilado (atómico). False si no hay pyarrow o falla."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return False
+    destino = Path(destino)
+    tmp = destino.with_name(f"{destino.name}.tmp")
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_META_KEY] = json.dumps(
+            {"version": VERSION, "huella": huella, "sha": sha, "fuentes": fuentes}
+        ).encode()
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, destino)
+        return True
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        return False
+
+
+def cargar(destino: Path, *, huella: str | None, sha: Callable[[], str]) -> OppSnapshot | None:
+    """Lee el Parquet si corresponde al Excel actual (por huella o, si no, por sha256)."""
+    try:
+        import pyarrow.parquet as pq
+        meta = json.loads((pq.read_schema(destino).metadata or {}).get(_META_KEY, b"{}"))
+        if meta.get("version") != VERSION:
+            return None
+        if meta.get("huella") != huella and meta.get("sha") != sha():
+            return None
+        df = pq.read_table(destino).to_pandas()
+    except Exception:
+        return None
+    return OppSnapshot(df, huella=huella, sha=meta.get("sha"), fuentes=meta.get("fuentes"))
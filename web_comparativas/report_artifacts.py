@@ -0,0 +1,108 @@
+"""Almacén de artefactos de reportes (PDF) por (upload_id, tipo, versión de datos).
+
+`descargar_reporte_proceso` e `informe_pdf` recomponían el PDF (plantilla +
+overlays de reportlab) en cada descarga, aunque un proceso finalizado no cambia:
+cuando todo el equipo baja el mismo informe, el CPU se va en rehacer lo mismo.
+Ahora (oct-2026) el PDF se genera una vez por versión de datos y se guarda en
+disco; las descargas lo sirven tal cual (streaming desde el archivo) con ETag,
+y un If-None-Match que coincide devuelve 304.
+  - la versión la calcula quien llama (hash del payload que alimenta el render
+    + versión del renderer): si los datos cambian, cambia la clave y la versión
+    vieja del mismo tipo se borra al guardar la nueva;
+  - `get_or_build` serializa la generación por clave: N descargas simultáneas
+    de un informe que no existe lo generan una sola vez;
+  - escritura atómica (tmp + os.replace). Es un cache: si el disco se pierde
+    (redeploy), se regenera en la próxima descarga.
+
+Solo depende de la stdlib: testeable sin levantar la app.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+_SAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def version_de(payload: Any, *extra: Any) -> str:
+    """Hash estable (16 hex) del payload del render + extras (versión del renderer, plantilla)."""
+    raw = json.dumps([payload, *extra], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    path: Path
+    etag: str
+    size: int
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """¿El header If-None-Match del cliente cubre `etag`? (acepta listas, W/ y *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    propio = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == propio for t in if_none_match.split(","))
+
+
+class ReportStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._locks: dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, upload_id: int) -> Path:
+        return self.root / str(int(upload_id))
+
+    def path(self, upload_id: int, kind: str, version: str) -> Path:
+        return self._dir(upload_id) / f"{_SAFE.sub('_', kind)}--{_SAFE.sub('_', version)}.pdf"
+
+    def get(self, upload_id: int, kind: str, version: str) -> Optional[Artifact]:
+        p = self.path(upload_id, kind, version)
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        return Artifact(p, f'"{version}-{st.st_mtime_ns:x}"', st.st_size)
+
+    def put(self, upload_id: int, kind: str, version: str, data: bytes) -> Artifact:
+        p = self.path(upload_id, kind, version)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+        finally:
+            tmp.unlink(missing_ok=True)
+        prefijo = f"{_SAFE.sub('_', kind)}--"
+        for viejo in p.parent.glob(f"{prefijo}*.pdf"):
+            if viejo != p:
+                viejo.unlink(missing_ok=True)
+        return self.get(upload_id, kind, version)
+
+    def _lock(self, key: tuple) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get_or_build(self, upload_id: int, kind: str, version: str, build: Callable[[], bytes]) -> Artifact:
+        art = self.get(upload_id, kind, version)
+        if art is not None:
+            return art
+        key = (int(upload_id), kind)
+        with self._lock(key):
+            art = self.get(upload_id, kind, version)     # otro request pudo generarlo mientras esperábamos
+            if art is None:
+                art = self.put(upload_id, kind, version, build())
+        return art
+
+    def purge(self, upload_id: int) -> None:
+        for p in self._dir(upload_id).glob("*.pdf"):
+            p.unlink(missing_ok=True)
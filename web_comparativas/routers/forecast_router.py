@@ -195,19 +195,23 @@ def _result_rows(payload) -> int:
     return -1
 
 
-def _log_api_perf(endpoint: str, started: float, payload) -> None:
+def _log_api_perf(endpoint: str, started: float, payload, subqueries: dict | None = None) -> None:
+    """subqueries: ms por subconsulta (svc.forecast_query_timings); vacío en HIT de cache."""
     total_ms = (time.perf_counter() - started) * 1000
     rows = _result_rows(payload)
     json_bytes = _approx_json_bytes(payload)
+    sub = " ".join(f"{k}={v:.1f}" for k, v in (subqueries or {}).items())
     logger.info(
-        "[FORECAST API] endpoint=%s total_ms=%.1f rows=%s json_bytes=%s",
+        "[FORECAST API] endpoint=%s total_ms=%.1f rows=%s json_bytes=%s%s",
         endpoint,
         total_ms,
         rows,
         json_bytes,
+        f" subqueries_ms[{sub}]" if sub else "",
     )
     print(
-        f"[FORECAST API] endpoint={endpoint} total_ms={total_ms:.1f} rows={rows} json_bytes={json_bytes}",
+        f"[FORECAST API] endpoint={endpoint} total_ms={total_ms:.1f} rows={rows} json_bytes={json_bytes}"
+        + (f" subqueries_ms[{sub}]" if sub else ""),
         flush=True,
     )
 
@@ -350,7 +354,8 @@ def api_chart_data(
             _forecast_role_key(_user),
             can_view_global,
         )
-        with _forecast_override_context(_user, access, preview_pending=preview_pending):
+        with _forecast_override_context(_user, access, preview_pending=preview_pending), \
+                svc.forecast_query_timings() as subqueries:
             result = svc.get_chart_data(
                 user_id=_user.id,
                 start_date=start_date,
@@ -367,7 +372,7 @@ def api_chart_data(
             )
         # Cache HIT returns pre-serialized bytes — bypass FastAPI encoding entirely.
         if isinstance(result, bytes):
-            _log_api_perf("chart-data", started, result)
+            _log_api_perf("chart-data", started, result, subqueries)
             return Response(content=result, media_type="application/json")
         logger.debug(
             "chart-data result history=%s forecast=%s has_overrides=%s",
@@ -405,7 +410,7 @@ def api_chart_data(
                 return obj
             result = _sanitize(result)
             logger.debug("chart-data sanitized — retrying JSON")
-        _log_api_perf("chart-data", started, result)
+        _log_api_perf("chart-data", started, result, subqueries)
         return result
     except HTTPException:
         raise
@@ -955,6 +960,8 @@ def api_create_manual_client(
         return result
     except HTTPException:
         raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except Exception as exc:
         logger.error("create-manual-client error: %s", exc, exc_info=True)
         raise HTTPException(500, str(exc))
@@ -1052,6 +1059,8 @@ def api_add_articles_to_manual_client(
         return result
     except HTTPException:
         raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except Exception as exc:
         logger.error("add-articles-to-manual-client error: %s", exc, exc_info=True)
         raise HTTPException(500, str(exc))
@@ -1094,6 +1103,8 @@ def api_add_articles_by_client_name(
         return result
     except HTTPException:
         raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except Exception as exc:
         logger.error("add-articles-to-client error: %s", exc, exc_info=True)
         raise HTTPException(500, str(exc))
@@ -2647,9 +2658,10 @@ def api_approvals_approve(
             if cr is None:
                 raise HTTPException(404, "Modificación no encontrada")
             owner_uid = _apply_review(session, cr, status="aprobado", user=user, motivo=payload.motivo)
+            selector = cr.client_selector or ""
             session.commit()
         if owner_uid is not None:
-            svc.clear_response_cache()
+            svc.clear_response_cache(override_selectors=[selector])
         return JSONResponse({"ok": True, "id": request_id, "status": "aprobado"})
     except HTTPException:
         raise
@@ -2681,10 +2693,11 @@ def api_approvals_reject(
             if cr is None:
                 raise HTTPException(404, "Modificación no encontrada")
             owner_uid = _apply_review(session, cr, status="rechazado", user=user, motivo=motivo)
+            selector = cr.client_selector or ""
             session.commit()
         # Caché del DUEÑO del override (cotizador), no del admin que rechaza.
         if owner_uid is not None:
-            svc.clear_response_cache()
+            svc.clear_response_cache(override_selectors=[selector])
         return JSONResponse({"ok": True, "id": request_id, "status": "rechazado"})
     except HTTPException:
         raise
@@ -3093,8 +3106,8 @@ def api_approvals_grouped(
 #   • proy. APROBADOS+PEND.   = meta + Σ delta de aprobados + pendientes
 # Los rechazados NO se suman (camino visual; el override real no se revierte).
 # GLOBAL: corre sobre TODOS los CRs (sin los filtros de la tabla) para clasificar
-# bien por estado y evitar el bug A′. Reusa compute_approval_curve_impacts (delta
-# por override) + el linking impacto→estado del CR (mismo patrón que la matriz).
+# bien por estado y evitar el bug A′. Reusa get_approval_curve_impacts (delta
+# por override, cacheado por versión de overrides) + el linking impacto→estado del CR (mismo patrón que la matriz).
 
 def _impacts_by_status(records_all: list[dict], impacts: dict) -> dict:
     """Suma los deltas de `impacts` (de compute_approval_curve_impacts) segmentados
@@ -3203,7 +3216,7 @@ def _compute_meta_gauge(session, user: User) -> dict:
         except Exception:
             forecast_year = None
 
-        impacts = svc.compute_approval_curve_impacts(growth_pct=25.0, is_admin=True)
+        impacts = svc.get_approval_curve_impacts(growth_pct=25.0, is_admin=True)
         rows_all = _query_change_requests(session, {}, cap=_MAX_CR_POOL)   # TODOS los CRs
         records_all = [_cr_to_dict(r) for r in rows_all]
         by = _impacts_by_status(records_all, impacts)
@@ -3378,6 +3391,7 @@ def _review_group(payload: "_GroupReviewPayload", *, status: str, user: User) ->
 
     n = 0
     reverted_owner_ids: set[int] = set()
+    reviewed_selectors: set[str] = set()
     with SessionLocal() as session:
         rows = _query_change_requests(session, filters, cap=_MAX_CR_POOL)
         rows = _filter_visible_approval_requests(session, user, rows)
@@ -3409,10 +3423,11 @@ def _review_group(payload: "_GroupReviewPayload", *, status: str, user: User) ->
             )
             if owner is not None:
                 reverted_owner_ids.add(owner)
+                reviewed_selectors.add(cr.client_selector or "")
             n += 1
         session.commit()
     if reverted_owner_ids:
-        svc.clear_response_cache()
+        svc.clear_response_cache(override_selectors=reviewed_selectors)
     return n
 
 
@@ -3501,6 +3516,7 @@ def _review_by_ids(payload: "_ByIdsReviewPayload", *, status: str, user: User) -
     filters = _ids_filters(payload)
     n = 0
     reverted_owner_ids: set[int] = set()
+    reviewed_selectors: set[str] = set()
     with SessionLocal() as session:
         rows = _query_change_requests(session, filters, cap=_MAX_CR_POOL)
         rows = _filter_visible_approval_requests(session, user, rows)
@@ -3526,10 +3542,11 @@ def _review_by_ids(payload: "_ByIdsReviewPayload", *, status: str, user: User) -
             )
             if owner is not None:
                 reverted_owner_ids.add(owner)
+                reviewed_selectors.add(cr.client_selector or "")
             n += 1
         session.commit()
     if reverted_owner_ids:
-        svc.clear_response_cache()
+        svc.clear_response_cache(override_selectors=reviewed_selectors)
     return n
 
 
@@ -19,6 +19,8 @@ Dimensionamiento.
 """
 from __future__ import annotations
 
+import base64
+import binascii
 import datetime as dt
 import json
 import logging
@@ -27,7 +29,7 @@ import unicodedata
 from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
-from sqlalchemy import func, or_, select
+from sqlalchemy import and_, case, func, or_, select, update
 from sqlalchemy.orm import Session
 
 from web_comparativas.policy import require_perm, is_admin
@@ -50,9 +52,13 @@ from web_comparativas.dimensionamiento.models import (
 from web_comparativas.dimensionamiento.oportunidades import (
     CRM_ENVIO_PLACEHOLDER,
     CRM_USUARIO_SIEM_ID,
+    ESTADO_ACTIVA,
     OPORTUNIDADES_CARTERA_ENABLED,
     OPORTUNIDADES_ENABLED,
+    TIPO_ESTABLE,
+    TIPO_RECURRENTE,
     VENTANA_MESES,
+    _CUENTA_VACIA,
     _detectar_ultimo_mes_completo,
     _subtract_months,
     normalizar_cuenta_fusion,
@@ -61,6 +67,7 @@ from web_comparativas.dimensionamiento.oportunidades import (
 from web_comparativas.dimensionamiento.oportunidades_visibilidad import (
     analistas_a_cargo,
     oportunidades_visibles_para,
+    predicado_visibilidad,
     supervisores_a_cargo,
 )
 from web_comparativas.dimensionamiento.query_service import _latest_success_import_run
@@ -658,10 +665,11 @@ def _window_meta(db: Session, run_id: int) -> dict[str, Any]:
 def _oportunidades_pendientes(db: Session, run_id: int, crm_modo: str):
     """Filas pendientes comparando la clave canonica exacta del envio.
 
-    ``oportunidades_summary`` no persiste ``oportunidad_id``. Por eso no se arma un
-    anti-join aproximado con columnas descriptivas: se calcula la identidad con
-    ``opportunity_stable_id``, la misma funcion usada por el payload y por
-    ``crm_envios.oportunidad_id``, y se excluye en backend antes de serializar/KPIs.
+    ``oportunidades_summary.oportunidad_id`` ya se persiste (lo usa /pagina como
+    predicado SQL), pero las filas de runs anteriores a la columna recien se completan
+    con ``_asegurar_oportunidad_id``. /list no depende de eso: calcula la identidad con
+    ``opportunity_stable_id``, la misma funcion que escribe la columna y
+    ``crm_envios.oportunidad_id``, y excluye en backend antes de serializar/KPIs.
     Son dos consultas acotadas y nunca una consulta por fila.
     """
     enviados = set(
@@ -686,8 +694,13 @@ def _resolve_account_for_opportunity(
     opportunity: OportunidadSummary,
     *,
     requested_account: str | None = None,
+    usar_cache: bool = False,
 ) -> dict[str, Any]:
-    """Reconstruye la relación y consulta el CRM en cada GET/POST; JavaScript no decide."""
+    """Reconstruye la relación y consulta el CRM en cada GET/POST; JavaScript no decide.
+
+    `usar_cache` (solo el preview del modal) admite la caché por corrida de crm_client;
+    el POST de envío siempre verifica contra el CRM en el momento.
+    """
     relationship = relationship_candidates(db, run_id, opportunity)
     crm_mode = _modo_envio_actual()
     results: dict[str, dict[str, Any]] = {}
@@ -697,7 +710,10 @@ def _resolve_account_for_opportunity(
     codes = [row["cuenta"] for row in relationship.get("cuentas_candidatas") or []] if can_query else []
     if crm_mode != "simulado" and codes:
         try:
-            lookup = crm_client.consultar_cuentas(codes, detener_si_primera_existe=True)
+            lookup = crm_client.consultar_cuentas(
+                codes, detener_si_primera_existe=True,
+                alcance=f"run:{run_id}" if usar_cache else None,
+            )
             results = lookup["results"]
         except CrmError as exc:
             results = {
@@ -962,22 +978,335 @@ def oportunidades_list(
             "window": _window_meta(db, latest.id),
             "completeness": completeness,
             "crm_modo": modo_actual,
-            # Insumos del selector de asignación (iguales para todas las filas).
-            "crm_asignacion": {
-                "match": ctx.get("match"),
-                "usuarios": ctx.get("usuarios") or [],
-                "sugerido_id": ctx.get("sugerido_id"),
-                "error": ctx.get("error"),
-                "puede_elegir": bool(ctx.get("puede_elegir", True)),
-                # Texto de bitácora ya armado por usuario: el modal lo muestra tal cual
-                # al cambiar la selección, sin recomponerlo del lado del cliente.
-                "bitacora_por_usuario": _bitacoras_por_usuario(ctx, ahora),
-            },
+            "crm_asignacion": _crm_asignacion_payload(ctx, ahora),
             "rows": data_rows,
         },
     }
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Listado PAGINADO: filtros, orden y visibilidad resueltos en SQL
+#
+# /list serializa la corrida entera (y arma el payload CRM de cada fila) antes de
+# mostrar la primera pantalla. /pagina devuelve de a `limit` filas con paginación por
+# cursor (keyset sobre (columna de orden, id): estable aunque entren envíos entre una
+# página y la siguiente) y deja en la base todo lo que antes se filtraba en Python:
+# pendientes del entorno activo, cartera comercial, filtros de la UI. Los totales
+# (KPIs y completitud) salen de un agregado, solo en la primera página.
+# ──────────────────────────────────────────────────────────────────────────────
+
+_PAGINA_LIMIT_MAX = 200
+
+# Claves de orden aceptadas = los `value` del selector "Ordenar por" de la UI.
+_ORDEN_PAGINA = {
+    "score": OportunidadSummary.score,
+    "monto_oportunidad": OportunidadSummary.monto_oportunidad,
+    "consumo_tipico_mensual": OportunidadSummary.consumo_tipico_mensual,
+    "efectividad": OportunidadSummary.efectividad,
+    "meses_demanda_cliente_12m": OportunidadSummary.meses_demanda_cliente_12m,
+    "cliente_visible": func.coalesce(OportunidadSummary.cliente_visible, ""),
+}
+
+
+def _crm_asignacion_payload(ctx: dict[str, Any], ahora: dt.datetime) -> dict[str, Any]:
+    """Insumos del selector de asignación (iguales para todas las filas)."""
+    return {
+        "match": ctx.get("match"),
+        "usuarios": ctx.get("usuarios") or [],
+        "sugerido_id": ctx.get("sugerido_id"),
+        "error": ctx.get("error"),
+        "puede_elegir": bool(ctx.get("puede_elegir", True)),
+        # Texto de bitácora ya armado por usuario: el modal lo muestra tal cual
+        # al cambiar la selección, sin recomponerlo del lado del cliente.
+        "bitacora_por_usuario": _bitacoras_por_usuario(ctx, ahora),
+    }
+
+
+def _asegurar_oportunidad_id(db: Session, run_id: int) -> int:
+    """Completa `oportunidad_id` en las filas del run construidas antes de la columna.
+
+    Corre una sola vez por run en la práctica: el motor ya la escribe al reconstruir,
+    así que después de la primera pasada la consulta no devuelve filas. Se usa la
+    MISMA `opportunity_stable_id` que el payload y `crm_envios`.
+    """
+    S = OportunidadSummary
+    faltantes = db.execute(
+        select(S.id, S.cliente_visible, S.codigo_articulo)
+        .where(S.import_run_id == run_id)
+        .where(S.oportunidad_id.is_(None))
+    ).all()
+    if not faltantes:
+        return 0
+    db.execute(
+        update(S),
+        [
+            {"id": row_id, "oportunidad_id": opportunity_stable_id(cliente, codigo)}
+            for row_id, cliente, codigo in faltantes
+        ],
+    )
+    db.commit()
+    logger.info(
+        "[OPORTUNIDADES][API] oportunidad_id completado run_id=%s filas=%s",
+        run_id, len(faltantes),
+    )
+    return len(faltantes)
+
+
+def _cursor_encode(valor: Any, row_id: int, orden: str, direccion: str) -> str:
+    raw = json.dumps({"v": valor, "id": row_id, "o": orden, "d": direccion}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _cursor_decode(cursor: str, orden: str, direccion: str) -> tuple[Any, int]:
+    """(valor de orden, id) de la última fila entregada. El cursor viaja opaco: si no
+    corresponde al orden pedido (la UI cambió el orden sin volver a la primera página)
+    se rechaza en vez de devolver una página incoherente."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+        valor, row_id = data["v"], int(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+    if data.get("o") != orden or data.get("d") != direccion:
+        raise HTTPException(
+            status_code=400,
+            detail="El cursor no corresponde al orden pedido. Volvé a la primera página.",
+        )
+    return valor, row_id
+
+
+def _valor_orden(o: OportunidadSummary, orden: str) -> Any:
+    if orden == "cliente_visible":
+        return o.cliente_visible or ""
+    return getattr(o, orden)
+
+
+def _like_ci(columna, texto: str):
+    """Contiene `texto` sin distinguir mayúsculas (mismo criterio en SQLite y PG)."""
+    patron = texto.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return func.lower(func.coalesce(columna, "")).like(f"%{patron}%", escape="\\")
+
+
+def _filtros_base_pagina(db: Session, user, run_id: int, crm_modo: str) -> list:
+    """Universo de la pantalla: pendientes del entorno activo que el usuario puede ver.
+
+    Mismo contrato que /list (`_oportunidades_pendientes` + cartera), pero como
+    predicados: la exclusión de enviadas es un anti-join por `oportunidad_id` y la
+    cartera un IN sobre cuentas (ver `predicado_visibilidad`).
+    """
+    S = OportunidadSummary
+    filtros = [
+        S.import_run_id == run_id,
+        S.oportunidad_id.not_in(
+            select(CrmEnvio.oportunidad_id).where(CrmEnvio.crm_modo == crm_modo)
+        ),
+    ]
+    # Mismo kill-switch que /list: apagado, todos ven todas las filas.
+    if OPORTUNIDADES_CARTERA_ENABLED():
+        visibilidad = predicado_visibilidad(db, user, run_id)
+        if visibilidad is not None:
+            filtros.append(visibilidad)
+    return filtros
+
+
+def _sin_cuenta_fusion():
+    """Equivalente SQL de `normalizar_cuenta_fusion(...) is None`."""
+    S = OportunidadSummary
+    return or_(
+        S.cuenta_interna.is_(None),
+        func.upper(func.trim(S.cuenta_interna)).in_(sorted(_CUENTA_VACIA)),
+    )
+
+
+def _resumen_pagina(db: Session, run_id: int, filtros: list) -> dict[str, Any]:
+    """KPIs y completitud CRM del conjunto FILTRADO, en un agregado.
+
+    Los KPIs son los mismos que la UI calculaba sobre las filas en memoria. Para
+    "faltan_n_cuenta" se respeta el fallback a records de /list: se agrupan por
+    cliente las filas sin cuenta en el summary (pocas) y solo esos clientes se
+    resuelven contra `dimensionamiento_records`.
+    """
+    S = OportunidadSummary
+
+    def vacio(columna):
+        return func.trim(func.coalesce(columna, "")) == ""
+
+    total, monto, repetida, activas, efectividad, faltan_producto, faltan_cliente = db.execute(
+        select(
+            func.count(S.id),
+            func.coalesce(func.sum(S.monto_oportunidad), 0),
+            func.coalesce(func.sum(case(
+                (S.tipo_oportunidad.in_((TIPO_ESTABLE, TIPO_RECURRENTE)), 1), else_=0,
+            )), 0),
+            func.coalesce(func.sum(case((S.estado_actividad == ESTADO_ACTIVA, 1), else_=0)), 0),
+            func.coalesce(func.avg(S.efectividad), 0),
+            func.coalesce(func.sum(case((vacio(S.producto_nombre), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((vacio(S.cliente_visible), 1), else_=0)), 0),
+        ).where(*filtros)
+    ).one()
+
+    sin_cuenta = db.execute(
+        select(S.cliente_visible, func.count(S.id))
+        .where(*filtros)
+        .where(_sin_cuenta_fusion())
+        .group_by(S.cliente_visible)
+    ).all()
+    respaldo = _cuentas_fusion_desde_records(
+        db, run_id, sorted({cliente for cliente, _ in sin_cuenta if cliente}),
+    )
+    faltan_cuenta = sum(int(n) for cliente, n in sin_cuenta if not respaldo.get(cliente))
+
+    return {
+        "total": int(total or 0),
+        "kpis": {
+            "monto_total": float(monto or 0),
+            "repetida": int(repetida or 0),
+            "activas": int(activas or 0),
+            "efectividad_promedio": float(efectividad or 0),
+        },
+        "completeness": {
+            "total": int(total or 0),
+            "faltan_n_cuenta": faltan_cuenta,
+            "faltan_producto": int(faltan_producto or 0),
+            "faltan_cliente": int(faltan_cliente or 0),
+        },
+    }
+
+
+def _opciones_pagina(db: Session, filtros_base: list) -> dict[str, list[str]]:
+    """Valores de los selectores de familia/unidad dentro del universo visible."""
+    S = OportunidadSummary
+    salida: dict[str, list[str]] = {}
+    for clave, columna in (("familias", S.familia), ("unidades_negocio", S.unidad_negocio)):
+        valores = db.execute(select(columna).where(*filtros_base).distinct()).scalars()
+        salida[clave] = sorted(v for v in valores if v)
+    return salida
+
+
+@router.get("/pagina")
+def oportunidades_pagina(
+    request: Request,
+    cursor: str | None = Query(None, max_length=512),
+    limit: int = Query(50, ge=1, le=_PAGINA_LIMIT_MAX),
+    orden: str = Query("score"),
+    direccion: str = Query("desc", pattern="^(asc|desc)$"),
+    q: str | None = Query(None, max_length=200),
+    cliente: str | None = Query(None, max_length=200),
+    familia: list[str] | None = Query(None),
+    unidad_negocio: list[str] | None = Query(None),
+    tipo: list[str] | None = Query(None),
+    actividad: str | None = Query(None, max_length=20),
+    monto_min: float | None = Query(None),
+    monto_max: float | None = Query(None),
+    oportunidad_id: str | None = Query(None, max_length=64),
+    _user=AllowedUser,
+    db: Session = Depends(get_db),
+):
+    """Página de oportunidades pendientes del run activo (cursor + filtros en SQL).
+
+    `q` busca en cliente, producto y código (el buscador de la UI); `cliente` solo en
+    el cliente. `familia`, `unidad_negocio` y `tipo` aceptan varios valores. La primera
+    página (sin `cursor`) agrega total, KPIs, completitud, ventana y opciones de los
+    selectores; las siguientes solo traen filas y el próximo cursor.
+    """
+    _require_enabled()
+    if orden not in _ORDEN_PAGINA:
+        raise HTTPException(status_code=400, detail=f"Orden no soportado: {orden}.")
+    latest = _latest_success_import_run(db)
+    if latest is None:
+        return {"ok": True, "data": {"run_id": None, "total": 0, "window": {}, "rows": [],
+                                     "next_cursor": None}}
+
+    S = OportunidadSummary
+    _asegurar_oportunidad_id(db, latest.id)
+    modo_actual = _modo_envio_actual()
+    filtros_base = _filtros_base_pagina(db, _user, latest.id, modo_actual)
+
+    filtros = list(filtros_base)
+    if q and q.strip():
+        filtros.append(or_(
+            _like_ci(S.cliente_visible, q),
+            _like_ci(S.producto_nombre, q),
+            _like_ci(S.codigo_articulo, q),
+        ))
+    if cliente and cliente.strip():
+        filtros.append(_like_ci(S.cliente_visible, cliente))
+    if familia:
+        filtros.append(S.familia.in_(familia))
+    if unidad_negocio:
+        filtros.append(S.unidad_negocio.in_(unidad_negocio))
+    if tipo:
+        filtros.append(S.tipo_oportunidad.in_(tipo))
+    if actividad:
+        filtros.append(S.estado_actividad == actividad)
+    if monto_min is not None:
+        filtros.append(S.monto_oportunidad >= monto_min)
+    if monto_max is not None:
+        filtros.append(S.monto_oportunidad <= monto_max)
+    if oportunidad_id:
+        filtros.append(S.oportunidad_id == oportunidad_id.strip().lower())
+
+    columna = _ORDEN_PAGINA[orden]
+    desc = direccion == "desc"
+    stmt = select(S).where(*filtros)
+    if cursor:
+        valor, ultimo_id = _cursor_decode(cursor, orden, direccion)
+        if desc:
+            stmt = stmt.where(or_(columna < valor, and_(columna == valor, S.id < ultimo_id)))
+        else:
+            stmt = stmt.where(or_(columna > valor, and_(columna == valor, S.id > ultimo_id)))
+    orden_sql = (columna.desc(), S.id.desc()) if desc else (columna.asc(), S.id.asc())
+    filas = db.execute(stmt.order_by(*orden_sql).limit(limit + 1)).scalars().all()
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    next_cursor = (
+        _cursor_encode(_valor_orden(filas[-1], orden), filas[-1].id, orden, direccion)
+        if hay_mas else None
+    )
+
+    # Fallback de cuenta y payload CRM solo para las filas de ESTA página.
+    sin_cuenta = {
+        o.cliente_visible
+        for o in filas
+        if not normalizar_cuenta_fusion(getattr(o, "cuenta_interna", None)) and o.cliente_visible
+    }
+    respaldo = _cuentas_fusion_desde_records(db, latest.id, sorted(sin_cuenta))
+    ctx = _contexto_asignacion_seguro(_user, db)
+    ahora = dt.datetime.utcnow()
+    data_rows = []
+    for o in filas:
+        fila = _row_to_dict(
+            o,
+            normalizar_cuenta_fusion(getattr(o, "cuenta_interna", None))
+            or respaldo.get(o.cliente_visible),
+            ctx,
+            ahora,
+        )
+        fila["envio"] = {"enviado": False}
+        data_rows.append(fila)
+
+    data: dict[str, Any] = {
+        "run_id": latest.id,
+        "crm_modo": modo_actual,
+        "orden": orden,
+        "direccion": direccion,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "crm_asignacion": _crm_asignacion_payload(ctx, ahora),
+        "rows": data_rows,
+    }
+    if not cursor:
+        data.update(_resumen_pagina(db, latest.id, filtros))
+        data["window"] = _window_meta(db, latest.id)
+        data["opciones"] = _opciones_pagina(db, filtros_base)
+
+    logger.info(
+        "[OPORTUNIDADES][API] pagina run_id=%s orden=%s/%s filas=%s hay_mas=%s",
+        latest.id, orden, direccion, len(data_rows), hay_mas,
+    )
+    return {"ok": True, "data": data}
+
+
 @router.get("/cuentas/{summary_id}")
 def oportunidad_cuentas(
     summary_id: int,
@@ -989,7 +1318,7 @@ def oportunidad_cuentas(
     _require_enabled()
     latest, opportunity = _active_opportunity(db, summary_id)
     try:
-        resolution = _resolve_account_for_opportunity(db, latest.id, opportunity)
+        resolution = _resolve_account_for_opportunity(db, latest.id, opportunity, usar_cache=True)
     except (FileNotFoundError, ValueError) as exc:
         raise HTTPException(status_code=503, detail=f"No se pudo cargar el maestro de cuentas: {exc}") from exc
     resolution["message"] = None if not resolution.get("bloqueado") else _account_resolution_message(resolution)
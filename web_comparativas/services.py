@@ -1,11 +1,12 @@
 from pathlib import Path
 import os
-import json, re, importlib, logging, unicodedata  # <-- NUEVO: unicodedata
+import json, re, logging, unicodedata  # <-- NUEVO: unicodedata
 from dataclasses import dataclass
-import yaml
 import pandas as pd
 
 from .models import db_session, Upload as UploadModel, SavedView, User  # <-- NUEVO: User
+from .adapter_registry import get_registry, load_handler
+from . import view_store
 
 # ------------------------------------------------------------
 # Logger
@@ -53,10 +54,8 @@ class HandlerRef:
     func: str
 
 def _load_registry():
-    if not REG_PATH.exists():
-        return {"sources": []}
-    data = yaml.safe_load(REG_PATH.read_text(encoding="utf-8")) or {}
-    return data.get("sources", [])
+    """Registry compilado (se recompila solo si registry.yml cambió). Ver adapter_registry."""
+    return get_registry(REG_PATH)
 
 def _str_keyed(o):
     """Convierte claves numpy/int en str para JSON."""
@@ -67,42 +66,17 @@ def _str_keyed(o):
     return o
 
 def _pick_handler(meta: dict):
-    # --- DEBUG LOGGING START ---
+    rule = _load_registry().resolve(meta)
+
+    # --- DEBUG LOGGING ---
     try:
         debug_log = PROJECT_ROOT / "debug_services.log"
         with open(debug_log, "a", encoding="utf-8") as f:
-            f.write(f"[PICK_HANDLER] Meta: {meta}\n")
-    except: pass
-    # --- DEBUG LOGGING END ---
-
-    sources = _load_registry()
-    fname = meta.get("filename", "") or ""
-    platform = (meta.get("platform", "") or "").upper()
-    for s in sources:
-        w = s.get("when", {}) or {}
-        ok = True
-        if "platform" in w and w["platform"]:
-            ok &= platform in [str(p).upper() for p in w["platform"]]
-        if w.get("filename_regex"):
-            if not re.match(w["filename_regex"], fname, flags=re.I):
-                ok = False
-        
-        # --- DEBUG LOGGING LOOP ---
-        try:
-            with open(debug_log, "a", encoding="utf-8") as f:
-                f.write(f"  Checking {s.get('id')}: OK={ok} (regex={w.get('filename_regex')} vs fname={fname}, plat={w.get('platform')} vs {platform})\n")
-        except: pass
-        # --- DEBUG LOGGING LOOP END ---
-
-        if ok:
-            mod, func = s["handler"].split(":")
-            return HandlerRef(mod, func), s.get("id")
-            
-    s = [x for x in sources if x.get("id") == "DEFAULT"]
-    if s:
-        mod, func = s[0]["handler"].split(":")
-        return HandlerRef(mod, func), "DEFAULT"
-    raise RuntimeError("No hay handler en registry.yml")
+            f.write(f"[PICK_HANDLER] Meta: {meta} → {rule.id} ({rule.spec})\n")
+    except Exception:
+        pass
+
+    return HandlerRef(rule.module, rule.func), rule.id
 
 # ------------------------------------------------------------
 # Helpers de rutas/DB
@@ -445,7 +419,15 @@ def advance_status(upload_id: int, *, force: bool = False) -> str:
 # ------------------------------------------------------------
 # Pipeline principal (ID-safe)
 # ------------------------------------------------------------
-def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool = False):
+def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool = False, progress=None):
+    """Pipeline de una carga. `progress(etapa)` (opcional) lo usa la cola de upload_jobs."""
+    def _step(etapa: str):
+        if progress is not None:
+            try:
+                progress(etapa)
+            except Exception:
+                pass
+
     up = _get_upload(upload_id)
     _fname = getattr(up, "original_filename", None) or f"upload_{upload_id}"
     logger.info("[upload %d] Iniciando classify_and_process | archivo: %s", upload_id, _fname)
@@ -490,6 +472,7 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
                 _set_status_by_id(upload_id, "classifying")
 
         # === Validación temprana del archivo ===
+        _step("validating")
         file_path = _resolve_original_path(up, base_dir_abs)
         if not file_path or not file_path.exists():
             # Fallback: si el archivo no está en disco (p.ej. tras un redeploy en Render),
@@ -530,6 +513,7 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
         if plat_hint and not meta_eff.get("platform"):
             meta_eff["platform"] = plat_hint
 
+        _step("handler")
         href, script_id = _pick_handler(meta_eff)
 
         logger.info("[upload %d] Handler seleccionado: %s → %s:%s", upload_id, script_id, href.module, href.func)
@@ -538,7 +522,7 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
         if touch_status:
             _set_status_by_id(upload_id, "processing")
 
-        handler = getattr(importlib.import_module(href.module), href.func)
+        handler = load_handler(f"{href.module}:{href.func}")
         logger.info("[upload %d] Ejecutando handler...", upload_id)
         result = handler(Path(file_path), meta_eff, out_dir)
 
@@ -577,6 +561,7 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
             _dlog(f"  DataFrame vacío: {_diag_msg}")
             raise RuntimeError(_diag_msg)
 
+        _step("persisting")
         normalized_path = out_dir / "normalized.xlsx"
         df.to_excel(normalized_path, index=False, engine="openpyxl")
 
@@ -639,63 +624,14 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
         _commit_safe()
 
         # Sincronizar filas de esta comparativa al dashboard de Reporte de Perfiles
+        _step("syncing")
         try:
-            from web_comparativas.migrations import backfill_comparativa_rows as _bf_comp
-            import io as _io
-            import datetime as _dt2
-            import pandas as _pd
-            from web_comparativas.models import ComparativaRow as _CompRow
-
-            _EXCEL_COL_MAP = {
-                "Proveedor": "proveedor", "Renglón": "renglon", "Alternativa": "alternativa",
-                "Código": "codigo", "Descripción": "descripcion",
-                "Cantidad solicitada": "cantidad_solicitada", "Unidad de medida": "unidad_medida",
-                "Precio unitario": "precio_unitario", "Cantidad ofertada": "cantidad_ofertada",
-                "Total por renglón": "total_por_renglon", "Especificación técnica": "especificacion_tecnica",
-                "Marca": "marca", "Posicion": "posicion", "Rubro": "rubro",
-            }
-            norm_bytes_sync = normalized_path.read_bytes()
-            df_sync = _pd.read_excel(_io.BytesIO(norm_bytes_sync), engine="openpyxl")
-            df_sync.columns = [str(c).strip() for c in df_sync.columns]
-
-            _fecha_ap = None
-            _ap_str = getattr(up, "apertura_fecha", None)
-            if _ap_str:
-                try:
-                    _fecha_ap = _dt2.date.fromisoformat(str(_ap_str).strip()[:10])
-                except Exception:
-                    pass
-
-            db_session.query(_CompRow).filter(_CompRow.upload_id == upload_id).delete()
-            _rows_sync = []
-            for _, _row in df_sync.iterrows():
-                _rec = {
-                    "upload_id": upload_id,
-                    "fecha_apertura": _fecha_ap,
-                    "nro_proceso": up.proceso_nro,
-                    "comprador": up.buyer_hint,
-                    "plataforma": up.platform_hint,
-                    "cuenta": up.cuenta_nro,
-                    "provincia": up.province_hint,
-                }
-                for _ec, _mc in _EXCEL_COL_MAP.items():
-                    _v = _row.get(_ec)
-                    if _v is not None and not (isinstance(_v, float) and _pd.isna(_v)):
-                        if _mc == "posicion":
-                            try: _v = int(_v)
-                            except: _v = None
-                        elif _mc in ("cantidad_solicitada","precio_unitario","cantidad_ofertada","total_por_renglon"):
-                            try: _v = float(_v)
-                            except: _v = None
-                        else:
-                            _v = str(_v).strip() if _v else None
-                        _rec[_mc] = _v
-                _rows_sync.append(_rec)
-
-            if _rows_sync:
-                db_session.bulk_insert_mappings(_CompRow, _rows_sync)
-                _commit_safe()
-                logger.info(f"Upload {upload_id}: {len(_rows_sync)} filas sincronizadas a comparativa_rows.")
+            from web_comparativas.comparativa_rows_sync import sincronizar_upload
+
+            _n_sync = sincronizar_upload(db_session, up, normalized_path.read_bytes())
+            _commit_safe()
+            if _n_sync:
+                logger.info(f"Upload {upload_id}: {_n_sync} filas sincronizadas a comparativa_rows.")
 
             from web_comparativas.routers.mercado_publico_perfiles_router import invalidate_perfiles_cache
             invalidate_perfiles_cache()
@@ -709,6 +645,21 @@ def classify_and_process(upload_id: int, metadata: dict, *, touch_status: bool =
                 pass
             logger.warning(f"Upload {upload_id}: sync comparativa_rows falló (no bloqueante) — {_sync_err}")
 
+        _step("bundle")
+        # Bundle de analítica del tablero (KPIs, gráficos, ranking, alertas): se calcula
+        # una vez acá y las vistas lo sirven tal cual. No bloqueante: si falla, el
+        # tablero lo regenera en la primera vista.
+        try:
+            from web_comparativas.legacy_routes import refresh_tablero_bundle
+
+            refresh_tablero_bundle(up, normalized_path.read_bytes())
+        except Exception as _bundle_err:
+            try:
+                db_session.rollback()
+            except Exception:
+                pass
+            logger.warning(f"Upload {upload_id}: bundle del tablero no generado (no bloqueante) — {_bundle_err}")
+
         if touch_status:
             _set_status_by_id(upload_id, "reviewing")
             # REMOVED: Auto-advance to dashboard/done
@@ -835,50 +786,22 @@ def _serialize_sv(sv: SavedView) -> dict:
         "updated_at": sv.updated_at.isoformat() if sv.updated_at else None,
     }
 
+# Lectura/escritura en view_store: caché por usuario + upsert / UPDATE únicos (oct-2026).
 def list_views(user_id: int, view_id: str = "dashboard") -> list[dict]:
     """Devuelve todas las vistas del usuario para una view determinada."""
-    q = db_session.query(SavedView).filter(
-        SavedView.user_id == int(user_id),
-        SavedView.view_id == str(view_id),
-    ).order_by(SavedView.is_default.desc(), SavedView.updated_at.desc())
-    return [_serialize_sv(x) for x in q.all()]
+    return view_store.listar(user_id, view_id)
 
 def get_default_view(user_id: int, view_id: str = "dashboard") -> dict | None:
     """Obtiene la vista por defecto; si no hay, devuelve None."""
-    sv = (
-        db_session.query(SavedView)
-        .filter(SavedView.user_id == int(user_id), SavedView.view_id == str(view_id), SavedView.is_default.is_(True))
-        .order_by(SavedView.updated_at.desc())
-        .first()
-    )
-    return _serialize_sv(sv) if sv else None
+    return view_store.por_defecto(user_id, view_id)
 
 def get_view(user_id: int, *, view_id: str = "dashboard", view_pk: int | None = None, name: str | None = None) -> dict | None:
     """Obtiene una vista específica por id o nombre."""
-    q = db_session.query(SavedView).filter(SavedView.user_id == int(user_id), SavedView.view_id == str(view_id))
-    if view_pk is not None:
-        sv = q.filter(SavedView.id == int(view_pk)).first()
-    elif name:
-        sv = q.filter(SavedView.name == str(name)).first()
-    else:
-        sv = None
-    return _serialize_sv(sv) if sv else None
+    return view_store.obtener(user_id, view_id, pk=view_pk, name=(str(name) if name else None))
 
 def _unset_others_default(user_id: int, view_id: str, keep_id: int):
-    """Pone en False el is_default de todas las demás vistas del mismo usuario/view."""
-    q = db_session.query(SavedView).filter(
-        SavedView.user_id == int(user_id),
-        SavedView.view_id == str(view_id),
-        SavedView.id != int(keep_id),
-        SavedView.is_default.is_(True),
-    )
-    count = 0
-    for sv in q.all():
-        sv.is_default = False
-        db_session.add(sv)
-        count += 1
-    if count:
-        _commit_safe()
+    """Deja `keep_id` como única default del mismo usuario/view (un solo UPDATE)."""
+    view_store.marcar_default(user_id, view_id, pk=keep_id)
 
 def save_view(
     user_id: int,
@@ -901,67 +824,33 @@ def save_view(
         raise ValueError("El nombre de la vista no debe superar 120 caracteres.")
 
     payload = _clean_payload(payload)
-
-    q = db_session.query(SavedView).filter(
-        SavedView.user_id == int(user_id),
-        SavedView.view_id == str(view_id),
-        SavedView.name == name,
+    sv = view_store.guardar(
+        user_id, view_id, name, payload,
+        is_default=bool(is_default), replace_existing=replace_existing,
     )
-    sv = q.first()
 
-    if sv and not replace_existing:
-        raise ValueError("Ya existe una vista con ese nombre.")
-
-    if not sv:
-        sv = SavedView(user_id=int(user_id), view_id=str(view_id), name=name, payload=payload, is_default=bool(is_default))
-        db_session.add(sv)
-    else:
-        sv.payload = payload
-        sv.is_default = bool(is_default) or bool(sv.is_default)
-
-    _commit_safe()
-    if sv.is_default:
-        _unset_others_default(user_id=int(user_id), view_id=str(view_id), keep_id=sv.id)
-
-    logger.info(f"Vista guardada: user={user_id} view={view_id!r} name={name!r} default={sv.is_default}")
-    return _serialize_sv(sv)
+    logger.info(f"Vista guardada: user={user_id} view={view_id!r} name={name!r} default={sv['is_default']}")
+    return sv
 
 def set_default_view(user_id: int, *, view_id: str = "dashboard", view_pk: int | None = None, name: str | None = None) -> dict:
     """Marca una vista como default y desmarca las demás."""
-    q = db_session.query(SavedView).filter(SavedView.user_id == int(user_id), SavedView.view_id == str(view_id))
-    if view_pk is not None:
-        sv = q.filter(SavedView.id == int(view_pk)).first()
-    elif name:
-        sv = q.filter(SavedView.name == str(name)).first()
-    else:
+    if view_pk is None and not name:
         raise ValueError("Debe indicar view_pk o name para establecer por defecto.")
 
+    sv = view_store.marcar_default(user_id, view_id, pk=view_pk, name=name)
     if not sv:
         raise RuntimeError("La vista indicada no existe.")
 
-    sv.is_default = True
-    db_session.add(sv)
-    _commit_safe()
-    _unset_others_default(user_id=int(user_id), view_id=str(view_id), keep_id=sv.id)
-
-    logger.info(f"Vista por defecto establecida: user={user_id} view={view_id!r} name={sv.name!r}")
-    return _serialize_sv(sv)
+    logger.info(f"Vista por defecto establecida: user={user_id} view={view_id!r} name={sv['name']!r}")
+    return sv
 
 def delete_view(user_id: int, *, view_id: str = "dashboard", view_pk: int | None = None, name: str | None = None) -> bool:
     """Elimina una vista. Si era default, no asigna otra automáticamente (lo decide la UI)."""
-    q = db_session.query(SavedView).filter(SavedView.user_id == int(user_id), SavedView.view_id == str(view_id))
-    if view_pk is not None:
-        sv = q.filter(SavedView.id == int(view_pk)).first()
-    elif name:
-        sv = q.filter(SavedView.name == str(name)).first()
-    else:
+    if view_pk is None and not name:
         raise ValueError("Debe indicar view_pk o name para eliminar.")
 
-    if not sv:
+    if not view_store.eliminar(user_id, view_id, pk=view_pk, name=name):
         return False
 
-    db_session.delete(sv)
-    _commit_safe()
-
-    logger.info(f"Vista eliminada: user={user_id} view={view_id!r} name={sv.name!r}")
+    logger.info(f"Vista eliminada: user={user_id} view={view_id!r} pk={view_pk} name={name!r}")
     return True
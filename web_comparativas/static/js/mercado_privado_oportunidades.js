@@ -1,16 +1,21 @@
 /* Oportunidades de Venta (Mercado Privado) — Fase 1B (UI).
-   Lee la tabla precalculada vía /api/mercado-privado/oportunidades/list.
-   Tabla compacta (10 col) + KPIs (recalculan con filtros) + panel de detalle.
+   Lee la tabla precalculada vía /api/mercado-privado/oportunidades/pagina: filtros,
+   orden y KPIs se resuelven en el servidor; la lista se completa de a páginas
+   ("Cargar más"). Tabla compacta (10 col) + KPIs + panel de detalle.
    El envío al CRM lo hace el backend (POST /enviar/{id}); acá solo se muestra el
    payload, se confirma el envío y, una vez que el CRM devuelve un id, el botón
    "Enviar a CRM" pasa a ser "Ver en CRM" apuntando al DetailView. */
 (function () {
   "use strict";
 
-  const API = "/api/mercado-privado/oportunidades/list";
+  const API = "/api/mercado-privado/oportunidades/pagina";
+  const PAGE_SIZE = 50;
   const SEND_API = (id) => `/api/mercado-privado/oportunidades/enviar/${id}`;
   const ACCOUNT_API = (id) => `/api/mercado-privado/oportunidades/cuentas/${id}`;
-  let ALL = [];
+  let ALL = [];          // filas ya cargadas (todas las páginas pedidas)
+  let TOTAL = 0;         // total del conjunto filtrado según el servidor
+  let NEXT_CURSOR = null;
+  let LOAD_SEQ = 0;      // descarta respuestas de filtros viejos que llegan tarde
   let WINDOW = {};
   let CRM_MODO = null;   // 'simulado' | 'test' | 'prod' — entorno al que se enviaría ahora
   let CRM_ASIGNACION = { match: null, usuarios: [], sugerido_id: null, error: null,
@@ -58,50 +63,46 @@
       `</div>`;
   };
 
-  // ── Filtros / orden ──
+  // ── Filtros / orden (se mandan al servidor) ──
   function getFilters() {
     return {
       tipo: $("fTipo").value, actividad: $("fActividad").value,
       familia: $("fFamilia").value, unidad: $("fUnidad").value,
-      search: ($("fSearch").value || "").trim().toLowerCase(),
+      search: ($("fSearch").value || "").trim(),
       sort: $("fSort").value || "score",
     };
   }
-  function filteredRows() {
+  function filterQuery(extra) {
     const f = getFilters();
-    let rows = ALL.filter((o) => {
-      if (f.tipo && o.tipo_oportunidad !== f.tipo) return false;
-      if (f.actividad && o.estado_actividad !== f.actividad) return false;
-      if (f.familia && (o.familia || "") !== f.familia) return false;
-      if (f.unidad && (o.unidad_negocio || "") !== f.unidad) return false;
-      if (f.search) {
-        const hay = `${o.cliente_visible || ""} ${o.producto_nombre || ""} ${o.codigo_articulo || ""}`.toLowerCase();
-        if (!hay.includes(f.search)) return false;
-      }
-      return true;
-    });
-    rows.sort((a, b) => (b[f.sort] || 0) - (a[f.sort] || 0));
-    return rows;
+    const query = new URLSearchParams({ limit: String(PAGE_SIZE), orden: f.sort });
+    if (f.tipo) query.set("tipo", f.tipo);
+    if (f.actividad) query.set("actividad", f.actividad);
+    if (f.familia) query.set("familia", f.familia);
+    if (f.unidad) query.set("unidad_negocio", f.unidad);
+    if (f.search) query.set("q", f.search);
+    Object.entries(extra || {}).forEach(([k, v]) => query.set(k, v));
+    return query;
   }
+  let searchTimer = null;
   function applyFilters() {
-    const rows = filteredRows();
-    render(rows);
-    updateKpis(rows);
+    clearTimeout(searchTimer);
+    load();
+  }
+  function applyFiltersDebounced() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(load, 300);
   }
 
-  // ── KPIs (sobre el conjunto filtrado) ──
-  function updateKpis(rows) {
-    const n = rows.length;
-    const monto = rows.reduce((s, o) => s + (o.monto_oportunidad || 0), 0);
-    const repetida = rows.filter((o) => o.tipo_oportunidad === "ESTABLE" || o.tipo_oportunidad === "RECURRENTE").length;
-    const activas = rows.filter((o) => o.estado_actividad === "ACTIVA").length;
-    const efProm = n ? rows.reduce((s, o) => s + (o.efectividad || 0), 0) / n : 0;
+  // ── KPIs (agregados por el servidor sobre el conjunto filtrado) ──
+  function updateKpis(kpis, total) {
+    const k = kpis || {};
+    const monto = k.monto_total || 0;
     $("kpiMonto").textContent = fmtMoneyC(monto);
     $("kpiMonto").title = fmtMoney(monto);
-    $("kpiCount").textContent = new Intl.NumberFormat("es-AR").format(n);
-    $("kpiRepetida").textContent = new Intl.NumberFormat("es-AR").format(repetida);
-    $("kpiActivas").textContent = new Intl.NumberFormat("es-AR").format(activas);
-    $("kpiEfect").textContent = fmtPct(efProm);
+    $("kpiCount").textContent = new Intl.NumberFormat("es-AR").format(total || 0);
+    $("kpiRepetida").textContent = new Intl.NumberFormat("es-AR").format(k.repetida || 0);
+    $("kpiActivas").textContent = new Intl.NumberFormat("es-AR").format(k.activas || 0);
+    $("kpiEfect").textContent = fmtPct(k.efectividad_promedio);
   }
 
   // Botón de CRM en la fila. El estado sale de `o.envio`, que el backend ya resuelve
@@ -130,7 +131,9 @@
   function render(rows) {
     const body = $("oppBody"), empty = $("oppEmpty");
     body.innerHTML = "";
-    $("oppShownLabel").textContent = `${rows.length} de ${ALL.length}`;
+    $("oppShownLabel").textContent = `${rows.length} de ${TOTAL}`;
+    const more = $("oppMoreBtn");
+    if (more) more.style.display = NEXT_CURSOR ? "inline-block" : "none";
     if (!rows.length) { empty.style.display = "block"; return; }
     empty.style.display = "none";
     const frag = document.createDocumentFragment();
@@ -614,7 +617,9 @@
 
   // POST /enviar/{id}: sella el envío server-side y maneja duplicado/éxito/error.
   function removeFromPending(o) {
+    const antes = ALL.length;
     ALL = ALL.filter((row) => row.oportunidad_id !== o.oportunidad_id);
+    TOTAL = Math.max(0, TOTAL - (antes - ALL.length));
   }
 
   async function sendCrm(o) {
@@ -654,7 +659,7 @@
         };
         reflectSent(o);
         removeFromPending(o);
-        applyFilters();
+        render(ALL);
         return;
       }
       // Éxito: sella estado local, refresca el payload mostrado (incluye enviado_por/at).
@@ -691,7 +696,7 @@
       btn.disabled = true; btn.innerHTML = `<i class="bi bi-check2-circle me-1"></i>Enviada`;
       reflectCrmLink(json.crm_url);
       removeFromPending(o);
-      applyFilters(); // refresca el badge "Enviada" en la lista
+      render(ALL); // la enviada sale de la lista sin volver a pedir la página
     } catch (e) {
       setCrmStatus("danger", `<i class="bi bi-x-circle me-1"></i>No se pudo enviar. ${esc(e.message)}`);
       btn.disabled = false; btn.innerHTML = `<i class="bi bi-send-check me-1"></i>Confirmar envío`;
@@ -722,44 +727,92 @@
     sel.value = cur;
   }
 
+  // Primera página: filas + totales/KPIs/ventana/opciones de los selectores.
   async function load() {
+    const seq = ++LOAD_SEQ;
     $("oppWindowLabel").textContent = "Cargando…";
     try {
-      const resp = await fetch(API, { headers: { Accept: "application/json" } });
+      const resp = await fetch(`${API}?${filterQuery()}`, { headers: { Accept: "application/json" } });
       if (!resp.ok) throw new Error(mensajeDeError(resp.status, null));
       const json = await resp.json();
+      if (seq !== LOAD_SEQ) return;
       const data = (json && json.data) || {};
       ALL = data.rows || [];
+      TOTAL = data.total || 0;
+      NEXT_CURSOR = data.next_cursor || null;
       WINDOW = data.window || {};
       CRM_MODO = data.crm_modo || null;
       CRM_ASIGNACION = data.crm_asignacion ||
         { match: null, usuarios: [], sugerido_id: null, error: null, bitacora_por_usuario: {} };
       $("oppWindowLabel").textContent = WINDOW.label ? `Demanda analizada: ${WINDOW.label}` : "Período no disponible";
-      fillSelect("fFamilia", [...new Set(ALL.map((o) => o.familia).filter(Boolean))].sort());
-      fillSelect("fUnidad", [...new Set(ALL.map((o) => o.unidad_negocio).filter(Boolean))].sort());
-      applyFilters();
+      const opciones = data.opciones || {};
+      fillSelect("fFamilia", opciones.familias || []);
+      fillSelect("fUnidad", opciones.unidades_negocio || []);
+      render(ALL);
+      updateKpis(data.kpis, TOTAL);
       abrirDesdeDeepLink();
     } catch (e) {
+      if (seq !== LOAD_SEQ) return;
       $("oppWindowLabel").textContent = "Error al cargar";
       $("oppBody").innerHTML =
         `<div class="opp-empty">No se pudieron cargar las oportunidades. ${esc(e.message)}</div>`;
     }
   }
 
+  // Páginas siguientes: solo filas, con el cursor que devolvió la anterior.
+  async function loadMore() {
+    if (!NEXT_CURSOR) return;
+    const seq = LOAD_SEQ;
+    const btn = $("oppMoreBtn");
+    btn.disabled = true;
+    try {
+      const resp = await fetch(`${API}?${filterQuery({ cursor: NEXT_CURSOR })}`,
+        { headers: { Accept: "application/json" } });
+      if (!resp.ok) throw new Error(mensajeDeError(resp.status, null));
+      const json = await resp.json();
+      if (seq !== LOAD_SEQ) return;
+      const data = (json && json.data) || {};
+      ALL = ALL.concat(data.rows || []);
+      NEXT_CURSOR = data.next_cursor || null;
+      render(ALL);
+    } catch (e) {
+      if (seq === LOAD_SEQ) notifyError(e.message);
+    } finally {
+      btn.disabled = false;
+    }
+  }
+  function notifyError(msg) {
+    const empty = $("oppEmpty");
+    if (!empty) return;
+    empty.style.display = "block";
+    empty.textContent = `No se pudo cargar la página siguiente. ${msg}`;
+  }
+
   // ── Deep-link "Ver en SIEM" (lo usa el botón del lado del CRM) ──
   // URL: /mercado-privado/oportunidades?oportunidad_id=<id_sistema_origen_c>
   // Ese id es el MISMO que viaja al CRM en `id_sistema_origen_c` (sha1 estable de
   // cliente+codigo), así que el CRM puede armar el link concatenando y sin guardar nada
-  // más. Se resuelve del lado del cliente contra las filas ya cargadas: no hace falta
-  // endpoint nuevo ni una segunda consulta.
-  function abrirDesdeDeepLink() {
+  // más. Como la lista llega paginada, si no está entre las filas ya cargadas se pide
+  // puntualmente al mismo endpoint con el filtro `oportunidad_id`.
+  let deepLinkResuelto = false;
+  async function abrirDesdeDeepLink() {
+    if (deepLinkResuelto) return;
+    deepLinkResuelto = true;
     let pedido;
     try {
       pedido = new URLSearchParams(window.location.search).get("oportunidad_id");
     } catch (e) { return; }
     if (!pedido) return;
     pedido = pedido.trim().toLowerCase();
-    const o = ALL.find((x) => String(x.oportunidad_id || "").toLowerCase() === pedido);
+    let o = ALL.find((x) => String(x.oportunidad_id || "").toLowerCase() === pedido);
+    if (!o) {
+      try {
+        const query = new URLSearchParams({ limit: "1", oportunidad_id: pedido });
+        const resp = await fetch(`${API}?${query}`, { headers: { Accept: "application/json" } });
+        const json = resp.ok ? await resp.json() : null;
+        o = ((json && json.data && json.data.rows) || [])[0];
+      } catch (e) { o = null; }
+    }
     if (o) { showDetail(o); return; }
     // No está en la corrida activa: puede haber dejado de calificar en el último
     // recálculo. Se avisa explícitamente en vez de abrir la lista como si nada.
@@ -776,12 +829,13 @@
 
   function init() {
     ["fTipo", "fActividad", "fFamilia", "fUnidad", "fSort"].forEach((id) => $(id).addEventListener("change", applyFilters));
-    $("fSearch").addEventListener("input", applyFilters);
+    $("fSearch").addEventListener("input", applyFiltersDebounced);
     $("fReset").addEventListener("click", () => {
       ["fTipo", "fActividad", "fFamilia", "fUnidad"].forEach((id) => ($(id).value = ""));
       $("fSearch").value = ""; $("fSort").value = "score"; applyFilters();
     });
     $("oppReloadBtn").addEventListener("click", load);
+    $("oppMoreBtn").addEventListener("click", loadMore);
     load();
   }
 
@@ -1,11 +1,14 @@
 import re
 import logging
 import io
+import os
+import tempfile
 import pdfplumber
 import json
 from typing import List, Dict, Any, Tuple
 from .pdf_utils import extract_text_all_pages, extract_text_pages_robust
 from .ollama_client import OllamaClient
+from ..adapters import pdf_executor
 
 
 logger = logging.getLogger("wc.product_agent")
@@ -37,6 +40,33 @@ KNOWN_UNITS = {
 }
 
 
+# Table strategies tried per page, in order (the second one only if nothing was found yet)
+PLUMBER_STRATEGIES = [
+    {"vertical_strategy": "lines", "horizontal_strategy": "lines", "intersection_y_tolerance": 5},
+    {"vertical_strategy": "text", "horizontal_strategy": "text"},
+]
+
+
+def _is_candidate_table(table) -> bool:
+    if not table or len(table) < 2:
+        return False
+    col_map = ProductAgent._map_columns([str(c).lower().strip() for c in table[0]])
+    return col_map.get("qty") is not None and col_map.get("desc") is not None
+
+
+def _tables_for_page(page) -> List[Any]:
+    """
+    Tables of one page for each strategy, extracted in a worker process (pdf_executor).
+    The "text" strategy is only pre-extracted when "lines" found no candidate table;
+    otherwise it stays None and is extracted on demand if it turns out to be needed.
+    """
+    lines = page.extract_tables(table_settings=PLUMBER_STRATEGIES[0]) or []
+    text = None
+    if not any(_is_candidate_table(t) for t in lines):
+        text = page.extract_tables(table_settings=PLUMBER_STRATEGIES[1]) or []
+    return [lines, text]
+
+
 class ProductAgent:
     """
     AGENTE 3: PRODUCTOS (Tabla de Renglones)
@@ -180,13 +210,13 @@ No inventes datos.'''
         items = []
         try:
             with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
+                prefetched = self._prefetch_tables(content, len(pdf.pages))
+                for page_idx, page in enumerate(pdf.pages):
                     # Try multiple strategies
-                    for strategy in [
-                        {"vertical_strategy": "lines", "horizontal_strategy": "lines", "intersection_y_tolerance": 5},
-                        {"vertical_strategy": "text", "horizontal_strategy": "text"},
-                    ]:
-                        tables = page.extract_tables(table_settings=strategy)
+                    for k, strategy in enumerate(PLUMBER_STRATEGIES):
+                        tables = prefetched[page_idx][k] if page_idx < len(prefetched) else None
+                        if tables is None:
+                            tables = page.extract_tables(table_settings=strategy)
                         
                         for table in (tables or []):
                             if not table or len(table) < 2:
@@ -212,7 +242,31 @@ No inventes datos.'''
             
         return items
 
-    def _map_columns(self, header: List[str]) -> Dict[str, int]:
+    def _prefetch_tables(self, content: bytes, n_pages: int) -> List[List[Any]]:
+        """
+        Large PDFs: extract every page's tables in parallel (page ranges across the
+        pdf_executor process pool, cached by file hash). The sequential loop in
+        `_extract_with_plumber` still decides what to use, so results are identical.
+        Returns [] for small PDFs or if the pool fails (-> sequential extraction).
+        """
+        if n_pages <= pdf_executor.PAGINAS_POR_TAREA:
+            return []
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            return pdf_executor.parsear_paginas(tmp_path, _tables_for_page)
+        except Exception as e:
+            logger.warning(f"Parallel table prefetch failed, extracting sequentially: {e}")
+            return []
+        finally:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _map_columns(header: List[str]) -> Dict[str, int]:
         """
         Flexibly map column headers to expected fields.
         Handles many variations: cant/cantidad, desc/descripcion/detalle, 
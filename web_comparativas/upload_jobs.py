@@ -0,0 +1,289 @@
+"""Cola durable de procesamiento de cargas (classify_and_process).
+
+Antes `crear_carga`, `crear_carga_otras_fuentes` y `api_carga_avance` lanzaban
+classify_and_process con BackgroundTasks o un Thread suelto: la normalización
+pesada de Excel/PDF corría dentro del worker web, sin límite de concurrencia, y
+un redeploy la perdía dejando la carga trabada en classifying/processing.
+Ahora (oct-2026) esos endpoints solo encolan una fila en `upload_jobs` y un pool
+acotado de workers la procesa:
+  - toma de jobs con `SELECT ... FOR UPDATE SKIP LOCKED` en PostgreSQL; en SQLite
+    (que ignora FOR UPDATE) el UPDATE condicional sobre status/lease hace de lease;
+  - lease renovado por heartbeat mientras el job corre: si el proceso muere, el
+    lease vence y otro worker lo retoma;
+  - nunca dos jobs del mismo upload a la vez;
+  - progreso por job (`progress`, reportado por classify_and_process);
+  - reintento con backoff exponencial si el pipeline revienta con una excepción.
+    Si termina con error propio (archivo inválido: ya quedó registrado en el
+    upload y notificado) el job queda `failed` sin reintentar;
+  - al arrancar, las cargas en classifying/processing sin normalized y sin job
+    activo se re-encolan (`recover_stuck_uploads`).
+
+Entorno: UPLOAD_JOB_WORKERS (0 = este proceso no levanta workers; correr aparte
+`python -m web_comparativas.upload_jobs`), UPLOAD_JOB_MAX_ATTEMPTS,
+UPLOAD_JOB_LEASE_SECONDS.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import os
+import socket
+import threading
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.orm import aliased
+
+from web_comparativas.models import IS_SQLITE, SessionLocal, Upload, UploadJob
+
+logger = logging.getLogger("wc.upload_jobs")
+
+WORKERS = int(os.getenv("UPLOAD_JOB_WORKERS", "1" if IS_SQLITE else "2"))
+MAX_ATTEMPTS = int(os.getenv("UPLOAD_JOB_MAX_ATTEMPTS", "3"))
+LEASE_SECONDS = int(os.getenv("UPLOAD_JOB_LEASE_SECONDS", "120"))
+BACKOFF_SECONDS = 30        # 30s, 60s, 120s, ...
+POLL_SECONDS = 5
+
+_ACTIVE = ("queued", "running")
+_STUCK_STATUSES = ("classifying", "processing")
+
+_Session = SessionLocal      # los tests lo reemplazan por una base en memoria
+_wakeup = threading.Event()
+_stop = threading.Event()
+_pool: list[threading.Thread] = []
+_pool_lock = threading.Lock()
+
+
+def _now() -> dt.datetime:
+    return dt.datetime.utcnow()
+
+
+def enqueue(upload_id: int, metadata: Optional[dict] = None, *, touch_status: bool = True) -> int:
+    """Encola el procesamiento del upload. Idempotente mientras haya uno en cola."""
+    with _Session() as s:
+        job = s.execute(
+            select(UploadJob)
+            .where(UploadJob.upload_id == int(upload_id), UploadJob.status == "queued")
+            .order_by(UploadJob.id)
+            .limit(1)
+        ).scalar_one_or_none()
+        if job is None:
+            job = UploadJob(
+                upload_id=int(upload_id),
+                metadata_json=json.dumps(metadata or {}, ensure_ascii=False, default=str),
+                touch_status=touch_status,
+                max_attempts=MAX_ATTEMPTS,
+                available_at=_now(),
+                progress="queued",
+            )
+            s.add(job)
+            s.commit()
+        job_id = int(job.id)
+    _wakeup.set()
+    logger.info("[upload %s] job %s encolado", upload_id, job_id)
+    return job_id
+
+
+def _claimable(now: dt.datetime):
+    return or_(
+        and_(UploadJob.status == "queued", UploadJob.available_at <= now),
+        and_(UploadJob.status == "running", UploadJob.lease_until < now),
+    )
+
+
+def claim(worker_id: str) -> Optional[SimpleNamespace]:
+    """Toma el próximo job disponible (o con lease vencido) para `worker_id`."""
+    now = _now()
+    tomable = _claimable(now)
+    otro = aliased(UploadJob)
+    ocupado = exists().where(
+        otro.upload_id == UploadJob.upload_id,
+        otro.id != UploadJob.id,
+        otro.status == "running",
+        otro.lease_until >= now,
+    )
+    with _Session() as s:
+        job_id = s.execute(
+            select(UploadJob.id)
+            .where(tomable, ~ocupado)
+            .order_by(UploadJob.available_at, UploadJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if job_id is None:
+            s.rollback()
+            return None
+        res = s.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job_id, tomable)
+            .values(
+                status="running",
+                locked_by=worker_id,
+                lease_until=now + dt.timedelta(seconds=LEASE_SECONDS),
+                attempts=UploadJob.attempts + 1,
+                started_at=now,
+                progress="claimed",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        s.commit()
+        if res.rowcount != 1:       # otro worker ganó el lease (SQLite)
+            return None
+        job = s.get(UploadJob, job_id)
+        return SimpleNamespace(
+            id=int(job.id),
+            upload_id=int(job.upload_id),
+            metadata=json.loads(job.metadata_json or "{}"),
+            touch_status=bool(job.touch_status),
+            attempts=int(job.attempts),
+            max_attempts=int(job.max_attempts),
+        )
+
+
+def _update_owned(job_id: int, worker_id: str, **values: Any) -> bool:
+    """UPDATE solo si el job sigue siendo de este worker (no pisa a quien lo retomó)."""
+    with _Session() as s:
+        res = s.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job_id, UploadJob.locked_by == worker_id, UploadJob.status == "running")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        s.commit()
+        return res.rowcount == 1
+
+
+def _finish(job: SimpleNamespace, worker_id: str, status: str, error: Optional[str] = None) -> None:
+    now = _now()
+    values: dict[str, Any] = {"status": status, "lease_until": None, "last_error": error}
+    if status == "queued":
+        values["available_at"] = now + dt.timedelta(seconds=BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        values["progress"] = "retry"
+        values["locked_by"] = None
+    else:
+        values["finished_at"] = now
+        values["progress"] = status
+    _update_owned(job.id, worker_id, **values)
+
+
+def run_job(job: SimpleNamespace, worker_id: str) -> str:
+    """Corre classify_and_process para el job y registra el resultado. Devuelve el status final."""
+    from web_comparativas import services
+
+    if job.attempts > job.max_attempts:
+        # Solo llega acá un job retomado por lease vencido: murió tantas veces como intentos tenía.
+        _finish(job, worker_id, "failed", "lease vencido: el worker murió en cada intento")
+        return "failed"
+
+    hb_stop = threading.Event()
+
+    def _heartbeat() -> None:
+        while not hb_stop.wait(LEASE_SECONDS / 3):
+            lease = _now() + dt.timedelta(seconds=LEASE_SECONDS)
+            if not _update_owned(job.id, worker_id, lease_until=lease):
+                return
+
+    def _progress(step: str) -> None:
+        try:
+            _update_owned(job.id, worker_id, progress=str(step)[:40])
+        except Exception:
+            pass
+
+    hb = threading.Thread(target=_heartbeat, name=f"{worker_id}-lease", daemon=True)
+    hb.start()
+    try:
+        result = services.classify_and_process(
+            job.upload_id, job.metadata, touch_status=job.touch_status, progress=_progress
+        )
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        status = "queued" if job.attempts < job.max_attempts else "failed"
+        logger.warning("[upload %s] job %s intento %s falló (%s): %s",
+                       job.upload_id, job.id, job.attempts, status, error)
+        _finish(job, worker_id, status, error[:2000])
+        return status
+    finally:
+        hb_stop.set()
+        services.db_session.remove()
+
+    if isinstance(result, dict) and result.get("error"):
+        _finish(job, worker_id, "failed", str(result["error"])[:2000])
+        return "failed"
+    _finish(job, worker_id, "done")
+    return "done"
+
+
+def recover_stuck_uploads() -> int:
+    """Re-encola cargas trabadas en classifying/processing (sin normalized ni job activo)."""
+    with _Session() as s:
+        activos = select(UploadJob.upload_id).where(UploadJob.status.in_(_ACTIVE))
+        ids = s.execute(
+            select(Upload.id).where(
+                Upload.status.in_(_STUCK_STATUSES),
+                Upload.normalized_content.is_(None),
+                Upload.id.not_in(activos),
+            )
+        ).scalars().all()
+    for upload_id in ids:
+        enqueue(upload_id, {})
+    if ids:
+        logger.info("Re-encoladas %d cargas trabadas: %s", len(ids), list(ids))
+    return len(ids)
+
+
+def _worker_loop(worker_id: str) -> None:
+    while not _stop.is_set():
+        try:
+            job = claim(worker_id)
+        except Exception as exc:
+            logger.warning("[%s] no se pudo tomar job: %s", worker_id, exc)
+            job = None
+        if job is None:
+            _wakeup.wait(POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        logger.info("[%s] job %s (upload %s, intento %s)", worker_id, job.id, job.upload_id, job.attempts)
+        try:
+            run_job(job, worker_id)
+        except Exception as exc:
+            logger.error("[%s] job %s: error no controlado: %s", worker_id, job.id, exc, exc_info=True)
+
+
+def start_pool(workers: Optional[int] = None) -> int:
+    """Levanta el pool de workers de este proceso (idempotente). Devuelve cuántos corren."""
+    n = WORKERS if workers is None else int(workers)
+    with _pool_lock:
+        _pool[:] = [t for t in _pool if t.is_alive()]
+        if n <= 0 or _pool:
+            return len(_pool)
+        _stop.clear()
+        try:
+            recover_stuck_uploads()
+        except Exception as exc:
+            logger.warning("recover_stuck_uploads falló: %s", exc)
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(n):
+            t = threading.Thread(
+                target=_worker_loop, args=(f"{base}:{i}",), name=f"upload-job-{i}", daemon=True
+            )
+            t.start()
+            _pool.append(t)
+        logger.info("Pool de procesamiento de cargas: %d workers", n)
+        return n
+
+
+def stop_pool() -> None:
+    _stop.set()
+    _wakeup.set()
+
+
+if __name__ == "__main__":
+    # Worker dedicado: `UPLOAD_JOB_WORKERS=0` en el web y esto en otro proceso.
+    logging.basicConfig(level=logging.INFO)
+    start_pool(max(WORKERS, 1))
+    try:
+        _stop.wait()
+    except KeyboardInterrupt:
+        stop_pool()
@@ -1,7 +1,8 @@
 import re, yaml
-from importlib import import_module
 from pathlib import Path
 
+from web_comparativas.adapter_registry import CompiledRegistry, get_registry, load_handler
+
 def load_registry(path: str | Path) -> list[dict]:
     p = Path(path)
     if not p.exists():
@@ -10,10 +11,21 @@ def load_registry(path: str | Path) -> list[dict]:
         raw = yaml.safe_load(f) or {}
     return raw.get("sources", [])
 
+def load_compiled_registry(path: str | Path) -> CompiledRegistry:
+    """Registry compilado y cacheado (se recompila si cambia el archivo).
+
+    Ojo: despacha con la semántica de services (`re.match` sin mayúsculas, DEFAULT
+    si no cumple ninguna), no con la de `pick_handler`.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"registry.yml no encontrado en {p.resolve()}")
+    return get_registry(p)
+
 def pick_handler(meta: dict, registry: list[dict]):
     """
     meta: {"platform","province","buyer","filename","header_sample"...}
-    Devuelve (callable, source_id)
+    Devuelve (callable, source_id); el import del handler queda memoizado.
     """
     for src in registry:
         w = src.get("when", {})
@@ -31,7 +43,5 @@ def pick_handler(meta: dict, registry: list[dict]):
             ok &= all(h.lower() in sample for h in w["header_contains"])
         if not ok:
             continue
-        mod, func = src["handler"].split(":")
-        handler = getattr(import_module(mod), func)
-        return handler, src.get("id")
+        return load_handler(src["handler"]), src.get("id")
     raise ValueError(f"No se encontró handler para meta={meta}")
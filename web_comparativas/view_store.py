@@ -0,0 +1,409 @@
+"""Vistas guardadas y presets de filtros en una sola tabla ('saved_views').
+
+Antes había dos mecanismos: los presets de /api/presets eran un JSON por usuario
+en data/presets/ (leído y reescrito entero en cada llamada, con carreras entre
+requests y sin compartirse entre workers) y las vistas de services.list_views /
+save_view consultaban SavedView cada vez, con `_unset_others_default` recorriendo
+filas para desmarcar defaults. Ahora (oct-2026):
+  - todo vive en 'saved_views'; los presets usan view_id 'preset:<vista>' y un
+    `public_id` (uuid) estable, el mismo que tenían en el JSON;
+  - guardar es un upsert atómico (INSERT ... ON CONFLICT sobre user/view/nombre);
+  - cambiar el default es UN UPDATE (`is_default = (id = :elegida)`);
+  - lectura desde un caché en memoria por usuario (una consulta trae todas sus
+    vistas y presets), invalidado en cada escritura y con TTL por si hay más de
+    un worker;
+  - el JSON viejo de un usuario se importa la primera vez que se leen sus presets
+    y queda renombrado a <id>.json.migrated.
+
+Las funciones de vistas devuelven el mismo dict que `services._serialize_sv`; las
+de presets, el formato de /api/presets ({id, view, name, filters, ...}).
+"""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from web_comparativas.models import SavedView, SessionLocal
+
+logger = logging.getLogger("wc.view_store")
+
+_Session = SessionLocal      # los tests lo reemplazan por una base en memoria
+
+PRESET_PREFIX = "preset:"
+CACHE_TTL = 60.0
+NOMBRE_MAX = 120
+
+_cache: dict[int, tuple[float, dict[str, list[dict]]]] = {}
+_migrados: set[int] = set()
+_lock = threading.Lock()
+
+
+def _preset_view_id(view: str) -> str:
+    return f"{PRESET_PREFIX}{view}"
+
+
+def _iso(v: Optional[dt.datetime]) -> Optional[str]:
+    return v.isoformat() if v else None
+
+
+def _fila(sv: SavedView) -> dict[str, Any]:
+    return {
+        "id": sv.id,
+        "user_id": sv.user_id,
+        "view_id": sv.view_id,
+        "name": sv.name,
+        "is_default": bool(sv.is_default),
+        "payload": dict(sv.payload or {}),
+        "created_at": _iso(sv.created_at),
+        "updated_at": _iso(sv.updated_at),
+        "public_id": sv.public_id,
+    }
+
+
+def _como_vista(d: dict) -> dict:
+    out = {k: v for k, v in d.items() if k != "public_id"}
+    out["payload"] = dict(d["payload"])
+    return out
+
+
+def _como_preset(d: dict) -> dict:
+    return {
+        "id": d["public_id"] or str(d["id"]),
+        "view": d["view_id"][len(PRESET_PREFIX):],
+        "name": d["name"],
+        "filters": dict(d["payload"]),
+        "created_at": d["created_at"],
+        "updated_at": d["updated_at"],
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Caché por usuario
+# ──────────────────────────────────────────────────────────────────────────────
+
+def invalidar(user_id: Optional[int] = None) -> None:
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(user_id), None)
+
+
+def _del_usuario(user_id: int) -> dict[str, list[dict]]:
+    """Todas las vistas y presets del usuario agrupados por view_id (default primero, más nuevas primero)."""
+    user_id = int(user_id)
+    ahora = time.monotonic()
+    hit = _cache.get(user_id)
+    if hit is not None and ahora - hit[0] < CACHE_TTL:
+        return hit[1]
+    with _Session() as s:
+        filas = s.scalars(
+            select(SavedView)
+            .where(SavedView.user_id == user_id)
+            .order_by(SavedView.view_id, SavedView.is_default.desc(), SavedView.updated_at.desc())
+        ).all()
+        agrupado: dict[str, list[dict]] = {}
+        for sv in filas:
+            agrupado.setdefault(sv.view_id, []).append(_fila(sv))
+    with _lock:
+        _cache[user_id] = (ahora, agrupado)
+    return agrupado
+
+
+def _buscar(user_id: int, view_id: str, *, pk: Optional[int] = None, name: Optional[str] = None,
+            public_id: Optional[str] = None) -> Optional[dict]:
+    for d in _del_usuario(user_id).get(str(view_id), []):
+        if pk is not None and d["id"] == int(pk):
+            return d
+        if pk is None and public_id is not None and d["public_id"] == public_id:
+            return d
+        if pk is None and public_id is None and name is not None and d["name"] == name:
+            return d
+    return None
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Escritura
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _dialect_insert(s):
+    nombre = s.get_bind().dialect.name
+    if nombre == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif nombre == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def _cambiar_default(s, user_id: int, view_id: str, keep_id: int) -> None:
+    """Un solo UPDATE: queda `keep_id` como default y se desmarcan las demás del mismo usuario/vista."""
+    s.execute(
+        update(SavedView)
+        .where(
+            SavedView.user_id == int(user_id),
+            SavedView.view_id == str(view_id),
+            or_(SavedView.is_default.is_(True), SavedView.id == int(keep_id)),
+        )
+        .values(is_default=(SavedView.id == int(keep_id)), updated_at=dt.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _upsert(s, user_id: int, view_id: str, name: str, payload: dict, *, is_default: bool,
+            replace_existing: bool, public_id: Optional[str]) -> Optional[int]:
+    """INSERT ... ON CONFLICT (user_id, view_id, name). Devuelve el id, o None si existía y no se reemplaza."""
+    ahora = dt.datetime.utcnow()
+    valores = dict(user_id=int(user_id), view_id=str(view_id), name=name, payload=payload,
+                   is_default=bool(is_default), public_id=public_id, created_at=ahora, updated_at=ahora)
+    clave = (SavedView.user_id == int(user_id), SavedView.view_id == str(view_id), SavedView.name == name)
+    dialect_insert = _dialect_insert(s)
+    if dialect_insert is not None:
+        stmt = dialect_insert(SavedView).values(**valores)
+        if replace_existing:
+            tabla = SavedView.__table__
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "view_id", "name"],
+                set_={
+                    "payload": stmt.excluded.payload,
+                    "is_default": or_(tabla.c.is_default, stmt.excluded.is_default),
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "view_id", "name"])
+        res = s.execute(stmt)
+        if not replace_existing and res.rowcount == 0:
+            return None
+    else:                                            # otros motores: select + insert/update
+        sv = s.scalars(select(SavedView).where(*clave).with_for_update()).first()
+        if sv is None:
+            s.execute(insert(SavedView).values(**valores))
+        elif not replace_existing:
+            return None
+        else:
+            sv.payload = payload
+            sv.is_default = bool(is_default) or bool(sv.is_default)
+            sv.updated_at = ahora
+        s.flush()
+    return s.scalar(select(SavedView.id).where(*clave))
+
+
+def guardar(user_id: int, view_id: str, name: str, payload: dict, *, is_default: bool = False,
+            replace_existing: bool = True) -> dict:
+    """Crea o actualiza (user, view_id, name); si queda como default, desmarca las demás."""
+    with _Session() as s:
+        try:
+            pk = _upsert(s, user_id, view_id, name, payload, is_default=is_default,
+                         replace_existing=replace_existing, public_id=None)
+            if pk is None:
+                raise ValueError("Ya existe una vista con ese nombre.")
+            sv = s.get(SavedView, pk)
+            if sv.is_default:
+                _cambiar_default(s, user_id, view_id, pk)
+            s.commit()
+        finally:
+            invalidar(user_id)
+        s.refresh(sv)
+        return _como_vista(_fila(sv))
+
+
+def marcar_default(user_id: int, view_id: str, *, pk: Optional[int] = None,
+                   name: Optional[str] = None) -> Optional[dict]:
+    """Marca la vista (por id o nombre) como default. None si no existe."""
+    with _Session() as s:
+        filtro = [SavedView.user_id == int(user_id), SavedView.view_id == str(view_id)]
+        filtro.append(SavedView.id == int(pk) if pk is not None else SavedView.name == str(name))
+        keep_id = s.scalar(select(SavedView.id).where(*filtro))
+        if keep_id is None:
+            return None
+        try:
+            _cambiar_default(s, user_id, view_id, keep_id)
+            s.commit()
+        finally:
+            invalidar(user_id)
+        return _como_vista(_fila(s.get(SavedView, keep_id)))
+
+
+def eliminar(user_id: int, view_id: str, *, pk: Optional[int] = None, name: Optional[str] = None,
+             public_id: Optional[str] = None) -> bool:
+    filtro = [SavedView.user_id == int(user_id), SavedView.view_id == str(view_id)]
+    if pk is not None:
+        filtro.append(SavedView.id == int(pk))
+    elif public_id is not None:
+        filtro.append(SavedView.public_id == str(public_id))
+    else:
+        filtro.append(SavedView.name == str(name))
+    with _Session() as s:
+        try:
+            n = s.execute(delete(SavedView).where(*filtro).execution_options(synchronize_session=False)).rowcount
+            s.commit()
+        finally:
+            invalidar(user_id)
+    return bool(n)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Vistas (services.list_views & cía.)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def listar(user_id: int, view_id: str = "dashboard") -> list[dict]:
+    return [_como_vista(d) for d in _del_usuario(user_id).get(str(view_id), [])]
+
+
+def por_defecto(user_id: int, view_id: str = "dashboard") -> Optional[dict]:
+    for d in _del_usuario(user_id).get(str(view_id), []):
+        if d["is_default"]:
+            return _como_vista(d)
+    return None
+
+
+def obtener(user_id: int, view_id: str = "dashboard", *, pk: Optional[int] = None,
+            name: Optional[str] = None) -> Optional[dict]:
+    if pk is None and not name:
+        return None
+    d = _buscar(user_id, view_id, pk=pk, name=name)
+    return _como_vista(d) if d else None
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Presets de filtros (/api/presets)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def presets(user_id: int, view: str, *, json_path: Optional[Path] = None) -> list[dict]:
+    """Presets del usuario para `view`, más nuevos primero (importa el JSON viejo la primera vez)."""
+    if json_path is not None:
+        migrar_json(user_id, json_path)
+    filas = _del_usuario(user_id).get(_preset_view_id(view), [])
+    return sorted((_como_preset(d) for d in filas), key=lambda p: p["updated_at"] or "", reverse=True)
+
+
+def obtener_preset(user_id: int, view: str, preset_id: str, *,
+                   json_path: Optional[Path] = None) -> Optional[dict]:
+    if json_path is not None:
+        migrar_json(user_id, json_path)
+    d = _buscar(user_id, _preset_view_id(view), public_id=str(preset_id))
+    return _como_preset(d) if d else None
+
+
+def guardar_preset(user_id: int, view: str, name: str, filters: dict, *,
+                   preset_id: Optional[str] = None) -> dict:
+    """Nuevo preset (mismo nombre = se actualiza ese) o, con `preset_id`, actualiza ese preset.
+
+    LookupError si `preset_id` no existe; ValueError si el nombre ya lo usa otro preset.
+    """
+    view_id = _preset_view_id(view)
+    name = name[:NOMBRE_MAX]
+    with _Session() as s:
+        try:
+            if preset_id:
+                res = s.execute(
+                    update(SavedView)
+                    .where(SavedView.user_id == int(user_id), SavedView.view_id == view_id,
+                           SavedView.public_id == str(preset_id))
+                    .values(name=name, payload=filters, updated_at=dt.datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                if res.rowcount == 0:
+                    raise LookupError(preset_id)
+                pk = s.scalar(select(SavedView.id).where(SavedView.public_id == str(preset_id)))
+            else:
+                pk = _upsert(s, user_id, view_id, name, filters, is_default=False,
+                             replace_existing=True, public_id=str(uuid.uuid4()))
+            s.commit()
+        except IntegrityError:
+            s.rollback()
+            raise ValueError("Ya existe un preset con ese nombre.")
+        finally:
+            invalidar(user_id)
+        return _como_preset(_fila(s.get(SavedView, pk)))
+
+
+def eliminar_preset(user_id: int, view: str, preset_id: str) -> bool:
+    return eliminar(user_id, _preset_view_id(view), public_id=str(preset_id))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Migración de data/presets/<user>.json
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _fecha(v: Any) -> dt.datetime:
+    try:
+        return dt.datetime.fromisoformat(str(v))
+    except (TypeError, ValueError):
+        return dt.datetime.utcnow()
+
+
+def migrar_json(user_id: int, json_path: Path) -> int:
+    """Importa el JSON de presets del usuario (una vez por proceso). Devuelve cuántos insertó.
+
+    Idempotente entre workers: ON CONFLICT DO NOTHING por public_id y nombre. Nombres
+    repetidos dentro de la misma vista se desambiguan con ' (2)', ' (3)'...
+    """
+    user_id = int(user_id)
+    if user_id in _migrados:
+        return 0
+    json_path = Path(json_path)
+    if not json_path.exists():
+        _migrados.add(user_id)
+        return 0
+    try:
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        logger.warning("[VIEW_STORE] presets de user=%s ilegibles (%s): no se migran.", user_id, exc)
+        _migrados.add(user_id)
+        return 0
+
+    insertados = 0
+    with _Session() as s:
+        usados: dict[str, set[str]] = {}
+        for vid, nombre in s.execute(
+            select(SavedView.view_id, SavedView.name).where(
+                SavedView.user_id == user_id, SavedView.view_id.like(f"{PRESET_PREFIX}%"))
+        ):
+            usados.setdefault(vid, set()).add(nombre)
+        ya = set(s.scalars(select(SavedView.public_id).where(
+            SavedView.user_id == user_id, SavedView.public_id.is_not(None))))
+
+        dialect_insert = _dialect_insert(s)
+        for p in (data if isinstance(data, list) else []):
+            if not isinstance(p, dict) or not p.get("id") or str(p["id"]) in ya:
+                continue
+            view_id = _preset_view_id(str(p.get("view") or "historial"))
+            base = (str(p.get("name") or "").strip() or "Sin título")[:NOMBRE_MAX]
+            nombre, k = base, 2
+            while nombre in usados.setdefault(view_id, set()):
+                suf = f" ({k})"
+                nombre, k = base[:NOMBRE_MAX - len(suf)] + suf, k + 1
+            valores = dict(
+                user_id=user_id, view_id=view_id, name=nombre, is_default=False,
+                payload=p.get("filters") if isinstance(p.get("filters"), dict) else {},
+                public_id=str(p["id"])[:36],
+                created_at=_fecha(p.get("created_at")), updated_at=_fecha(p.get("updated_at")),
+            )
+            if dialect_insert is not None:
+                res = s.execute(dialect_insert(SavedView).values(**valores).on_conflict_do_nothing())
+                insertados += res.rowcount or 0
+            else:
+                s.execute(insert(SavedView).values(**valores))
+                insertados += 1
+            usados[view_id].add(nombre)
+        s.commit()
+    invalidar(user_id)
+    _migrados.add(user_id)
+    try:
+        json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+    except OSError as exc:
+        logger.warning("[VIEW_STORE] no se pudo renombrar %s (%s); re-importarlo no duplica.", json_path, exc)
+    logger.info("[VIEW_STORE] user=%s: %d presets migrados desde %s.", user_id, insertados, json_path.name)
+    return insertados
@@ -1,10 +1,15 @@
 # web_comparativas/visibility_service.py
 from __future__ import annotations
-from typing import Optional, Dict, Set, List
+from typing import Any, Optional, Dict, Set, List
 from dataclasses import dataclass
+from itertools import chain
+from types import SimpleNamespace
+import datetime as dt
+import threading
+import time
 
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, select
+from sqlalchemy import case, event, inspect as sa_inspect, or_, func, select
 from sqlalchemy.orm import aliased
 
 # Importamos solo los modelos/base de datos, no helpers de visibilidad
@@ -208,38 +213,41 @@ def uploads_visible_query(session: Session, user):
       - Analista: uploads de los usuarios visibles (sin fallback por 'mismo proceso').
       - Supervisor/Otros: filtra por user_ids visibles + fallback por 'mismo proceso'.
     """
+    crit, _kpi_crit, _key = _upload_scope(session, user)
+    qry = session.query(Upload)
+    return qry if crit is None else qry.filter(crit)
+
+
+def _upload_scope(session: Session, user):
+    """
+    Alcance de visibilidad de uploads como criterio SQL (sin armar la query):
+      (criterio de visibilidad | None, criterio de KPIs | None, clave de alcance).
+    El criterio de KPIs no incluye el fallback por 'mismo proceso' (como siempre
+    contaron las tarjetas del panel). La clave identifica el alcance para cachear.
+    """
     if _is_admin(user):
-        return session.query(Upload)
+        return None, None, ("all",)
 
     me = int(user.id)
 
     # Regla para Analista: uploads de usuarios visibles (sin fallback por proceso)
     if _is_analyst(user):
-        ids = list(visible_user_ids(session, user) or {me})
-        return session.query(Upload).filter(Upload.user_id.in_(ids))
+        ids = sorted(visible_user_ids(session, user) or {me})
+        crit = Upload.user_id.in_(ids)
+        return crit, crit, ("ids", tuple(ids))
 
     # Resto de roles: visibilidad por usuarios + fallback por mismo proceso
-    ids = list(visible_user_ids(session, user)) or [me]
+    ids = sorted(visible_user_ids(session, user)) or [me]
 
-    # Subquery con los proceso_key que cargó el propio usuario
-    own_keys_subq = (
-        session.query(Upload.proceso_key)
-        .filter(
-            Upload.user_id == me,
-            Upload.proceso_key.isnot(None),
-        )
-        .subquery()
-    )
+    # proceso_key que cargó el propio usuario (alias: no se correlaciona con la query externa)
+    own = aliased(Upload)
+    own_keys = select(own.proceso_key).where(own.user_id == me, own.proceso_key.isnot(None))
 
-    return (
-        session.query(Upload)
-        .filter(
-            or_(
-                Upload.user_id.in_(ids),  # regla tradicional por visibilidad de usuario
-                Upload.proceso_key.in_(select(own_keys_subq.c.proceso_key)),  # mismo proceso
-            )
-        )
+    crit = or_(
+        Upload.user_id.in_(ids),  # regla tradicional por visibilidad de usuario
+        Upload.proceso_key.in_(own_keys),  # mismo proceso
     )
+    return crit, Upload.user_id.in_(ids), ("proc", me, tuple(ids))
 
 
 def can_view_upload(session: Session, user, upload: Upload) -> bool:
@@ -359,45 +367,157 @@ def kpis_for_home(session: Session, user) -> Dict[str, int]:
       - pending: pending|classifying|processing|reviewing
       - done: done
       - total: todos los visibles
+    Salen del agregado cacheado de `home_panel` (antes: tres COUNT por request).
     """
-    # Rama rápida para admin/auditor: no filtra por usuario
-    if _is_admin(user):
-        pending = (
-            session.query(func.count(Upload.id))
-            .filter(Upload.status.in_(PENDING_STATUSES))
-            .scalar()
-            or 0
-        )
-        done = (
-            session.query(func.count(Upload.id))
-            .filter(Upload.status == DONE_STATUS)
-            .scalar()
-            or 0
-        )
-        total = session.query(func.count(Upload.id)).scalar() or 0
-        return {"pending": pending, "done": done, "total": total}
+    return dict(home_panel(session, user)["kpis"])
 
-    ids = list(visible_user_ids(session, user) or {int(user.id)})
 
-    pending = (
-        session.query(func.count(Upload.id))
-        .filter(Upload.user_id.in_(ids), Upload.status.in_(PENDING_STATUSES))
-        .scalar()
-        or 0
-    )
-    done = (
-        session.query(func.count(Upload.id))
-        .filter(Upload.user_id.in_(ids), Upload.status == DONE_STATUS)
-        .scalar()
-        or 0
-    )
-    total = (
-        session.query(func.count(Upload.id))
-        .filter(Upload.user_id.in_(ids))
-        .scalar()
-        or 0
-    )
-    return {"pending": pending, "done": done, "total": total}
+# ----------------------------------------------------------------------
+# Panel de inicio: un agregado por estado + dos LIMIT sobre columnas angostas
+# ----------------------------------------------------------------------
+# Antes el panel hacía `uploads_visible_ext(...).all()` (cada Upload con sus
+# blobs, comentarios y usuario) para partirlo en Python, más tres COUNT. Ahora
+# (oct-2026): GROUP BY status con el conteo visible y el de KPIs, los últimos 5
+# y los listos en 24h con proyección angosta. Cacheado por alcance de
+# visibilidad; se invalida cuando un commit toca el estado (o la visibilidad)
+# de un upload en este proceso, y vence a los HOME_CACHE_TTL segundos por los
+# cambios hechos desde otros procesos (workers de upload_jobs, otras réplicas).
+HOME_DONE_STATUSES = ("done", "dashboard", "finalizado", "tablero")
+HOME_LAST_LIMIT = 5
+HOME_RECENT_LIMIT = 50
+HOME_CACHE_TTL = 60.0
+_HOME_CACHE_MAX = 256
+
+_HOME_COLUMNS = (
+    Upload.id,
+    Upload.proceso_nro,
+    Upload.platform_hint,
+    Upload.buyer_hint,
+    Upload.apertura_fecha,
+    Upload.original_filename,
+    Upload.status,
+    Upload.created_at,
+    Upload.updated_at,
+)
+# campos que mueven algún número o fila del panel
+_HOME_FIELDS = (
+    "status", "user_id", "proceso_key", "proceso_nro", "platform_hint",
+    "buyer_hint", "apertura_fecha", "original_filename",
+)
+_HOME_DIRTY = "home_panel_dirty"
+
+_home_lock = threading.Lock()
+_home_cache: Dict[tuple, tuple] = {}
+_home_version = 0
+
+
+def invalidate_home_panel() -> None:
+    global _home_version
+    with _home_lock:
+        _home_version += 1
+        _home_cache.clear()
+
+
+def _home_rows(session: Session, crit, *extra, limit: int) -> List[SimpleNamespace]:
+    stmt = select(*_HOME_COLUMNS)
+    if crit is not None:
+        stmt = stmt.where(crit)
+    if extra:
+        stmt = stmt.where(*extra)
+    stmt = stmt.order_by(Upload.created_at.desc()).limit(limit)
+    return [SimpleNamespace(**row._mapping) for row in session.execute(stmt)]
+
+
+def _home_panel_query(session: Session, crit, kpi_crit) -> Dict[str, Any]:
+    if kpi_crit is None or kpi_crit is crit:
+        kpi_count = func.count(Upload.id)
+    else:
+        kpi_count = func.count(case((kpi_crit, 1)))
+    stmt = select(Upload.status, func.count(Upload.id), kpi_count).group_by(Upload.status)
+    if crit is not None:
+        stmt = stmt.where(crit)
+
+    by_status: Dict[Optional[str], int] = {}
+    kpi_by_status: Dict[Optional[str], int] = {}
+    for status, n_visible, n_kpi in session.execute(stmt):
+        by_status[status] = int(n_visible or 0)
+        kpi_by_status[status] = int(n_kpi or 0)
+
+    since = dt.datetime.utcnow() - dt.timedelta(hours=24)
+    return {
+        "kpis": {
+            "pending": sum(kpi_by_status.get(st, 0) for st in PENDING_STATUSES),
+            "done": kpi_by_status.get(DONE_STATUS, 0),
+            "total": sum(kpi_by_status.values()),
+        },
+        "by_status": by_status,
+        "visible_total": sum(by_status.values()),
+        "last_done": _home_rows(session, crit, limit=HOME_LAST_LIMIT),
+        "recent_done": _home_rows(
+            session, crit,
+            Upload.status.in_(HOME_DONE_STATUSES),
+            Upload.updated_at >= since,
+            limit=HOME_RECENT_LIMIT,
+        ),
+    }
+
+
+def home_panel(session: Session, user) -> Dict[str, Any]:
+    """
+    Datos de procesos del panel de inicio para `user`:
+      kpis (pending/done/total), by_status, visible_total,
+      last_done (últimos 5 visibles, cualquier estado) y
+      recent_done (finalizados en las últimas 24h, hasta HOME_RECENT_LIMIT).
+    Las filas son SimpleNamespace con id, proceso_nro, hints, archivo, estado y fechas.
+    """
+    crit, kpi_crit, key = _upload_scope(session, user)
+    now = time.monotonic()
+    with _home_lock:
+        hit = _home_cache.get(key)
+        version = _home_version
+    if hit is not None and hit[0] == version and now - hit[1] < HOME_CACHE_TTL:
+        return hit[2]
+
+    data = _home_panel_query(session, crit, kpi_crit)
+    with _home_lock:
+        if version == _home_version:
+            if len(_home_cache) >= _HOME_CACHE_MAX:
+                _home_cache.clear()
+            _home_cache[key] = (version, now, data)
+    return data
+
+
+@event.listens_for(Session, "after_flush")
+def _home_after_flush(session, _flush_context):
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, Upload):
+            session.info[_HOME_DIRTY] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Upload):
+            attrs = sa_inspect(obj).attrs
+            if any(attrs[f].history.has_changes() for f in _HOME_FIELDS):
+                session.info[_HOME_DIRTY] = True
+                return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _home_bulk_dml(state):
+    # query(Upload).update(...) / update(Upload) no pasan por el flush
+    if (state.is_update or state.is_delete) and state.bind_mapper is not None:
+        if state.bind_mapper.class_ is Upload:
+            state.session.info[_HOME_DIRTY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _home_after_commit(session):
+    if session.info.pop(_HOME_DIRTY, False):
+        invalidate_home_panel()
+
+
+@event.listens_for(Session, "after_rollback")
+def _home_after_rollback(session):
+    session.info.pop(_HOME_DIRTY, None)
 
 
 def recent_done(session: Session, user, limit: int = 5):